@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy
+from osgeo import gdal
+
+from .catalog import get_day_directory_at, parse_tif_path
+from .datetime_utils import (
+    FIVE_MINUTES_IN_SECONDS,
+    ONE_DAY_IN_SECONDS,
+    ONE_HOUR_IN_SECONDS,
+    datetime_of,
+)
+from .generation import (
+    FileExistenceChecker,
+    IdentityTransform,
+    TifConfig,
+    TifLocator,
+    TifReader,
+    Transform,
+    check_tif_config,
+    get_tif_config_of_dataset,
+    read_tif,
+)
+from .tiles import (
+    PrecipitationsParam,
+    Zone,
+    get_param_key_for_zone,
+    get_tif_path_for_param_in_zone_at,
+)
+
+ARCHIVED_PARAMS_STEPS = {
+    PrecipitationsParam.VALUES_5MN: FIVE_MINUTES_IN_SECONDS,
+    PrecipitationsParam.VALUES_1H: ONE_HOUR_IN_SECONDS,
+}
+TIMESTAMPS_METADATA_KEY = "TIMESTAMPS"
+CLOSED_DAY_DELAY = 2 * ONE_HOUR_IN_SECONDS
+
+
+def get_day_start_of(timestamp: int) -> int:
+    return timestamp - timestamp % ONE_DAY_IN_SECONDS
+
+
+def get_archive_path_for_param_in_zone_on(
+    param: PrecipitationsParam, zone: Zone, timestamp: int
+) -> str:
+    param_key = get_param_key_for_zone(param, zone)
+    return f"{get_day_directory_at(timestamp)}/{param_key}_day.tif"
+
+
+def get_archived_timestamps_on(param: PrecipitationsParam, timestamp: int) -> list[int]:
+    day_start = get_day_start_of(timestamp)
+    return list(
+        range(day_start, day_start + ONE_DAY_IN_SECONDS, ARCHIVED_PARAMS_STEPS[param])
+    )
+
+
+def is_day_closed(timestamp: int, now: int) -> bool:
+    return get_day_start_of(timestamp) + ONE_DAY_IN_SECONDS + CLOSED_DAY_DELAY <= now
+
+
+def get_band_indexes_per_timestamp(
+    timestamps_metadata: Optional[str],
+) -> dict[int, int]:
+    if not timestamps_metadata:
+        return {}
+    return {
+        timestamp: band_index + 1
+        for band_index, timestamp in enumerate(json.loads(timestamps_metadata))
+    }
+
+
+def pack_day_of_param_in_zone(
+    param: PrecipitationsParam,
+    zone: Zone,
+    timestamp: int,
+    *,
+    remove_packed: bool = False,
+) -> Optional[str]:
+    """
+    packs the tifs of param in zone on the day of timestamp into one multi-band tif, a band per timestamp,
+    the timestamps of the bands being listed in the TIMESTAMPS metadata
+    """
+    start_time = time.time()
+    archive_path = get_archive_path_for_param_in_zone_on(param, zone, timestamp)
+    tifs_pathes: list[str] = []
+    datasets: list[gdal.Dataset] = []
+    timestamps: list[int] = []
+    for t in get_archived_timestamps_on(param, timestamp):
+        tif_path = get_tif_path_for_param_in_zone_at(param, zone, t)
+        dataset = read_tif(tif_path)
+        if not dataset:
+            continue
+        if datasets:
+            check_tif_config(
+                tif_path,
+                get_tif_config_of_dataset(datasets[0]),
+                get_tif_config_of_dataset(dataset),
+            )
+        tifs_pathes.append(tif_path)
+        datasets.append(dataset)
+        timestamps.append(t)
+    if not datasets:
+        print(f"Nothing to pack in '{archive_path}'.")
+        return None
+
+    tif_config = get_tif_config_of_dataset(datasets[0])
+    first_band = datasets[0].GetRasterBand(1)
+    tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+    driver = gdal.GetDriverByName("GTiff")
+    archive = driver.Create(
+        tmp_path,
+        tif_config.cols,
+        tif_config.rows,
+        len(datasets),
+        first_band.DataType,
+        ["TILED=YES", "COMPRESS=LZW", "INTERLEAVE=BAND", "BIGTIFF=IF_SAFER"],
+    )
+    archive.SetGeoTransform(tif_config.geo_transform)
+    archive.SetProjection(tif_config.projection)
+    archive.SetMetadataItem(TIMESTAMPS_METADATA_KEY, json.dumps(timestamps))
+    no_data_value = first_band.GetNoDataValue()
+    for band_index, dataset in enumerate(datasets):
+        band = archive.GetRasterBand(band_index + 1)
+        if no_data_value is not None:
+            band.SetNoDataValue(no_data_value)
+        band.SetDescription(os.path.basename(tifs_pathes[band_index]))
+        band.WriteArray(dataset.GetRasterBand(1).ReadAsArray())
+    archive.FlushCache()
+    archive = None
+    os.replace(tmp_path, archive_path)
+    print(
+        f"Packed {len(datasets)} tifs into '{archive_path}': {time.time()-start_time}s"
+    )
+
+    if remove_packed:
+        for tif_path in tifs_pathes:
+            os.remove(tif_path)
+    return archive_path
+
+
+def pack_archives(
+    zones: list[Zone],
+    start: int,
+    end: int,
+    *,
+    remove_packed: bool = False,
+) -> None:
+    now = int(time.time())
+    for day_start in range(
+        get_day_start_of(start), get_day_start_of(end) + 1, ONE_DAY_IN_SECONDS
+    ):
+        if not is_day_closed(day_start, now):
+            print(
+                f"Skipping packing of '{datetime_of(day_start):%Y-%m-%d}' because it is not closed."
+            )
+            continue
+        for zone in zones:
+            for param in ARCHIVED_PARAMS_STEPS:
+                pack_day_of_param_in_zone(
+                    param, zone, day_start, remove_packed=remove_packed
+                )
+
+
+class ArchiveTifLocator(TifLocator):
+    """locates in their day archive the tifs which are not there anymore"""
+
+    def __init__(self, tif_locator: TifLocator) -> None:
+        self.tif_locator = tif_locator
+        # by archive path, with the mtime they were read at, an archive being packed again
+        self.band_indexes_per_archive: dict[str, tuple[int, dict[int, int]]] = {}
+
+    def get_band_indexes_of(self, archive_path: str) -> dict[int, int]:
+        try:
+            mtime_ns = os.stat(archive_path).st_mtime_ns
+        except OSError:
+            return {}
+        cached = self.band_indexes_per_archive.get(archive_path, None)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        dataset = read_tif(archive_path)
+        band_indexes = get_band_indexes_per_timestamp(
+            dataset.GetMetadataItem(TIMESTAMPS_METADATA_KEY) if dataset else None
+        )
+        self.band_indexes_per_archive[archive_path] = (mtime_ns, band_indexes)
+        return band_indexes
+
+    def locate_in_archive(self, tif_path: str) -> Optional[tuple[str, int]]:
+        parsed = parse_tif_path(tif_path)
+        if parsed is None or parsed[0] not in ARCHIVED_PARAMS_STEPS:
+            return None
+        param, zone, timestamp = parsed
+        archive_path = get_archive_path_for_param_in_zone_on(param, zone, timestamp)
+        band_index = self.get_band_indexes_of(archive_path).get(timestamp, None)
+        if band_index is None:
+            return None
+        return archive_path, band_index
+
+    def locate(self, tif_path: str) -> Optional[tuple[str, int]]:
+        return self.tif_locator.locate(tif_path) or self.locate_in_archive(tif_path)
+
+
+class ArchiveFileExistenceChecker(FileExistenceChecker):
+    """the tifs packed into their day archive still exist"""
+
+    def __init__(
+        self,
+        file_existence_checker: FileExistenceChecker,
+        archive_tif_locator: ArchiveTifLocator,
+    ) -> None:
+        self.file_existence_checker = file_existence_checker
+        self.archive_tif_locator = archive_tif_locator
+
+    def exists(self, path: str) -> bool:
+        return (
+            self.file_existence_checker.exists(path)
+            or self.archive_tif_locator.locate_in_archive(path) is not None
+        )
+
+    def add(self, path: str) -> None:
+        self.file_existence_checker.add(path)
+
+
+class ArchiveTifReader(TifReader):
+    """reads from the day archive the tifs which are not there anymore"""
+
+    def __init__(self, tif_reader: TifReader, max_open_archives: int = 4) -> None:
+        self.tif_reader = tif_reader
+        self.max_open_archives = max_open_archives
+        self.archives: OrderedDict[
+            str, tuple[Optional[gdal.Dataset], dict[int, int], threading.Lock]
+        ] = OrderedDict()
+        # guards the open archives, each dataset having its own lock
+        # since it is not to be read from several threads at once
+        self.lock = threading.Lock()
+
+    def open_archive(
+        self, archive_path: str
+    ) -> tuple[Optional[gdal.Dataset], dict[int, int], threading.Lock]:
+        if archive_path in self.archives:
+            self.archives.move_to_end(archive_path)
+            return self.archives[archive_path]
+        dataset = read_tif(archive_path) if os.path.isfile(archive_path) else None
+        archive = (
+            dataset,
+            get_band_indexes_per_timestamp(
+                dataset.GetMetadataItem(TIMESTAMPS_METADATA_KEY) if dataset else None
+            ),
+            threading.Lock(),
+        )
+        self.archives[archive_path] = archive
+        if len(self.archives) > self.max_open_archives:
+            self.archives.popitem(last=False)
+        return archive
+
+    def read_tif(
+        self,
+        tif_path: str,
+        *,
+        transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
+    ) -> Optional[numpy.ndarray[Any, Any]]:
+        array = self.tif_reader.read_tif(
+            tif_path, transform=transform, expected_tif_config=expected_tif_config
+        )
+        if array is not None:
+            return array
+        parsed = parse_tif_path(tif_path)
+        if parsed is None or parsed[0] not in ARCHIVED_PARAMS_STEPS:
+            return None
+        param, zone, timestamp = parsed
+        archive_path = get_archive_path_for_param_in_zone_on(param, zone, timestamp)
+        with self.lock:
+            dataset, band_indexes, archive_lock = self.open_archive(archive_path)
+        band_index = band_indexes.get(timestamp, None)
+        if dataset is None or band_index is None:
+            return None
+        with archive_lock:
+            check_tif_config(
+                archive_path, expected_tif_config, get_tif_config_of_dataset(dataset)
+            )
+            print(f"Reading [{tif_path}] from '{archive_path}'...")
+            array = dataset.GetRasterBand(band_index).ReadAsArray()
+        return transform.transform(array)
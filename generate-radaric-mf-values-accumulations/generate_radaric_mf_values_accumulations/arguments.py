@@ -1,8 +1,12 @@
-from argparse import ArgumentParser
+import time
+from argparse import ArgumentError, ArgumentParser, Namespace
 from typing import Optional
 
-from .datetime_utils import timestamp_of
-from .tiles import Zone
+from .client import DEFAULT_SOCKET_PATH
+from .compression import Codec, check_codec_for, parse_codec
+from .datetime_utils import FIVE_MINUTES_IN_SECONDS, timestamp_of
+from .local_cache import LOCAL_TILES_CACHE_PATH
+from .tiles import AccumulationDuration, PrecipitationsParam, Zone
 
 ZONES = [
     Zone.METROPOLE.value,
@@ -11,6 +15,29 @@ ZONES = [
     # Zone.NOUVELLE_CALEDONIE.value,
 ]
 
+DEFAULT_OVERVIEW_LEVELS = [2, 4, 8, 16]
+DEFAULT_QUICKLOOK_SIZES = [256]
+DEFAULT_XYZ_ZOOMS = "4-9"
+MAX_XYZ_ZOOM = 22
+
+GENERATED_DURATIONS = [
+    AccumulationDuration.CUMUL_1H.value,
+    AccumulationDuration.CUMUL_3H.value,
+    AccumulationDuration.CUMUL_6H.value,
+    AccumulationDuration.CUMUL_12H.value,
+    AccumulationDuration.CUMUL_24H.value,
+    AccumulationDuration.CUMUL_72H.value,
+]
+
+ACCUMULATIONS_COLOR_PARAMS = [
+    PrecipitationsParam.COLOR_1H.value,
+    PrecipitationsParam.COLOR_3H.value,
+    PrecipitationsParam.COLOR_6H.value,
+    PrecipitationsParam.COLOR_12H.value,
+    PrecipitationsParam.COLOR_24H.value,
+    PrecipitationsParam.COLOR_72H.value,
+]
+
 
 class Arguments:
     def __init__(
@@ -19,11 +46,86 @@ class Arguments:
         end: int,
         zones: Optional[list[str]] = None,
         replace: bool = False,
+        use_catalog: bool = False,
+        rebuild_catalog: bool = False,
+        block_size: Optional[int] = None,
+        read_ahead: bool = False,
+        read_through: bool = False,
+        local_cache_size: Optional[int] = None,
+        local_cache_path: str = LOCAL_TILES_CACHE_PATH,
+        pack_archives: bool = False,
+        remove_packed: bool = False,
+        read_archives: bool = False,
+        pipeline_workers: Optional[list[int]] = None,
+        pipeline_queue_size: int = 2,
+        paletted_params: Optional[list[str]] = None,
+        sparse: bool = False,
+        deduplicate: bool = False,
+        codecs: Optional[list[tuple[str, Codec]]] = None,
+        benchmark_codecs: bool = False,
+        overview_levels: Optional[list[int]] = None,
+        background_writers: Optional[int] = None,
+        background_queue_size: int = 4,
+        publish_at_once: bool = False,
+        quicklook_sizes: Optional[list[int]] = None,
+        quicklook_format: str = "png",
+        xyz_zooms: Optional[list[int]] = None,
+        xyz_workers: int = 4,
+        virtual_values: bool = False,
+        manifest: bool = False,
+        daemon: bool = False,
+        polling: bool = False,
+        polling_interval: float = 10.0,
+        durations: Optional[list[str]] = None,
+        serve: bool = False,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        jobs: int = 1,
     ) -> None:
         self.start = start
         self.end = end
         self.zones = [Zone(zone) for zone in (zones or ZONES)]
         self.replace = replace
+        self.use_catalog = use_catalog
+        self.rebuild_catalog = rebuild_catalog
+        self.block_size = block_size
+        self.read_ahead = read_ahead
+        self.read_through = read_through
+        self.local_cache_size = local_cache_size
+        self.local_cache_path = local_cache_path
+        self.pack_archives = pack_archives
+        self.remove_packed = remove_packed
+        self.read_archives = read_archives
+        self.pipeline_workers = pipeline_workers
+        self.pipeline_queue_size = pipeline_queue_size
+        self.paletted_params = [
+            PrecipitationsParam(param) for param in (paletted_params or [])
+        ]
+        self.sparse = sparse
+        self.deduplicate = deduplicate
+        self.codecs = {
+            PrecipitationsParam(param): codec for param, codec in (codecs or [])
+        }
+        self.benchmark_codecs = benchmark_codecs
+        self.overview_levels = overview_levels
+        self.background_writers = background_writers
+        self.background_queue_size = background_queue_size
+        self.publish_at_once = publish_at_once
+        self.quicklook_sizes = quicklook_sizes
+        self.quicklook_format = quicklook_format
+        self.xyz_zooms = xyz_zooms
+        self.xyz_workers = xyz_workers
+        self.virtual_values = virtual_values
+        self.manifest = manifest
+        self.daemon = daemon
+        self.polling = polling
+        self.polling_interval = polling_interval
+        # all of them if not given
+        self.durations = [
+            AccumulationDuration(duration) for duration in (durations or [])
+        ]
+        self.serve = serve
+        self.socket_path = socket_path
+        self.jobs = jobs
 
 
 def timestamp_of_argument(value: str) -> int:
@@ -33,6 +135,96 @@ def timestamp_of_argument(value: str) -> int:
     return timestamp_of(value)
 
 
+def workers_of_argument(value: str) -> list[int]:
+    """readers,writers,colorizers"""
+    workers = [int(v) for v in value.split(",")]
+    if len(workers) != 3 or any(w < 1 for w in workers):
+        raise ValueError(f"Expected 3 positive numbers of workers, got '{value}'")
+    return workers
+
+
+def queue_size_of_argument(value: str) -> int:
+    """0 would make the queues unbounded"""
+    queue_size = int(value)
+    if queue_size < 1:
+        raise ValueError(f"Expected a queue size of at least 1, got '{value}'")
+    return queue_size
+
+
+def codec_of_argument(value: str) -> tuple[str, Codec]:
+    """PARAM=METHOD[,LEVEL=n][,PREDICTOR=STANDARD|FLOATING_POINT][,MAX_Z_ERROR=x]"""
+    param, _, codec_value = value.partition("=")
+    codec = parse_codec(codec_value)
+    check_codec_for(PrecipitationsParam(param), codec)
+    return param, codec
+
+
+def overview_level_of_argument(value: str) -> int:
+    level = int(value)
+    if level < 2:
+        raise ValueError(f"Expected an overview level of at least 2, got '{value}'")
+    return level
+
+
+def quicklook_size_of_argument(value: str) -> int:
+    size = int(value)
+    if size < 1:
+        raise ValueError(f"Expected a quicklook size of at least 1, got '{value}'")
+    return size
+
+
+def jobs_of_argument(value: str) -> int:
+    jobs = int(value)
+    if jobs < 1:
+        raise ValueError(f"Expected at least 1 job, got '{value}'")
+    return jobs
+
+
+def zooms_of_argument(value: str) -> list[int]:
+    """MIN_ZOOM-MAX_ZOOM"""
+    min_zoom, _, max_zoom = value.partition("-")
+    zooms = list(range(int(min_zoom), int(max_zoom or min_zoom) + 1))
+    if not zooms or zooms[0] < 0 or zooms[-1] > MAX_XYZ_ZOOM:
+        raise ValueError(
+            f"Expected MIN_ZOOM-MAX_ZOOM between 0 and {MAX_XYZ_ZOOM}, got '{value}'"
+        )
+    return zooms
+
+
+def check_pipeline_options(argument_parser: ArgumentParser, parsed: Namespace) -> None:
+    """the pipeline generates the products through its own stages"""
+    if not parsed.pipeline_workers:
+        return
+    options = [
+        option
+        for option, value in [
+            ("--stream-blocks", parsed.block_size),
+            ("--manifest", parsed.manifest),
+            ("--background-writes", parsed.background_writers),
+            ("--publish-at-once", parsed.publish_at_once),
+        ]
+        if value
+    ]
+    if not options:
+        return
+    message = f"--pipeline cannot be used with {', '.join(options)}"
+    if not argument_parser.exit_on_error:
+        raise ArgumentError(None, message)
+    argument_parser.error(message)
+
+
+def check_remove_packed_options(
+    argument_parser: ArgumentParser, parsed: Namespace
+) -> None:
+    """the tifs removed once packed are only read back from their archive"""
+    if not parsed.remove_packed or parsed.read_archives:
+        return
+    message = "--remove-packed requires --read-archives"
+    if not argument_parser.exit_on_error:
+        raise ArgumentError(None, message)
+    argument_parser.error(message)
+
+
 def parse_arguments(arguments: list[str], *, exit_on_error: bool = True) -> Arguments:
     argument_parser = ArgumentParser(exit_on_error=exit_on_error)
     timestamp_group = argument_parser.add_mutually_exclusive_group(required=True)
@@ -56,6 +248,24 @@ def parse_arguments(arguments: list[str], *, exit_on_error: bool = True) -> Argu
         action="store",
         dest="start",
     )
+    timestamp_group.add_argument(
+        "--serve",
+        action="store_true",
+        default=False,
+        help=(
+            "stay resident, executing the jobs submitted through the socket by "
+            "client.py"
+        ),
+    )
+    timestamp_group.add_argument(
+        "--daemon",
+        action="store_true",
+        default=False,
+        help=(
+            "stay resident, generating the accumulations of each new 5 minutes tif of "
+            "the tiles directory"
+        ),
+    )
     argument_parser.add_argument(
         "--end",
         type=timestamp_of_argument,
@@ -87,10 +297,428 @@ def parse_arguments(arguments: list[str], *, exit_on_error: bool = True) -> Argu
         action="store_true",
         default=False,
     )
+    argument_parser.add_argument(
+        "--use-catalog",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "check existing products and grids in the local catalog instead of the "
+            "datastore"
+        ),
+    )
+    argument_parser.add_argument(
+        "--rebuild-catalog",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "catalog the products of the days between start and end instead of "
+            "generating"
+        ),
+    )
+    argument_parser.add_argument(
+        "--stream-blocks",
+        type=int,
+        required=False,
+        action="store",
+        dest="block_size",
+        nargs="?",
+        const=256,
+        default=None,
+        help=(
+            "sum the inputs block by block (of the given size, 256 by default) instead "
+            "of reading them whole"
+        ),
+    )
+    argument_parser.add_argument(
+        "--read-ahead",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "once done, ask the kernel to load the files the next 5 minutes run will "
+            "read into the page cache"
+        ),
+    )
+    argument_parser.add_argument(
+        "--read-through",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "with --read-ahead, read the files through instead of asking the kernel, "
+            "e.g. on a network filesystem ignoring posix_fadvise"
+        ),
+    )
+    argument_parser.add_argument(
+        "--local-cache",
+        type=int,
+        required=False,
+        action="store",
+        dest="local_cache_size",
+        nargs="?",
+        const=2048,
+        default=None,
+        help=(
+            "keep the inputs read on local disk, up to the given size in MB (2048 by "
+            "default)"
+        ),
+    )
+    argument_parser.add_argument(
+        "--local-cache-path",
+        type=str,
+        required=False,
+        action="store",
+        dest="local_cache_path",
+        default=LOCAL_TILES_CACHE_PATH,
+        help=(
+            "directory of the local cache, of one process at a time "
+            f"({LOCAL_TILES_CACHE_PATH} by default)"
+        ),
+    )
+    argument_parser.add_argument(
+        "--pack-archives",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "pack the 5 minutes and hourly values of the closed days between start and "
+            "end into day archives instead of generating"
+        ),
+    )
+    argument_parser.add_argument(
+        "--remove-packed",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "with --pack-archives, remove the tifs once packed, which requires "
+            "--read-archives to acknowledge that every later run must read the "
+            "archives, the runs without it seeing the packed inputs as missing"
+        ),
+    )
+    argument_parser.add_argument(
+        "--read-archives",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "read the tifs which are not there anymore from the day archives written "
+            "by --pack-archives, needed by every run once --remove-packed was used"
+        ),
+    )
+    argument_parser.add_argument(
+        "--pipeline",
+        type=workers_of_argument,
+        required=False,
+        action="store",
+        dest="pipeline_workers",
+        nargs="?",
+        const="2,2,2",
+        default=None,
+        metavar="READERS,WRITERS,COLORIZERS",
+        help=(
+            "overlap the reads, writes and colorizations of the accumulations, with "
+            "the given workers per stage (2 each by default)"
+        ),
+    )
+    argument_parser.add_argument(
+        "--pipeline-queue-size",
+        type=queue_size_of_argument,
+        required=False,
+        action="store",
+        default=2,
+        help=(
+            "with --pipeline, accumulations waiting between two stages, bounding the "
+            "memory used"
+        ),
+    )
+    argument_parser.add_argument(
+        "--paletted-colors",
+        type=str,
+        required=False,
+        action="store",
+        dest="paletted_params",
+        nargs="*",
+        default=None,
+        choices=ACCUMULATIONS_COLOR_PARAMS,
+        help=(
+            "write the given color params (all of them if none given) as single band "
+            "tifs with a color table instead of RGBA"
+        ),
+    )
+    argument_parser.add_argument(
+        "--sparse",
+        required=False,
+        action="store_true",
+        default=False,
+        help="do not write the blocks of the tifs without rain",
+    )
+    argument_parser.add_argument(
+        "--deduplicate",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "hardlink the products identical to a previous one of their zone instead "
+            "of writing them"
+        ),
+    )
+    argument_parser.add_argument(
+        "--codec",
+        type=codec_of_argument,
+        required=False,
+        action="append",
+        dest="codecs",
+        default=[],
+        metavar=(
+            "PARAM=METHOD[,LEVEL=n][,PREDICTOR=STANDARD|FLOATING_POINT][,MAX_Z_ERROR=x]"
+        ),
+        help="compress the tifs of the param with the given codec (LZW by default)",
+    )
+    argument_parser.add_argument(
+        "--benchmark-codecs",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "report the encoding and decoding times and sizes of the codecs on the "
+            "products between start and end instead of generating"
+        ),
+    )
+    argument_parser.add_argument(
+        "--overviews",
+        type=overview_level_of_argument,
+        required=False,
+        action="store",
+        dest="overview_levels",
+        nargs="*",
+        default=None,
+        metavar="LEVEL",
+        help=(
+            "add to the values tifs internal overviews averaging the values, at the "
+            "given levels "
+            f"({' '.join(str(level) for level in DEFAULT_OVERVIEW_LEVELS)} if none "
+            "given)"
+        ),
+    )
+    argument_parser.add_argument(
+        "--background-writes",
+        type=int,
+        required=False,
+        action="store",
+        dest="background_writers",
+        nargs="?",
+        const=2,
+        default=None,
+        metavar="WRITERS",
+        help=(
+            "write, color and publish the products on the given background workers (2 "
+            "by default) while the next ones are computed"
+        ),
+    )
+    argument_parser.add_argument(
+        "--background-queue-size",
+        type=queue_size_of_argument,
+        required=False,
+        action="store",
+        default=4,
+        help=(
+            "with --background-writes, products waiting for a writer, bounding the "
+            "memory used"
+        ),
+    )
+    argument_parser.add_argument(
+        "--publish-at-once",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "publish all the products of a zone at a timestamp at once, then update "
+            "their tiles datetimes in a single statement"
+        ),
+    )
+    argument_parser.add_argument(
+        "--quicklooks",
+        type=quicklook_size_of_argument,
+        required=False,
+        action="store",
+        dest="quicklook_sizes",
+        nargs="*",
+        default=None,
+        metavar="SIZE",
+        help=(
+            "render next to each color tif a quicklook fitting in SIZE x SIZE pixels, "
+            "for each given size "
+            f"({' '.join(str(size) for size in DEFAULT_QUICKLOOK_SIZES)} if none "
+            "given)"
+        ),
+    )
+    argument_parser.add_argument(
+        "--quicklooks-format",
+        required=False,
+        action="store",
+        dest="quicklook_format",
+        choices=["png", "webp"],
+        default="png",
+        help="format of the quicklooks",
+    )
+    argument_parser.add_argument(
+        "--xyz-tiles",
+        type=zooms_of_argument,
+        required=False,
+        action="store",
+        dest="xyz_zooms",
+        nargs="?",
+        const=zooms_of_argument(DEFAULT_XYZ_ZOOMS),
+        default=None,
+        metavar="MIN_ZOOM-MAX_ZOOM",
+        help=(
+            "cut each color product into XYZ png tiles between the given zooms "
+            f"({DEFAULT_XYZ_ZOOMS} by default), the tifs being in EPSG:3857"
+        ),
+    )
+    argument_parser.add_argument(
+        "--xyz-workers",
+        type=jobs_of_argument,
+        required=False,
+        action="store",
+        dest="xyz_workers",
+        default=4,
+        help="processes rendering the XYZ tiles",
+    )
+    argument_parser.add_argument(
+        "--virtual-values",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "publish the values over 3h, 6h and 12h, which are not kept, as VRTs "
+            "summing the hourly values when read"
+        ),
+    )
+    argument_parser.add_argument(
+        "--manifest",
+        required=False,
+        action="store_true",
+        default=False,
+        help=(
+            "record the fingerprint of the inputs of each product, so that --replace "
+            "skips the products whose inputs did not change"
+        ),
+    )
+    argument_parser.add_argument(
+        "--poll",
+        required=False,
+        action="store_true",
+        dest="polling",
+        default=False,
+        help=(
+            "with --daemon, list the tiles directory instead of relying on inotify, "
+            "e.g. on a network filesystem"
+        ),
+    )
+    argument_parser.add_argument(
+        "--polling-interval",
+        type=float,
+        required=False,
+        action="store",
+        dest="polling_interval",
+        default=10.0,
+        help="seconds between two listings of the tiles directory when polling",
+    )
+    argument_parser.add_argument(
+        "--duration",
+        type=str,
+        required=False,
+        action="append",
+        dest="durations",
+        default=[],
+        choices=GENERATED_DURATIONS,
+        help="accumulations to generate, all of them if not given",
+    )
+    argument_parser.add_argument(
+        "--socket",
+        type=str,
+        required=False,
+        action="store",
+        dest="socket_path",
+        default=DEFAULT_SOCKET_PATH,
+        help=(
+            f"unix socket the jobs are submitted through ({DEFAULT_SOCKET_PATH} by "
+            "default)"
+        ),
+    )
+    argument_parser.add_argument(
+        "--jobs",
+        type=jobs_of_argument,
+        required=False,
+        action="store",
+        dest="jobs",
+        default=1,
+        help=(
+            "processes generating the zones in parallel, each with its own caches, "
+            "connection and workers"
+        ),
+    )
     parsed = argument_parser.parse_args(arguments)
+    check_pipeline_options(argument_parser, parsed)
+    check_remove_packed_options(argument_parser, parsed)
+    if parsed.daemon or parsed.serve:
+        # resident, from the time they are started
+        parsed.start = (
+            int(time.time()) // FIVE_MINUTES_IN_SECONDS * FIVE_MINUTES_IN_SECONDS
+        )
     return Arguments(
         start=parsed.start,
         end=parsed.end if parsed.end else parsed.start,
         zones=parsed.zones,
         replace=parsed.replace,
+        use_catalog=parsed.use_catalog,
+        rebuild_catalog=parsed.rebuild_catalog,
+        block_size=parsed.block_size,
+        read_ahead=parsed.read_ahead,
+        read_through=parsed.read_through,
+        local_cache_size=parsed.local_cache_size,
+        local_cache_path=parsed.local_cache_path,
+        pack_archives=parsed.pack_archives,
+        remove_packed=parsed.remove_packed,
+        read_archives=parsed.read_archives,
+        pipeline_workers=parsed.pipeline_workers,
+        pipeline_queue_size=parsed.pipeline_queue_size,
+        paletted_params=(
+            ACCUMULATIONS_COLOR_PARAMS
+            if parsed.paletted_params == []
+            else parsed.paletted_params
+        ),
+        sparse=parsed.sparse,
+        deduplicate=parsed.deduplicate,
+        codecs=parsed.codecs,
+        benchmark_codecs=parsed.benchmark_codecs,
+        overview_levels=(
+            DEFAULT_OVERVIEW_LEVELS
+            if parsed.overview_levels == []
+            else parsed.overview_levels
+        ),
+        background_writers=parsed.background_writers,
+        background_queue_size=parsed.background_queue_size,
+        publish_at_once=parsed.publish_at_once,
+        quicklook_sizes=(
+            DEFAULT_QUICKLOOK_SIZES
+            if parsed.quicklook_sizes == []
+            else parsed.quicklook_sizes
+        ),
+        quicklook_format=parsed.quicklook_format,
+        xyz_zooms=parsed.xyz_zooms,
+        xyz_workers=parsed.xyz_workers,
+        virtual_values=parsed.virtual_values,
+        manifest=parsed.manifest,
+        daemon=parsed.daemon,
+        polling=parsed.polling,
+        polling_interval=parsed.polling_interval,
+        durations=parsed.durations,
+        serve=parsed.serve,
+        socket_path=parsed.socket_path,
+        jobs=parsed.jobs,
     )
@@ -0,0 +1,239 @@
+import io
+import os
+import time
+import zlib
+from typing import Any, Optional, Protocol
+from uuid import uuid4
+
+import numpy
+from osgeo import gdal
+
+from .compression import Codec, is_values_param, parse_codec
+from .datetime_utils import ONE_HOUR_IN_SECONDS
+from .generation import (
+    ACCUMULATIONS_DURATIONS,
+    VALUES_TIF_CREATION_OPTIONS,
+    TifConfig,
+    create_memory_dataset,
+    get_generated_params_for,
+    get_tif_config_of_dataset,
+    get_tif_content_of,
+    read_tif,
+)
+from .tiles import PrecipitationsParam, Zone, get_tif_path_for_param_in_zone_at
+
+VALUES_BENCHMARK_CODECS = [
+    parse_codec(codec)
+    for codec in [
+        "LZW",
+        "LZW,PREDICTOR=FLOATING_POINT",
+        "DEFLATE,LEVEL=6",
+        "DEFLATE,LEVEL=6,PREDICTOR=FLOATING_POINT",
+        "DEFLATE,LEVEL=9,PREDICTOR=FLOATING_POINT",
+        "ZSTD,LEVEL=1,PREDICTOR=FLOATING_POINT",
+        "ZSTD,LEVEL=9,PREDICTOR=FLOATING_POINT",
+        "LERC_ZSTD,MAX_Z_ERROR=0",
+        "LERC_ZSTD,MAX_Z_ERROR=0.01",
+        "LERC_ZSTD,MAX_Z_ERROR=0.1",
+    ]
+]
+COLOR_BENCHMARK_CODECS = [
+    parse_codec(codec)
+    for codec in [
+        "LZW,PREDICTOR=STANDARD",
+        "LZW",
+        "DEFLATE,LEVEL=6,PREDICTOR=STANDARD",
+        "DEFLATE,LEVEL=9,PREDICTOR=STANDARD",
+        "ZSTD,LEVEL=1,PREDICTOR=STANDARD",
+        "ZSTD,LEVEL=9,PREDICTOR=STANDARD",
+    ]
+]
+
+
+class BenchmarkRaster:
+    def __init__(
+        self,
+        path: str,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+    ) -> None:
+        self.path = path
+        self.tif_config = tif_config
+        # (bands, rows, cols)
+        self.data = data.reshape((-1, tif_config.rows, tif_config.cols))
+
+
+class RasterEncoder(Protocol):
+    def encode(self, raster: BenchmarkRaster, codec: Codec) -> bytes: ...
+
+    def decode(self, content: bytes) -> numpy.ndarray[Any, Any]: ...
+
+
+class GDALRasterEncoder(RasterEncoder):
+    """encodes values as the values tifs are written, colors as the color tifs are"""
+
+    def encode(self, raster: BenchmarkRaster, codec: Codec) -> bytes:
+        is_values = raster.data.dtype != numpy.uint8
+        dataset = create_memory_dataset(
+            raster.tif_config,
+            len(raster.data),
+            gdal.GDT_Float32 if is_values else gdal.GDT_Byte,
+        )
+        for band_index, band_data in enumerate(raster.data):
+            dataset.GetRasterBand(band_index + 1).WriteArray(band_data, 0, 0)
+        if is_values:
+            return get_tif_content_of(
+                dataset,
+                "GTiff",
+                VALUES_TIF_CREATION_OPTIONS + codec.get_gtiff_creation_options(),
+            )
+        return get_tif_content_of(dataset, "COG", codec.get_cog_creation_options())
+
+    def decode(self, content: bytes) -> numpy.ndarray[Any, Any]:
+        vsimem_path = f"/vsimem/{uuid4().hex}.tif"
+        gdal.FileFromMemBuffer(vsimem_path, content)
+        try:
+            dataset = gdal.Open(vsimem_path)
+            return dataset.ReadAsArray()
+        finally:
+            dataset = None
+            gdal.Unlink(vsimem_path)
+
+
+class InMemoryRasterEncoder(RasterEncoder):
+    """zlib at the level of the codec"""
+
+    def encode(self, raster: BenchmarkRaster, codec: Codec) -> bytes:
+        content = io.BytesIO()
+        numpy.save(content, raster.data)
+        return zlib.compress(content.getvalue(), codec.level or 6)
+
+    def decode(self, content: bytes) -> numpy.ndarray[Any, Any]:
+        return numpy.load(io.BytesIO(zlib.decompress(content)))
+
+
+class CodecBenchmark:
+    def __init__(self, codec: Codec) -> None:
+        self.codec = codec
+        self.rasters = 0
+        self.encode_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.size = 0
+        self.raw_size = 0
+        self.max_error = 0.0
+
+    def get_ratio(self) -> float:
+        return self.size / self.raw_size if self.raw_size else 0
+
+    def __str__(self) -> str:
+        rasters = max(self.rasters, 1)
+        return f"{str(self.codec):<42} encode {self.encode_seconds / rasters * 1000:8.1f}ms, decode {self.decode_seconds / rasters * 1000:8.1f}ms, {self.size:>12} bytes ({self.get_ratio():6.1%}), max error {self.max_error:g}"
+
+
+def get_max_error(
+    decoded: numpy.ndarray[Any, Any], data: numpy.ndarray[Any, Any]
+) -> float:
+    errors = numpy.abs(
+        decoded.reshape(data.shape).astype(numpy.float64) - data.astype(numpy.float64)
+    )
+    errors = errors[numpy.isfinite(errors)]
+    return float(errors.max()) if errors.size else 0.0
+
+
+def benchmark_codec(
+    codec: Codec,
+    rasters: list[BenchmarkRaster],
+    *,
+    raster_encoder: RasterEncoder,
+) -> CodecBenchmark:
+    codec_benchmark = CodecBenchmark(codec)
+    for raster in rasters:
+        start_time = time.perf_counter()
+        content = raster_encoder.encode(raster, codec)
+        encoded_time = time.perf_counter()
+        decoded = raster_encoder.decode(content)
+        codec_benchmark.encode_seconds += encoded_time - start_time
+        codec_benchmark.decode_seconds += time.perf_counter() - encoded_time
+        codec_benchmark.rasters += 1
+        codec_benchmark.size += len(content)
+        codec_benchmark.raw_size += raster.data.nbytes
+        codec_benchmark.max_error = max(
+            codec_benchmark.max_error, get_max_error(decoded, raster.data)
+        )
+    return codec_benchmark
+
+
+def benchmark_codecs(
+    codecs: list[Codec],
+    rasters: list[BenchmarkRaster],
+    *,
+    raster_encoder: RasterEncoder,
+) -> list[CodecBenchmark]:
+    return [
+        benchmark_codec(codec, rasters, raster_encoder=raster_encoder)
+        for codec in codecs
+    ]
+
+
+def get_benchmarked_tifs_pathes(
+    zones: list[Zone], start: int, end: int
+) -> dict[PrecipitationsParam, list[str]]:
+    """existing accumulations tifs of the hours between start and end"""
+    tifs_pathes: dict[PrecipitationsParam, list[str]] = {}
+    first_hour = start - start % ONE_HOUR_IN_SECONDS
+    for timestamp in range(first_hour, end + 1, ONE_HOUR_IN_SECONDS):
+        for zone in zones:
+            for accumulation_duration in ACCUMULATIONS_DURATIONS:
+                for param in get_generated_params_for(accumulation_duration):
+                    tif_path = get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+                    if os.path.isfile(tif_path):
+                        tifs_pathes.setdefault(param, []).append(tif_path)
+    return tifs_pathes
+
+
+def read_benchmark_raster(tif_path: str) -> Optional[BenchmarkRaster]:
+    dataset = read_tif(tif_path)
+    if dataset is None:
+        return None
+    return BenchmarkRaster(
+        tif_path, get_tif_config_of_dataset(dataset), dataset.ReadAsArray()
+    )
+
+
+def add_missing_codecs(codecs: list[Codec], added_codecs: list[Codec]) -> list[Codec]:
+    return codecs + [codec for codec in added_codecs if codec not in codecs]
+
+
+def run_codecs_benchmark(
+    zones: list[Zone],
+    start: int,
+    end: int,
+    configured_codecs: Optional[dict[PrecipitationsParam, Codec]] = None,
+) -> None:
+    configured_codecs = configured_codecs or {}
+    values_rasters: list[BenchmarkRaster] = []
+    color_rasters: list[BenchmarkRaster] = []
+    for param, tifs_pathes in get_benchmarked_tifs_pathes(zones, start, end).items():
+        rasters = values_rasters if is_values_param(param) else color_rasters
+        for tif_path in tifs_pathes:
+            raster = read_benchmark_raster(tif_path)
+            if raster is not None:
+                rasters.append(raster)
+    for kind, rasters, codecs in [
+        ("values", values_rasters, VALUES_BENCHMARK_CODECS),
+        ("colors", color_rasters, COLOR_BENCHMARK_CODECS),
+    ]:
+        added_codecs = [
+            codec
+            for param, codec in configured_codecs.items()
+            if is_values_param(param) == (kind == "values")
+        ]
+        print(f"Benchmarking codecs on {len(rasters)} {kind} tifs...")
+        if not rasters:
+            continue
+        for codec_benchmark in benchmark_codecs(
+            add_missing_codecs(codecs, added_codecs),
+            rasters,
+            raster_encoder=GDALRasterEncoder(),
+        ):
+            print(codec_benchmark)
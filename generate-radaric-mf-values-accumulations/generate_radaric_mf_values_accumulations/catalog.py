@@ -0,0 +1,372 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional, Protocol
+
+from .datetime_utils import (
+    ONE_DAY_IN_SECONDS,
+    datetime_of,
+    get_datetime_from_date_object,
+    get_datetime_from_timestamp,
+)
+from .tiles import (
+    LOCAL_CACHE_PATH,
+    TILES_PATH,
+    PrecipitationsParam,
+    Zone,
+    get_param_key_for_zone,
+)
+
+CATALOG_PATH = f"{LOCAL_CACHE_PATH}/products.sqlite"
+
+TIF_FILE_NAME_PATTERN = re.compile(
+    r"^(?P<param_key>.+)_(?P<hour>\d{2})_v(?P<minute>\d{2})\.tif$"
+)
+TIF_DIRECTORY_PATTERN = re.compile(r"(?P<year>\d{4})/(?P<month>\d{2})/(?P<day>\d{2})$")
+
+PARAMS_AND_ZONES_PER_KEY: dict[str, tuple[PrecipitationsParam, Zone]] = {
+    get_param_key_for_zone(param, zone): (param, zone)
+    for param in PrecipitationsParam
+    for zone in Zone
+}
+
+
+class ProductRecord:
+    def __init__(
+        self,
+        path: str,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        size: Optional[int] = None,
+        mtime: Optional[float] = None,
+        cols: Optional[int] = None,
+        rows: Optional[int] = None,
+        geo_transform: Optional[tuple[float, float, float, float, float, float]] = None,
+        projection: Optional[str] = None,
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None,
+        nonzero: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.param = param
+        self.zone = zone
+        self.timestamp = timestamp
+        self.size = size
+        self.mtime = mtime
+        self.cols = cols
+        self.rows = rows
+        self.geo_transform = geo_transform
+        self.projection = projection
+        self.minimum = minimum
+        self.maximum = maximum
+        self.nonzero = nonzero
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ProductRecord):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f"ProductRecord({vars(self)!r})"
+
+
+def parse_tif_path(path: str) -> Optional[tuple[PrecipitationsParam, Zone, int]]:
+    directory, file_name = os.path.split(path)
+    file_match = TIF_FILE_NAME_PATTERN.match(file_name)
+    directory_match = TIF_DIRECTORY_PATTERN.search(directory)
+    if not file_match or not directory_match:
+        return None
+    param_and_zone = PARAMS_AND_ZONES_PER_KEY.get(file_match["param_key"], None)
+    if param_and_zone is None:
+        return None
+    param, zone = param_and_zone
+    try:
+        dt = get_datetime_from_date_object(
+            {
+                "year": directory_match["year"],
+                "month": directory_match["month"],
+                "day": directory_match["day"],
+                "hour": file_match["hour"],
+                "minute": file_match["minute"],
+            }
+        )
+    except ValueError:
+        return None
+    return param, zone, int(dt.timestamp())
+
+
+def get_product_record_of_file(
+    path: str,
+    size: Optional[int] = None,
+    mtime: Optional[float] = None,
+) -> Optional[ProductRecord]:
+    parsed = parse_tif_path(path)
+    if parsed is None:
+        return None
+    param, zone, timestamp = parsed
+    if size is None or mtime is None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        size, mtime = stat.st_size, stat.st_mtime
+    return ProductRecord(path, param, zone, timestamp, size=size, mtime=mtime)
+
+
+class ProductsCatalog(Protocol):
+    def add_products(self, records: Iterable[ProductRecord]) -> None: ...
+
+    def get_product(self, path: str) -> Optional[ProductRecord]: ...
+
+    def get_products(
+        self, param: PrecipitationsParam, zone: Zone, start: int, end: int
+    ) -> list[ProductRecord]: ...
+
+
+def get_missing_timestamps(
+    catalog: ProductsCatalog,
+    param: PrecipitationsParam,
+    zone: Zone,
+    start: int,
+    end: int,
+    step: int,
+) -> list[int]:
+    """(inclusive) timestamps between start and end without a product in the catalog"""
+    existing = {
+        record.timestamp for record in catalog.get_products(param, zone, start, end)
+    }
+    return [t for t in range(start, end + step, step) if t not in existing]
+
+
+CATALOG_COLUMNS = [
+    "path",
+    "param",
+    "zone",
+    "timestamp",
+    "size",
+    "mtime",
+    "cols",
+    "rows",
+    "geo_transform",
+    "projection",
+    "minimum",
+    "maximum",
+    "nonzero",
+]
+
+
+def product_record_to_row(record: ProductRecord) -> tuple[Any, ...]:
+    return (
+        record.path,
+        record.param.value,
+        record.zone.value,
+        record.timestamp,
+        record.size,
+        record.mtime,
+        record.cols,
+        record.rows,
+        json.dumps(list(record.geo_transform)) if record.geo_transform else None,
+        record.projection,
+        record.minimum,
+        record.maximum,
+        record.nonzero,
+    )
+
+
+def product_record_from_row(row: tuple[Any, ...]) -> ProductRecord:
+    (
+        path,
+        param,
+        zone,
+        timestamp,
+        size,
+        mtime,
+        cols,
+        rows,
+        geo_transform,
+        projection,
+        minimum,
+        maximum,
+        nonzero,
+    ) = row
+    return ProductRecord(
+        path,
+        PrecipitationsParam(param),
+        Zone(zone),
+        timestamp,
+        size=size,
+        mtime=mtime,
+        cols=cols,
+        rows=rows,
+        geo_transform=tuple(json.loads(geo_transform)) if geo_transform else None,
+        projection=projection,
+        minimum=minimum,
+        maximum=maximum,
+        nonzero=nonzero,
+    )
+
+
+class SQLiteProductsCatalog(ProductsCatalog):
+    def __init__(self, catalog_path: str = CATALOG_PATH) -> None:
+        if catalog_path != ":memory:":
+            os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
+        self.catalog_path = catalog_path
+        # the pipeline registers the products from its own thread
+        self.connection = sqlite3.connect(
+            catalog_path, timeout=30, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS products (
+                        path TEXT PRIMARY KEY,
+                        param TEXT NOT NULL,
+                        zone TEXT NOT NULL,
+                        timestamp INTEGER NOT NULL,
+                        size INTEGER,
+                        mtime REAL,
+                        cols INTEGER,
+                        rows INTEGER,
+                        geo_transform TEXT,
+                        projection TEXT,
+                        minimum REAL,
+                        maximum REAL,
+                        nonzero INTEGER
+                    )
+                """
+            )
+            self.connection.execute(
+                """
+                    CREATE INDEX IF NOT EXISTS products_param_zone_timestamp
+                    ON products (param, zone, timestamp)
+                """
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add_products(self, records: Iterable[ProductRecord]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                f"""
+                    REPLACE INTO products ({", ".join(CATALOG_COLUMNS)})
+                    VALUES ({", ".join("?" for _ in CATALOG_COLUMNS)})
+                """,
+                (product_record_to_row(record) for record in records),
+            )
+
+    def get_product(self, path: str) -> Optional[ProductRecord]:
+        row = self.connection.execute(
+            f"SELECT {', '.join(CATALOG_COLUMNS)} FROM products WHERE path = ?",
+            (path,),
+        ).fetchone()
+        return product_record_from_row(row) if row else None
+
+    def get_products(
+        self, param: PrecipitationsParam, zone: Zone, start: int, end: int
+    ) -> list[ProductRecord]:
+        rows = self.connection.execute(
+            f"""
+                SELECT {', '.join(CATALOG_COLUMNS)}
+                FROM products
+                WHERE param = ? AND zone = ? AND timestamp BETWEEN ? AND ?
+                ORDER BY timestamp
+            """,
+            (param.value, zone.value, start, end),
+        ).fetchall()
+        return [product_record_from_row(row) for row in rows]
+
+
+class InMemoryProductsCatalog(ProductsCatalog):
+    def __init__(self, records: Optional[list[ProductRecord]] = None) -> None:
+        self.records: dict[str, ProductRecord] = {
+            record.path: record for record in (records or [])
+        }
+
+    def add_products(self, records: Iterable[ProductRecord]) -> None:
+        for record in records:
+            self.records[record.path] = record
+
+    def get_product(self, path: str) -> Optional[ProductRecord]:
+        return self.records.get(path, None)
+
+    def get_products(
+        self, param: PrecipitationsParam, zone: Zone, start: int, end: int
+    ) -> list[ProductRecord]:
+        return sorted(
+            (
+                record
+                for record in self.records.values()
+                if record.param == param
+                and record.zone == zone
+                and start <= record.timestamp <= end
+            ),
+            key=lambda record: record.timestamp,
+        )
+
+
+def get_day_directory_at(timestamp: int, tiles_path: str = TILES_PATH) -> str:
+    dt = get_datetime_from_timestamp(timestamp)
+    return f"{tiles_path}/{dt.year:04d}/{dt.month:02d}/{dt.day:02d}"
+
+
+def list_product_records_in_directory(
+    directory: str,
+    get_details: Optional[Callable[[ProductRecord], ProductRecord]] = None,
+) -> list[ProductRecord]:
+    records: list[ProductRecord] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                record = get_product_record_of_file(
+                    entry.path, size=stat.st_size, mtime=stat.st_mtime
+                )
+                if record is None:
+                    continue
+                records.append(get_details(record) if get_details else record)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def crawl_tiles_into_catalog(
+    catalog: ProductsCatalog,
+    start: int,
+    end: int,
+    *,
+    tiles_path: str = TILES_PATH,
+    jobs: int = 8,
+    get_details: Optional[Callable[[ProductRecord], ProductRecord]] = None,
+) -> int:
+    """(inclusive) lists the day directories between start and end in parallel, and adds their products to the catalog"""
+    directories = [
+        get_day_directory_at(t, tiles_path)
+        for t in range(start, end + ONE_DAY_IN_SECONDS, ONE_DAY_IN_SECONDS)
+    ]
+    start_time = time.time()
+    count = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for directory, records in zip(
+            directories,
+            executor.map(
+                lambda directory: list_product_records_in_directory(
+                    directory, get_details
+                ),
+                directories,
+            ),
+        ):
+            catalog.add_products(records)
+            count += len(records)
+            print(f"Cataloged {len(records)} products in '{directory}'.")
+    print(
+        f"Cataloged {count} products from {datetime_of(start):%Y-%m-%d} to {datetime_of(end):%Y-%m-%d} in {time.time()-start_time} s."
+    )
+    return count
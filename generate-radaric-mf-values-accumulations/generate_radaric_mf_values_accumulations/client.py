@@ -0,0 +1,96 @@
+import json
+import os
+import socket
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+# submits the jobs to `main.py --serve`, importing nothing but the standard library to start at once
+DEFAULT_SOCKET_PATH = str(
+    (Path(__file__).parent.parent / ".cache" / "jobs.sock").resolve()
+)
+MAIN_PATH = str(Path(__file__).parent / "main.py")
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    """one json object per line"""
+    return json.dumps(message).encode() + b"\n"
+
+
+def read_message(stream: BinaryIO) -> Optional[dict[str, Any]]:
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def submit_job(
+    request: dict[str, Any], socket_path: str = DEFAULT_SOCKET_PATH
+) -> dict[str, Any]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect(socket_path)
+        client_socket.sendall(encode_message(request))
+        with client_socket.makefile("rb") as stream:
+            response = read_message(stream)
+    if response is None:
+        raise ConnectionError(f"No response from '{socket_path}'")
+    return response
+
+
+def format_product_status(product: dict[str, Any]) -> str:
+    dt = datetime.fromtimestamp(product["timestamp"], tz=timezone.utc)
+    return f"{product['zone']:<20} {dt:%Y-%m-%d %H:%M} {product['duration']:>4} {product['status']:<10} {product['seconds']:.3f}s"
+
+
+def print_job_response(response: dict[str, Any]) -> int:
+    for product in response.get("products", []):
+        print(format_product_status(product))
+    if not response.get("ok", False):
+        print(f">> ERROR : {response.get('error', None)}", file=sys.stderr)
+        return 1
+    print(f"Took {response.get('seconds', 0)} s.")
+    return 0
+
+
+def parse_client_arguments(arguments: list[str]) -> dict[str, Any]:
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument("--timestamp", type=int, required=True)
+    argument_parser.add_argument("--zone", action="append", dest="zones", default=[])
+    argument_parser.add_argument("--replace", action="store_true", default=False)
+    argument_parser.add_argument(
+        "--duration", action="append", dest="durations", default=[]
+    )
+    argument_parser.add_argument(
+        "--socket", dest="socket_path", default=DEFAULT_SOCKET_PATH
+    )
+    parsed = argument_parser.parse_args(arguments)
+    return {
+        "socket_path": parsed.socket_path,
+        "request": {
+            "timestamp": parsed.timestamp,
+            "zones": parsed.zones,
+            "replace": parsed.replace,
+            "durations": parsed.durations,
+        },
+    }
+
+
+def main() -> None:
+    arguments = sys.argv[1:]
+    client_arguments = parse_client_arguments(arguments)
+    try:
+        response = submit_job(
+            client_arguments["request"], client_arguments["socket_path"]
+        )
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        # no server running, the job is executed by a new process
+        print(f">> WARNING : could not submit the job ({e!r}), running main.py.")
+        sys.stdout.flush()
+        os.execv(sys.executable, [sys.executable, MAIN_PATH, *arguments])
+    sys.exit(print_job_response(response))
+
+
+if __name__ == "__main__":
+    main()
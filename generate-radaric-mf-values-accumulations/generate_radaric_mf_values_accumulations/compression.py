@@ -0,0 +1,152 @@
+import os
+from typing import Optional
+
+from .tiles import PrecipitationsParam, Zone, get_param_key_for_zone
+
+COMPRESSION_METHODS = [
+    "NONE",
+    "LZW",
+    "DEFLATE",
+    "ZSTD",
+    "LERC",
+    "LERC_DEFLATE",
+    "LERC_ZSTD",
+]
+LERC_COMPRESSION_METHODS = ["LERC", "LERC_DEFLATE", "LERC_ZSTD"]
+PREDICTORS = ["STANDARD", "FLOATING_POINT"]
+GTIFF_PREDICTORS = {"STANDARD": "2", "FLOATING_POINT": "3"}
+GTIFF_LEVEL_OPTIONS = {
+    "DEFLATE": "ZLEVEL",
+    "LERC_DEFLATE": "ZLEVEL",
+    "ZSTD": "ZSTD_LEVEL",
+    "LERC_ZSTD": "ZSTD_LEVEL",
+}
+
+
+class Codec:
+    """compression of a tif, written as METHOD[,LEVEL=n][,PREDICTOR=STANDARD|FLOATING_POINT][,MAX_Z_ERROR=x]"""
+
+    def __init__(
+        self,
+        method: str = "LZW",
+        level: Optional[int] = None,
+        predictor: Optional[str] = None,
+        max_z_error: Optional[float] = None,
+    ) -> None:
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"Expected one of {COMPRESSION_METHODS}, got '{method}'")
+        if level is not None and method not in GTIFF_LEVEL_OPTIONS:
+            raise ValueError(f"Expected no level for {method}, got {level}")
+        if predictor is not None and predictor not in PREDICTORS:
+            raise ValueError(f"Expected one of {PREDICTORS}, got '{predictor}'")
+        if max_z_error is not None and method not in LERC_COMPRESSION_METHODS:
+            raise ValueError(f"Expected no max Z error for {method}, got {max_z_error}")
+        self.method = method
+        self.level = level
+        self.predictor = predictor
+        self.max_z_error = max_z_error
+
+    def is_lossy(self) -> bool:
+        return bool(self.max_z_error)
+
+    def get_gtiff_creation_options(self) -> list[str]:
+        creation_options = [f"COMPRESS={self.method}"]
+        if self.level is not None:
+            creation_options.append(f"{GTIFF_LEVEL_OPTIONS[self.method]}={self.level}")
+        if self.predictor is not None:
+            creation_options.append(f"PREDICTOR={GTIFF_PREDICTORS[self.predictor]}")
+        if self.max_z_error is not None:
+            creation_options.append(f"MAX_Z_ERROR={self.max_z_error}")
+        return creation_options
+
+    def get_cog_creation_options(self) -> list[str]:
+        creation_options = [f"COMPRESS={self.method}"]
+        if self.level is not None:
+            creation_options.append(f"LEVEL={self.level}")
+        if self.predictor is not None:
+            creation_options.append(f"PREDICTOR={self.predictor}")
+        if self.max_z_error is not None:
+            creation_options.append(f"MAX_Z_ERROR={self.max_z_error}")
+        return creation_options
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Codec):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def __str__(self) -> str:
+        tokens = [self.method]
+        if self.level is not None:
+            tokens.append(f"LEVEL={self.level}")
+        if self.predictor is not None:
+            tokens.append(f"PREDICTOR={self.predictor}")
+        if self.max_z_error is not None:
+            tokens.append(f"MAX_Z_ERROR={self.max_z_error}")
+        return ",".join(tokens)
+
+    def __repr__(self) -> str:
+        return f"Codec({self})"
+
+
+def parse_codec(value: str) -> Codec:
+    method, *settings = value.upper().split(",")
+    level: Optional[int] = None
+    predictor: Optional[str] = None
+    max_z_error: Optional[float] = None
+    for setting in settings:
+        key, _, setting_value = setting.partition("=")
+        if key == "LEVEL":
+            level = int(setting_value)
+        elif key == "PREDICTOR":
+            predictor = setting_value
+        elif key == "MAX_Z_ERROR":
+            max_z_error = float(setting_value)
+        else:
+            raise ValueError(
+                f"Expected LEVEL, PREDICTOR or MAX_Z_ERROR, got '{setting}'"
+            )
+    return Codec(method, level, predictor, max_z_error)
+
+
+DEFAULT_VALUES_CODEC = Codec("LZW")
+DEFAULT_COLOR_CODEC = Codec("LZW", predictor="STANDARD")
+DEFAULT_PALETTED_COLOR_CODEC = Codec("LZW")
+
+
+def is_values_param(param: PrecipitationsParam) -> bool:
+    return param.name.startswith("VALUES_")
+
+
+def check_codec_for(param: PrecipitationsParam, codec: Codec) -> None:
+    """colors are bytes, and must stay exact"""
+    if is_values_param(param):
+        return
+    if codec.predictor == "FLOATING_POINT" or codec.is_lossy():
+        raise ValueError(
+            f"Expected a lossless codec without floating point predictor for {param.value}, got '{codec}'"
+        )
+
+
+def get_default_codec_for(param: PrecipitationsParam) -> Codec:
+    return DEFAULT_VALUES_CODEC if is_values_param(param) else DEFAULT_COLOR_CODEC
+
+
+def get_param_of_tif_path(path: str) -> Optional[PrecipitationsParam]:
+    """param of the tif, whether on disk or staged in RAM"""
+    file_name = os.path.basename(path)
+    for param in PrecipitationsParam:
+        for zone in Zone:
+            if file_name.startswith(f"{get_param_key_for_zone(param, zone)}_"):
+                return param
+    return None
+
+
+def get_codec_for_tif_path(
+    path: str,
+    codecs: dict[PrecipitationsParam, Codec],
+    default_codec: Codec,
+) -> Codec:
+    param = get_param_of_tif_path(path)
+    if param is None:
+        return default_codec
+    return codecs.get(param, default_codec)
@@ -0,0 +1,287 @@
+import copy
+import ctypes
+import os
+import select
+import struct
+import time
+from typing import Callable, Optional, Protocol
+
+from .arguments import Arguments
+from .catalog import parse_tif_path
+from .datetime_utils import ONE_HOUR_IN_SECONDS, datetime_of
+from .generation import FileExistenceChecker, list_files_in_directory
+from .tiles import PrecipitationsParam, Zone, get_tif_path_for_param_in_zone_at
+
+WATCHED_PARAM = PrecipitationsParam.VALUES_5MN
+DEFAULT_POLLING_INTERVAL = 10.0
+# seconds waited for new files before checking the watched directories again
+WAIT_TIMEOUT = 60.0
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_watched_file_name(name: str) -> bool:
+    return name.startswith(f"{WATCHED_PARAM.value}_") and name.endswith(".tif")
+
+
+class FilesWatcher(Protocol):
+    def watch(self, directory: str, include_existing: bool = False) -> bool:
+        """
+        false if the directory does not exist yet,
+        its existing files being reported as created if include_existing
+        """
+
+    def unwatch(self, directory: str) -> None: ...
+
+    def wait_for_created_files(self, timeout: float) -> list[str]: ...
+
+    def close(self) -> None: ...
+
+
+class InotifyFilesWatcher(FilesWatcher):
+    """linux only, and blind to the files written through another host of a network filesystem"""
+
+    def __init__(self) -> None:
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories_per_descriptor: dict[int, str] = {}
+        self.existing_files: list[str] = []
+
+    def watch(self, directory: str, include_existing: bool = False) -> bool:
+        if directory in self.directories_per_descriptor.values():
+            return True
+        descriptor = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if descriptor < 0:
+            return False
+        self.directories_per_descriptor[descriptor] = directory
+        if include_existing:
+            self.existing_files += get_watched_files_in(directory)
+        return True
+
+    def unwatch(self, directory: str) -> None:
+        for descriptor, watched_directory in list(
+            self.directories_per_descriptor.items()
+        ):
+            if watched_directory == directory:
+                self.libc.inotify_rm_watch(self.fd, descriptor)
+                del self.directories_per_descriptor[descriptor]
+
+    def wait_for_created_files(self, timeout: float) -> list[str]:
+        created_files, self.existing_files = self.existing_files, []
+        if created_files:
+            return created_files
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        return self.read_created_files(os.read(self.fd, 64 * 1024))
+
+    def read_created_files(self, events: bytes) -> list[str]:
+        created_files: list[str] = []
+        offset = 0
+        while offset < len(events):
+            descriptor, _, _, length = INOTIFY_EVENT_HEADER.unpack_from(events, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = os.fsdecode(events[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            directory = self.directories_per_descriptor.get(descriptor, None)
+            if directory is not None and is_watched_file_name(name):
+                created_files.append(os.path.join(directory, name))
+        return created_files
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingFilesWatcher(FilesWatcher):
+    """lists the watched directories every interval, a file being reported once its size is stable"""
+
+    def __init__(self, interval: float = DEFAULT_POLLING_INTERVAL) -> None:
+        self.interval = interval
+        self.seen_files_per_directory: dict[str, set[str]] = {}
+        self.pending_sizes: dict[str, int] = {}
+
+    def watch(self, directory: str, include_existing: bool = False) -> bool:
+        if directory in self.seen_files_per_directory:
+            return True
+        if not os.path.isdir(directory):
+            return False
+        self.seen_files_per_directory[directory] = (
+            set() if include_existing else set(list_files_in_directory(directory))
+        )
+        return True
+
+    def unwatch(self, directory: str) -> None:
+        self.seen_files_per_directory.pop(directory, None)
+
+    def get_size(self, path: str) -> Optional[int]:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return None
+
+    def poll(self) -> list[str]:
+        created_files: list[str] = []
+        for directory, seen_files in self.seen_files_per_directory.items():
+            for name in sorted(list_files_in_directory(directory) - seen_files):
+                if not is_watched_file_name(name):
+                    seen_files.add(name)
+                    continue
+                path = os.path.join(directory, name)
+                size = self.get_size(path)
+                if size is not None and self.pending_sizes.get(path, None) == size:
+                    del self.pending_sizes[path]
+                    seen_files.add(name)
+                    created_files.append(path)
+                elif size is not None:
+                    self.pending_sizes[path] = size
+        return created_files
+
+    def wait_for_created_files(self, timeout: float) -> list[str]:
+        deadline = time.monotonic() + timeout
+        while True:
+            created_files = self.poll()
+            if created_files or time.monotonic() >= deadline:
+                return created_files
+            time.sleep(min(self.interval, max(deadline - time.monotonic(), 0)))
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryFilesWatcher(FilesWatcher):
+    def __init__(self, created_files_per_wait: list[list[str]]) -> None:
+        self.created_files_per_wait = created_files_per_wait
+        self.watched_directories: list[str] = []
+
+    def watch(self, directory: str, include_existing: bool = False) -> bool:
+        if directory not in self.watched_directories:
+            self.watched_directories.append(directory)
+        return True
+
+    def unwatch(self, directory: str) -> None:
+        self.watched_directories.remove(directory)
+
+    def wait_for_created_files(self, timeout: float) -> list[str]:
+        if not self.created_files_per_wait:
+            return []
+        return self.created_files_per_wait.pop(0)
+
+    def close(self) -> None:
+        pass
+
+
+def get_watched_files_in(directory: str) -> list[str]:
+    return [
+        os.path.join(directory, name)
+        for name in sorted(list_files_in_directory(directory))
+        if is_watched_file_name(name)
+    ]
+
+
+def get_files_watcher(
+    polling: bool = False, polling_interval: float = DEFAULT_POLLING_INTERVAL
+) -> FilesWatcher:
+    if not polling:
+        try:
+            return InotifyFilesWatcher()
+        except (OSError, AttributeError) as e:
+            print(f">> WARNING : inotify unavailable ({e!r}), polling instead.")
+    return PollingFilesWatcher(polling_interval)
+
+
+def get_watched_directories_at(zones: list[Zone], timestamp: int) -> list[str]:
+    """the directories of the current day, and of the previous one during the first hour"""
+    directories: list[str] = []
+    for zone in zones:
+        for at in [timestamp - ONE_HOUR_IN_SECONDS, timestamp]:
+            directory = os.path.dirname(
+                get_tif_path_for_param_in_zone_at(WATCHED_PARAM, zone, at)
+            )
+            if directory not in directories:
+                directories.append(directory)
+    return directories
+
+
+def get_zones_per_timestamp_of(
+    created_files: list[str], zones: list[Zone]
+) -> dict[int, list[Zone]]:
+    zones_per_timestamp: dict[int, list[Zone]] = {}
+    for path in created_files:
+        parsed = parse_tif_path(path)
+        if parsed is None:
+            continue
+        param, zone, timestamp = parsed
+        if param != WATCHED_PARAM or zone not in zones:
+            continue
+        timestamp_zones = zones_per_timestamp.setdefault(timestamp, [])
+        if zone not in timestamp_zones:
+            timestamp_zones.append(zone)
+    return dict(sorted(zones_per_timestamp.items()))
+
+
+def get_arguments_for(
+    arguments: Arguments, zones: list[Zone], timestamp: int
+) -> Arguments:
+    cycle_arguments = copy.copy(arguments)
+    cycle_arguments.start = timestamp
+    cycle_arguments.end = timestamp
+    cycle_arguments.zones = [zone for zone in arguments.zones if zone in zones]
+    return cycle_arguments
+
+
+class WatchedDirectories:
+    def __init__(self, files_watcher: FilesWatcher, zones: list[Zone]) -> None:
+        self.files_watcher = files_watcher
+        self.zones = zones
+        self.directories: list[str] = []
+        self.started = False
+
+    def update(self, timestamp: int) -> None:
+        """the directories watched once started may have received files before being watched"""
+        directories = get_watched_directories_at(self.zones, timestamp)
+        for directory in self.directories:
+            if directory not in directories:
+                self.files_watcher.unwatch(directory)
+        self.directories = [
+            directory
+            for directory in directories
+            if directory in self.directories
+            or self.files_watcher.watch(directory, include_existing=self.started)
+        ]
+        self.started = True
+
+
+def run_daemon(
+    arguments: Arguments,
+    *,
+    files_watcher: FilesWatcher,
+    file_existence_checker: FileExistenceChecker,
+    generate: Callable[[Arguments], None],
+    clock: Callable[[], float] = time.time,
+    cycles: Optional[int] = None,
+) -> None:
+    """generates the accumulations of each new 5 minutes tif, the caches and connections staying warm"""
+    watched_directories = WatchedDirectories(files_watcher, arguments.zones)
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        cycle += 1
+        watched_directories.update(int(clock()))
+        created_files = files_watcher.wait_for_created_files(WAIT_TIMEOUT)
+        for path in created_files:
+            file_existence_checker.add(path)
+        for timestamp, zones in get_zones_per_timestamp_of(
+            created_files, arguments.zones
+        ).items():
+            print(
+                f"Generating accumulations in {[zone.value for zone in zones]} at '{datetime_of(timestamp):%Y-%m-%d %H:%M:%S}'..."
+            )
+            try:
+                generate(get_arguments_for(arguments, zones, timestamp))
+            except Exception as e:
+                print(f">> ERROR : could not generate the accumulations : {e!r}")
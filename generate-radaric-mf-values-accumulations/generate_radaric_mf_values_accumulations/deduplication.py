@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+import numpy
+
+from .catalog import parse_tif_path
+from .tiles import PrecipitationsParam, Zone
+
+DEFAULT_MAX_HASHES_PER_PRODUCT = 8
+
+
+def get_content_hash_of(
+    arrays: Iterable[numpy.ndarray[Any, Any]], *settings: Any
+) -> str:
+    """hash of what a raster is encoded from: its arrays and everything else written with them"""
+    content_hash = hashlib.blake2b(digest_size=16)
+    content_hash.update(repr(settings).encode())
+    for array in arrays:
+        array = numpy.ascontiguousarray(array)
+        content_hash.update(f"{array.dtype.str}{array.shape}".encode())
+        content_hash.update(array.data)
+    return content_hash.hexdigest()
+
+
+class DeduplicationStatistics:
+    def __init__(self) -> None:
+        self.links = 0
+        self.writes = 0
+
+    def __str__(self) -> str:
+        return f"Deduplication: {self.links} hardlinks, {self.writes} writes."
+
+
+class ProductsDeduplicator:
+    """
+    keeps, per zone and param, the paths of the latest products written per content hash,
+    so that an identical product is hardlinked to them instead of being encoded and written again
+    """
+
+    def __init__(
+        self, max_hashes_per_product: int = DEFAULT_MAX_HASHES_PER_PRODUCT
+    ) -> None:
+        self.max_hashes_per_product = max_hashes_per_product
+        self.pathes_per_hash: dict[
+            tuple[PrecipitationsParam, Zone], OrderedDict[str, str]
+        ] = {}
+        self.statistics = DeduplicationStatistics()
+        self.lock = threading.Lock()
+
+    def get_index_key_of(self, path: str) -> Optional[tuple[PrecipitationsParam, Zone]]:
+        parsed = parse_tif_path(path)
+        if parsed is None:
+            return None
+        param, zone, _ = parsed
+        return param, zone
+
+    def find_identical_to(self, path: str, content_hash: str) -> Optional[str]:
+        key = self.get_index_key_of(path)
+        if key is None:
+            return None
+        with self.lock:
+            pathes_per_hash = self.pathes_per_hash.get(key, None)
+            if pathes_per_hash is None or content_hash not in pathes_per_hash:
+                return None
+            pathes_per_hash.move_to_end(content_hash)
+            return pathes_per_hash[content_hash]
+
+    def add(self, path: str, content_hash: str) -> None:
+        key = self.get_index_key_of(path)
+        if key is None:
+            return
+        with self.lock:
+            pathes_per_hash = self.pathes_per_hash.setdefault(key, OrderedDict())
+            # a path written again no longer holds its previous contents
+            for previous_hash, previous_path in list(pathes_per_hash.items()):
+                if previous_path == path and previous_hash != content_hash:
+                    del pathes_per_hash[previous_hash]
+            pathes_per_hash[content_hash] = path
+            pathes_per_hash.move_to_end(content_hash)
+            while len(pathes_per_hash) > self.max_hashes_per_product:
+                pathes_per_hash.popitem(last=False)
+
+    def forget(self, path: str, content_hash: str) -> None:
+        key = self.get_index_key_of(path)
+        if key is None:
+            return
+        with self.lock:
+            pathes_per_hash = self.pathes_per_hash.get(key, OrderedDict())
+            if pathes_per_hash.get(content_hash, None) == path:
+                del pathes_per_hash[content_hash]
+
+    def link_to_identical(self, path: str, content_hash: str) -> bool:
+        """hardlinks path to an identical product, False when there is none on the same filesystem"""
+        identical_path = self.find_identical_to(path, content_hash)
+        if identical_path is None:
+            return False
+        if identical_path == path:
+            return os.path.isfile(path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.link(identical_path, tmp_path)
+        except OSError:
+            # removed since, or on another filesystem
+            self.forget(identical_path, content_hash)
+            return False
+        try:
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        print(f"Linking '{path}' to identical '{identical_path}'.")
+        with self.lock:
+            self.statistics.links += 1
+        self.add(path, content_hash)
+        return True
+
+    def record_written(self, path: str, content_hash: str) -> None:
+        with self.lock:
+            self.statistics.writes += 1
+        self.add(path, content_hash)
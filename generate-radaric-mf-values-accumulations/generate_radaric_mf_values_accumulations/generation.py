@@ -1,12 +1,26 @@
+import fcntl
+import json
 import os
+import threading
 import time
-from typing import Any, Iterable, Optional, Protocol
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from uuid import uuid4
+from xml.etree import ElementTree
+from typing import Any, Callable, Iterable, Iterator, Optional, Protocol, Union
 
 import numpy
 from .arguments import Arguments
 from osgeo import gdal
-from scipy import integrate, interpolate
 
+from .catalog import (
+    ProductRecord,
+    ProductsCatalog,
+    SQLiteProductsCatalog,
+    crawl_tiles_into_catalog,
+    get_product_record_of_file,
+    parse_tif_path,
+)
 from .datetime_utils import (
     FIVE_MINUTES_IN_SECONDS,
     ONE_HOUR_IN_SECONDS,
@@ -14,6 +28,14 @@ from .datetime_utils import (
     get_datetime_from_timestamp,
     timestamp_to_iso,
 )
+from .compression import (
+    DEFAULT_COLOR_CODEC,
+    DEFAULT_PALETTED_COLOR_CODEC,
+    DEFAULT_VALUES_CODEC,
+    Codec,
+    get_codec_for_tif_path,
+)
+from .deduplication import ProductsDeduplicator, get_content_hash_of
 from .radaric_mf_values_accumulations import (
     CommandExecutor,
     RealCommandExecutor,
@@ -22,27 +44,45 @@ from .radaric_mf_values_accumulations import (
     get_timestamps_for_cumul_1h_at,
     get_timestamps_for_interpolated_cumul_1h_at,
 )
+from .local_cache import LocalFileCache
+from .manifest import (
+    GenerationManifest,
+    SQLiteGenerationManifest,
+    get_inputs_fingerprint,
+)
+from .palettes import Palette, get_radar_palette_for
+from .read_ahead import RealFilePrefetcher, read_ahead_next_cycle
 from .sql import get_sql_connection
 from .tiles import (
     AccumulationDuration,
     PrecipitationsParam,
+    LOCAL_CACHE_PATH,
     RealTilesDatetimesRepository,
     TilesDatetimesRepository,
     Zone,
     get_param_key_for_zone,
+    get_quicklook_path_for_param_in_zone_at,
     get_tif_path_for_param_in_zone_at,
+    get_vrt_path_for_param_in_zone_at,
     update_tile_last_timestamp,
 )
 
+TIF_CONFIGS_CACHE_PATH = f"{LOCAL_CACHE_PATH}/tif_configs.json"
+
 
 class FileExistenceChecker(Protocol):
     def exists(self, path: str) -> bool: ...
 
+    def add(self, path: str) -> None: ...
+
 
 class RealFileExistenceChecker(FileExistenceChecker):
     def exists(self, path: str) -> bool:
         return os.path.isfile(path)
 
+    def add(self, path: str) -> None:
+        pass
+
 
 class InMemoryFileExistenceChecker(FileExistenceChecker):
     def __init__(self, existing_files: Optional[set[str]] = None) -> None:
@@ -51,6 +91,76 @@ class InMemoryFileExistenceChecker(FileExistenceChecker):
     def exists(self, path: str) -> bool:
         return path in self.existing_files
 
+    def add(self, path: str) -> None:
+        self.existing_files.add(path)
+
+
+def list_files_in_directory(directory: str) -> set[str]:
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except FileNotFoundError:
+        return set()
+
+
+class IndexedFileExistenceChecker(FileExistenceChecker):
+    """lists each directory once instead of checking each file, files we write are added with `add`"""
+
+    def __init__(self) -> None:
+        self.files_per_directory: dict[str, set[str]] = {}
+
+    def get_files_in_directory(self, directory: str) -> set[str]:
+        files = self.files_per_directory.get(directory, None)
+        if files is None:
+            files = list_files_in_directory(directory)
+            self.files_per_directory[directory] = files
+        return files
+
+    def exists(self, path: str) -> bool:
+        directory, name = os.path.split(path)
+        return name in self.get_files_in_directory(directory)
+
+    def add(self, path: str) -> None:
+        directory, name = os.path.split(path)
+        self.get_files_in_directory(directory).add(name)
+
+    def invalidate(self, directory: Optional[str] = None) -> None:
+        if directory is None:
+            self.files_per_directory.clear()
+            return
+        self.files_per_directory.pop(directory, None)
+
+
+PARAMS_READ_BACK = [
+    PrecipitationsParam.VALUES_1H,
+    PrecipitationsParam.VALUES_24H,
+]
+
+
+def is_read_back(path: str) -> bool:
+    parsed = parse_tif_path(path)
+    return parsed is not None and parsed[0] in PARAMS_READ_BACK
+
+
+class LocalCacheFileExistenceChecker(FileExistenceChecker):
+    """the products we will read back later are written through to the local cache"""
+
+    def __init__(
+        self,
+        file_existence_checker: FileExistenceChecker,
+        local_file_cache: LocalFileCache,
+    ) -> None:
+        self.file_existence_checker = file_existence_checker
+        self.local_file_cache = local_file_cache
+
+    def exists(self, path: str) -> bool:
+        return self.file_existence_checker.exists(path)
+
+    def add(self, path: str) -> None:
+        self.file_existence_checker.add(path)
+        if is_read_back(path):
+            self.local_file_cache.store(path)
+
 
 def get_ram_path_for_param_in_zone_at(
     param: PrecipitationsParam,
@@ -126,6 +236,457 @@ def copy_param_in_zone_at_from_disk_to_ram(
     )
 
 
+class ProductsStager(Protocol):
+    def get_staging_path(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> str: ...
+
+    def publish(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> None: ...
+
+    def discard(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> None: ...
+
+    def get_readable_path(self, path: str) -> str:
+        """where the product of path is to be read, published or not"""
+
+
+class RamProductsStager(ProductsStager):
+    """writes the products in /dev/shm, then moves them to the datastore"""
+
+    def __init__(self, command_executor: CommandExecutor) -> None:
+        self.command_executor = command_executor
+
+    def get_staging_path(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> str:
+        return get_ram_path_for_param_in_zone_at(param, zone, timestamp)
+
+    def publish(self, param: PrecipitationsParam, zone: Zone, timestamp: int) -> None:
+        move_param_in_zone_at_from_ram_to_disk(
+            param, zone, timestamp, command_executor=self.command_executor
+        )
+
+    def discard(self, param: PrecipitationsParam, zone: Zone, timestamp: int) -> None:
+        pass
+
+    def get_readable_path(self, path: str) -> str:
+        return path
+
+
+class InPlaceProductsStager(ProductsStager):
+    """writes the products in the datastore directly, the tif creators replacing each file atomically"""
+
+    def get_staging_path(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> str:
+        return get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+
+    def publish(self, param: PrecipitationsParam, zone: Zone, timestamp: int) -> None:
+        pass
+
+    def discard(self, param: PrecipitationsParam, zone: Zone, timestamp: int) -> None:
+        try:
+            os.remove(self.get_staging_path(param, zone, timestamp))
+        except FileNotFoundError:
+            pass
+
+    def get_readable_path(self, path: str) -> str:
+        return path
+
+
+def fsync_directory(directory: str) -> None:
+    directory_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+class FilesPublisher(Protocol):
+    def publish(self, staged_pathes: list[tuple[str, str]]) -> None:
+        """renames each staging path to its path"""
+
+    def discard(self, path: str) -> None: ...
+
+
+class RealFilesPublisher(FilesPublisher):
+    def publish(self, staged_pathes: list[tuple[str, str]]) -> None:
+        for staging_path, path in staged_pathes:
+            os.replace(staging_path, path)
+        for directory in sorted({os.path.dirname(path) for _, path in staged_pathes}):
+            fsync_directory(directory)
+
+    def discard(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class InMemoryFilesPublisher(FilesPublisher):
+    def __init__(self) -> None:
+        self.published: list[list[tuple[str, str]]] = []
+        self.discarded: list[str] = []
+
+    def publish(self, staged_pathes: list[tuple[str, str]]) -> None:
+        self.published.append(staged_pathes)
+
+    def discard(self, path: str) -> None:
+        self.discarded.append(path)
+
+
+class PublishTransaction:
+    """
+    the products of a zone at a timestamp, staged next to their path,
+    then all renamed at once, followed by a single update of their tiles datetimes
+    """
+
+    def __init__(
+        self,
+        files_publisher: FilesPublisher,
+        tiles_repository: TilesDatetimesRepository,
+    ) -> None:
+        self.files_publisher = files_publisher
+        self.tiles_repository = tiles_repository
+        self.staging_pathes: dict[str, str] = {}
+        self.published_pathes: list[str] = []
+        self.date_objects: dict[str, dict[str, str]] = {}
+        self.deferred: list[Callable[[], None]] = []
+        # the products are published from the background writers
+        self.lock = threading.Lock()
+
+    def get_staging_path_for(self, path: str) -> str:
+        return f"{path}.{os.getpid()}.staged"
+
+    def stage(self, path: str) -> None:
+        with self.lock:
+            self.staging_pathes[path] = self.get_staging_path_for(path)
+
+    def publish(self, path: str) -> None:
+        with self.lock:
+            self.published_pathes.append(path)
+
+    def discard(self, path: str) -> None:
+        self.files_publisher.discard(self.get_staging_path_for(path))
+
+    def get_readable_path(self, path: str) -> str:
+        with self.lock:
+            if path in self.published_pathes:
+                return self.staging_pathes[path]
+        return path
+
+    def update_tile_last_date_object(self, key: str, data: dict[str, str]) -> None:
+        with self.lock:
+            self.date_objects[key] = data
+
+    def defer(self, callback: Callable[[], None]) -> None:
+        """callback once the transaction is committed"""
+        with self.lock:
+            self.deferred.append(callback)
+
+    def clear(self) -> None:
+        self.staging_pathes = {}
+        self.published_pathes = []
+        self.date_objects = {}
+        self.deferred = []
+
+    def commit(self) -> None:
+        with self.lock:
+            if self.published_pathes:
+                self.files_publisher.publish(
+                    [
+                        (self.staging_pathes[path], path)
+                        for path in self.published_pathes
+                    ]
+                )
+            if self.date_objects:
+                self.tiles_repository.update_tiles_last_date_objects(self.date_objects)
+            for callback in self.deferred:
+                callback()
+            self.clear()
+
+    def rollback(self) -> None:
+        with self.lock:
+            for path in self.staging_pathes:
+                self.files_publisher.discard(self.staging_pathes[path])
+            self.clear()
+
+
+class TransactionProductsStager(ProductsStager):
+    def __init__(self, publish_transaction: PublishTransaction) -> None:
+        self.publish_transaction = publish_transaction
+
+    def get_staging_path(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> str:
+        path = get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        self.publish_transaction.stage(path)
+        return self.publish_transaction.get_staging_path_for(path)
+
+    def publish(self, param: PrecipitationsParam, zone: Zone, timestamp: int) -> None:
+        self.publish_transaction.publish(
+            get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        )
+
+    def discard(self, param: PrecipitationsParam, zone: Zone, timestamp: int) -> None:
+        self.publish_transaction.discard(
+            get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        )
+
+    def get_readable_path(self, path: str) -> str:
+        return self.publish_transaction.get_readable_path(path)
+
+
+class TransactionTilesDatetimesRepository(TilesDatetimesRepository):
+    """updates the tiles datetimes once the transaction is committed"""
+
+    def __init__(self, publish_transaction: PublishTransaction) -> None:
+        self.publish_transaction = publish_transaction
+
+    def update_tile_last_date_object(self, key: str, data: dict[str, str]) -> None:
+        self.publish_transaction.update_tile_last_date_object(key, data)
+
+    def update_tiles_last_date_objects(
+        self, data_per_key: dict[str, dict[str, str]]
+    ) -> None:
+        for key, data in data_per_key.items():
+            self.publish_transaction.update_tile_last_date_object(key, data)
+
+
+class TransactionGenerationManifest(GenerationManifest):
+    """records the fingerprints once the transaction is committed"""
+
+    def __init__(
+        self,
+        publish_transaction: PublishTransaction,
+        generation_manifest: GenerationManifest,
+    ) -> None:
+        self.publish_transaction = publish_transaction
+        self.generation_manifest = generation_manifest
+        self.output_settings = generation_manifest.output_settings
+
+    def get_fingerprint(self, path: str) -> Optional[str]:
+        return self.generation_manifest.get_fingerprint(path)
+
+    def record(self, path: str, fingerprint: str) -> None:
+        self.publish_transaction.defer(
+            lambda: self.generation_manifest.record(path, fingerprint)
+        )
+
+
+class TransactionFileExistenceChecker(FileExistenceChecker):
+    """adds the products once the transaction is committed"""
+
+    def __init__(
+        self,
+        publish_transaction: PublishTransaction,
+        file_existence_checker: FileExistenceChecker,
+    ) -> None:
+        self.publish_transaction = publish_transaction
+        self.file_existence_checker = file_existence_checker
+
+    def exists(self, path: str) -> bool:
+        return self.file_existence_checker.exists(path)
+
+    def add(self, path: str) -> None:
+        self.publish_transaction.defer(lambda: self.file_existence_checker.add(path))
+
+
+class TransactionProductsCatalog(ProductsCatalog):
+    """adds the products once the transaction is committed"""
+
+    def __init__(
+        self,
+        publish_transaction: PublishTransaction,
+        products_catalog: ProductsCatalog,
+    ) -> None:
+        self.publish_transaction = publish_transaction
+        self.products_catalog = products_catalog
+
+    def add_products(self, records: Iterable[ProductRecord]) -> None:
+        records = list(records)
+        self.publish_transaction.defer(
+            lambda: self.products_catalog.add_products(records)
+        )
+
+    def get_product(self, path: str) -> Optional[ProductRecord]:
+        return self.products_catalog.get_product(path)
+
+    def get_products(
+        self, param: PrecipitationsParam, zone: Zone, start: int, end: int
+    ) -> list[ProductRecord]:
+        return self.products_catalog.get_products(param, zone, start, end)
+
+
+@contextmanager
+def published_at_once(
+    publish_transaction: Optional[PublishTransaction],
+    products_writer: "ProductsWriter",
+) -> Iterator[None]:
+    """commits the transaction once all the products are written, rolls it back on failure"""
+    if publish_transaction is None:
+        yield
+        return
+    try:
+        yield
+        products_writer.flush()
+    except BaseException:
+        publish_transaction.rollback()
+        raise
+    publish_transaction.commit()
+
+
+def get_products_stager(
+    products_stager: Optional[ProductsStager], command_executor: CommandExecutor
+) -> ProductsStager:
+    if products_stager is None:
+        return RamProductsStager(command_executor)
+    return products_stager
+
+
+class ProductsWriter(Protocol):
+    def submit(self, destinations: list[str], write: Callable[[], None]) -> None: ...
+
+    def wait_for(self, pathes: Iterable[str]) -> None:
+        """until the writes of pathes submitted are done"""
+
+    def when_written(
+        self, destinations: list[str], callback: Callable[[], None]
+    ) -> None:
+        """callback, from the thread submitting or flushing, once everything submitted before is written"""
+
+    def flush(self) -> None: ...
+
+
+class ImmediateProductsWriter(ProductsWriter):
+    def submit(self, destinations: list[str], write: Callable[[], None]) -> None:
+        write()
+
+    def wait_for(self, pathes: Iterable[str]) -> None:
+        pass
+
+    def when_written(
+        self, destinations: list[str], callback: Callable[[], None]
+    ) -> None:
+        callback()
+
+    def flush(self) -> None:
+        pass
+
+
+class PendingWrite:
+    def __init__(
+        self,
+        destinations: list[str],
+        future: Optional[Future[None]] = None,
+        callback: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.destinations = set(destinations)
+        self.future = future
+        self.callback = callback
+
+    def is_done(self) -> bool:
+        return self.future is None or self.future.done()
+
+
+class BackgroundProductsWriter(ProductsWriter):
+    """
+    writes on a pool of workers, at most queue_size writes waiting for one,
+    the callbacks being called in order, and only when no write of their destinations failed
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 4) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.pending: list[PendingWrite] = []
+        self.failed_destinations: set[str] = set()
+
+    def submit(self, destinations: list[str], write: Callable[[], None]) -> None:
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(write)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        self.pending.append(PendingWrite(destinations, future=future))
+        self.complete(wait=False)
+
+    def wait_for(self, pathes: Iterable[str]) -> None:
+        pathes = set(pathes)
+        for pending_write in list(self.pending):
+            if pending_write.future is not None and pending_write.destinations & pathes:
+                pending_write.future.result()
+
+    def when_written(
+        self, destinations: list[str], callback: Callable[[], None]
+    ) -> None:
+        self.pending.append(PendingWrite(destinations, callback=callback))
+        self.complete(wait=False)
+
+    def flush(self) -> None:
+        self.complete(wait=True)
+
+    def complete(self, wait: bool) -> None:
+        """calls the callbacks of the leading writes done, raising the first error met"""
+        error: Optional[BaseException] = None
+        while self.pending and (wait or self.pending[0].is_done()):
+            pending_write = self.pending.pop(0)
+            try:
+                if pending_write.future is not None:
+                    pending_write.future.result()
+                elif not pending_write.destinations & self.failed_destinations:
+                    pending_write.callback()  # type: ignore
+            except Exception as e:
+                self.failed_destinations |= pending_write.destinations
+                error = error or e
+        if error is not None:
+            raise error
+
+
+def get_products_writer(products_writer: Optional[ProductsWriter]) -> ProductsWriter:
+    if products_writer is None:
+        return ImmediateProductsWriter()
+    return products_writer
+
+
+def get_tmp_path_for(path: str) -> str:
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def write_file_atomically(path: str, content: bytes) -> None:
+    """readers of path see either the previous file or the whole new one"""
+    tmp_path = get_tmp_path_for(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_product(
+    tif_path: str,
+    encode: Callable[[], bytes],
+    content_hash: Callable[[], str],
+    deduplicator: Optional[ProductsDeduplicator] = None,
+) -> None:
+    """encodes and writes the product, unless deduplicator can hardlink it to an identical one"""
+    if deduplicator is None:
+        write_file_atomically(tif_path, encode())
+        return
+    product_hash = content_hash()
+    if deduplicator.link_to_identical(tif_path, product_hash):
+        return
+    write_file_atomically(tif_path, encode())
+    deduplicator.record_written(tif_path, product_hash)
+
+
 class TifConfig:
     def __init__(
         self,
@@ -139,6 +700,19 @@ class TifConfig:
         self.geo_transform = geo_transform
         self.projection = projection
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TifConfig):
+            return NotImplemented
+        return (
+            self.cols == other.cols
+            and self.rows == other.rows
+            and tuple(self.geo_transform) == tuple(other.geo_transform)
+            and self.projection == other.projection
+        )
+
+    def __repr__(self) -> str:
+        return f"TifConfig(cols={self.cols}, rows={self.rows}, geo_transform={self.geo_transform}, projection={self.projection!r})"
+
 
 def read_tif(tif_path: str) -> Optional[gdal.Dataset]:
     try:
@@ -147,6 +721,43 @@ def read_tif(tif_path: str) -> Optional[gdal.Dataset]:
         return None
 
 
+def get_tif_config_of_dataset(dataset: gdal.Dataset) -> TifConfig:
+    return TifConfig(
+        cols=dataset.RasterXSize,
+        rows=dataset.RasterYSize,
+        geo_transform=dataset.GetGeoTransform(),
+        projection=dataset.GetProjection(),
+    )
+
+
+class TifConfigMismatchException(Exception):
+    def __init__(
+        self,
+        tif_path: str,
+        expected_tif_config: TifConfig,
+        actual_tif_config: TifConfig,
+    ) -> None:
+        super().__init__(
+            f"'{tif_path}' has {actual_tif_config} instead of {expected_tif_config}"
+        )
+        self.tif_path = tif_path
+        self.expected_tif_config = expected_tif_config
+        self.actual_tif_config = actual_tif_config
+
+
+def check_tif_config(
+    tif_path: str,
+    expected_tif_config: Optional[TifConfig],
+    actual_tif_config: Optional[TifConfig],
+) -> None:
+    if expected_tif_config is None or actual_tif_config is None:
+        return
+    if expected_tif_config != actual_tif_config:
+        raise TifConfigMismatchException(
+            tif_path, expected_tif_config, actual_tif_config
+        )
+
+
 class Transform(Protocol):
     def transform(
         self, array: Optional[numpy.ndarray[Any, Any]]
@@ -178,6 +789,7 @@ class TifReader(Protocol):
         tif_path: str,
         *,
         transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
     ) -> Optional[numpy.ndarray[Any, Any]]: ...
 
 
@@ -187,8 +799,13 @@ class RealTifReader(TifReader):
         tif_path: str,
         *,
         transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
     ) -> Optional[numpy.ndarray[Any, Any]]:
         dataset = read_tif(tif_path)
+        if dataset and expected_tif_config is not None:
+            check_tif_config(
+                tif_path, expected_tif_config, get_tif_config_of_dataset(dataset)
+            )
         return transform.transform(dataset.ReadAsArray() if dataset else None)
 
 
@@ -196,15 +813,22 @@ class InMemoryTifReader(TifReader):
     def __init__(
         self,
         tifs: Optional[dict[str, numpy.ndarray[Any, Any]]] = None,
+        tif_configs: Optional[dict[str, TifConfig]] = None,
     ) -> None:
         self.tifs: dict[str, numpy.ndarray[Any, Any]] = tifs or {}
+        self.tif_configs: dict[str, TifConfig] = tif_configs or {}
 
     def read_tif(
         self,
         tif_path: str,
         *,
         transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
     ) -> Optional[numpy.ndarray[Any, Any]]:
+        if tif_path in self.tifs:
+            check_tif_config(
+                tif_path, expected_tif_config, self.tif_configs.get(tif_path, None)
+            )
         return transform.transform(self.tifs.get(tif_path, None))
 
     @staticmethod
@@ -226,6 +850,7 @@ class SameInMemoryTifReader(TifReader):
         tif_path: str,
         *,
         transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
     ) -> Optional[numpy.ndarray[Any, Any]]:
         return transform.transform(self.array)
 
@@ -234,32 +859,80 @@ class SameInMemoryTifReader(TifReader):
         return SameInMemoryTifReader(numpy.array(array))
 
 
+class LocalCacheTifReader(TifReader):
+    def __init__(self, tif_reader: TifReader, local_file_cache: LocalFileCache) -> None:
+        self.tif_reader = tif_reader
+        self.local_file_cache = local_file_cache
+
+    def read_tif(
+        self,
+        tif_path: str,
+        *,
+        transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
+    ) -> Optional[numpy.ndarray[Any, Any]]:
+        local_tif_path = self.local_file_cache.fetch(tif_path)
+        return self.tif_reader.read_tif(
+            local_tif_path or tif_path,
+            transform=transform,
+            expected_tif_config=expected_tif_config,
+        )
+
+
 class GDALOpenException(Exception):
     pass
 
 
-def get_tif_config(timestamp: int, zone: Zone) -> Optional[TifConfig]:
+class TifLocator(Protocol):
+    def locate(self, tif_path: str) -> Optional[tuple[str, int]]:
+        """file and band holding tif_path, None if nowhere"""
+
+
+class RealTifLocator(TifLocator):
+    def locate(self, tif_path: str) -> Optional[tuple[str, int]]:
+        return (tif_path, 1) if os.path.isfile(tif_path) else None
+
+
+class InMemoryTifLocator(TifLocator):
+    def __init__(self, located: Optional[dict[str, tuple[str, int]]] = None) -> None:
+        self.located: dict[str, tuple[str, int]] = located or {}
+
+    def locate(self, tif_path: str) -> Optional[tuple[str, int]]:
+        return self.located.get(tif_path, None)
+
+
+def get_tif_config(
+    timestamp: int, zone: Zone, tif_locator: Optional[TifLocator] = None
+) -> Optional[TifConfig]:
     radaric_tif_path = get_tif_path_for_param_in_zone_at(
         PrecipitationsParam.VALUES_5MN, zone, timestamp
     )
+    if tif_locator is not None:
+        located = tif_locator.locate(radaric_tif_path)
+        if located is None:
+            return None
+        radaric_tif_path = located[0]
     radaric_dataset = read_tif(radaric_tif_path)
     if not radaric_dataset:
         return None
-    return TifConfig(
-        cols=radaric_dataset.RasterXSize,
-        rows=radaric_dataset.RasterYSize,
-        geo_transform=radaric_dataset.GetGeoTransform(),
-        projection=radaric_dataset.GetProjection(),
-    )
+    return get_tif_config_of_dataset(radaric_dataset)
 
 
 class TifConfigGetter(Protocol):
     def get_tif_config(self, timestamp: int, zone: Zone) -> Optional[TifConfig]: ...
 
+    def update_tif_config(self, zone: Zone, tif_config: TifConfig) -> None: ...
+
 
 class RealTifConfigGetter(TifConfigGetter):
+    def __init__(self, tif_locator: Optional[TifLocator] = None) -> None:
+        self.tif_locator = tif_locator
+
     def get_tif_config(self, timestamp: int, zone: Zone) -> Optional[TifConfig]:
-        return get_tif_config(timestamp, zone)
+        return get_tif_config(timestamp, zone, self.tif_locator)
+
+    def update_tif_config(self, zone: Zone, tif_config: TifConfig) -> None:
+        pass
 
 
 class InMemoryTifConfigGetter(TifConfigGetter):
@@ -268,87 +941,1191 @@ class InMemoryTifConfigGetter(TifConfigGetter):
         tif_configs: Optional[dict[tuple[Zone, int], TifConfig]] = None,
     ) -> None:
         self.tif_configs: dict[tuple[Zone, int], TifConfig] = tif_configs or {}
+        self.updated_tif_configs: dict[Zone, TifConfig] = {}
 
     def get_tif_config(self, timestamp: int, zone: Zone) -> Optional[TifConfig]:
         return self.tif_configs.get((zone, timestamp), None)
 
+    def update_tif_config(self, zone: Zone, tif_config: TifConfig) -> None:
+        self.updated_tif_configs[zone] = tif_config
 
-def create_tif(
-    tif_path: str,
-    tif_config: TifConfig,
-    data: numpy.ndarray[Any, Any],
-    no_data_value: Optional[float] = None,
+
+def tif_config_to_json_object(tif_config: TifConfig) -> dict[str, Any]:
+    return {
+        "cols": tif_config.cols,
+        "rows": tif_config.rows,
+        "geo_transform": list(tif_config.geo_transform),
+        "projection": tif_config.projection,
+    }
+
+
+def tif_config_from_json_object(json_object: dict[str, Any]) -> TifConfig:
+    return TifConfig(
+        cols=int(json_object["cols"]),
+        rows=int(json_object["rows"]),
+        geo_transform=tuple(json_object["geo_transform"]),
+        projection=json_object["projection"],
+    )
+
+
+def read_tif_configs_cache(cache_path: str) -> dict[Zone, TifConfig]:
+    try:
+        with open(cache_path) as cache_file:
+            json_objects = json.load(cache_file)
+        return {
+            Zone(zone): tif_config_from_json_object(json_object)
+            for zone, json_object in json_objects.items()
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def write_tif_configs_cache(
+    cache_path: str, tif_configs: dict[Zone, TifConfig]
 ) -> None:
-    driver = gdal.GetDriverByName("GTiff")
-    tif = driver.Create(
-        tif_path,
-        tif_config.cols,
-        tif_config.rows,
-        1,
-        gdal.GDT_Float32,
-        ["TILED=YES", "COMPRESS=LZW"],
-    )
-    band = tif.GetRasterBand(1)
-    band.WriteArray(data, 0, 0)
-    band.FlushCache()
-    if no_data_value is not None:
-        band.SetNoDataValue(no_data_value)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as cache_file:
+        json.dump(
+            {
+                zone.value: tif_config_to_json_object(tif_config)
+                for zone, tif_config in tif_configs.items()
+            },
+            cache_file,
+            indent=4,
+        )
+    os.replace(tmp_path, cache_path)
 
-    tif.SetGeoTransform(tif_config.geo_transform)
-    tif.SetProjection(tif_config.projection)
-    tif.FlushCache()
 
+def merge_into_tif_configs_cache(
+    cache_path: str, zone: Zone, tif_config: TifConfig
+) -> dict[Zone, TifConfig]:
+    """under a lock, the zone workers sharing the file"""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(f"{cache_path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        tif_configs = read_tif_configs_cache(cache_path)
+        tif_configs[zone] = tif_config
+        write_tif_configs_cache(cache_path, tif_configs)
+    return tif_configs
 
-class TifCreator(Protocol):
-    def create_tif(
-        self,
-        tif_path: str,
-        tif_config: TifConfig,
-        data: numpy.ndarray[Any, Any],
-        no_data_value: Optional[float] = None,
-    ) -> None: ...
 
+class CachedTifConfigGetter(TifConfigGetter):
+    """
+    keeps the grid of each zone in a local file, refreshed when an input read does not match it,
+    the cached grid being used only at the timestamps having a 5 minutes tif,
+    located on disk since the catalog and the index only know of the products
+    """
 
-class RealTifCreator(TifCreator):
-    def create_tif(
+    def __init__(
         self,
-        tif_path: str,
-        tif_config: TifConfig,
-        data: numpy.ndarray[Any, Any],
-        no_data_value: Optional[float] = None,
+        tif_config_getter: TifConfigGetter,
+        tif_locator: TifLocator = RealTifLocator(),
+        cache_path: str = TIF_CONFIGS_CACHE_PATH,
     ) -> None:
-        create_tif(
-            tif_path,
-            tif_config,
-            data,
-            no_data_value,
+        self.tif_config_getter = tif_config_getter
+        self.tif_locator = tif_locator
+        self.cache_path = cache_path
+        self.tif_configs: dict[Zone, TifConfig] = read_tif_configs_cache(cache_path)
+
+    def get_tif_config(self, timestamp: int, zone: Zone) -> Optional[TifConfig]:
+        tif_config = self.tif_configs.get(zone, None)
+        if tif_config is not None:
+            if (
+                self.tif_locator.locate(
+                    get_tif_path_for_param_in_zone_at(
+                        PrecipitationsParam.VALUES_5MN, zone, timestamp
+                    )
+                )
+                is None
+            ):
+                return None
+            return tif_config
+        tif_config = self.tif_config_getter.get_tif_config(timestamp, zone)
+        if tif_config is not None:
+            self.update_tif_config(zone, tif_config)
+        return tif_config
+
+    def update_tif_config(self, zone: Zone, tif_config: TifConfig) -> None:
+        if self.tif_configs.get(zone, None) == tif_config:
+            return
+        print(f"Caching {tif_config} for zone '{zone.value}' in '{self.cache_path}'.")
+        self.tif_configs = merge_into_tif_configs_cache(
+            self.cache_path, zone, tif_config
         )
+        self.tif_config_getter.update_tif_config(zone, tif_config)
 
 
-class InMemoryTifCreator(TifCreator):
-    def __init__(self) -> None:
-        self.tifs: dict[str, numpy.ndarray[Any, Any]] = {}
+def get_tif_config_of_product_record(record: ProductRecord) -> Optional[TifConfig]:
+    if (
+        record.cols is None
+        or record.rows is None
+        or record.geo_transform is None
+        or record.projection is None
+    ):
+        return None
+    return TifConfig(
+        cols=record.cols,
+        rows=record.rows,
+        geo_transform=record.geo_transform,
+        projection=record.projection,
+    )
 
-    def create_tif(
-        self,
-        tif_path: str,
-        tif_config: TifConfig,
-        data: numpy.ndarray[Any, Any],
-        no_data_value: Optional[float] = None,
-    ) -> None:
-        self.tifs[tif_path] = data
 
+def set_product_record_statistics(
+    record: ProductRecord,
+    tif_config: TifConfig,
+    data: Optional[numpy.ndarray[Any, Any]],
+) -> ProductRecord:
+    record.cols = tif_config.cols
+    record.rows = tif_config.rows
+    record.geo_transform = tuple(tif_config.geo_transform)
+    record.projection = tif_config.projection
+    if data is not None and data.size > 0 and not numpy.all(numpy.isnan(data)):
+        record.minimum = float(numpy.nanmin(data))
+        record.maximum = float(numpy.nanmax(data))
+        record.nonzero = int(numpy.count_nonzero(numpy.nan_to_num(data)))
+    return record
+
+
+def get_product_record_details(record: ProductRecord) -> ProductRecord:
+    dataset = read_tif(record.path)
+    if not dataset:
+        return record
+    data: Optional[numpy.ndarray[Any, Any]] = None
+    if record.param.name.startswith("VALUES_"):
+        transform: Transform = (
+            MeteoFranceTransform()
+            if record.param == PrecipitationsParam.VALUES_5MN
+            else IdentityTransform()
+        )
+        data = transform.transform(dataset.ReadAsArray())
+    return set_product_record_statistics(
+        record, get_tif_config_of_dataset(dataset), data
+    )
 
-def set_layer_at_timestamp_with_values_from(
-    layer_index: int,
-    tif_path: str,
+
+def record_generated_products(
+    params: list[PrecipitationsParam],
+    zone: Zone,
+    timestamp: int,
     tif_config: TifConfig,
-    accum_data: numpy.ndarray[Any, Any],
+    data: Optional[numpy.ndarray[Any, Any]],
     *,
-    tif_reader: TifReader,
+    products_catalog: ProductsCatalog,
 ) -> None:
-    print(f"Reading [{tif_path}]...")
-    dataset_at_timestamp = tif_reader.read_tif(tif_path)
+    records: list[ProductRecord] = []
+    for param in params:
+        path = get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        record = get_product_record_of_file(path) or ProductRecord(
+            path, param, zone, timestamp
+        )
+        # the colors are not the values
+        records.append(
+            set_product_record_statistics(
+                record, tif_config, data if param.name.startswith("VALUES_") else None
+            )
+        )
+    products_catalog.add_products(records)
+
+
+class CatalogFileExistenceChecker(FileExistenceChecker):
+    def __init__(self, products_catalog: ProductsCatalog) -> None:
+        self.products_catalog = products_catalog
+
+    def exists(self, path: str) -> bool:
+        return self.products_catalog.get_product(path) is not None
+
+    def add(self, path: str) -> None:
+        if self.products_catalog.get_product(path) is not None:
+            return
+        record = get_product_record_of_file(path)
+        if record is not None:
+            self.products_catalog.add_products([record])
+
+
+class CatalogTifConfigGetter(TifConfigGetter):
+    def __init__(
+        self,
+        products_catalog: ProductsCatalog,
+        tif_config_getter: TifConfigGetter,
+    ) -> None:
+        self.products_catalog = products_catalog
+        self.tif_config_getter = tif_config_getter
+
+    def get_tif_config(self, timestamp: int, zone: Zone) -> Optional[TifConfig]:
+        record = self.products_catalog.get_product(
+            get_tif_path_for_param_in_zone_at(
+                PrecipitationsParam.VALUES_5MN, zone, timestamp
+            )
+        )
+        tif_config = get_tif_config_of_product_record(record) if record else None
+        if tif_config is not None:
+            return tif_config
+        return self.tif_config_getter.get_tif_config(timestamp, zone)
+
+    def update_tif_config(self, zone: Zone, tif_config: TifConfig) -> None:
+        self.tif_config_getter.update_tif_config(zone, tif_config)
+
+
+VALUES_TIF_CREATION_OPTIONS = ["TILED=YES"]
+# blocks all 0 (or no data) are not written, and read back as such
+SPARSE_CREATION_OPTIONS = ["SPARSE_OK=TRUE"]
+
+
+OVERVIEWS_CREATION_OPTIONS = ["COPY_SRC_OVERVIEWS=YES"]
+
+
+def get_average_overview(
+    data: numpy.ndarray[Any, Any],
+    level: int,
+    no_data_value: Optional[float] = None,
+) -> numpy.ndarray[Any, Any]:
+    """
+    averages of the level x level blocks of data (the last ones partial, as GDAL sizes overviews),
+    ignoring no data and NaN, no data (or NaN) where a block has no value
+    """
+    rows, cols = data.shape
+    overview_rows = -(-rows // level)
+    overview_cols = -(-cols // level)
+    values = numpy.full(
+        (overview_rows * level, overview_cols * level), numpy.nan, numpy.float64
+    )
+    values[:rows, :cols] = data
+    if no_data_value is not None:
+        values[values == no_data_value] = numpy.nan
+    blocks = values.reshape((overview_rows, level, overview_cols, level))
+    is_valid = numpy.isfinite(blocks)
+    counts = is_valid.sum(axis=(1, 3))
+    sums = numpy.where(is_valid, blocks, 0).sum(axis=(1, 3))
+    overview = numpy.full(
+        (overview_rows, overview_cols),
+        numpy.nan if no_data_value is None else no_data_value,
+        numpy.float32,
+    )
+    numpy.divide(sums, counts, out=overview, where=counts > 0, casting="unsafe")
+    return overview
+
+
+def add_average_overviews(
+    dataset: gdal.Dataset,
+    data: numpy.ndarray[Any, Any],
+    overview_levels: list[int],
+    no_data_value: Optional[float] = None,
+) -> None:
+    """overviews computed from data, without reading back the dataset"""
+    dataset.BuildOverviews("NONE", overview_levels)
+    band = dataset.GetRasterBand(1)
+    for index, level in enumerate(overview_levels):
+        overview_band = band.GetOverview(index)
+        if no_data_value is not None:
+            overview_band.SetNoDataValue(no_data_value)
+        overview_band.WriteArray(get_average_overview(data, level, no_data_value), 0, 0)
+
+
+def get_creation_options(creation_options: list[str], sparse: bool) -> list[str]:
+    return creation_options + SPARSE_CREATION_OPTIONS if sparse else creation_options
+
+
+def create_memory_dataset(
+    tif_config: TifConfig, bands: int, data_type: int
+) -> gdal.Dataset:
+    memory_driver = gdal.GetDriverByName("MEM")
+    dataset = memory_driver.Create(
+        "", tif_config.cols, tif_config.rows, bands, data_type
+    )
+    dataset.SetGeoTransform(tif_config.geo_transform)
+    dataset.SetProjection(tif_config.projection)
+    return dataset
+
+
+def get_tif_content_of(
+    dataset: gdal.Dataset, driver_name: str, creation_options: list[str]
+) -> bytes:
+    """encodes dataset with the driver in /vsimem/"""
+    vsimem_path = f"/vsimem/{uuid4().hex}.tif"
+    try:
+        tif = gdal.GetDriverByName(driver_name).CreateCopy(
+            vsimem_path, dataset, options=creation_options
+        )
+        tif = None
+        size = gdal.VSIStatL(vsimem_path).size
+        vsimem_file = gdal.VSIFOpenL(vsimem_path, "rb")
+        try:
+            return bytes(gdal.VSIFReadL(1, size, vsimem_file))
+        finally:
+            gdal.VSIFCloseL(vsimem_file)
+    finally:
+        gdal.Unlink(vsimem_path)
+
+
+def create_tif(
+    tif_path: str,
+    tif_config: TifConfig,
+    data: numpy.ndarray[Any, Any],
+    no_data_value: Optional[float] = None,
+    sparse: bool = False,
+    deduplicator: Optional[ProductsDeduplicator] = None,
+    codec: Codec = DEFAULT_VALUES_CODEC,
+    overview_levels: Optional[list[int]] = None,
+) -> None:
+    creation_options = get_creation_options(
+        VALUES_TIF_CREATION_OPTIONS + codec.get_gtiff_creation_options(), sparse
+    )
+    if overview_levels:
+        creation_options = creation_options + OVERVIEWS_CREATION_OPTIONS
+
+    def encode() -> bytes:
+        dataset = create_memory_dataset(tif_config, 1, gdal.GDT_Float32)
+        band = dataset.GetRasterBand(1)
+        band.WriteArray(data, 0, 0)
+        if no_data_value is not None:
+            band.SetNoDataValue(no_data_value)
+        if overview_levels:
+            add_average_overviews(dataset, data, overview_levels, no_data_value)
+        return get_tif_content_of(dataset, "GTiff", creation_options)
+
+    write_product(
+        tif_path,
+        encode,
+        lambda: get_content_hash_of(
+            [data.astype(numpy.float32, copy=False)],
+            tif_config_to_json_object(tif_config),
+            creation_options,
+            no_data_value,
+            overview_levels,
+        ),
+        deduplicator,
+    )
+
+
+class TifCreator(Protocol):
+    def create_tif(
+        self,
+        tif_path: str,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+        no_data_value: Optional[float] = None,
+    ) -> None: ...
+
+
+class RealTifCreator(TifCreator):
+    def __init__(
+        self,
+        sparse: bool = False,
+        deduplicator: Optional[ProductsDeduplicator] = None,
+        codecs: Optional[dict[PrecipitationsParam, Codec]] = None,
+        overview_levels: Optional[list[int]] = None,
+    ) -> None:
+        self.sparse = sparse
+        self.deduplicator = deduplicator
+        self.codecs = codecs or {}
+        self.overview_levels = overview_levels
+
+    def create_tif(
+        self,
+        tif_path: str,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+        no_data_value: Optional[float] = None,
+    ) -> None:
+        create_tif(
+            tif_path,
+            tif_config,
+            data,
+            no_data_value,
+            self.sparse,
+            self.deduplicator,
+            get_codec_for_tif_path(tif_path, self.codecs, DEFAULT_VALUES_CODEC),
+            self.overview_levels,
+        )
+
+
+class InMemoryTifCreator(TifCreator):
+    def __init__(self) -> None:
+        self.tifs: dict[str, numpy.ndarray[Any, Any]] = {}
+
+    def create_tif(
+        self,
+        tif_path: str,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+        no_data_value: Optional[float] = None,
+    ) -> None:
+        self.tifs[tif_path] = data
+
+
+def clear_transparent_colors(
+    colors: numpy.ndarray[Any, Any]
+) -> numpy.ndarray[Any, Any]:
+    """RGBA bands with the transparent pixels all 0, so that the transparent blocks are empty"""
+    colors = colors.copy()
+    colors[:, colors[3] == 0] = 0
+    return colors
+
+
+def write_color_bands(dataset: gdal.Dataset, colors: numpy.ndarray[Any, Any]) -> None:
+    for band_index, color_interpretation in enumerate(
+        [gdal.GCI_RedBand, gdal.GCI_GreenBand, gdal.GCI_BlueBand, gdal.GCI_AlphaBand]
+    ):
+        band = dataset.GetRasterBand(band_index + 1)
+        band.SetColorInterpretation(color_interpretation)
+        band.WriteArray(colors[band_index], 0, 0)
+
+
+def create_color_tif(
+    tif_path: str,
+    tif_config: TifConfig,
+    colors: numpy.ndarray[Any, Any],
+    sparse: bool = False,
+    deduplicator: Optional[ProductsDeduplicator] = None,
+    codec: Codec = DEFAULT_COLOR_CODEC,
+) -> None:
+    """RGBA COG, as gdaldem color-relief -alpha -of COG would write it"""
+    if sparse:
+        colors = clear_transparent_colors(colors)
+    creation_options = get_creation_options(codec.get_cog_creation_options(), sparse)
+
+    def encode() -> bytes:
+        dataset = create_memory_dataset(tif_config, len(colors), gdal.GDT_Byte)
+        write_color_bands(dataset, colors)
+        return get_tif_content_of(dataset, "COG", creation_options)
+
+    write_product(
+        tif_path,
+        encode,
+        lambda: get_content_hash_of(
+            [colors], tif_config_to_json_object(tif_config), creation_options
+        ),
+        deduplicator,
+    )
+
+
+def create_paletted_color_tif(
+    tif_path: str,
+    tif_config: TifConfig,
+    indexes: numpy.ndarray[Any, Any],
+    palette: Palette,
+    sparse: bool = False,
+    deduplicator: Optional[ProductsDeduplicator] = None,
+    codec: Codec = DEFAULT_PALETTED_COLOR_CODEC,
+) -> None:
+    """single band COG of indexes into the color table of palette, transparent where no data"""
+    creation_options = get_creation_options(codec.get_cog_creation_options(), sparse)
+
+    def encode() -> bytes:
+        dataset = create_memory_dataset(tif_config, 1, gdal.GDT_Byte)
+        color_table = gdal.ColorTable()
+        for index, color in enumerate(palette.get_color_table()):
+            color_table.SetColorEntry(index, color)
+        band = dataset.GetRasterBand(1)
+        band.SetRasterColorTable(color_table)
+        band.SetRasterColorInterpretation(gdal.GCI_PaletteIndex)
+        band.SetNoDataValue(palette.get_no_data_index())
+        band.WriteArray(indexes, 0, 0)
+        return get_tif_content_of(dataset, "COG", creation_options)
+
+    write_product(
+        tif_path,
+        encode,
+        lambda: get_content_hash_of(
+            [indexes],
+            tif_config_to_json_object(tif_config),
+            creation_options,
+            palette.get_color_table(),
+        ),
+        deduplicator,
+    )
+
+
+def is_paletted(
+    accumulation_duration: AccumulationDuration,
+    paletted_params: list[PrecipitationsParam],
+) -> bool:
+    return (
+        get_corresponding_color_precipitations_param(accumulation_duration)
+        in paletted_params
+    )
+
+
+class ColorTifGenerator(Protocol):
+    def generate_color_tif(
+        self,
+        values_tif_path: str,
+        color_tif_path: str,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: Optional[numpy.ndarray[Any, Any]] = None,
+    ) -> None: ...
+
+
+class CommandColorTifGenerator(ColorTifGenerator):
+    """colors the values tif with gdaldem"""
+
+    def __init__(self, command_executor: CommandExecutor) -> None:
+        self.command_executor = command_executor
+
+    def generate_color_tif(
+        self,
+        values_tif_path: str,
+        color_tif_path: str,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: Optional[numpy.ndarray[Any, Any]] = None,
+    ) -> None:
+        generate_color_tif_from_values(
+            values_tif_path,
+            color_tif_path,
+            accumulation_duration,
+            command_executor=self.command_executor,
+        )
+
+
+class PaletteColorTifGenerator(ColorTifGenerator):
+    """
+    colors the values in process, reading them back from the values tif only when not given,
+    as paletted tifs for the color params in paletted_params, as RGBA tifs for the others
+    """
+
+    def __init__(
+        self,
+        tif_reader: TifReader = RealTifReader(),
+        paletted_params: Optional[list[PrecipitationsParam]] = None,
+        sparse: bool = False,
+        deduplicator: Optional[ProductsDeduplicator] = None,
+        codecs: Optional[dict[PrecipitationsParam, Codec]] = None,
+    ) -> None:
+        self.tif_reader = tif_reader
+        self.paletted_params = paletted_params or []
+        self.sparse = sparse
+        self.deduplicator = deduplicator
+        self.codecs = codecs or {}
+
+    def generate_color_tif(
+        self,
+        values_tif_path: str,
+        color_tif_path: str,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: Optional[numpy.ndarray[Any, Any]] = None,
+    ) -> None:
+        if data is None:
+            data = self.tif_reader.read_tif(
+                values_tif_path, expected_tif_config=tif_config
+            )
+        if data is None:
+            raise GDALOpenException(f"Could not read '{values_tif_path}'")
+        print(f"Coloring '{color_tif_path}'...")
+        palette = get_radar_palette_for(accumulation_duration)
+        if is_paletted(accumulation_duration, self.paletted_params):
+            create_paletted_color_tif(
+                color_tif_path,
+                tif_config,
+                palette.colorize_as_color_table_indexes(data),
+                palette,
+                self.sparse,
+                self.deduplicator,
+                get_codec_for_tif_path(
+                    color_tif_path, self.codecs, DEFAULT_PALETTED_COLOR_CODEC
+                ),
+            )
+            return
+        create_color_tif(
+            color_tif_path,
+            tif_config,
+            palette.colorize(data),
+            self.sparse,
+            self.deduplicator,
+            get_codec_for_tif_path(color_tif_path, self.codecs, DEFAULT_COLOR_CODEC),
+        )
+
+
+class InMemoryColorTifGenerator(ColorTifGenerator):
+    def __init__(
+        self, paletted_params: Optional[list[PrecipitationsParam]] = None
+    ) -> None:
+        self.tifs: dict[str, numpy.ndarray[Any, Any]] = {}
+        self.paletted_params = paletted_params or []
+
+    def generate_color_tif(
+        self,
+        values_tif_path: str,
+        color_tif_path: str,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: Optional[numpy.ndarray[Any, Any]] = None,
+    ) -> None:
+        if data is None:
+            raise ValueError(f"No values given for '{color_tif_path}'")
+        palette = get_radar_palette_for(accumulation_duration)
+        if is_paletted(accumulation_duration, self.paletted_params):
+            self.tifs[color_tif_path] = palette.colorize_as_color_table_indexes(data)
+            return
+        self.tifs[color_tif_path] = palette.colorize(data)
+
+
+def generate_color_tif(
+    values_tif_path: str,
+    color_tif_path: str,
+    accumulation_duration: AccumulationDuration,
+    tif_config: TifConfig,
+    data: Optional[numpy.ndarray[Any, Any]],
+    *,
+    command_executor: CommandExecutor,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+) -> None:
+    if color_tif_generator is None:
+        color_tif_generator = CommandColorTifGenerator(command_executor)
+    color_tif_generator.generate_color_tif(
+        values_tif_path,
+        color_tif_path,
+        accumulation_duration,
+        tif_config,
+        data,
+    )
+
+
+IMAGE_DRIVERS = {"png": "PNG", "webp": "WEBP"}
+IMAGE_CREATION_OPTIONS = {"png": ["ZLEVEL=9"], "webp": ["LOSSLESS=TRUE"]}
+
+
+def get_quicklook_level(tif_config: TifConfig, size: int) -> int:
+    """smallest overview level fitting the raster in size x size pixels"""
+    return max(1, -(-max(tif_config.rows, tif_config.cols) // size))
+
+
+def get_quicklook_colors(
+    data: numpy.ndarray[Any, Any], palette: Palette, level: int
+) -> numpy.ndarray[Any, Any]:
+    """RGBA bands of the average overview of data at level"""
+    if level > 1:
+        data = get_average_overview(data, level)
+    return palette.colorize(data)
+
+
+def encode_image(colors: numpy.ndarray[Any, Any], image_format: str) -> bytes:
+    """RGBA bands as a png or webp image"""
+    _, rows, cols = colors.shape
+    dataset = gdal.GetDriverByName("MEM").Create(
+        "", cols, rows, len(colors), gdal.GDT_Byte
+    )
+    write_color_bands(dataset, colors)
+    return get_tif_content_of(
+        dataset,
+        IMAGE_DRIVERS[image_format],
+        IMAGE_CREATION_OPTIONS[image_format],
+    )
+
+
+class QuicklookGenerator(Protocol):
+    def generate_quicklooks(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+    ) -> None:
+        """downsampled colors of data, next to the tif of param"""
+
+    def get_quicklook_pathes(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> list[str]: ...
+
+
+class RealQuicklookGenerator(QuicklookGenerator):
+    def __init__(self, sizes: list[int], quicklook_format: str = "png") -> None:
+        if quicklook_format not in IMAGE_DRIVERS:
+            raise ValueError(
+                f"Expected one of {list(IMAGE_DRIVERS)}, got '{quicklook_format}'"
+            )
+        self.sizes = sizes
+        self.quicklook_format = quicklook_format
+
+    def get_quicklook_pathes(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> list[str]:
+        return [
+            get_quicklook_path_for_param_in_zone_at(
+                param, zone, timestamp, size, self.quicklook_format
+            )
+            for size in self.sizes
+        ]
+
+    def generate_quicklooks(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+    ) -> None:
+        palette = get_radar_palette_for(accumulation_duration)
+        for size in self.sizes:
+            quicklook_path = get_quicklook_path_for_param_in_zone_at(
+                param, zone, timestamp, size, self.quicklook_format
+            )
+            print(f"Rendering quicklook '{quicklook_path}'...")
+            os.makedirs(os.path.dirname(quicklook_path), exist_ok=True)
+            write_file_atomically(
+                quicklook_path,
+                encode_image(
+                    get_quicklook_colors(
+                        data, palette, get_quicklook_level(tif_config, size)
+                    ),
+                    self.quicklook_format,
+                ),
+            )
+
+
+class InMemoryQuicklookGenerator(QuicklookGenerator):
+    def __init__(self, sizes: list[int], quicklook_format: str = "png") -> None:
+        self.sizes = sizes
+        self.quicklook_format = quicklook_format
+        self.quicklooks: dict[str, numpy.ndarray[Any, Any]] = {}
+
+    def get_quicklook_pathes(
+        self, param: PrecipitationsParam, zone: Zone, timestamp: int
+    ) -> list[str]:
+        return [
+            get_quicklook_path_for_param_in_zone_at(
+                param, zone, timestamp, size, self.quicklook_format
+            )
+            for size in self.sizes
+        ]
+
+    def generate_quicklooks(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+    ) -> None:
+        palette = get_radar_palette_for(accumulation_duration)
+        for size in self.sizes:
+            self.quicklooks[
+                get_quicklook_path_for_param_in_zone_at(
+                    param, zone, timestamp, size, self.quicklook_format
+                )
+            ] = get_quicklook_colors(
+                data, palette, get_quicklook_level(tif_config, size)
+            )
+
+
+class TilePyramidGenerator(Protocol):
+    def generate_pyramid(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+    ) -> None:
+        """XYZ tiles of the colors of data"""
+
+    def has_pyramid(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        tif_config: TifConfig,
+    ) -> bool:
+        """false if the tiles expected for the tif of param were not written"""
+
+
+VIRTUAL_VALUES_DURATIONS = [
+    AccumulationDuration.CUMUL_3H,
+    AccumulationDuration.CUMUL_6H,
+    AccumulationDuration.CUMUL_12H,
+]
+
+
+def get_sum_vrt_content(
+    vrt_path: str, sources: list[tuple[str, int]], tif_config: TifConfig
+) -> bytes:
+    """VRT summing the given band of the sources when read, the sources relative to the VRT"""
+    vrt_directory = os.path.dirname(vrt_path)
+    dataset = ElementTree.Element(
+        "VRTDataset",
+        rasterXSize=str(tif_config.cols),
+        rasterYSize=str(tif_config.rows),
+    )
+    ElementTree.SubElement(dataset, "SRS", dataAxisToSRSAxisMapping="1,2").text = (
+        tif_config.projection
+    )
+    ElementTree.SubElement(dataset, "GeoTransform").text = ", ".join(
+        repr(float(value)) for value in tif_config.geo_transform
+    )
+    band = ElementTree.SubElement(
+        dataset,
+        "VRTRasterBand",
+        dataType="Float32",
+        band="1",
+        subClass="VRTDerivedRasterBand",
+    )
+    ElementTree.SubElement(band, "PixelFunctionType").text = "sum"
+    for source_path, source_band in sources:
+        source = ElementTree.SubElement(band, "SimpleSource")
+        ElementTree.SubElement(source, "SourceFilename", relativeToVRT="1").text = (
+            os.path.relpath(source_path, vrt_directory)
+        )
+        ElementTree.SubElement(source, "SourceBand").text = str(source_band)
+    ElementTree.indent(dataset)
+    return ElementTree.tostring(dataset)
+
+
+class VirtualValuesWriter(Protocol):
+    def write_virtual_values(
+        self, vrt_path: str, sources_pathes: list[str], tif_config: TifConfig
+    ) -> None:
+        """values of vrt_path computed from the sources only when read"""
+
+
+class RealVirtualValuesWriter(VirtualValuesWriter):
+    def __init__(self, tif_locator: TifLocator = RealTifLocator()) -> None:
+        self.tif_locator = tif_locator
+
+    def write_virtual_values(
+        self, vrt_path: str, sources_pathes: list[str], tif_config: TifConfig
+    ) -> None:
+        # as the accumulations, summing the sources found
+        existing_sources = [
+            located
+            for located in (
+                self.tif_locator.locate(source_path) for source_path in sources_pathes
+            )
+            if located is not None
+        ]
+        if not existing_sources:
+            print(f"Skipping '{vrt_path}' because none of its sources exists.")
+            return
+        print(f"Writing virtual values '{vrt_path}'...")
+        os.makedirs(os.path.dirname(vrt_path), exist_ok=True)
+        write_file_atomically(
+            vrt_path,
+            get_sum_vrt_content(vrt_path, existing_sources, tif_config),
+        )
+
+
+class InMemoryVirtualValuesWriter(VirtualValuesWriter):
+    def __init__(self) -> None:
+        self.vrts: dict[str, list[str]] = {}
+
+    def write_virtual_values(
+        self, vrt_path: str, sources_pathes: list[str], tif_config: TifConfig
+    ) -> None:
+        self.vrts[vrt_path] = sources_pathes
+
+
+class BlockWindow:
+    def __init__(self, x_offset: int, y_offset: int, cols: int, rows: int) -> None:
+        self.x_offset = x_offset
+        self.y_offset = y_offset
+        self.cols = cols
+        self.rows = rows
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BlockWindow):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f"BlockWindow(x_offset={self.x_offset}, y_offset={self.y_offset}, cols={self.cols}, rows={self.rows})"
+
+    def slice_of(self, array: numpy.ndarray[Any, Any]) -> numpy.ndarray[Any, Any]:
+        return array[
+            self.y_offset : self.y_offset + self.rows,
+            self.x_offset : self.x_offset + self.cols,
+        ]
+
+
+def get_block_windows(
+    tif_config: TifConfig, block_cols: int, block_rows: int
+) -> list[BlockWindow]:
+    return [
+        BlockWindow(
+            x_offset,
+            y_offset,
+            min(block_cols, tif_config.cols - x_offset),
+            min(block_rows, tif_config.rows - y_offset),
+        )
+        for y_offset in range(0, tif_config.rows, block_rows)
+        for x_offset in range(0, tif_config.cols, block_cols)
+    ]
+
+
+def sum_blocks(
+    blocks: Iterable[Optional[numpy.ndarray[Any, Any]]], window: BlockWindow
+) -> numpy.ndarray[Any, Any]:
+    accumulations = numpy.zeros((window.rows, window.cols), numpy.float32)
+    for block in blocks:
+        if block is None:
+            continue
+        accumulations = accumulations + block
+    return accumulations
+
+
+def is_empty_block(
+    block: numpy.ndarray[Any, Any], no_data_value: Optional[float] = None
+) -> bool:
+    if no_data_value is None:
+        return not block.any()
+    return bool(numpy.all((block == 0) | (block == no_data_value)))
+
+
+class AccumulationsTifStreamer(Protocol):
+    def stream_accumulations_to_tif(
+        self,
+        tifs_pathes: Iterable[str],
+        tif_path: str,
+        tif_config: TifConfig,
+        *,
+        tif_reader: TifReader,
+        transform: Transform,
+        no_data_value: Optional[float] = None,
+    ) -> None: ...
+
+
+DEFAULT_BLOCK_SIZE = 256
+
+
+def open_tifs_to_stream(
+    tifs_pathes: Iterable[str],
+    tif_config: TifConfig,
+    *,
+    tif_reader: TifReader,
+    local_file_cache: Optional[LocalFileCache] = None,
+) -> list[Union[gdal.Dataset, numpy.ndarray[Any, Any]]]:
+    """
+    the tifs opened to be read block by block, from the local cache if any,
+    those which cannot be opened (e.g. packed into an archive) being read whole through tif_reader
+    """
+    inputs: list[Union[gdal.Dataset, numpy.ndarray[Any, Any]]] = []
+    for tif_path in tifs_pathes:
+        print(f"Opening '{tif_path}'...")
+        local_tif_path = (
+            local_file_cache.fetch(tif_path) if local_file_cache is not None else None
+        )
+        dataset = read_tif(local_tif_path or tif_path)
+        if dataset is not None:
+            check_tif_config(tif_path, tif_config, get_tif_config_of_dataset(dataset))
+            inputs.append(dataset)
+            continue
+        array = tif_reader.read_tif(tif_path, expected_tif_config=tif_config)
+        if array is None:
+            print(f"'{tif_path}' is None !")
+            continue
+        inputs.append(array)
+    return inputs
+
+
+def get_streaming_block_size(
+    inputs: list[Union[gdal.Dataset, numpy.ndarray[Any, Any]]],
+    default_block_size: int,
+) -> tuple[int, int]:
+    datasets = [tif for tif in inputs if not isinstance(tif, numpy.ndarray)]
+    if not datasets:
+        return default_block_size, default_block_size
+    block_cols, block_rows = datasets[0].GetRasterBand(1).GetBlockSize()
+    if block_rows == 1 or block_cols % 16 != 0 or block_rows % 16 != 0:
+        return default_block_size, default_block_size
+    return block_cols, block_rows
+
+
+def read_block_from(
+    tif: Union[gdal.Dataset, numpy.ndarray[Any, Any]], window: BlockWindow
+) -> numpy.ndarray[Any, Any]:
+    if isinstance(tif, numpy.ndarray):
+        return window.slice_of(tif).copy()
+    return tif.GetRasterBand(1).ReadAsArray(
+        window.x_offset, window.y_offset, window.cols, window.rows
+    )
+
+
+def read_blocks_from(
+    inputs: list[Union[gdal.Dataset, numpy.ndarray[Any, Any]]],
+    window: BlockWindow,
+    transform: Transform,
+) -> list[Optional[numpy.ndarray[Any, Any]]]:
+    return [transform.transform(read_block_from(tif, window)) for tif in inputs]
+
+
+class RealAccumulationsTifStreamer(AccumulationsTifStreamer):
+    """
+    sums the inputs block by block following the tiles of the first input (or block_size when it is striped),
+    the next blocks being read while the current one is summed and written
+    """
+
+    def __init__(
+        self,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        sparse: bool = False,
+        codecs: Optional[dict[PrecipitationsParam, Codec]] = None,
+        local_file_cache: Optional[LocalFileCache] = None,
+    ) -> None:
+        self.block_size = block_size
+        self.sparse = sparse
+        self.codecs = codecs or {}
+        self.local_file_cache = local_file_cache
+
+    def stream_accumulations_to_tif(
+        self,
+        tifs_pathes: Iterable[str],
+        tif_path: str,
+        tif_config: TifConfig,
+        *,
+        tif_reader: TifReader,
+        transform: Transform,
+        no_data_value: Optional[float] = None,
+    ) -> None:
+        start_time = time.time()
+        inputs = open_tifs_to_stream(
+            tifs_pathes,
+            tif_config,
+            tif_reader=tif_reader,
+            local_file_cache=self.local_file_cache,
+        )
+        block_cols, block_rows = get_streaming_block_size(inputs, self.block_size)
+        windows = get_block_windows(tif_config, block_cols, block_rows)
+
+        tmp_path = get_tmp_path_for(tif_path)
+        try:
+            empty_blocks = self.write_blocks_to(
+                tmp_path,
+                tif_path,
+                tif_config,
+                inputs,
+                windows,
+                block_cols,
+                block_rows,
+                transform=transform,
+                no_data_value=no_data_value,
+            )
+            os.replace(tmp_path, tif_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        print(
+            f"Streaming {len(inputs)} tifs in {len(windows)} blocks ({empty_blocks} empty): {time.time()-start_time}s"
+        )
+
+    def write_blocks_to(
+        self,
+        tmp_path: str,
+        tif_path: str,
+        tif_config: TifConfig,
+        inputs: list[Union[gdal.Dataset, numpy.ndarray[Any, Any]]],
+        windows: list[BlockWindow],
+        block_cols: int,
+        block_rows: int,
+        *,
+        transform: Transform,
+        no_data_value: Optional[float] = None,
+    ) -> int:
+        """the number of empty blocks skipped"""
+        driver = gdal.GetDriverByName("GTiff")
+        tif = driver.Create(
+            tmp_path,
+            tif_config.cols,
+            tif_config.rows,
+            1,
+            gdal.GDT_Float32,
+            get_creation_options(
+                VALUES_TIF_CREATION_OPTIONS
+                + get_codec_for_tif_path(
+                    tif_path, self.codecs, DEFAULT_VALUES_CODEC
+                ).get_gtiff_creation_options()
+                + [f"BLOCKXSIZE={block_cols}", f"BLOCKYSIZE={block_rows}"],
+                self.sparse,
+            ),
+        )
+        tif.SetGeoTransform(tif_config.geo_transform)
+        tif.SetProjection(tif_config.projection)
+        band = tif.GetRasterBand(1)
+        if no_data_value is not None:
+            band.SetNoDataValue(no_data_value)
+
+        empty_blocks = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_blocks = executor.submit(
+                read_blocks_from, inputs, windows[0], transform
+            )
+            for index, window in enumerate(windows):
+                blocks = next_blocks.result()
+                if index + 1 < len(windows):
+                    next_blocks = executor.submit(
+                        read_blocks_from, inputs, windows[index + 1], transform
+                    )
+                accumulations = sum_blocks(blocks, window)
+                if self.sparse and is_empty_block(accumulations, no_data_value):
+                    empty_blocks += 1
+                    continue
+                band.WriteArray(accumulations, window.x_offset, window.y_offset)
+
+        band.FlushCache()
+        tif.FlushCache()
+        return empty_blocks
+
+
+class InMemoryAccumulationsTifStreamer(AccumulationsTifStreamer):
+    def __init__(
+        self,
+        tifs: Optional[dict[str, numpy.ndarray[Any, Any]]] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        sparse: bool = False,
+    ) -> None:
+        self.input_tifs: dict[str, numpy.ndarray[Any, Any]] = tifs or {}
+        self.block_size = block_size
+        self.sparse = sparse
+        self.tifs: dict[str, numpy.ndarray[Any, Any]] = {}
+        self.written_windows: dict[str, list[BlockWindow]] = {}
+
+    def stream_accumulations_to_tif(
+        self,
+        tifs_pathes: Iterable[str],
+        tif_path: str,
+        tif_config: TifConfig,
+        *,
+        tif_reader: TifReader,
+        transform: Transform,
+        no_data_value: Optional[float] = None,
+    ) -> None:
+        inputs = [
+            self.input_tifs[path] for path in tifs_pathes if path in self.input_tifs
+        ]
+        data = numpy.zeros((tif_config.rows, tif_config.cols), numpy.float32)
+        self.written_windows[tif_path] = []
+        for window in get_block_windows(tif_config, self.block_size, self.block_size):
+            accumulations = sum_blocks(
+                (
+                    transform.transform(window.slice_of(array).copy())
+                    for array in inputs
+                ),
+                window,
+            )
+            if self.sparse and is_empty_block(accumulations, no_data_value):
+                continue
+            window.slice_of(data)[:, :] = accumulations
+            self.written_windows[tif_path].append(window)
+        self.tifs[tif_path] = data
+
+
+def set_layer_at_timestamp_with_values_from(
+    layer_index: int,
+    tif_path: str,
+    tif_config: TifConfig,
+    accum_data: numpy.ndarray[Any, Any],
+    *,
+    tif_reader: TifReader,
+) -> None:
+    print(f"Reading [{tif_path}]...")
+    dataset_at_timestamp = tif_reader.read_tif(tif_path, expected_tif_config=tif_config)
     if dataset_at_timestamp is None:
         print(f"'{tif_path}' is None !")
         return
@@ -399,6 +2176,9 @@ def interpolate_accumulations_over_1h(
     timestamps_after_interpolation: list[int],
     accumulations_per_timestamp: numpy.ndarray[Any, Any],
 ):
+    # scipy is only needed by the accumulations over 1h, and is slow to import
+    from scipy import interpolate
+
     start_time = time.time()
     interpolator = interpolate.interp1d(
         timestamps_before_interpolation,
@@ -420,6 +2200,8 @@ def integrate_accumulations_over_1h(
     timestamps_after_interpolation: list[int],
     values: numpy.ndarray[Any, Any],
 ):
+    from scipy import integrate
+
     start_time = time.time()
     integrated = integrate.trapezoid(values, timestamps_after_interpolation, axis=0)
     print(f"Evaluating integral: {time.time()-start_time}s")
@@ -481,7 +2263,7 @@ def generate_accumulations_over_1h_from_instantanee_in_zone_at(
     tif_reader: TifReader,
     tif_creator: TifCreator,
     command_executor: CommandExecutor,
-) -> None:
+) -> numpy.ndarray[Any, Any]:
     print("Accumulation over 1h...")
     accumulation = create_accumulation_over_1h_from_instantanee_in_zone_at(
         zone,
@@ -522,6 +2304,7 @@ def generate_accumulations_over_1h_from_instantanee_in_zone_at(
         timestamp,
         command_executor=command_executor,
     )
+    return accumulation
 
 
 def generate_accumulations_over_1h_from_instantanee_if_possible(
@@ -535,6 +2318,7 @@ def generate_accumulations_over_1h_from_instantanee_if_possible(
     command_executor: CommandExecutor,
     tiles_repository: TilesDatetimesRepository,
     replace_existing: bool = False,
+    products_catalog: Optional[ProductsCatalog] = None,
 ) -> None:
     cumul_1h_color_tif_disk_path = get_tif_path_for_param_in_zone_at(
         PrecipitationsParam.COLOR_1H, zone, timestamp
@@ -550,7 +2334,7 @@ def generate_accumulations_over_1h_from_instantanee_if_possible(
         )
 
     start_time = time.time()
-    generate_accumulations_over_1h_from_instantanee_in_zone_at(
+    accumulation = generate_accumulations_over_1h_from_instantanee_in_zone_at(
         zone,
         timestamp,
         tif_config,
@@ -558,6 +2342,19 @@ def generate_accumulations_over_1h_from_instantanee_if_possible(
         tif_creator=tif_creator,
         command_executor=command_executor,
     )
+    if products_catalog is not None:
+        record_generated_products(
+            [PrecipitationsParam.VALUES_1H, PrecipitationsParam.COLOR_1H],
+            zone,
+            timestamp,
+            tif_config,
+            accumulation,
+            products_catalog=products_catalog,
+        )
+    for param in [PrecipitationsParam.VALUES_1H, PrecipitationsParam.COLOR_1H]:
+        file_existence_checker.add(
+            get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        )
     if not replace_existing:
         update_tile_last_timestamp(
             PrecipitationsParam.COLOR_1H,
@@ -579,7 +2376,9 @@ def create_accumulations_from(
 
     for tif_path in tifs_pathes:
         print(f"Processing '{tif_path}'...")
-        dataset = tif_reader.read_tif(tif_path, transform=transform)
+        dataset = tif_reader.read_tif(
+            tif_path, transform=transform, expected_tif_config=tif_config
+        )
         if dataset is None:
             print(f"'{tif_path}' is None !")
             continue
@@ -660,6 +2459,95 @@ def should_keep_values_for(accumulation_duration: AccumulationDuration) -> bool:
     ]
 
 
+def get_generated_params_for(
+    accumulation_duration: AccumulationDuration,
+) -> list[PrecipitationsParam]:
+    color_param = get_corresponding_color_precipitations_param(accumulation_duration)
+    if not should_keep_values_for(accumulation_duration):
+        return [color_param]
+    return [
+        get_corresponding_values_precipitations_param(accumulation_duration),
+        color_param,
+    ]
+
+
+def get_generated_pathes_for(
+    zone: Zone, timestamp: int, accumulation_duration: AccumulationDuration
+) -> list[str]:
+    return [
+        get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        for param in get_generated_params_for(accumulation_duration)
+    ]
+
+
+def get_derived_pathes_for(
+    zone: Zone,
+    timestamp: int,
+    accumulation_duration: AccumulationDuration,
+    *,
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+) -> list[str]:
+    """the files written along the tifs, streamed accumulations having no quicklooks"""
+    derived_pathes: list[str] = []
+    if quicklook_generator is not None and accumulations_streamer is None:
+        derived_pathes += quicklook_generator.get_quicklook_pathes(
+            get_corresponding_color_precipitations_param(accumulation_duration),
+            zone,
+            timestamp,
+        )
+    if (
+        virtual_values_writer is not None
+        and not should_keep_values_for(accumulation_duration)
+        and accumulation_duration in VIRTUAL_VALUES_DURATIONS
+    ):
+        derived_pathes.append(
+            get_vrt_path_for_param_in_zone_at(
+                get_corresponding_values_precipitations_param(accumulation_duration),
+                zone,
+                timestamp,
+            )
+        )
+    return derived_pathes
+
+
+def are_products_generated_in_zone_at(
+    zone: Zone,
+    timestamp: int,
+    tif_config: TifConfig,
+    accumulation_duration: AccumulationDuration,
+    *,
+    file_existence_checker: FileExistenceChecker,
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+) -> bool:
+    pathes = get_generated_pathes_for(
+        zone, timestamp, accumulation_duration
+    ) + get_derived_pathes_for(
+        zone,
+        timestamp,
+        accumulation_duration,
+        accumulations_streamer=accumulations_streamer,
+        quicklook_generator=quicklook_generator,
+        virtual_values_writer=virtual_values_writer,
+    )
+    if not all(file_existence_checker.exists(path) for path in pathes):
+        return False
+    return (
+        tile_pyramid_generator is None
+        or accumulations_streamer is not None
+        or tile_pyramid_generator.has_pyramid(
+            get_corresponding_color_precipitations_param(accumulation_duration),
+            zone,
+            timestamp,
+            tif_config,
+        )
+    )
+
+
 def generate_accumulations_over_some_hours_in_zone_at(
     zone: Zone,
     timestamp: int,
@@ -670,49 +2558,107 @@ def generate_accumulations_over_some_hours_in_zone_at(
     transform: Transform,
     tif_creator: TifCreator,
     command_executor: CommandExecutor,
-) -> None:
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+    products_stager: Optional[ProductsStager] = None,
+    products_writer: Optional[ProductsWriter] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+) -> Optional[numpy.ndarray[Any, Any]]:
     print(f"Accumulation over {accumulation_duration.value}...")
-    accumulations = get_accumulations_over_some_hours_in_zone_at(
-        zone,
-        timestamp,
-        tif_config,
-        accumulation_duration,
-        tif_reader=tif_reader,
-        transform=transform,
+    products_stager = get_products_stager(products_stager, command_executor)
+    products_writer = get_products_writer(products_writer)
+    tifs_pathes = list(
+        get_tifs_pathes_to_read_for_cumul_in_zone_at(
+            zone, timestamp, accumulation_duration
+        )
     )
-
-    cumul_val_tif_ram_path = get_ram_path_for_param_in_zone_at(
-        get_corresponding_values_precipitations_param(accumulation_duration),
-        zone,
-        timestamp,
+    products_writer.wait_for(tifs_pathes)
+    tifs_pathes_to_read = [
+        products_stager.get_readable_path(tif_path) for tif_path in tifs_pathes
+    ]
+    values_param = get_corresponding_values_precipitations_param(accumulation_duration)
+    color_param = get_corresponding_color_precipitations_param(accumulation_duration)
+    cumul_val_tif_staging_path = products_stager.get_staging_path(
+        values_param, zone, timestamp
     )
-    tif_creator.create_tif(cumul_val_tif_ram_path, tif_config, accumulations)
+    accumulations: Optional[numpy.ndarray[Any, Any]] = None
+    if accumulations_streamer is not None:
+        accumulations_streamer.stream_accumulations_to_tif(
+            tifs_pathes_to_read,
+            cumul_val_tif_staging_path,
+            tif_config,
+            tif_reader=tif_reader,
+            transform=transform,
+        )
+    else:
+        accumulations = create_accumulations_from(
+            tifs_pathes_to_read,
+            tif_config,
+            tif_reader=tif_reader,
+            transform=transform,
+        )
 
-    cumul_color_tif_ram_path = get_ram_path_for_param_in_zone_at(
-        get_corresponding_color_precipitations_param(accumulation_duration),
-        zone,
-        timestamp,
-    )
-    generate_color_tif_from_values(
-        cumul_val_tif_ram_path,
-        cumul_color_tif_ram_path,
-        accumulation_duration,
-        command_executor=command_executor,
+    cumul_color_tif_staging_path = products_stager.get_staging_path(
+        color_param, zone, timestamp
     )
 
-    if should_keep_values_for(accumulation_duration):
-        move_param_in_zone_at_from_ram_to_disk(
-            get_corresponding_values_precipitations_param(accumulation_duration),
-            zone,
-            timestamp,
+    def write_products() -> None:
+        # colored in process, the values not kept need no tif
+        if accumulations is not None and (
+            color_tif_generator is None or should_keep_values_for(accumulation_duration)
+        ):
+            tif_creator.create_tif(
+                cumul_val_tif_staging_path, tif_config, accumulations
+            )
+        generate_color_tif(
+            cumul_val_tif_staging_path,
+            cumul_color_tif_staging_path,
+            accumulation_duration,
+            tif_config,
+            accumulations,
             command_executor=command_executor,
+            color_tif_generator=color_tif_generator,
         )
-    move_param_in_zone_at_from_ram_to_disk(
-        get_corresponding_color_precipitations_param(accumulation_duration),
-        zone,
-        timestamp,
-        command_executor=command_executor,
+        if should_keep_values_for(accumulation_duration):
+            products_stager.publish(values_param, zone, timestamp)
+        else:
+            products_stager.discard(values_param, zone, timestamp)
+            if (
+                virtual_values_writer is not None
+                and accumulation_duration in VIRTUAL_VALUES_DURATIONS
+            ):
+                virtual_values_writer.write_virtual_values(
+                    get_vrt_path_for_param_in_zone_at(values_param, zone, timestamp),
+                    tifs_pathes,
+                    tif_config,
+                )
+        products_stager.publish(color_param, zone, timestamp)
+        if quicklook_generator is not None and accumulations is not None:
+            quicklook_generator.generate_quicklooks(
+                color_param,
+                zone,
+                timestamp,
+                accumulation_duration,
+                tif_config,
+                accumulations,
+            )
+        if tile_pyramid_generator is not None and accumulations is not None:
+            tile_pyramid_generator.generate_pyramid(
+                color_param,
+                zone,
+                timestamp,
+                accumulation_duration,
+                tif_config,
+                accumulations,
+            )
+
+    products_writer.submit(
+        get_generated_pathes_for(zone, timestamp, accumulation_duration),
+        write_products,
     )
+    return accumulations
 
 
 def check_timestamp_eligibility_for(
@@ -736,26 +2682,32 @@ def check_timestamp_eligibility_for(
     raise ValueError(f"Unknown accumulation duration: {accumulation_duration}")
 
 
-def generate_accumulations_over_some_hours_if_possible(
+class GenerationReporter(Protocol):
+    def report(
+        self,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        status: str,
+        seconds: float,
+    ) -> None:
+        """status of a product, 'generated' once written or 'skipped'"""
+
+
+def is_generation_needed(
     zone: Zone,
     timestamp: int,
-    tif_config: TifConfig,
     accumulation_duration: AccumulationDuration,
     *,
     file_existence_checker: FileExistenceChecker,
-    tif_reader: TifReader,
-    transform: Transform,
-    tif_creator: TifCreator,
-    command_executor: CommandExecutor,
-    tiles_repository: TilesDatetimesRepository,
     replace_existing: bool = False,
-) -> None:
+) -> bool:
     datetime_error = check_timestamp_eligibility_for(timestamp, accumulation_duration)
     if datetime_error:
         print(
             f"Skipping generation of accumulations over {accumulation_duration.value} because minutes are not {datetime_error}."
         )
-        return
+        return False
 
     cumul_color_tif_disk_path = get_tif_path_for_param_in_zone_at(
         get_corresponding_color_precipitations_param(accumulation_duration),
@@ -767,13 +2719,170 @@ def generate_accumulations_over_some_hours_if_possible(
             print(
                 f"Skipping generation of accumulations over {accumulation_duration.value} because '{cumul_color_tif_disk_path}' already exists."
             )
-            return
+            return False
         print(
             f"Replacing accumulations over {accumulation_duration.value} because '{cumul_color_tif_disk_path}' already exists."
         )
+    return True
+
+
+def get_stat_path_for(
+    tif_path: str,
+    *,
+    products_stager: Optional[ProductsStager],
+    tif_locator: Optional[TifLocator] = None,
+) -> str:
+    """the staged file if any, else the file holding tif_path, e.g. its archive"""
+    if products_stager is not None:
+        readable_path = products_stager.get_readable_path(tif_path)
+        if readable_path != tif_path:
+            return readable_path
+    if tif_locator is None:
+        return tif_path
+    located = tif_locator.locate(tif_path)
+    return located[0] if located is not None else tif_path
+
+
+def get_inputs_fingerprint_in_zone_at(
+    zone: Zone,
+    timestamp: int,
+    accumulation_duration: AccumulationDuration,
+    *,
+    products_stager: Optional[ProductsStager],
+    products_writer: ProductsWriter,
+    tif_locator: Optional[TifLocator] = None,
+    output_settings: str = "",
+) -> str:
+    tifs_pathes = list(
+        get_tifs_pathes_to_read_for_cumul_in_zone_at(
+            zone, timestamp, accumulation_duration
+        )
+    )
+    # regenerated inputs are fingerprinted once written
+    products_writer.wait_for(tifs_pathes)
+    return get_inputs_fingerprint(
+        [
+            (
+                tif_path,
+                get_stat_path_for(
+                    tif_path, products_stager=products_stager, tif_locator=tif_locator
+                ),
+            )
+            for tif_path in tifs_pathes
+        ],
+        accumulation_duration,
+        output_settings,
+    )
+
+
+def register_generated_products(
+    zone: Zone,
+    timestamp: int,
+    tif_config: TifConfig,
+    accumulation_duration: AccumulationDuration,
+    accumulations: Optional[numpy.ndarray[Any, Any]],
+    *,
+    file_existence_checker: FileExistenceChecker,
+    products_catalog: Optional[ProductsCatalog] = None,
+) -> None:
+    if products_catalog is not None:
+        record_generated_products(
+            get_generated_params_for(accumulation_duration),
+            zone,
+            timestamp,
+            tif_config,
+            accumulations,
+            products_catalog=products_catalog,
+        )
+    for param in get_generated_params_for(accumulation_duration):
+        file_existence_checker.add(
+            get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        )
+
+
+def generate_accumulations_over_some_hours_if_possible(
+    zone: Zone,
+    timestamp: int,
+    tif_config: TifConfig,
+    accumulation_duration: AccumulationDuration,
+    *,
+    file_existence_checker: FileExistenceChecker,
+    tif_reader: TifReader,
+    transform: Transform,
+    tif_creator: TifCreator,
+    command_executor: CommandExecutor,
+    tiles_repository: TilesDatetimesRepository,
+    replace_existing: bool = False,
+    products_catalog: Optional[ProductsCatalog] = None,
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+    products_stager: Optional[ProductsStager] = None,
+    products_writer: Optional[ProductsWriter] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+    generation_manifest: Optional[GenerationManifest] = None,
+    tif_locator: Optional[TifLocator] = None,
+    generation_reporter: Optional[GenerationReporter] = None,
+) -> None:
+    products_writer = get_products_writer(products_writer)
+    if not is_generation_needed(
+        zone,
+        timestamp,
+        accumulation_duration,
+        file_existence_checker=file_existence_checker,
+        replace_existing=replace_existing,
+    ):
+        if generation_reporter is not None and not check_timestamp_eligibility_for(
+            timestamp, accumulation_duration
+        ):
+            generation_reporter.report(
+                zone, timestamp, accumulation_duration, "skipped", 0
+            )
+        return
+    cumul_color_tif_disk_path = get_tif_path_for_param_in_zone_at(
+        get_corresponding_color_precipitations_param(accumulation_duration),
+        zone,
+        timestamp,
+    )
+    fingerprint: Optional[str] = None
+    if generation_manifest is not None:
+        fingerprint = get_inputs_fingerprint_in_zone_at(
+            zone,
+            timestamp,
+            accumulation_duration,
+            products_stager=products_stager,
+            products_writer=products_writer,
+            tif_locator=tif_locator,
+            output_settings=generation_manifest.output_settings,
+        )
+        if (
+            replace_existing
+            and generation_manifest.get_fingerprint(cumul_color_tif_disk_path)
+            == fingerprint
+            and are_products_generated_in_zone_at(
+                zone,
+                timestamp,
+                tif_config,
+                accumulation_duration,
+                file_existence_checker=file_existence_checker,
+                accumulations_streamer=accumulations_streamer,
+                quicklook_generator=quicklook_generator,
+                tile_pyramid_generator=tile_pyramid_generator,
+                virtual_values_writer=virtual_values_writer,
+            )
+        ):
+            print(
+                f"Skipping generation of accumulations over {accumulation_duration.value} because the inputs of '{cumul_color_tif_disk_path}' did not change."
+            )
+            if generation_reporter is not None:
+                generation_reporter.report(
+                    zone, timestamp, accumulation_duration, "skipped", 0
+                )
+            return
 
     start_time = time.time()
-    generate_accumulations_over_some_hours_in_zone_at(
+    accumulations = generate_accumulations_over_some_hours_in_zone_at(
         zone,
         timestamp,
         tif_config,
@@ -782,62 +2891,295 @@ def generate_accumulations_over_some_hours_if_possible(
         transform=transform,
         tif_creator=tif_creator,
         command_executor=command_executor,
+        accumulations_streamer=accumulations_streamer,
+        color_tif_generator=color_tif_generator,
+        products_stager=products_stager,
+        products_writer=products_writer,
+        quicklook_generator=quicklook_generator,
+        tile_pyramid_generator=tile_pyramid_generator,
+        virtual_values_writer=virtual_values_writer,
     )
-    if not replace_existing:
-        update_tile_last_timestamp(
-            get_corresponding_color_precipitations_param(accumulation_duration),
+    print(f"Took {time.time()-start_time} s.")
+
+    def on_written() -> None:
+        register_generated_products(
             zone,
             timestamp,
-            repository=tiles_repository,
+            tif_config,
+            accumulation_duration,
+            accumulations,
+            file_existence_checker=file_existence_checker,
+            products_catalog=products_catalog,
         )
-    print(f"Took {time.time()-start_time} s.")
+        for derived_path in get_derived_pathes_for(
+            zone,
+            timestamp,
+            accumulation_duration,
+            accumulations_streamer=accumulations_streamer,
+            quicklook_generator=quicklook_generator,
+            virtual_values_writer=virtual_values_writer,
+        ):
+            file_existence_checker.add(derived_path)
+        # never ahead of the published files
+        if not replace_existing:
+            update_tile_last_timestamp(
+                get_corresponding_color_precipitations_param(accumulation_duration),
+                zone,
+                timestamp,
+                repository=tiles_repository,
+            )
+        if generation_manifest is not None and fingerprint is not None:
+            generation_manifest.record(cumul_color_tif_disk_path, fingerprint)
+        if generation_reporter is not None:
+            generation_reporter.report(
+                zone,
+                timestamp,
+                accumulation_duration,
+                "generated",
+                time.time() - start_time,
+            )
+
+    products_writer.when_written(
+        get_generated_pathes_for(zone, timestamp, accumulation_duration), on_written
+    )
 
 
-def generate_accumulations(
+ACCUMULATIONS_DURATIONS = [
+    AccumulationDuration.CUMUL_1H,
+    AccumulationDuration.CUMUL_3H,
+    AccumulationDuration.CUMUL_6H,
+    AccumulationDuration.CUMUL_12H,
+    AccumulationDuration.CUMUL_24H,
+    AccumulationDuration.CUMUL_72H,
+]
+
+
+def generate_accumulations_with_tif_config(
     timestamp: int,
     zone: Zone,
+    tif_config: TifConfig,
     *,
     file_existence_checker: FileExistenceChecker,
-    tif_config_getter: TifConfigGetter,
     tif_reader: TifReader,
     tif_creator: TifCreator,
     command_executor: CommandExecutor,
     tiles_repository: TilesDatetimesRepository,
     replace_existing: bool = False,
+    products_catalog: Optional[ProductsCatalog] = None,
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+    products_stager: Optional[ProductsStager] = None,
+    products_writer: Optional[ProductsWriter] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+    generation_manifest: Optional[GenerationManifest] = None,
+    tif_locator: Optional[TifLocator] = None,
+    generation_reporter: Optional[GenerationReporter] = None,
+    accumulations_durations: list[AccumulationDuration] = ACCUMULATIONS_DURATIONS,
 ) -> None:
+    for accumulation_duration in accumulations_durations:
+        generate_accumulations_over_some_hours_if_possible(
+            zone,
+            timestamp,
+            tif_config,
+            accumulation_duration,
+            file_existence_checker=file_existence_checker,
+            tif_reader=tif_reader,
+            tif_creator=tif_creator,
+            transform=get_corresponding_transform(accumulation_duration),
+            command_executor=command_executor,
+            tiles_repository=tiles_repository,
+            replace_existing=replace_existing,
+            products_catalog=products_catalog,
+            accumulations_streamer=accumulations_streamer,
+            color_tif_generator=color_tif_generator,
+            products_stager=products_stager,
+            products_writer=products_writer,
+            quicklook_generator=quicklook_generator,
+            tile_pyramid_generator=tile_pyramid_generator,
+            virtual_values_writer=virtual_values_writer,
+            generation_manifest=generation_manifest,
+            tif_locator=tif_locator,
+            generation_reporter=generation_reporter,
+        )
+
+
+def find_tif_config_in_zone_at(
+    timestamp: int,
+    zone: Zone,
+    *,
+    tif_config_getter: TifConfigGetter,
+) -> Optional[TifConfig]:
+    """config of the latest 5 minutes tif of the hour before timestamp"""
     tif_config: Optional[TifConfig] = None
     timestamp_for_config = timestamp
     while tif_config is None and timestamp_for_config > timestamp - ONE_HOUR_IN_SECONDS:
         tif_config = tif_config_getter.get_tif_config(timestamp_for_config, zone)
         timestamp_for_config -= FIVE_MINUTES_IN_SECONDS
+    return tif_config
+
+
+def generate_accumulations(
+    timestamp: int,
+    zone: Zone,
+    *,
+    file_existence_checker: FileExistenceChecker,
+    tif_config_getter: TifConfigGetter,
+    tif_reader: TifReader,
+    tif_creator: TifCreator,
+    command_executor: CommandExecutor,
+    tiles_repository: TilesDatetimesRepository,
+    replace_existing: bool = False,
+    products_catalog: Optional[ProductsCatalog] = None,
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+    products_stager: Optional[ProductsStager] = None,
+    products_writer: Optional[ProductsWriter] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+    generation_manifest: Optional[GenerationManifest] = None,
+    tif_locator: Optional[TifLocator] = None,
+    generation_reporter: Optional[GenerationReporter] = None,
+    accumulations_durations: list[AccumulationDuration] = ACCUMULATIONS_DURATIONS,
+    publish_transaction: Optional[PublishTransaction] = None,
+) -> None:
+    products_writer = get_products_writer(products_writer)
+    if publish_transaction is not None:
+        products_stager = TransactionProductsStager(publish_transaction)
+        tiles_repository = TransactionTilesDatetimesRepository(publish_transaction)
+        # a rolled back product is neither indexed nor catalogued
+        file_existence_checker = TransactionFileExistenceChecker(
+            publish_transaction, file_existence_checker
+        )
+        if products_catalog is not None:
+            products_catalog = TransactionProductsCatalog(
+                publish_transaction, products_catalog
+            )
+        if generation_manifest is not None:
+            generation_manifest = TransactionGenerationManifest(
+                publish_transaction, generation_manifest
+            )
+    with published_at_once(publish_transaction, products_writer):
+        generate_accumulations_with_tif_config_found(
+            timestamp,
+            zone,
+            file_existence_checker=file_existence_checker,
+            tif_config_getter=tif_config_getter,
+            tif_reader=tif_reader,
+            tif_creator=tif_creator,
+            command_executor=command_executor,
+            tiles_repository=tiles_repository,
+            replace_existing=replace_existing,
+            products_catalog=products_catalog,
+            accumulations_streamer=accumulations_streamer,
+            color_tif_generator=color_tif_generator,
+            products_stager=products_stager,
+            products_writer=products_writer,
+            quicklook_generator=quicklook_generator,
+            tile_pyramid_generator=tile_pyramid_generator,
+            virtual_values_writer=virtual_values_writer,
+            generation_manifest=generation_manifest,
+            tif_locator=tif_locator,
+            generation_reporter=generation_reporter,
+            accumulations_durations=accumulations_durations,
+        )
+
+
+def generate_accumulations_with_tif_config_found(
+    timestamp: int,
+    zone: Zone,
+    *,
+    file_existence_checker: FileExistenceChecker,
+    tif_config_getter: TifConfigGetter,
+    tif_reader: TifReader,
+    tif_creator: TifCreator,
+    command_executor: CommandExecutor,
+    tiles_repository: TilesDatetimesRepository,
+    replace_existing: bool = False,
+    products_catalog: Optional[ProductsCatalog] = None,
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+    products_stager: Optional[ProductsStager] = None,
+    products_writer: Optional[ProductsWriter] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+    generation_manifest: Optional[GenerationManifest] = None,
+    tif_locator: Optional[TifLocator] = None,
+    generation_reporter: Optional[GenerationReporter] = None,
+    accumulations_durations: list[AccumulationDuration] = ACCUMULATIONS_DURATIONS,
+) -> None:
+    products_writer = get_products_writer(products_writer)
+    tif_config = find_tif_config_in_zone_at(
+        timestamp, zone, tif_config_getter=tif_config_getter
+    )
     if tif_config is None:
         print(
             f"Skipping generation of accumulations because no tif found for zone '{zone}' at '{datetime_of(timestamp):%Y-%m-%d %H:%M:%S}'."
         )
         return
 
-    accumulations_durations = [
-        AccumulationDuration.CUMUL_1H,
-        AccumulationDuration.CUMUL_3H,
-        AccumulationDuration.CUMUL_6H,
-        AccumulationDuration.CUMUL_12H,
-        AccumulationDuration.CUMUL_24H,
-        AccumulationDuration.CUMUL_72H,
-    ]
-    for accumulation_duration in accumulations_durations:
-        generate_accumulations_over_some_hours_if_possible(
-            zone,
+    try:
+        generate_accumulations_with_tif_config(
             timestamp,
+            zone,
             tif_config,
-            accumulation_duration,
             file_existence_checker=file_existence_checker,
             tif_reader=tif_reader,
             tif_creator=tif_creator,
-            transform=get_corresponding_transform(accumulation_duration),
             command_executor=command_executor,
             tiles_repository=tiles_repository,
             replace_existing=replace_existing,
+            products_catalog=products_catalog,
+            accumulations_streamer=accumulations_streamer,
+            color_tif_generator=color_tif_generator,
+            products_stager=products_stager,
+            products_writer=products_writer,
+            quicklook_generator=quicklook_generator,
+            tile_pyramid_generator=tile_pyramid_generator,
+            virtual_values_writer=virtual_values_writer,
+            generation_manifest=generation_manifest,
+            tif_locator=tif_locator,
+            generation_reporter=generation_reporter,
+            accumulations_durations=accumulations_durations,
         )
+    except TifConfigMismatchException as e:
+        print(f">> WARNING : {e} ! Retrying with the new config.")
+        # the products written before the mismatch are not to be generated again
+        products_writer.flush()
+        tif_config_getter.update_tif_config(zone, e.actual_tif_config)
+        try:
+            generate_accumulations_with_tif_config(
+                timestamp,
+                zone,
+                e.actual_tif_config,
+                file_existence_checker=file_existence_checker,
+                tif_reader=tif_reader,
+                tif_creator=tif_creator,
+                command_executor=command_executor,
+                tiles_repository=tiles_repository,
+                replace_existing=replace_existing,
+                products_catalog=products_catalog,
+                accumulations_streamer=accumulations_streamer,
+                color_tif_generator=color_tif_generator,
+                products_stager=products_stager,
+                products_writer=products_writer,
+                quicklook_generator=quicklook_generator,
+                tile_pyramid_generator=tile_pyramid_generator,
+                virtual_values_writer=virtual_values_writer,
+                generation_manifest=generation_manifest,
+                tif_locator=tif_locator,
+                generation_reporter=generation_reporter,
+                accumulations_durations=accumulations_durations,
+            )
+        except TifConfigMismatchException as e:
+            # the inputs of the zone disagree with one another, the other zones are still to be generated
+            print(
+                f">> ERROR : {e} ! Skipping zone '{zone}' at '{datetime_of(timestamp):%Y-%m-%d %H:%M:%S}'."
+            )
+            products_writer.flush()
 
 
 def execute_from_arguments(
@@ -849,7 +3191,20 @@ def execute_from_arguments(
     tif_creator: TifCreator,
     command_executor: CommandExecutor,
     tiles_repository: TilesDatetimesRepository,
+    products_catalog: Optional[ProductsCatalog] = None,
+    accumulations_streamer: Optional[AccumulationsTifStreamer] = None,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+    products_stager: Optional[ProductsStager] = None,
+    products_writer: Optional[ProductsWriter] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+    generation_manifest: Optional[GenerationManifest] = None,
+    tif_locator: Optional[TifLocator] = None,
+    generation_reporter: Optional[GenerationReporter] = None,
+    publish_transaction: Optional[PublishTransaction] = None,
 ) -> None:
+    products_writer = get_products_writer(products_writer)
     for timestamp in range(
         arguments.start,
         arguments.end + FIVE_MINUTES_IN_SECONDS,
@@ -866,17 +3221,290 @@ def execute_from_arguments(
                 command_executor=command_executor,
                 tiles_repository=tiles_repository,
                 replace_existing=arguments.replace,
+                products_catalog=products_catalog,
+                accumulations_streamer=accumulations_streamer,
+                color_tif_generator=color_tif_generator,
+                products_stager=products_stager,
+                products_writer=products_writer,
+                quicklook_generator=quicklook_generator,
+                tile_pyramid_generator=tile_pyramid_generator,
+                virtual_values_writer=virtual_values_writer,
+                generation_manifest=generation_manifest,
+                tif_locator=tif_locator,
+                generation_reporter=generation_reporter,
+                accumulations_durations=arguments.durations or ACCUMULATIONS_DURATIONS,
+                publish_transaction=publish_transaction,
             )
+    products_writer.flush()
+
+
+def get_output_settings_of(arguments: Arguments) -> str:
+    """what changes the products written from the same inputs"""
+    return repr(
+        (
+            sorted(
+                (param.value, repr(codec)) for param, codec in arguments.codecs.items()
+            ),
+            sorted(param.value for param in arguments.paletted_params),
+            arguments.sparse,
+            arguments.overview_levels,
+            arguments.quicklook_sizes,
+            arguments.quicklook_format,
+            arguments.xyz_zooms,
+            arguments.virtual_values,
+        )
+    )
 
 
 def real_execute_from_arguments(arguments: Arguments) -> None:
+    # imported here since they import their protocols and helpers from this module
+    from .archives import (
+        ArchiveFileExistenceChecker,
+        ArchiveTifLocator,
+        ArchiveTifReader,
+        pack_archives,
+    )
+    from .benchmark import run_codecs_benchmark
+    from .daemon import get_files_watcher, run_daemon
+    from .jobs import run_job_server
+    from .pipeline import (
+        PipelineConcurrency,
+        PipelineFailedException,
+        PipelineReport,
+        get_timestamps_between,
+        run_accumulations_pipeline,
+    )
+    from .pyramid import RealTilePyramidGenerator
+    from .zones_pool import execute_zones_in_parallel, is_executed_per_zone
+
+    if arguments.pack_archives:
+        pack_archives(
+            arguments.zones,
+            arguments.start,
+            arguments.end,
+            remove_packed=arguments.remove_packed,
+        )
+        return
+    if arguments.benchmark_codecs:
+        run_codecs_benchmark(
+            arguments.zones, arguments.start, arguments.end, arguments.codecs
+        )
+        return
+    if is_executed_per_zone(arguments):
+        execute_zones_in_parallel(arguments)
+        return
+    products_catalog: Optional[ProductsCatalog] = None
+    if arguments.rebuild_catalog:
+        crawl_tiles_into_catalog(
+            SQLiteProductsCatalog(),
+            arguments.start,
+            arguments.end,
+            get_details=get_product_record_details,
+        )
+        return
+    indexed_file_existence_checker = IndexedFileExistenceChecker()
+    file_existence_checker: FileExistenceChecker = indexed_file_existence_checker
+    tif_reader: TifReader = RealTifReader()
+    archive_tif_locator: Optional[ArchiveTifLocator] = None
+    if arguments.read_archives:
+        archive_tif_locator = ArchiveTifLocator(RealTifLocator())
+        tif_reader = ArchiveTifReader(tif_reader)
+    tif_locator: Optional[TifLocator] = archive_tif_locator
+    tif_config_getter: TifConfigGetter = RealTifConfigGetter(tif_locator)
+    if arguments.use_catalog:
+        products_catalog = SQLiteProductsCatalog()
+        file_existence_checker = CatalogFileExistenceChecker(products_catalog)
+        tif_config_getter = CatalogTifConfigGetter(products_catalog, tif_config_getter)
+    if archive_tif_locator is not None:
+        file_existence_checker = ArchiveFileExistenceChecker(
+            file_existence_checker, archive_tif_locator
+        )
+    local_file_cache: Optional[LocalFileCache] = None
+    if arguments.local_cache_size:
+        local_file_cache = LocalFileCache(
+            arguments.local_cache_path,
+            max_size=arguments.local_cache_size * 1024 * 1024,
+        )
+        file_existence_checker = LocalCacheFileExistenceChecker(
+            file_existence_checker, local_file_cache
+        )
+        tif_reader = LocalCacheTifReader(tif_reader, local_file_cache)
+    tif_config_getter = CachedTifConfigGetter(
+        tif_config_getter, tif_locator or RealTifLocator()
+    )
+    deduplicator = ProductsDeduplicator() if arguments.deduplicate else None
+    quicklook_generator = (
+        RealQuicklookGenerator(arguments.quicklook_sizes, arguments.quicklook_format)
+        if arguments.quicklook_sizes
+        else None
+    )
+    tile_pyramid_generator = (
+        RealTilePyramidGenerator(arguments.xyz_zooms, arguments.xyz_workers)
+        if arguments.xyz_zooms
+        else None
+    )
+    virtual_values_writer = (
+        RealVirtualValuesWriter(tif_locator or RealTifLocator())
+        if arguments.virtual_values
+        else None
+    )
+    generation_manifest = (
+        SQLiteGenerationManifest(output_settings=get_output_settings_of(arguments))
+        if arguments.manifest
+        else None
+    )
+    pipeline_report: Optional[PipelineReport] = None
     with get_sql_connection("V5") as connection:
-        execute_from_arguments(
-            arguments,
-            file_existence_checker=RealFileExistenceChecker(),
-            tif_config_getter=RealTifConfigGetter(),
-            tif_reader=RealTifReader(),
-            tif_creator=RealTifCreator(),
-            command_executor=RealCommandExecutor(),
-            tiles_repository=RealTilesDatetimesRepository(connection),
+        if arguments.pipeline_workers:
+            readers, writers, colorizers = arguments.pipeline_workers
+            pipeline_report = run_accumulations_pipeline(
+                get_timestamps_between(arguments.start, arguments.end),
+                arguments.zones,
+                file_existence_checker=file_existence_checker,
+                tif_config_getter=tif_config_getter,
+                tif_reader=tif_reader,
+                tif_creator=RealTifCreator(
+                    sparse=arguments.sparse,
+                    deduplicator=deduplicator,
+                    codecs=arguments.codecs,
+                    overview_levels=arguments.overview_levels,
+                ),
+                command_executor=RealCommandExecutor(),
+                tiles_repository=RealTilesDatetimesRepository(connection),
+                replace_existing=arguments.replace,
+                products_catalog=products_catalog,
+                color_tif_generator=PaletteColorTifGenerator(
+                    paletted_params=arguments.paletted_params,
+                    sparse=arguments.sparse,
+                    deduplicator=deduplicator,
+                    codecs=arguments.codecs,
+                ),
+                products_stager=InPlaceProductsStager(),
+                quicklook_generator=quicklook_generator,
+                tile_pyramid_generator=tile_pyramid_generator,
+                virtual_values_writer=virtual_values_writer,
+                accumulations_durations=arguments.durations or ACCUMULATIONS_DURATIONS,
+                concurrency=PipelineConcurrency(
+                    readers=readers,
+                    writers=writers,
+                    colorizers=colorizers,
+                    queue_size=arguments.pipeline_queue_size,
+                ),
+            )
+        else:
+            products_writer = (
+                BackgroundProductsWriter(
+                    arguments.background_writers, arguments.background_queue_size
+                )
+                if arguments.background_writers
+                else None
+            )
+
+            def execute(
+                arguments_to_execute: Arguments,
+                generation_reporter: Optional[GenerationReporter] = None,
+            ) -> None:
+                execute_from_arguments(
+                    arguments_to_execute,
+                    file_existence_checker=file_existence_checker,
+                    tif_config_getter=tif_config_getter,
+                    tif_reader=tif_reader,
+                    tif_creator=RealTifCreator(
+                        sparse=arguments.sparse,
+                        deduplicator=deduplicator,
+                        codecs=arguments.codecs,
+                        overview_levels=arguments.overview_levels,
+                    ),
+                    command_executor=RealCommandExecutor(),
+                    tiles_repository=RealTilesDatetimesRepository(connection),
+                    products_catalog=products_catalog,
+                    accumulations_streamer=(
+                        RealAccumulationsTifStreamer(
+                            arguments.block_size,
+                            sparse=arguments.sparse,
+                            codecs=arguments.codecs,
+                            local_file_cache=local_file_cache,
+                        )
+                        if arguments.block_size
+                        else None
+                    ),
+                    color_tif_generator=PaletteColorTifGenerator(
+                        paletted_params=arguments.paletted_params,
+                        sparse=arguments.sparse,
+                        deduplicator=deduplicator,
+                        codecs=arguments.codecs,
+                    ),
+                    products_stager=InPlaceProductsStager(),
+                    products_writer=products_writer,
+                    quicklook_generator=quicklook_generator,
+                    tile_pyramid_generator=tile_pyramid_generator,
+                    virtual_values_writer=virtual_values_writer,
+                    generation_manifest=generation_manifest,
+                    tif_locator=tif_locator,
+                    generation_reporter=generation_reporter,
+                    publish_transaction=(
+                        PublishTransaction(
+                            RealFilesPublisher(),
+                            RealTilesDatetimesRepository(connection),
+                        )
+                        if arguments.publish_at_once
+                        else None
+                    ),
+                )
+
+            def execute_resident(
+                resident_arguments: Arguments,
+                generation_reporter: Optional[GenerationReporter] = None,
+            ) -> None:
+                try:
+                    execute(resident_arguments, generation_reporter)
+                except Exception:
+                    # so that the connection is renewed at the next cycle if lost
+                    connection.rollback()
+                    raise
+                if arguments.read_ahead:
+                    read_ahead_next_cycle(
+                        resident_arguments.zones,
+                        resident_arguments.end,
+                        file_prefetcher=RealFilePrefetcher(
+                            read_through=arguments.read_through
+                        ),
+                    )
+
+            if arguments.serve:
+                run_job_server(
+                    arguments,
+                    execute=execute_resident,
+                    file_existence_checker=indexed_file_existence_checker,
+                )
+            elif arguments.daemon:
+                files_watcher = get_files_watcher(
+                    arguments.polling, arguments.polling_interval
+                )
+                try:
+                    run_daemon(
+                        arguments,
+                        files_watcher=files_watcher,
+                        file_existence_checker=file_existence_checker,
+                        generate=execute_resident,
+                    )
+                finally:
+                    files_watcher.close()
+            else:
+                execute(arguments)
+    if tile_pyramid_generator is not None:
+        tile_pyramid_generator.close()
+    if generation_manifest is not None:
+        generation_manifest.close()
+    if local_file_cache is not None:
+        print(local_file_cache.statistics)
+    if deduplicator is not None:
+        print(deduplicator.statistics)
+    if arguments.read_ahead:
+        read_ahead_next_cycle(
+            arguments.zones,
+            arguments.end,
+            file_prefetcher=RealFilePrefetcher(read_through=arguments.read_through),
         )
+    if pipeline_report is not None and pipeline_report.failed:
+        raise PipelineFailedException(pipeline_report)
@@ -0,0 +1,160 @@
+import copy
+import os
+import socketserver
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .arguments import GENERATED_DURATIONS, ZONES, Arguments
+from .client import encode_message, read_message
+from .generation import GenerationReporter, IndexedFileExistenceChecker
+from .tiles import AccumulationDuration, Zone
+
+
+class JobGenerationReporter(GenerationReporter):
+    def __init__(self) -> None:
+        self.products: list[dict[str, Any]] = []
+
+    def report(
+        self,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        status: str,
+        seconds: float,
+    ) -> None:
+        self.products.append(
+            {
+                "zone": zone.value,
+                "timestamp": timestamp,
+                "duration": accumulation_duration.value,
+                "status": status,
+                "seconds": round(seconds, 3),
+            }
+        )
+
+
+def get_job_arguments(arguments: Arguments, request: dict[str, Any]) -> Arguments:
+    """{"timestamp": int, "zones": [str], "replace": bool, "durations": [str]}, all but the timestamp optional"""
+    timestamp = request.get("timestamp", None)
+    if not isinstance(timestamp, int):
+        raise ValueError(f"Expected an integer timestamp, got {timestamp!r}")
+    zones = request.get("zones", None) or [zone.value for zone in arguments.zones]
+    unknown_zones = [zone for zone in zones if zone not in ZONES]
+    if unknown_zones:
+        raise ValueError(f"Unknown zones {unknown_zones!r}, expected some of {ZONES!r}")
+    durations = request.get("durations", None) or []
+    unknown_durations = [
+        duration for duration in durations if duration not in GENERATED_DURATIONS
+    ]
+    if unknown_durations:
+        raise ValueError(
+            f"Unknown durations {unknown_durations!r}, expected some of {GENERATED_DURATIONS!r}"
+        )
+    job_arguments = copy.copy(arguments)
+    job_arguments.start = timestamp
+    job_arguments.end = timestamp
+    job_arguments.zones = [Zone(zone) for zone in zones]
+    job_arguments.replace = bool(request.get("replace", False))
+    job_arguments.durations = [AccumulationDuration(duration) for duration in durations]
+    return job_arguments
+
+
+def execute_job(
+    arguments: Arguments,
+    request: dict[str, Any],
+    *,
+    execute: Callable[[Arguments, GenerationReporter], None],
+) -> dict[str, Any]:
+    start_time = time.time()
+    generation_reporter = JobGenerationReporter()
+    try:
+        execute(get_job_arguments(arguments, request), generation_reporter)
+    except Exception as e:
+        print(f">> ERROR : could not execute the job {request!r} : {e!r}")
+        return {
+            "ok": False,
+            "error": repr(e),
+            "products": generation_reporter.products,
+            "seconds": round(time.time() - start_time, 3),
+        }
+    return {
+        "ok": True,
+        "products": generation_reporter.products,
+        "seconds": round(time.time() - start_time, 3),
+    }
+
+
+class JobRequestHandler(socketserver.StreamRequestHandler):
+    server: "JobServer"
+
+    def handle(self) -> None:
+        try:
+            request = read_message(self.rfile)
+        except ValueError as e:
+            self.wfile.write(encode_message({"ok": False, "error": repr(e)}))
+            return
+        if request is None:
+            return
+        self.wfile.write(encode_message(self.server.execute_request(request)))
+
+
+class JobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    accepts jobs from many clients at once, executing them one at a time on the warm worker
+    since the generation of a timestamp reads the products of the previous ones,
+    the directories indexed being listed again for each job to see the new inputs
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        arguments: Arguments,
+        *,
+        execute: Callable[[Arguments, GenerationReporter], None],
+        file_existence_checker: Optional[IndexedFileExistenceChecker] = None,
+    ) -> None:
+        self.arguments = arguments
+        self.execute = execute
+        self.file_existence_checker = file_existence_checker
+        self.lock = threading.Lock()
+        super().__init__(socket_path, JobRequestHandler)
+
+    def execute_request(self, request: dict[str, Any]) -> dict[str, Any]:
+        with self.lock:
+            print(f"Executing the job {request!r}...")
+            if self.file_existence_checker is not None:
+                self.file_existence_checker.invalidate()
+            return execute_job(self.arguments, request, execute=self.execute)
+
+
+def remove_stale_socket(socket_path: str) -> None:
+    try:
+        os.remove(socket_path)
+    except FileNotFoundError:
+        pass
+
+
+def run_job_server(
+    arguments: Arguments,
+    *,
+    execute: Callable[[Arguments, GenerationReporter], None],
+    file_existence_checker: Optional[IndexedFileExistenceChecker] = None,
+) -> None:
+    os.makedirs(os.path.dirname(arguments.socket_path), exist_ok=True)
+    remove_stale_socket(arguments.socket_path)
+    with JobServer(
+        arguments.socket_path,
+        arguments,
+        execute=execute,
+        file_existence_checker=file_existence_checker,
+    ) as job_server:
+        # the cron submitting the jobs may run as another user of the group
+        os.chmod(arguments.socket_path, 0o660)
+        print(f"Listening for jobs on '{arguments.socket_path}'...")
+        try:
+            job_server.serve_forever()
+        finally:
+            remove_stale_socket(arguments.socket_path)
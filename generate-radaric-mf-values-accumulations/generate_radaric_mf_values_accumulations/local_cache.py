@@ -0,0 +1,155 @@
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .tiles import LOCAL_CACHE_PATH
+
+LOCAL_TILES_CACHE_PATH = f"{LOCAL_CACHE_PATH}/tiles"
+DEFAULT_LOCAL_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+
+
+class LocalFileCacheStatistics:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_fetched = 0
+        self.bytes_stored = 0
+        self.evictions = 0
+
+    def get_hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0
+
+    def __str__(self) -> str:
+        return f"Local cache: {self.hits} hits, {self.misses} misses ({self.get_hit_rate():.0%}), {self.bytes_saved} bytes saved, {self.bytes_fetched} bytes fetched, {self.bytes_stored} bytes written through, {self.evictions} evictions."
+
+
+class LocalFileCache:
+    """
+    keeps copies of remote files in a local directory, up to max_size bytes, least recently used first evicted,
+    a copy is used only while its size and mtime are the ones of the remote file
+    """
+
+    def __init__(
+        self,
+        cache_path: str = LOCAL_TILES_CACHE_PATH,
+        max_size: int = DEFAULT_LOCAL_CACHE_SIZE,
+    ) -> None:
+        self.cache_path = cache_path
+        self.max_size = max_size
+        self.statistics = LocalFileCacheStatistics()
+        self.sizes: OrderedDict[str, int] = OrderedDict()
+        self.lock = threading.Lock()
+        os.makedirs(cache_path, exist_ok=True)
+        self.load_index()
+
+    def load_index(self) -> None:
+        entries: list[tuple[float, str, int]] = []
+        for directory, _, file_names in os.walk(self.cache_path):
+            for file_name in file_names:
+                if file_name.endswith(".tmp"):
+                    continue
+                local_path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(local_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, local_path, stat.st_size))
+        for _, local_path, size in sorted(entries):
+            self.sizes[local_path] = size
+
+    def get_total_size(self) -> int:
+        return sum(self.sizes.values())
+
+    def get_local_path(self, path: str) -> str:
+        return os.path.join(self.cache_path, os.path.abspath(path).lstrip("/"))
+
+    def touch(self, local_path: str, mtime_ns: int) -> None:
+        os.utime(local_path, ns=(time.time_ns(), mtime_ns))
+        self.sizes.move_to_end(local_path)
+
+    def is_valid(self, local_path: str, stat: os.stat_result) -> bool:
+        if local_path not in self.sizes:
+            return False
+        try:
+            local_stat = os.stat(local_path)
+        except OSError:
+            self.sizes.pop(local_path, None)
+            return False
+        return (
+            local_stat.st_size == stat.st_size
+            and local_stat.st_mtime_ns == stat.st_mtime_ns
+        )
+
+    def copy_into_cache(self, path: str, local_path: str, mtime_ns: int) -> int:
+        """copies without the lock, each thread through its own tmp file, only the index being updated under it"""
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        tmp_path = f"{local_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.utime(tmp_path, ns=(time.time_ns(), mtime_ns))
+            os.replace(tmp_path, local_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = os.path.getsize(local_path)
+        with self.lock:
+            self.sizes[local_path] = size
+            self.sizes.move_to_end(local_path)
+            self.evict()
+        return size
+
+    def evict(self) -> None:
+        total_size = self.get_total_size()
+        while total_size > self.max_size and len(self.sizes) > 1:
+            local_path, size = self.sizes.popitem(last=False)
+            try:
+                os.remove(local_path)
+            except OSError:
+                pass
+            total_size -= size
+            self.statistics.evictions += 1
+
+    def contains(self, path: str) -> bool:
+        return self.get_local_path(path) in self.sizes
+
+    def fetch(self, path: str) -> Optional[str]:
+        """local copy of path, fetched if missing or outdated, None if path does not exist"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        local_path = self.get_local_path(path)
+        with self.lock:
+            if self.is_valid(local_path, stat):
+                self.statistics.hits += 1
+                self.statistics.bytes_saved += stat.st_size
+                self.touch(local_path, stat.st_mtime_ns)
+                return local_path
+            self.statistics.misses += 1
+        try:
+            size = self.copy_into_cache(path, local_path, stat.st_mtime_ns)
+        except OSError as e:
+            print(f">> WARNING : could not cache '{path}' : {e}")
+            return None
+        with self.lock:
+            self.statistics.bytes_fetched += size
+        return local_path
+
+    def store(self, path: str) -> None:
+        """copies a file we just wrote, still in the page cache, so that reading it back later is local"""
+        try:
+            stat = os.stat(path)
+            size = self.copy_into_cache(
+                path, self.get_local_path(path), stat.st_mtime_ns
+            )
+        except OSError as e:
+            print(f">> WARNING : could not cache '{path}' : {e}")
+            return
+        with self.lock:
+            self.statistics.bytes_stored += size
@@ -1,13 +1,15 @@
 import sys
 
 from generate_radaric_mf_values_accumulations.arguments import parse_arguments
-from generate_radaric_mf_values_accumulations.generation import (
-    real_execute_from_arguments,
-)
 
 
 def main() -> None:
     arguments = parse_arguments(sys.argv[1:])
+    # gdal, numpy and the generation are only imported once the arguments are valid
+    from generate_radaric_mf_values_accumulations.generation import (
+        real_execute_from_arguments,
+    )
+
     real_execute_from_arguments(arguments)
 
 
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Optional, Protocol
+
+from .radaric_mf_values_accumulations import get_radar_palette_file_path_for
+from .tiles import LOCAL_CACHE_PATH, AccumulationDuration
+
+MANIFEST_PATH = f"{LOCAL_CACHE_PATH}/manifest.sqlite"
+# to bump whenever the products generated from the same inputs change
+GENERATION_VERSION = "1"
+MISSING_FILE_FINGERPRINT = "missing"
+
+
+def get_file_fingerprint(path: str) -> str:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return MISSING_FILE_FINGERPRINT
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+@lru_cache
+def get_palette_fingerprint(accumulation_duration: AccumulationDuration) -> str:
+    try:
+        with open(get_radar_palette_file_path_for(accumulation_duration), "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    except OSError:
+        return MISSING_FILE_FINGERPRINT
+
+
+def get_inputs_fingerprint(
+    inputs: list[tuple[str, str]],
+    accumulation_duration: AccumulationDuration,
+    output_settings: str = "",
+) -> str:
+    """
+    of the inputs, as (path, path to stat) since they may be staged elsewhere,
+    and of the version of the code, palette and output settings generating the product
+    """
+    fingerprint = hashlib.blake2b(digest_size=16)
+    fingerprint.update(f"{GENERATION_VERSION}\n".encode())
+    fingerprint.update(f"{get_palette_fingerprint(accumulation_duration)}\n".encode())
+    fingerprint.update(f"{output_settings}\n".encode())
+    for path, stat_path in inputs:
+        fingerprint.update(f"{path} {get_file_fingerprint(stat_path)}\n".encode())
+    return fingerprint.hexdigest()
+
+
+class GenerationManifest(Protocol):
+    # the codecs, colors and derived files the products are written with
+    output_settings: str
+
+    def get_fingerprint(self, path: str) -> Optional[str]: ...
+
+    def record(self, path: str, fingerprint: str) -> None:
+        """fingerprint of the inputs path was generated from"""
+
+
+class SQLiteGenerationManifest(GenerationManifest):
+    def __init__(
+        self, manifest_path: str = MANIFEST_PATH, output_settings: str = ""
+    ) -> None:
+        self.output_settings = output_settings
+        if manifest_path != ":memory:":
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        self.manifest_path = manifest_path
+        # the products are registered once written, from the thread flushing them
+        self.connection = sqlite3.connect(
+            manifest_path, timeout=30, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS manifest (
+                        path TEXT PRIMARY KEY,
+                        fingerprint TEXT NOT NULL
+                    )
+                """
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get_fingerprint(self, path: str) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fingerprint FROM manifest WHERE path = ?", (path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record(self, path: str, fingerprint: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "REPLACE INTO manifest (path, fingerprint) VALUES (?, ?)",
+                (path, fingerprint),
+            )
+
+
+class InMemoryGenerationManifest(GenerationManifest):
+    def __init__(
+        self,
+        fingerprints: Optional[dict[str, str]] = None,
+        output_settings: str = "",
+    ) -> None:
+        self.fingerprints: dict[str, str] = fingerprints or {}
+        self.output_settings = output_settings
+
+    def get_fingerprint(self, path: str) -> Optional[str]:
+        return self.fingerprints.get(path, None)
+
+    def record(self, path: str, fingerprint: str) -> None:
+        self.fingerprints[path] = fingerprint
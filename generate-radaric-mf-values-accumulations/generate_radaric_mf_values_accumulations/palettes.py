@@ -0,0 +1,121 @@
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+import numpy
+
+from .radaric_mf_values_accumulations import get_radar_palette_file_path_for
+from .tiles import AccumulationDuration
+
+NO_DATA_COLOR = (0, 0, 0, 0)
+MAX_COLOR_TABLE_ENTRIES = 256
+PALETTE_LINE_SEPARATORS = re.compile(r"[\s,:]+")
+
+
+class Palette:
+    """
+    colors of a gdaldem color-relief palette, picked as gdaldem color-relief -alpha -nearest_color_entry does :
+    below the first value the first color, above the last value the last color,
+    in between the color of the nearest value, the upper one on ties
+    """
+
+    def __init__(
+        self,
+        values: list[float],
+        colors: list[tuple[int, int, int, int]],
+        no_data_color: tuple[int, int, int, int] = NO_DATA_COLOR,
+    ) -> None:
+        if not values or len(values) != len(colors):
+            raise ValueError(
+                f"Expected as many colors as values, got {len(values)} values and {len(colors)} colors"
+            )
+        order = numpy.argsort(numpy.array(values, numpy.float64), kind="stable")
+        self.values = numpy.array(values, numpy.float64)[order]
+        self.colors = numpy.array(colors, numpy.uint8)[order]
+        self.no_data_color = numpy.array(no_data_color, numpy.uint8)
+
+    def get_color_indexes(
+        self, data: numpy.ndarray[Any, Any]
+    ) -> numpy.ndarray[Any, Any]:
+        values = self.values
+        if len(values) == 1:
+            return numpy.zeros(numpy.shape(data), numpy.intp)
+        data = numpy.asarray(data, numpy.float64)
+        # first value not lower than the data, NaN being above all values
+        upper_indexes = numpy.searchsorted(values, data, side="left")
+        indexes = numpy.clip(upper_indexes, 1, len(values) - 1)
+        nearest_indexes = numpy.where(
+            data - values[indexes - 1] < values[indexes] - data, indexes - 1, indexes
+        )
+        nearest_indexes[upper_indexes == 0] = 0
+        nearest_indexes[upper_indexes == len(values)] = len(values) - 1
+        return nearest_indexes
+
+    def colorize(
+        self,
+        data: numpy.ndarray[Any, Any],
+        no_data_value: Optional[float] = None,
+    ) -> numpy.ndarray[Any, Any]:
+        """RGBA bands (4, rows, cols) of data"""
+        colors = self.colors[self.get_color_indexes(data)]
+        if no_data_value is not None:
+            colors[numpy.asarray(data) == no_data_value] = self.no_data_color
+        return numpy.moveaxis(colors, -1, 0)
+
+    def get_no_data_index(self) -> int:
+        """entry of the color table after the colors of the palette"""
+        return len(self.colors)
+
+    def get_color_table(self) -> list[tuple[int, int, int, int]]:
+        color_table = [tuple(color) for color in self.colors.tolist()]
+        color_table.append(tuple(self.no_data_color.tolist()))
+        if len(color_table) > MAX_COLOR_TABLE_ENTRIES:
+            raise ValueError(
+                f"Expected at most {MAX_COLOR_TABLE_ENTRIES - 1} colors in a paletted palette, got {len(self.colors)}"
+            )
+        return color_table  # type: ignore
+
+    def colorize_as_color_table_indexes(
+        self,
+        data: numpy.ndarray[Any, Any],
+        no_data_value: Optional[float] = None,
+    ) -> numpy.ndarray[Any, Any]:
+        """Byte indexes into get_color_table() of data, the transparent colors being no data"""
+        no_data_index = self.get_no_data_index()
+        indexes = self.get_color_indexes(data)
+        indexes[self.colors[indexes, 3] == 0] = no_data_index
+        if no_data_value is not None:
+            indexes[numpy.asarray(data) == no_data_value] = no_data_index
+        return indexes.astype(numpy.uint8)
+
+
+def parse_palette(content: str) -> Palette:
+    values: list[float] = []
+    colors: list[tuple[int, int, int, int]] = []
+    no_data_color = NO_DATA_COLOR
+    for line in content.splitlines():
+        tokens = [
+            token for token in PALETTE_LINE_SEPARATORS.split(line.strip()) if token
+        ]
+        if not tokens:
+            continue
+        if len(tokens) not in [4, 5]:
+            raise ValueError(f"Expected 'value R G B [A]', got '{line}'")
+        red, green, blue = (int(token) for token in tokens[1:4])
+        alpha = int(tokens[4]) if len(tokens) == 5 else 255
+        if tokens[0].lower() == "nv":
+            no_data_color = (red, green, blue, alpha)
+            continue
+        values.append(float(tokens[0]))
+        colors.append((red, green, blue, alpha))
+    return Palette(values, colors, no_data_color)
+
+
+def read_palette(palette_path: str) -> Palette:
+    with open(palette_path, "r") as f:
+        return parse_palette(f.read())
+
+
+@lru_cache
+def get_radar_palette_for(accumulation_duration: AccumulationDuration) -> Palette:
+    return read_palette(get_radar_palette_file_path_for(accumulation_duration))
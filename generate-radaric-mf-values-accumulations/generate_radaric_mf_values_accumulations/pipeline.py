@@ -0,0 +1,535 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import numpy
+
+from .catalog import ProductsCatalog
+from .datetime_utils import FIVE_MINUTES_IN_SECONDS, datetime_of
+from .generation import (
+    ACCUMULATIONS_DURATIONS,
+    VIRTUAL_VALUES_DURATIONS,
+    ColorTifGenerator,
+    FileExistenceChecker,
+    IdentityTransform,
+    ProductsStager,
+    QuicklookGenerator,
+    TifConfig,
+    TifConfigGetter,
+    TifConfigMismatchException,
+    TifCreator,
+    TifReader,
+    TilePyramidGenerator,
+    VirtualValuesWriter,
+    find_tif_config_in_zone_at,
+    generate_color_tif,
+    get_corresponding_color_precipitations_param,
+    get_corresponding_transform,
+    get_corresponding_values_precipitations_param,
+    get_generated_params_for,
+    get_products_stager,
+    is_generation_needed,
+    register_generated_products,
+    should_keep_values_for,
+)
+from .radaric_mf_values_accumulations import (
+    CommandExecutor,
+    get_tifs_pathes_to_read_for_cumul_in_zone_at,
+)
+from .tiles import (
+    AccumulationDuration,
+    PrecipitationsParam,
+    TilesDatetimesRepository,
+    Zone,
+    get_tif_path_for_param_in_zone_at,
+    get_vrt_path_for_param_in_zone_at,
+    update_tile_last_timestamp,
+)
+
+
+class PipelineConcurrency:
+    """
+    workers of each stage, and size of the queues between them,
+    each job holding its running sum and the input being read
+    """
+
+    def __init__(
+        self,
+        readers: int = 2,
+        writers: int = 2,
+        colorizers: int = 2,
+        queue_size: int = 2,
+    ) -> None:
+        self.readers = readers
+        self.writers = writers
+        self.colorizers = colorizers
+        self.queue_size = queue_size
+
+
+class AccumulationJob:
+    def __init__(
+        self,
+        zone: Zone,
+        timestamp: int,
+        tif_config: TifConfig,
+        accumulation_duration: AccumulationDuration,
+    ) -> None:
+        self.zone = zone
+        self.timestamp = timestamp
+        self.tif_config = tif_config
+        self.accumulation_duration = accumulation_duration
+        self.accumulations: Optional[numpy.ndarray[Any, Any]] = None
+        self.error: Optional[Exception] = None
+        self.retried = False
+        # set once published, or once failed
+        self.published = asyncio.Event()
+        self.done = asyncio.Event()
+
+    def get_tifs_pathes_to_read(self) -> list[str]:
+        return list(
+            get_tifs_pathes_to_read_for_cumul_in_zone_at(
+                self.zone, self.timestamp, self.accumulation_duration
+            )
+        )
+
+    def get_generated_pathes(self) -> list[str]:
+        return [
+            get_tif_path_for_param_in_zone_at(param, self.zone, self.timestamp)
+            for param in get_generated_params_for(self.accumulation_duration)
+        ]
+
+    def __str__(self) -> str:
+        return f"accumulations over {self.accumulation_duration.value} in '{self.zone.value}' at '{datetime_of(self.timestamp):%Y-%m-%d %H:%M:%S}'"
+
+
+class PrerequisiteFailedException(Exception):
+    pass
+
+
+class PipelineReport:
+    def __init__(self) -> None:
+        self.generated = 0
+        self.failed: list[tuple[AccumulationJob, Exception]] = []
+        self.seconds: float = 0
+
+    def __str__(self) -> str:
+        return f"Pipeline generated {self.generated} accumulations, {len(self.failed)} failed: {self.seconds:.3f}s."
+
+
+class PipelineFailedException(Exception):
+    def __init__(self, report: PipelineReport) -> None:
+        self.report = report
+        super().__init__(
+            f"{len(report.failed)} accumulations failed : {', '.join(f'{job} ({error!r})' for job, error in report.failed)}"
+        )
+
+
+def get_timestamps_between(start: int, end: int) -> range:
+    """(inclusive)"""
+    return range(start, end + FIVE_MINUTES_IN_SECONDS, FIVE_MINUTES_IN_SECONDS)
+
+
+def plan_accumulation_jobs(
+    timestamps: range,
+    zones: list[Zone],
+    *,
+    file_existence_checker: FileExistenceChecker,
+    tif_config_getter: TifConfigGetter,
+    replace_existing: bool = False,
+    accumulations_durations: list[AccumulationDuration] = ACCUMULATIONS_DURATIONS,
+) -> list[AccumulationJob]:
+    """jobs in the order the serial run generates them, already generated products skipped"""
+    jobs: list[AccumulationJob] = []
+    for timestamp in timestamps:
+        for zone in zones:
+            tif_config = find_tif_config_in_zone_at(
+                timestamp, zone, tif_config_getter=tif_config_getter
+            )
+            if tif_config is None:
+                print(
+                    f"Skipping generation of accumulations because no tif found for zone '{zone}' at '{datetime_of(timestamp):%Y-%m-%d %H:%M:%S}'."
+                )
+                continue
+            for accumulation_duration in accumulations_durations:
+                if is_generation_needed(
+                    zone,
+                    timestamp,
+                    accumulation_duration,
+                    file_existence_checker=file_existence_checker,
+                    replace_existing=replace_existing,
+                ):
+                    jobs.append(
+                        AccumulationJob(
+                            zone, timestamp, tif_config, accumulation_duration
+                        )
+                    )
+    return jobs
+
+
+def get_prerequisites_per_job(
+    jobs: list[AccumulationJob],
+) -> dict[AccumulationJob, list[AccumulationJob]]:
+    """
+    jobs reading a product of an earlier job, e.g. the 3h accumulations reading the 1h values,
+    must wait for it to be published
+    """
+    jobs_per_generated_path = {
+        path: job for job in jobs for path in job.get_generated_pathes()
+    }
+    prerequisites_per_job: dict[AccumulationJob, list[AccumulationJob]] = {}
+    for job in jobs:
+        prerequisites_per_job[job] = []
+        for tif_path in job.get_tifs_pathes_to_read():
+            prerequisite = jobs_per_generated_path.get(tif_path, None)
+            if (
+                prerequisite is not None
+                and prerequisite not in prerequisites_per_job[job]
+            ):
+                prerequisites_per_job[job].append(prerequisite)
+    return prerequisites_per_job
+
+
+class AccumulationsPipeline:
+    """
+    generates the accumulations of many jobs at once, through stages connected by bounded queues :
+    read -> write -> colorize -> publish -> update of the tiles datetimes,
+    each stage running its blocking calls in its own executor
+    """
+
+    def __init__(
+        self,
+        *,
+        file_existence_checker: FileExistenceChecker,
+        tif_config_getter: TifConfigGetter,
+        tif_reader: TifReader,
+        tif_creator: TifCreator,
+        command_executor: CommandExecutor,
+        tiles_repository: TilesDatetimesRepository,
+        replace_existing: bool = False,
+        products_catalog: Optional[ProductsCatalog] = None,
+        color_tif_generator: Optional[ColorTifGenerator] = None,
+        products_stager: Optional[ProductsStager] = None,
+        quicklook_generator: Optional[QuicklookGenerator] = None,
+        tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+        virtual_values_writer: Optional[VirtualValuesWriter] = None,
+        concurrency: PipelineConcurrency = PipelineConcurrency(),
+    ) -> None:
+        self.file_existence_checker = file_existence_checker
+        self.tif_config_getter = tif_config_getter
+        self.tif_reader = tif_reader
+        self.tif_creator = tif_creator
+        self.command_executor = command_executor
+        self.tiles_repository = tiles_repository
+        self.replace_existing = replace_existing
+        self.products_catalog = products_catalog
+        self.color_tif_generator = color_tif_generator
+        self.products_stager = get_products_stager(products_stager, command_executor)
+        self.quicklook_generator = quicklook_generator
+        self.tile_pyramid_generator = tile_pyramid_generator
+        self.virtual_values_writer = virtual_values_writer
+        self.concurrency = concurrency
+        self.last_updated_timestamps: dict[tuple[PrecipitationsParam, Zone], int] = {}
+        self.retries: list[asyncio.Task[None]] = []
+
+    def get_staging_path_for(
+        self, job: AccumulationJob, param: PrecipitationsParam
+    ) -> str:
+        return self.products_stager.get_staging_path(param, job.zone, job.timestamp)
+
+    def read(self, job: AccumulationJob) -> None:
+        """each input summed as soon as read, so that a job holds one input at a time"""
+        transform = get_corresponding_transform(job.accumulation_duration)
+        accumulations = numpy.zeros(
+            (job.tif_config.rows, job.tif_config.cols), numpy.float32
+        )
+        for tif_path in job.get_tifs_pathes_to_read():
+            print(f"Processing '{tif_path}'...")
+            array = self.tif_reader.read_tif(
+                tif_path,
+                transform=IdentityTransform(),
+                expected_tif_config=job.tif_config,
+            )
+            if array is None:
+                print(f"'{tif_path}' is None !")
+                continue
+            accumulations = accumulations + transform.transform(array)
+        job.accumulations = accumulations
+
+    def write(self, job: AccumulationJob) -> None:
+        assert job.accumulations is not None
+        if self.color_tif_generator is not None and not should_keep_values_for(
+            job.accumulation_duration
+        ):
+            return
+        self.tif_creator.create_tif(
+            self.get_staging_path_for(
+                job,
+                get_corresponding_values_precipitations_param(
+                    job.accumulation_duration
+                ),
+            ),
+            job.tif_config,
+            job.accumulations,
+        )
+
+    def colorize(self, job: AccumulationJob) -> None:
+        generate_color_tif(
+            self.get_staging_path_for(
+                job,
+                get_corresponding_values_precipitations_param(
+                    job.accumulation_duration
+                ),
+            ),
+            self.get_staging_path_for(
+                job,
+                get_corresponding_color_precipitations_param(job.accumulation_duration),
+            ),
+            job.accumulation_duration,
+            job.tif_config,
+            job.accumulations,
+            command_executor=self.command_executor,
+            color_tif_generator=self.color_tif_generator,
+        )
+
+    def publish(self, job: AccumulationJob) -> None:
+        values_param = get_corresponding_values_precipitations_param(
+            job.accumulation_duration
+        )
+        if not should_keep_values_for(job.accumulation_duration):
+            self.products_stager.discard(values_param, job.zone, job.timestamp)
+            if (
+                self.virtual_values_writer is not None
+                and job.accumulation_duration in VIRTUAL_VALUES_DURATIONS
+            ):
+                self.virtual_values_writer.write_virtual_values(
+                    get_vrt_path_for_param_in_zone_at(
+                        values_param, job.zone, job.timestamp
+                    ),
+                    job.get_tifs_pathes_to_read(),
+                    job.tif_config,
+                )
+        for param in get_generated_params_for(job.accumulation_duration):
+            self.products_stager.publish(param, job.zone, job.timestamp)
+        if self.quicklook_generator is not None and job.accumulations is not None:
+            self.quicklook_generator.generate_quicklooks(
+                get_corresponding_color_precipitations_param(job.accumulation_duration),
+                job.zone,
+                job.timestamp,
+                job.accumulation_duration,
+                job.tif_config,
+                job.accumulations,
+            )
+        if self.tile_pyramid_generator is not None and job.accumulations is not None:
+            self.tile_pyramid_generator.generate_pyramid(
+                get_corresponding_color_precipitations_param(job.accumulation_duration),
+                job.zone,
+                job.timestamp,
+                job.accumulation_duration,
+                job.tif_config,
+                job.accumulations,
+            )
+        register_generated_products(
+            job.zone,
+            job.timestamp,
+            job.tif_config,
+            job.accumulation_duration,
+            job.accumulations,
+            file_existence_checker=self.file_existence_checker,
+            products_catalog=self.products_catalog,
+        )
+        job.accumulations = None
+
+    def update_tiles_datetimes(self, job: AccumulationJob) -> None:
+        if self.replace_existing:
+            return
+        param = get_corresponding_color_precipitations_param(job.accumulation_duration)
+        last_updated_timestamp = self.last_updated_timestamps.get(
+            (param, job.zone), None
+        )
+        if (
+            last_updated_timestamp is not None
+            and last_updated_timestamp > job.timestamp
+        ):
+            return
+        update_tile_last_timestamp(
+            param, job.zone, job.timestamp, repository=self.tiles_repository
+        )
+        self.last_updated_timestamps[(param, job.zone)] = job.timestamp
+
+    def fail(self, job: AccumulationJob, error: Exception) -> None:
+        print(f">> ERROR : could not generate {job} : {error!r}")
+        job.error = error
+        job.accumulations = None
+        job.published.set()
+        job.done.set()
+
+    def retry(
+        self,
+        job: AccumulationJob,
+        error: Exception,
+        queue: "asyncio.Queue[AccumulationJob]",
+    ) -> bool:
+        """once with the new config, as the serial run, when the inputs no longer match the cached one"""
+        if not isinstance(error, TifConfigMismatchException) or job.retried:
+            return False
+        print(f">> WARNING : {error} ! Retrying {job} with the new config.")
+        self.tif_config_getter.update_tif_config(job.zone, error.actual_tif_config)
+        job.tif_config = error.actual_tif_config
+        job.accumulations = None
+        job.retried = True
+        # not awaited by the worker, which would wait for itself when the queue is full
+        self.retries.append(asyncio.create_task(queue.put(job)))
+        return True
+
+    async def schedule(
+        self,
+        job: AccumulationJob,
+        prerequisites: list[AccumulationJob],
+        queue: "asyncio.Queue[AccumulationJob]",
+    ) -> None:
+        for prerequisite in prerequisites:
+            await prerequisite.published.wait()
+            if prerequisite.error is not None:
+                self.fail(job, PrerequisiteFailedException(f"{prerequisite} failed"))
+                return
+        await queue.put(job)
+
+    async def work(
+        self,
+        stage: Callable[[AccumulationJob], None],
+        executor: ThreadPoolExecutor,
+        input_queue: "asyncio.Queue[AccumulationJob]",
+        output_queue: Optional["asyncio.Queue[AccumulationJob]"],
+        on_done: Optional[Callable[[AccumulationJob], None]] = None,
+        retry_queue: Optional["asyncio.Queue[AccumulationJob]"] = None,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await input_queue.get()
+            try:
+                await loop.run_in_executor(executor, stage, job)
+            except Exception as e:
+                if retry_queue is None or not self.retry(job, e, retry_queue):
+                    self.fail(job, e)
+                continue
+            finally:
+                input_queue.task_done()
+            if on_done is not None:
+                on_done(job)
+            if output_queue is not None:
+                await output_queue.put(job)
+
+    async def run_jobs(self, jobs: list[AccumulationJob]) -> PipelineReport:
+        report = PipelineReport()
+        start_time = time.time()
+        concurrency = self.concurrency
+        stages: list[tuple[Callable[[AccumulationJob], None], int]] = [
+            (self.read, concurrency.readers),
+            (self.write, concurrency.writers),
+            (self.colorize, concurrency.colorizers),
+            # single workers, so that the file existence checker, the catalog and the database connection
+            # are used from one thread at a time
+            (self.publish, 1),
+            (self.update_tiles_datetimes, 1),
+        ]
+        queues: list["asyncio.Queue[AccumulationJob]"] = [
+            asyncio.Queue(maxsize=concurrency.queue_size) for _ in stages
+        ]
+        on_dones: list[Optional[Callable[[AccumulationJob], None]]] = [
+            None for _ in stages
+        ]
+        on_dones[-2] = lambda job: job.published.set()
+        on_dones[-1] = lambda job: job.done.set()
+        executors = [ThreadPoolExecutor(max_workers=workers) for _, workers in stages]
+        tasks: list[asyncio.Task[None]] = []
+        try:
+            for index, (stage, workers) in enumerate(stages):
+                for _ in range(workers):
+                    tasks.append(
+                        asyncio.create_task(
+                            self.work(
+                                stage,
+                                executors[index],
+                                queues[index],
+                                queues[index + 1] if index + 1 < len(queues) else None,
+                                on_dones[index],
+                                queues[0],
+                            )
+                        )
+                    )
+            prerequisites_per_job = get_prerequisites_per_job(jobs)
+            schedulers = [
+                asyncio.create_task(
+                    self.schedule(job, prerequisites_per_job[job], queues[0])
+                )
+                for job in jobs
+            ]
+            await asyncio.gather(*(job.done.wait() for job in jobs))
+            await asyncio.gather(*schedulers)
+        finally:
+            for task in tasks + self.retries:
+                task.cancel()
+            await asyncio.gather(*tasks, *self.retries, return_exceptions=True)
+            self.retries = []
+            for executor in executors:
+                executor.shutdown()
+        for job in jobs:
+            if job.error is not None:
+                report.failed.append((job, job.error))
+            else:
+                report.generated += 1
+        report.seconds = time.time() - start_time
+        print(report)
+        return report
+
+
+def run_accumulations_pipeline(
+    timestamps: range,
+    zones: list[Zone],
+    *,
+    file_existence_checker: FileExistenceChecker,
+    tif_config_getter: TifConfigGetter,
+    tif_reader: TifReader,
+    tif_creator: TifCreator,
+    command_executor: CommandExecutor,
+    tiles_repository: TilesDatetimesRepository,
+    replace_existing: bool = False,
+    products_catalog: Optional[ProductsCatalog] = None,
+    color_tif_generator: Optional[ColorTifGenerator] = None,
+    products_stager: Optional[ProductsStager] = None,
+    quicklook_generator: Optional[QuicklookGenerator] = None,
+    tile_pyramid_generator: Optional[TilePyramidGenerator] = None,
+    virtual_values_writer: Optional[VirtualValuesWriter] = None,
+    accumulations_durations: list[AccumulationDuration] = ACCUMULATIONS_DURATIONS,
+    concurrency: PipelineConcurrency = PipelineConcurrency(),
+) -> PipelineReport:
+    pipeline = AccumulationsPipeline(
+        file_existence_checker=file_existence_checker,
+        tif_config_getter=tif_config_getter,
+        tif_reader=tif_reader,
+        tif_creator=tif_creator,
+        command_executor=command_executor,
+        tiles_repository=tiles_repository,
+        replace_existing=replace_existing,
+        products_catalog=products_catalog,
+        color_tif_generator=color_tif_generator,
+        products_stager=products_stager,
+        quicklook_generator=quicklook_generator,
+        tile_pyramid_generator=tile_pyramid_generator,
+        virtual_values_writer=virtual_values_writer,
+        concurrency=concurrency,
+    )
+
+    async def run() -> PipelineReport:
+        jobs = plan_accumulation_jobs(
+            timestamps,
+            zones,
+            file_existence_checker=file_existence_checker,
+            tif_config_getter=tif_config_getter,
+            replace_existing=replace_existing,
+            accumulations_durations=accumulations_durations,
+        )
+        return await pipeline.run_jobs(jobs)
+
+    return asyncio.run(run())
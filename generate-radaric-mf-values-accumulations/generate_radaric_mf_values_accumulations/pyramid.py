@@ -0,0 +1,382 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Optional
+
+import numpy
+
+from .generation import (
+    TifConfig,
+    TilePyramidGenerator,
+    encode_image,
+    get_tmp_path_for,
+    write_file_atomically,
+)
+from .palettes import get_radar_palette_for
+from .tiles import (
+    AccumulationDuration,
+    PrecipitationsParam,
+    Zone,
+    get_pyramid_path_for_param_in_zone_at,
+)
+
+WEB_MERCATOR_ORIGIN = 20037508.342789244
+WEB_MERCATOR_PROJECTIONS = ["3857", "Pseudo-Mercator", "Pseudo Mercator"]
+DEFAULT_TILE_SIZE = 256
+DEFAULT_PYRAMID_WORKERS = 4
+
+
+class XYZTile:
+    def __init__(self, zoom: int, x: int, y: int) -> None:
+        self.zoom = zoom
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, XYZTile):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def __hash__(self) -> int:
+        return hash((self.zoom, self.x, self.y))
+
+    def __repr__(self) -> str:
+        return f"XYZTile(zoom={self.zoom}, x={self.x}, y={self.y})"
+
+    def get_path_in(self, pyramid_path: str) -> str:
+        return f"{pyramid_path}/{self.zoom}/{self.x}/{self.y}.png"
+
+
+def is_web_mercator(tif_config: TifConfig) -> bool:
+    return any(
+        projection in tif_config.projection for projection in WEB_MERCATOR_PROJECTIONS
+    )
+
+
+def get_tile_span(zoom: int) -> float:
+    """width and height of the tiles at zoom, in meters"""
+    return 2 * WEB_MERCATOR_ORIGIN / 2**zoom
+
+
+def get_tiles_covering(tif_config: TifConfig, zoom: int) -> list[XYZTile]:
+    x_origin, x_resolution, _, y_origin, _, y_resolution = tif_config.geo_transform
+    x_end = x_origin + x_resolution * tif_config.cols
+    y_end = y_origin + y_resolution * tif_config.rows
+    tile_span = get_tile_span(zoom)
+
+    def get_tile_index(offset: float) -> int:
+        return min(max(int(offset // tile_span), 0), 2**zoom - 1)
+
+    xs = range(
+        get_tile_index(min(x_origin, x_end) + WEB_MERCATOR_ORIGIN),
+        get_tile_index(max(x_origin, x_end) + WEB_MERCATOR_ORIGIN) + 1,
+    )
+    ys = range(
+        get_tile_index(WEB_MERCATOR_ORIGIN - max(y_origin, y_end)),
+        get_tile_index(WEB_MERCATOR_ORIGIN - min(y_origin, y_end)) + 1,
+    )
+    return [XYZTile(zoom, x, y) for y in ys for x in xs]
+
+
+def get_tile_source_indexes(
+    tif_config: TifConfig, tile: XYZTile, tile_size: int = DEFAULT_TILE_SIZE
+) -> tuple[numpy.ndarray[Any, Any], numpy.ndarray[Any, Any]]:
+    """rows and cols of the raster nearest to the pixels of tile, -1 outside of the raster"""
+    x_origin, x_resolution, _, y_origin, _, y_resolution = tif_config.geo_transform
+    tile_span = get_tile_span(tile.zoom)
+    centers = (numpy.arange(tile_size) + 0.5) * (tile_span / tile_size)
+    xs = tile.x * tile_span - WEB_MERCATOR_ORIGIN + centers
+    ys = WEB_MERCATOR_ORIGIN - tile.y * tile_span - centers
+    rows = numpy.floor((ys - y_origin) / y_resolution).astype(numpy.intp)
+    cols = numpy.floor((xs - x_origin) / x_resolution).astype(numpy.intp)
+    rows[(rows < 0) | (rows >= tif_config.rows)] = -1
+    cols[(cols < 0) | (cols >= tif_config.cols)] = -1
+    return rows, cols
+
+
+def get_source_window(
+    rows: numpy.ndarray[Any, Any], cols: numpy.ndarray[Any, Any]
+) -> Optional[tuple[slice, slice]]:
+    """slices of the raster read by a tile, None when it is outside of the raster"""
+    valid_rows = rows[rows >= 0]
+    valid_cols = cols[cols >= 0]
+    if not valid_rows.size or not valid_cols.size:
+        return None
+    return (
+        slice(int(valid_rows.min()), int(valid_rows.max()) + 1),
+        slice(int(valid_cols.min()), int(valid_cols.max()) + 1),
+    )
+
+
+def render_tile(
+    colors: numpy.ndarray[Any, Any],
+    rows: numpy.ndarray[Any, Any],
+    cols: numpy.ndarray[Any, Any],
+) -> numpy.ndarray[Any, Any]:
+    """RGBA bands of the tile, nearest neighbour, transparent outside of the raster"""
+    tile = numpy.zeros((len(colors), len(rows), len(cols)), numpy.uint8)
+    valid_rows = numpy.flatnonzero(rows >= 0)
+    valid_cols = numpy.flatnonzero(cols >= 0)
+    bands = numpy.arange(len(colors))
+    tile[numpy.ix_(bands, valid_rows, valid_cols)] = colors[
+        numpy.ix_(bands, rows[valid_rows], cols[valid_cols])
+    ]
+    return tile
+
+
+def is_transparent(colors: numpy.ndarray[Any, Any]) -> bool:
+    return not colors[3].any()
+
+
+class PyramidPlan:
+    """tiles to render, tiles to link to the previous pyramid, tiles skipped as transparent"""
+
+    def __init__(self) -> None:
+        self.rendered: list[XYZTile] = []
+        self.linked: list[XYZTile] = []
+        self.transparent = 0
+
+
+def plan_pyramid(
+    tif_config: TifConfig,
+    zooms: list[int],
+    colors: numpy.ndarray[Any, Any],
+    previous_colors: Optional[numpy.ndarray[Any, Any]] = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
+) -> PyramidPlan:
+    changed: Optional[numpy.ndarray[Any, Any]] = None
+    if previous_colors is not None and previous_colors.shape == colors.shape:
+        changed = numpy.any(colors != previous_colors, axis=0)
+    plan = PyramidPlan()
+    for zoom in zooms:
+        for tile in get_tiles_covering(tif_config, zoom):
+            window = get_source_window(
+                *get_tile_source_indexes(tif_config, tile, tile_size)
+            )
+            if window is None or is_transparent(colors[:, window[0], window[1]]):
+                plan.transparent += 1
+            elif changed is not None and not changed[window].any():
+                plan.linked.append(tile)
+            else:
+                plan.rendered.append(tile)
+    return plan
+
+
+def group_tiles_per_row(tiles: list[XYZTile]) -> list[list[XYZTile]]:
+    rows: dict[tuple[int, int], list[XYZTile]] = {}
+    for tile in tiles:
+        rows.setdefault((tile.zoom, tile.y), []).append(tile)
+    return list(rows.values())
+
+
+def get_source_rows_of(
+    tif_config: TifConfig, tiles: list[XYZTile], tile_size: int = DEFAULT_TILE_SIZE
+) -> slice:
+    """rows of the raster read by a row of tiles"""
+    rows, _ = get_tile_source_indexes(tif_config, tiles[0], tile_size)
+    valid_rows = rows[rows >= 0]
+    if not valid_rows.size:
+        return slice(0, 0)
+    return slice(int(valid_rows.min()), int(valid_rows.max()) + 1)
+
+
+def render_tiles(
+    colors: numpy.ndarray[Any, Any],
+    first_row: int,
+    tif_config: TifConfig,
+    tiles: list[XYZTile],
+    pyramid_path: str,
+    tile_size: int = DEFAULT_TILE_SIZE,
+) -> int:
+    """
+    renders and writes a row of tiles from the rows of colors starting at first_row,
+    returns how many were not transparent
+    """
+    written = 0
+    for tile in tiles:
+        rows, cols = get_tile_source_indexes(tif_config, tile, tile_size)
+        rows[rows >= 0] -= first_row
+        tile_colors = render_tile(colors, rows, cols)
+        if is_transparent(tile_colors):
+            continue
+        tile_path = tile.get_path_in(pyramid_path)
+        os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+        write_file_atomically(tile_path, encode_image(tile_colors, "png"))
+        written += 1
+    return written
+
+
+def link_tile(previous_tile_path: str, tile_path: str) -> bool:
+    """hardlinks the tile to the same one of the previous pyramid, False when it has none"""
+    if previous_tile_path == tile_path:
+        return os.path.isfile(tile_path)
+    os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+    tmp_path = get_tmp_path_for(tile_path)
+    try:
+        os.link(previous_tile_path, tmp_path)
+    except OSError:
+        return False
+    try:
+        os.replace(tmp_path, tile_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return True
+
+
+class RealTilePyramidGenerator(TilePyramidGenerator):
+    """
+    cuts the colors of each product into XYZ png tiles on a process pool,
+    linking the tiles whose source blocks did not change since the previous product to its tiles
+    """
+
+    def __init__(
+        self,
+        zooms: list[int],
+        workers: int = DEFAULT_PYRAMID_WORKERS,
+        tile_size: int = DEFAULT_TILE_SIZE,
+    ) -> None:
+        self.zooms = zooms
+        self.workers = workers
+        self.tile_size = tile_size
+        self.previous: dict[
+            tuple[PrecipitationsParam, Zone], tuple[str, numpy.ndarray[Any, Any]]
+        ] = {}
+        self.executor: Optional[ProcessPoolExecutor] = None
+        # the products are published from the background writers
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            # forking a process using GDAL from several threads is not safe
+            self.executor = ProcessPoolExecutor(
+                self.workers, mp_context=get_context("spawn")
+            )
+        return self.executor
+
+    def has_pyramid(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        tif_config: TifConfig,
+    ) -> bool:
+        # the tiles all transparent, the pyramid has no directory and is cut again
+        return not is_web_mercator(tif_config) or os.path.isdir(
+            get_pyramid_path_for_param_in_zone_at(param, zone, timestamp)
+        )
+
+    def generate_pyramid(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+    ) -> None:
+        pyramid_path = get_pyramid_path_for_param_in_zone_at(param, zone, timestamp)
+        if not is_web_mercator(tif_config):
+            print(
+                f"Skipping pyramid '{pyramid_path}' because the tif is not in EPSG:3857."
+            )
+            return
+        colors = get_radar_palette_for(accumulation_duration).colorize(data)
+        with self.lock:
+            previous_pyramid_path, previous_colors = self.previous.get(
+                (param, zone), (None, None)
+            )
+            plan = plan_pyramid(
+                tif_config, self.zooms, colors, previous_colors, self.tile_size
+            )
+            rendered = list(plan.rendered)
+            linked = 0
+            for tile in plan.linked:
+                if previous_pyramid_path is not None and link_tile(
+                    tile.get_path_in(previous_pyramid_path),
+                    tile.get_path_in(pyramid_path),
+                ):
+                    linked += 1
+                else:
+                    rendered.append(tile)
+            futures = []
+            for tiles in group_tiles_per_row(rendered):
+                source_rows = get_source_rows_of(tif_config, tiles, self.tile_size)
+                futures.append(
+                    self.get_executor().submit(
+                        render_tiles,
+                        colors[:, source_rows],
+                        source_rows.start,
+                        tif_config,
+                        tiles,
+                        pyramid_path,
+                        self.tile_size,
+                    )
+                )
+            written = sum(future.result() for future in futures)
+            self.previous[(param, zone)] = (pyramid_path, colors)
+        print(
+            f"Pyramid '{pyramid_path}' : {written} tiles rendered, {linked} linked, {plan.transparent} transparent skipped."
+        )
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+class InMemoryTilePyramidGenerator(TilePyramidGenerator):
+    def __init__(self, zooms: list[int], tile_size: int = DEFAULT_TILE_SIZE) -> None:
+        self.zooms = zooms
+        self.tile_size = tile_size
+        self.previous: dict[
+            tuple[PrecipitationsParam, Zone], tuple[str, numpy.ndarray[Any, Any]]
+        ] = {}
+        self.tiles: dict[str, numpy.ndarray[Any, Any]] = {}
+        self.linked: dict[str, str] = {}
+
+    def has_pyramid(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        tif_config: TifConfig,
+    ) -> bool:
+        pyramid_path = get_pyramid_path_for_param_in_zone_at(param, zone, timestamp)
+        return any(tile_path.startswith(f"{pyramid_path}/") for tile_path in self.tiles)
+
+    def generate_pyramid(
+        self,
+        param: PrecipitationsParam,
+        zone: Zone,
+        timestamp: int,
+        accumulation_duration: AccumulationDuration,
+        tif_config: TifConfig,
+        data: numpy.ndarray[Any, Any],
+    ) -> None:
+        pyramid_path = get_pyramid_path_for_param_in_zone_at(param, zone, timestamp)
+        colors = get_radar_palette_for(accumulation_duration).colorize(data)
+        previous_pyramid_path, previous_colors = self.previous.get(
+            (param, zone), (None, None)
+        )
+        plan = plan_pyramid(
+            tif_config, self.zooms, colors, previous_colors, self.tile_size
+        )
+        rendered = list(plan.rendered)
+        for tile in plan.linked:
+            previous_tile_path = tile.get_path_in(str(previous_pyramid_path))
+            if previous_tile_path in self.tiles:
+                self.linked[tile.get_path_in(pyramid_path)] = previous_tile_path
+                self.tiles[tile.get_path_in(pyramid_path)] = self.tiles[
+                    previous_tile_path
+                ]
+            else:
+                rendered.append(tile)
+        for tile in rendered:
+            tile_colors = render_tile(
+                colors, *get_tile_source_indexes(tif_config, tile, self.tile_size)
+            )
+            if not is_transparent(tile_colors):
+                self.tiles[tile.get_path_in(pyramid_path)] = tile_colors
+        self.previous[(param, zone)] = (pyramid_path, colors)
@@ -0,0 +1,162 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Protocol
+
+from .datetime_utils import FIVE_MINUTES_IN_SECONDS, datetime_of
+from .radaric_mf_values_accumulations import (
+    get_tifs_pathes_to_read_for_cumul_in_zone_at,
+)
+from .tiles import (
+    AccumulationDuration,
+    PrecipitationsParam,
+    Zone,
+    get_tif_path_for_param_in_zone_at,
+)
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def get_accumulations_durations_generated_at(
+    timestamp: int,
+) -> list[AccumulationDuration]:
+    dt = datetime_of(timestamp)
+    if dt.minute % 5 != 0:
+        return []
+    if dt.minute != 0:
+        return [AccumulationDuration.CUMUL_1H]
+    return [
+        AccumulationDuration.CUMUL_1H,
+        AccumulationDuration.CUMUL_3H,
+        AccumulationDuration.CUMUL_6H,
+        AccumulationDuration.CUMUL_12H,
+        AccumulationDuration.CUMUL_24H,
+        AccumulationDuration.CUMUL_72H,
+    ]
+
+
+def get_tifs_pathes_to_read_in_zone_at(zone: Zone, timestamp: int) -> list[str]:
+    tifs_pathes: list[str] = []
+    for accumulation_duration in get_accumulations_durations_generated_at(timestamp):
+        for tif_path in get_tifs_pathes_to_read_for_cumul_in_zone_at(
+            zone, timestamp, accumulation_duration
+        ):
+            if tif_path not in tifs_pathes:
+                tifs_pathes.append(tif_path)
+    return tifs_pathes
+
+
+def get_next_cycle_working_set(zones: list[Zone], timestamp: int) -> list[str]:
+    """
+    files the run following the one at timestamp will read and which already exist,
+    i.e. all of them but the 5 minutes values not received yet and the products of that run
+    """
+    next_timestamp = timestamp + FIVE_MINUTES_IN_SECONDS
+    return [
+        tif_path
+        for zone in zones
+        for tif_path in get_tifs_pathes_to_read_in_zone_at(zone, next_timestamp)
+        if tif_path not in get_tifs_pathes_of_zone_at(zone, next_timestamp)
+    ]
+
+
+def get_tifs_pathes_of_zone_at(zone: Zone, timestamp: int) -> set[str]:
+    return {
+        get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+        for param in PrecipitationsParam
+    }
+
+
+class FilePrefetcher(Protocol):
+    def prefetch(self, path: str) -> Optional[int]: ...
+
+
+class RealFilePrefetcher(FilePrefetcher):
+    """
+    asks the kernel to read the file into the page cache (posix_fadvise WILLNEED),
+    or reads it through when read_through is set or fadvise is not available
+    """
+
+    def __init__(self, read_through: bool = False) -> None:
+        self.read_through = read_through or not hasattr(os, "posix_fadvise")
+
+    def prefetch(self, path: str) -> Optional[int]:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if not self.read_through:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                return size
+            while os.read(fd, READ_CHUNK_SIZE):
+                pass
+            return size
+        finally:
+            os.close(fd)
+
+
+class InMemoryFilePrefetcher(FilePrefetcher):
+    def __init__(self, sizes: Optional[dict[str, int]] = None) -> None:
+        self.sizes: dict[str, int] = sizes or {}
+        self.prefetched: list[str] = []
+
+    def prefetch(self, path: str) -> Optional[int]:
+        size = self.sizes.get(path, None)
+        if size is not None:
+            self.prefetched.append(path)
+        return size
+
+
+class ReadAheadReport:
+    def __init__(
+        self,
+        files: int = 0,
+        missing_files: int = 0,
+        bytes: int = 0,
+        seconds: float = 0,
+    ) -> None:
+        self.files = files
+        self.missing_files = missing_files
+        self.bytes = bytes
+        self.seconds = seconds
+
+    def __str__(self) -> str:
+        return f"Read ahead {self.files} files ({self.bytes} bytes, {self.missing_files} missing): {self.seconds:.3f}s."
+
+
+def read_ahead(
+    tifs_pathes: list[str],
+    *,
+    file_prefetcher: FilePrefetcher,
+    jobs: int = 4,
+) -> ReadAheadReport:
+    """the time spent prefetching, not the time the next run saves, which is not measured"""
+    report = ReadAheadReport()
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for size in executor.map(file_prefetcher.prefetch, tifs_pathes):
+            if size is None:
+                report.missing_files += 1
+                continue
+            report.files += 1
+            report.bytes += size
+    report.seconds = time.time() - start_time
+    return report
+
+
+def read_ahead_next_cycle(
+    zones: list[Zone],
+    timestamp: int,
+    *,
+    file_prefetcher: FilePrefetcher,
+    jobs: int = 4,
+) -> ReadAheadReport:
+    report = read_ahead(
+        get_next_cycle_working_set(zones, timestamp),
+        file_prefetcher=file_prefetcher,
+        jobs=jobs,
+    )
+    print(report)
+    return report
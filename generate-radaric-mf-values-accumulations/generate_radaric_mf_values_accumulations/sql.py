@@ -1,30 +1,46 @@
 import os
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
-from sqlalchemy import Connection, CursorResult, Engine, create_engine, text
+if TYPE_CHECKING:
+    from sqlalchemy import Connection, CursorResult, Engine
 
-HOST = os.environ["DB_HOST"]
-USER = os.environ["DB_USER"]
-PASSWORD = os.environ["DB_PASSWORD"]
+# sqlalchemy and the credentials are only loaded once connecting,
+# so that the runs not updating the tiles neither wait for nor depend on them
 
 
-def get_engine(database: str = "V5") -> Engine:
-    return create_engine(f"mysql+mysqlconnector://{USER}:{PASSWORD}@{HOST}/{database}")
+def get_engine(database: str = "V5") -> "Engine":
+    from sqlalchemy import create_engine
 
+    host = os.environ["DB_HOST"]
+    user = os.environ["DB_USER"]
+    password = os.environ["DB_PASSWORD"]
+    return create_engine(f"mysql+mysqlconnector://{user}:{password}@{host}/{database}")
 
-def get_sql_connection(database: str = "V5") -> Connection:
+
+def get_sql_connection(database: str = "V5") -> "Connection":
     engine = get_engine(database)
     return engine.connect()
 
 
 def execute_sql(
-    connection: Connection, statement: str, values: Optional[dict[str, Any]] = None
-) -> CursorResult[Any]:
+    connection: "Connection", statement: str, values: Optional[dict[str, Any]] = None
+) -> "CursorResult[Any]":
+    from sqlalchemy import text
+
     return connection.execute(text(statement), values)
 
 
 def execute_and_commit_sql(
-    connection: Connection, statement: str, values: dict[str, Any]
+    connection: "Connection", statement: str, values: dict[str, Any]
 ) -> None:
     execute_sql(connection, statement, values)
     connection.commit()
+
+
+def execute_many_and_commit_sql(
+    connection: "Connection", statement: str, values: list[dict[str, Any]]
+) -> None:
+    from sqlalchemy import text
+
+    connection.execute(text(statement), values)
+    connection.commit()
@@ -1,18 +1,26 @@
 import json
 from enum import Enum
-from typing import Protocol
-
-from sqlalchemy import Connection
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol
 
 from .datetime_utils import (
     get_date_object_for,
     get_datetime_from_timestamp,
     get_timestamp_from_json_date,
 )
-from .sql import execute_and_commit_sql, execute_sql, get_sql_connection
+from .sql import (
+    execute_and_commit_sql,
+    execute_many_and_commit_sql,
+    execute_sql,
+    get_sql_connection,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy import Connection
 
 MEDIA_FS = '/media/datastore'
 TILES_PATH = MEDIA_FS + '/tempsreel.infoclimat.net/tiles'
+LOCAL_CACHE_PATH = str((Path(__file__).parent.parent / ".cache").resolve())
 
 class Zone(Enum):
     METROPOLE = "METROPOLE"
@@ -49,7 +57,7 @@ class PrecipitationsParam(Enum):
 
 
 def update_tile_last_date_object_using(
-    connection: Connection, key: str, data: dict[str, str]
+    connection: "Connection", key: str, data: dict[str, str]
 ) -> None:
     execute_and_commit_sql(
         connection,
@@ -61,6 +69,22 @@ def update_tile_last_date_object_using(
     )
 
 
+def update_tiles_last_date_objects_using(
+    connection: "Connection", data_per_key: dict[str, dict[str, str]]
+) -> None:
+    execute_many_and_commit_sql(
+        connection,
+        """
+            REPLACE INTO V5.cartes_tuiles
+            VALUES (:nom, :donnees)
+        """,
+        [
+            {"nom": key, "donnees": json.dumps(data)}
+            for key, data in data_per_key.items()
+        ],
+    )
+
+
 def update_tile_last_date_object(key: str, data: dict[str, str]) -> None:
     with get_sql_connection("V5") as connection:
         update_tile_last_date_object_using(connection, key, data)
@@ -72,9 +96,14 @@ class TilesDatetimesRepository(Protocol):
     ) -> None:
         ...
 
+    def update_tiles_last_date_objects(
+        self, data_per_key: dict[str, dict[str, str]]
+    ) -> None:
+        """in a single statement"""
+
 
 class RealTilesDatetimesRepository(TilesDatetimesRepository):
-    def __init__(self, connection: Connection) -> None:
+    def __init__(self, connection: "Connection") -> None:
         self.connection = connection
 
     def update_tile_last_date_object(
@@ -82,6 +111,11 @@ class RealTilesDatetimesRepository(TilesDatetimesRepository):
     ) -> None:
         update_tile_last_date_object_using(self.connection, key, data)
 
+    def update_tiles_last_date_objects(
+        self, data_per_key: dict[str, dict[str, str]]
+    ) -> None:
+        update_tiles_last_date_objects_using(self.connection, data_per_key)
+
 
 class InMemoryTilesDatetimesRepository(TilesDatetimesRepository):
     def __init__(self) -> None:
@@ -92,6 +126,11 @@ class InMemoryTilesDatetimesRepository(TilesDatetimesRepository):
     ) -> None:
         self.data[key] = data
 
+    def update_tiles_last_date_objects(
+        self, data_per_key: dict[str, dict[str, str]]
+    ) -> None:
+        self.data.update(data_per_key)
+
 
 def update_last_timestamp_for(key: str, timestamp: int) -> None:
     date_object = get_date_object_for(timestamp)
@@ -137,3 +176,29 @@ def get_tif_path_for_param_in_zone_at(
     dt = get_datetime_from_timestamp(timestamp)
     param_key = get_param_key_for_zone(param, zone)
     return f"{TILES_PATH}/{dt.year:04d}/{dt.month:02d}/{dt.day:02d}/{param_key}_{dt.hour:02d}_v{dt.minute:02d}.tif"
+
+
+def get_quicklook_path_for_param_in_zone_at(
+    param: PrecipitationsParam,
+    zone: Zone,
+    timestamp: int,
+    size: int,
+    quicklook_format: str,
+) -> str:
+    tif_path = get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+    return f"{tif_path.removesuffix('.tif')}_{size}px.{quicklook_format}"
+
+
+def get_vrt_path_for_param_in_zone_at(
+    param: PrecipitationsParam, zone: Zone, timestamp: int
+) -> str:
+    tif_path = get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+    return f"{tif_path.removesuffix('.tif')}.vrt"
+
+
+def get_pyramid_path_for_param_in_zone_at(
+    param: PrecipitationsParam, zone: Zone, timestamp: int
+) -> str:
+    """directory of the {zoom}/{x}/{y}.png tiles of the product"""
+    tif_path = get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+    return f"{tif_path.removesuffix('.tif')}_xyz"
@@ -0,0 +1,143 @@
+import copy
+import io
+import sys
+import time
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from multiprocessing import get_context
+from typing import Callable, Optional, TextIO
+
+from .arguments import Arguments
+from .generation import real_execute_from_arguments
+from .tiles import Zone
+
+
+class ZoneResult:
+    def __init__(self, zone: Zone, seconds: float, error: Optional[str] = None) -> None:
+        self.zone = zone
+        self.seconds = seconds
+        self.error = error
+
+    def __str__(self) -> str:
+        status = f"failed : {self.error}" if self.error else "done"
+        return f"'{self.zone.value}' {status} in {self.seconds:.3f}s"
+
+
+class ZonesFailedException(Exception):
+    def __init__(self, results: list[ZoneResult]) -> None:
+        self.results = results
+        super().__init__(
+            f"{len(results)} zones failed : {', '.join(str(result) for result in results)}"
+        )
+
+
+class PrefixedWriter(io.TextIOBase):
+    """writes whole lines, each one prefixed, so that the logs of the workers interleave line by line"""
+
+    def __init__(self, stream: TextIO, prefix: str) -> None:
+        self.stream = stream
+        self.prefix = prefix
+        self.pending = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        *lines, self.pending = (self.pending + text).split("\n")
+        if lines:
+            self.stream.write("".join(f"{self.prefix}{line}\n" for line in lines))
+            self.stream.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if self.pending:
+            self.stream.write(f"{self.prefix}{self.pending}\n")
+            self.pending = ""
+        self.stream.flush()
+
+
+def is_executed_per_zone(arguments: Arguments) -> bool:
+    return (
+        arguments.jobs > 1
+        and len(arguments.zones) > 1
+        and not arguments.daemon
+        and not arguments.serve
+        and not arguments.rebuild_catalog
+    )
+
+
+def get_arguments_per_zone(arguments: Arguments) -> list[Arguments]:
+    """
+    the timestamps of a zone stay in order in the same worker,
+    the accumulations of a timestamp reading the products of the previous ones,
+    each worker evicting from its own share of the local cache
+    """
+    arguments_per_zone: list[Arguments] = []
+    for zone in arguments.zones:
+        zone_arguments = copy.copy(arguments)
+        zone_arguments.zones = [zone]
+        zone_arguments.jobs = 1
+        if arguments.local_cache_size:
+            zone_arguments.local_cache_size = max(
+                arguments.local_cache_size // len(arguments.zones), 1
+            )
+            zone_arguments.local_cache_path = (
+                f"{arguments.local_cache_path}_{zone.value}"
+            )
+        arguments_per_zone.append(zone_arguments)
+    return arguments_per_zone
+
+
+def execute_zone(arguments: Arguments) -> ZoneResult:
+    """in a worker process, with its own caches and connection to the database"""
+    zone = arguments.zones[0]
+    prefix = f"[{zone.value}] "
+    stdout = PrefixedWriter(sys.stdout, prefix)
+    stderr = PrefixedWriter(sys.stderr, prefix)
+    start_time = time.time()
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                real_execute_from_arguments(arguments)
+            except Exception as e:
+                traceback.print_exc()
+                return ZoneResult(zone, time.time() - start_time, repr(e))
+    finally:
+        stdout.flush()
+        stderr.flush()
+    return ZoneResult(zone, time.time() - start_time)
+
+
+def execute_zones_with(
+    arguments: Arguments,
+    *,
+    executor: Executor,
+    execute: Callable[[Arguments], ZoneResult] = execute_zone,
+) -> list[ZoneResult]:
+    start_time = time.time()
+    futures = [
+        executor.submit(execute, zone_arguments)
+        for zone_arguments in get_arguments_per_zone(arguments)
+    ]
+    results: list[ZoneResult] = []
+    for zone, future in zip(arguments.zones, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            # e.g. a worker killed
+            results.append(ZoneResult(zone, time.time() - start_time, repr(e)))
+    for result in results:
+        print(result)
+    print(f"Took {time.time() - start_time} s for {len(results)} zones.")
+    failed_results = [result for result in results if result.error is not None]
+    if failed_results:
+        raise ZonesFailedException(failed_results)
+    return results
+
+
+def execute_zones_in_parallel(arguments: Arguments) -> list[ZoneResult]:
+    with ProcessPoolExecutor(
+        min(arguments.jobs, len(arguments.zones)), mp_context=get_context("spawn")
+    ) as executor:
+        return execute_zones_with(arguments, executor=executor)
@@ -0,0 +1,175 @@
+import unittest
+
+import numpy
+from generate_radaric_mf_values_accumulations.archives import (
+    ArchiveFileExistenceChecker,
+    ArchiveTifLocator,
+    ArchiveTifReader,
+    get_archive_path_for_param_in_zone_on,
+    get_archived_timestamps_on,
+    get_band_indexes_per_timestamp,
+    get_day_start_of,
+    is_day_closed,
+)
+from generate_radaric_mf_values_accumulations.datetime_utils import (
+    get_timestamp_from_iso_utc_date,
+)
+from generate_radaric_mf_values_accumulations.generation import (
+    InMemoryFileExistenceChecker,
+    InMemoryTifLocator,
+    InMemoryTifReader,
+    TifLocator,
+)
+from generate_radaric_mf_values_accumulations.tiles import PrecipitationsParam, Zone
+
+MEDIA_FS = "/media/datastore"
+TILES_PATH = f"{MEDIA_FS}/tempsreel.infoclimat.net/tiles"
+
+
+class InMemoryArchiveTifLocator(ArchiveTifLocator):
+    def __init__(
+        self,
+        tif_locator: TifLocator,
+        band_indexes_per_archive: dict[str, dict[int, int]],
+    ) -> None:
+        super().__init__(tif_locator)
+        self.in_memory_band_indexes = band_indexes_per_archive
+
+    def get_band_indexes_of(self, archive_path: str) -> dict[int, int]:
+        return self.in_memory_band_indexes.get(archive_path, {})
+
+
+class TestArchives(unittest.TestCase):
+    maxDiff = None
+
+    def test_get_day_start_of(self) -> None:
+        self.assertEqual(
+            get_timestamp_from_iso_utc_date("2000-06-15T00:00:00Z"),
+            get_day_start_of(get_timestamp_from_iso_utc_date("2000-06-15T12:30:45Z")),
+        )
+
+    def test_get_archive_path_for_param_in_zone_on(self) -> None:
+        self.assertEqual(
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_ANTILLES_day.tif",
+            get_archive_path_for_param_in_zone_on(
+                PrecipitationsParam.VALUES_5MN,
+                Zone.ANTILLES,
+                get_timestamp_from_iso_utc_date("2000-06-15T12:30:45Z"),
+            ),
+        )
+
+    def test_get_archived_timestamps_on(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:45Z")
+        five_minutes = get_archived_timestamps_on(
+            PrecipitationsParam.VALUES_5MN, timestamp
+        )
+        self.assertEqual(288, len(five_minutes))
+        self.assertEqual(
+            get_timestamp_from_iso_utc_date("2000-06-15T00:00:00Z"), five_minutes[0]
+        )
+        self.assertEqual(
+            get_timestamp_from_iso_utc_date("2000-06-15T23:55:00Z"), five_minutes[-1]
+        )
+        hours = get_archived_timestamps_on(PrecipitationsParam.VALUES_1H, timestamp)
+        self.assertEqual(24, len(hours))
+        self.assertEqual(
+            get_timestamp_from_iso_utc_date("2000-06-15T23:00:00Z"), hours[-1]
+        )
+
+    def test_is_day_closed(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:45Z")
+        self.assertFalse(
+            is_day_closed(
+                timestamp, get_timestamp_from_iso_utc_date("2000-06-16T01:00:00Z")
+            )
+        )
+        self.assertTrue(
+            is_day_closed(
+                timestamp, get_timestamp_from_iso_utc_date("2000-06-16T02:00:00Z")
+            )
+        )
+
+    def test_get_band_indexes_per_timestamp(self) -> None:
+        self.assertEqual({}, get_band_indexes_per_timestamp(None))
+        self.assertEqual(
+            {961027200: 1, 961027500: 2},
+            get_band_indexes_per_timestamp("[961027200, 961027500]"),
+        )
+
+    def test_ArchiveTifReader_whenLooseTif(self) -> None:
+        tif_path = (
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_ANTILLES_12_v30.tif"
+        )
+        tif_reader = ArchiveTifReader(
+            InMemoryTifReader({tif_path: numpy.array([[1, 2], [3, 4]])})
+        )
+        self.assertTrue(
+            numpy.array_equal(
+                numpy.array([[1, 2], [3, 4]]), tif_reader.read_tif(tif_path)
+            )
+        )
+        self.assertEqual({}, tif_reader.archives)
+
+    def test_ArchiveTifReader_whenNotArchived(self) -> None:
+        tif_reader = ArchiveTifReader(InMemoryTifReader())
+        self.assertIsNone(
+            tif_reader.read_tif(
+                f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_ANTILLES_12_v00.tif"
+            )
+        )
+        self.assertEqual({}, tif_reader.archives)
+
+    def test_ArchiveTifLocator(self) -> None:
+        loose_path = (
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_ANTILLES_12_v30.tif"
+        )
+        packed_path = (
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_ANTILLES_12_v35.tif"
+        )
+        archive_path = get_archive_path_for_param_in_zone_on(
+            PrecipitationsParam.VALUES_5MN,
+            Zone.ANTILLES,
+            get_timestamp_from_iso_utc_date("2000-06-15T12:35:00Z"),
+        )
+        tif_locator = InMemoryArchiveTifLocator(
+            InMemoryTifLocator({loose_path: (loose_path, 1)}),
+            {
+                archive_path: {
+                    get_timestamp_from_iso_utc_date("2000-06-15T12:35:00Z"): 152
+                }
+            },
+        )
+        self.assertEqual((loose_path, 1), tif_locator.locate(loose_path))
+        self.assertEqual((archive_path, 152), tif_locator.locate(packed_path))
+        self.assertIsNone(
+            tif_locator.locate(
+                f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_ANTILLES_12_v40.tif"
+            )
+        )
+        self.assertIsNone(
+            tif_locator.locate(
+                f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_ANTILLES_12_v00.tif"
+            )
+        )
+
+        file_existence_checker = ArchiveFileExistenceChecker(
+            InMemoryFileExistenceChecker({loose_path}), tif_locator
+        )
+        self.assertTrue(file_existence_checker.exists(loose_path))
+        self.assertTrue(file_existence_checker.exists(packed_path))
+        self.assertFalse(
+            file_existence_checker.exists(
+                f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_ANTILLES_12_v40.tif"
+            )
+        )
+
+    def test_ArchiveTifLocator_whenNoArchive(self) -> None:
+        self.assertIsNone(
+            ArchiveTifLocator(InMemoryTifLocator()).locate(
+                f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_ANTILLES_12_v35.tif"
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
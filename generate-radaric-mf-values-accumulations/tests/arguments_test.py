@@ -2,7 +2,14 @@ import argparse
 import unittest
 
 from generate_radaric_mf_values_accumulations.arguments import ZONES, parse_arguments
-from generate_radaric_mf_values_accumulations.tiles import Zone
+from generate_radaric_mf_values_accumulations.client import DEFAULT_SOCKET_PATH
+from generate_radaric_mf_values_accumulations.compression import Codec
+from generate_radaric_mf_values_accumulations.local_cache import LOCAL_TILES_CACHE_PATH
+from generate_radaric_mf_values_accumulations.tiles import (
+    AccumulationDuration,
+    PrecipitationsParam,
+    Zone,
+)
 
 
 class TestArguments(unittest.TestCase):
@@ -177,6 +184,397 @@ class TestArguments(unittest.TestCase):
         arguments = parse_arguments(["--timestamp", "961072245", "--replace"])
         self.assertTrue(arguments.replace)
 
+    def test_parseArguments_whenNoCatalog(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertFalse(arguments.use_catalog)
+        self.assertFalse(arguments.rebuild_catalog)
+
+    def test_parseArguments_whenCatalog(self) -> None:
+        arguments = parse_arguments(
+            ["--timestamp", "961072245", "--use-catalog", "--rebuild-catalog"]
+        )
+        self.assertTrue(arguments.use_catalog)
+        self.assertTrue(arguments.rebuild_catalog)
+
+    def test_parseArguments_whenNoStreamBlocks(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertIsNone(arguments.block_size)
+
+    def test_parseArguments_whenStreamBlocks(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245", "--stream-blocks"])
+        self.assertEqual(256, arguments.block_size)
+        arguments = parse_arguments(
+            ["--timestamp", "961072245", "--stream-blocks", "512"]
+        )
+        self.assertEqual(512, arguments.block_size)
+
+    def test_parseArguments_whenReadAhead(self) -> None:
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).read_ahead)
+        self.assertTrue(
+            parse_arguments(["--timestamp", "961072245", "--read-ahead"]).read_ahead
+        )
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).read_through)
+        self.assertTrue(
+            parse_arguments(
+                ["--timestamp", "961072245", "--read-ahead", "--read-through"]
+            ).read_through
+        )
+
+    def test_parseArguments_whenLocalCache(self) -> None:
+        self.assertIsNone(
+            parse_arguments(["--timestamp", "961072245"]).local_cache_size
+        )
+        self.assertEqual(
+            2048,
+            parse_arguments(
+                ["--timestamp", "961072245", "--local-cache"]
+            ).local_cache_size,
+        )
+        self.assertEqual(
+            100,
+            parse_arguments(
+                ["--timestamp", "961072245", "--local-cache", "100"]
+            ).local_cache_size,
+        )
+        self.assertEqual(
+            LOCAL_TILES_CACHE_PATH,
+            parse_arguments(["--timestamp", "961072245"]).local_cache_path,
+        )
+        self.assertEqual(
+            "/tmp/cache",
+            parse_arguments(
+                ["--timestamp", "961072245", "--local-cache-path", "/tmp/cache"]
+            ).local_cache_path,
+        )
+
+    def test_parseArguments_whenPackArchives(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertFalse(arguments.pack_archives)
+        self.assertFalse(arguments.remove_packed)
+        arguments = parse_arguments(
+            [
+                "--timestamp",
+                "961072245",
+                "--pack-archives",
+                "--remove-packed",
+                "--read-archives",
+            ]
+        )
+        self.assertTrue(arguments.pack_archives)
+        self.assertTrue(arguments.remove_packed)
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--pack-archives", "--remove-packed"],
+                exit_on_error=False,
+            )
+
+    def test_parseArguments_whenReadArchives(self) -> None:
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).read_archives)
+        self.assertTrue(
+            parse_arguments(
+                ["--timestamp", "961072245", "--read-archives"]
+            ).read_archives
+        )
+
+    def test_parseArguments_whenPipeline(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertIsNone(arguments.pipeline_workers)
+        self.assertEqual(2, arguments.pipeline_queue_size)
+        self.assertEqual(
+            [2, 2, 2],
+            parse_arguments(
+                ["--timestamp", "961072245", "--pipeline"]
+            ).pipeline_workers,
+        )
+        arguments = parse_arguments(
+            [
+                "--timestamp",
+                "961072245",
+                "--pipeline",
+                "4,1,3",
+                "--pipeline-queue-size",
+                "8",
+            ]
+        )
+        self.assertEqual([4, 1, 3], arguments.pipeline_workers)
+        self.assertEqual(8, arguments.pipeline_queue_size)
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--pipeline", "4,2"],
+                exit_on_error=False,
+            )
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                [
+                    "--timestamp",
+                    "961072245",
+                    "--pipeline",
+                    "--pipeline-queue-size",
+                    "0",
+                ],
+                exit_on_error=False,
+            )
+        for option in [
+            "--stream-blocks",
+            "--manifest",
+            "--background-writes",
+            "--publish-at-once",
+        ]:
+            with self.assertRaises(argparse.ArgumentError):
+                parse_arguments(
+                    ["--timestamp", "961072245", "--pipeline", option],
+                    exit_on_error=False,
+                )
+
+    def test_parseArguments_whenPalettedColors(self) -> None:
+        self.assertEqual(
+            [], parse_arguments(["--timestamp", "961072245"]).paletted_params
+        )
+        self.assertEqual(
+            [
+                PrecipitationsParam.COLOR_1H,
+                PrecipitationsParam.COLOR_3H,
+                PrecipitationsParam.COLOR_6H,
+                PrecipitationsParam.COLOR_12H,
+                PrecipitationsParam.COLOR_24H,
+                PrecipitationsParam.COLOR_72H,
+            ],
+            parse_arguments(
+                ["--timestamp", "961072245", "--paletted-colors"]
+            ).paletted_params,
+        )
+        self.assertEqual(
+            [PrecipitationsParam.COLOR_3H, PrecipitationsParam.COLOR_6H],
+            parse_arguments(
+                [
+                    "--timestamp",
+                    "961072245",
+                    "--paletted-colors",
+                    "ac3hradaric_MF",
+                    "ac6hradaric_MF",
+                ]
+            ).paletted_params,
+        )
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--paletted-colors", "ac3hradaricval_MF"],
+                exit_on_error=False,
+            )
+
+    def test_parseArguments_whenSparse(self) -> None:
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).sparse)
+        self.assertTrue(
+            parse_arguments(["--timestamp", "961072245", "--sparse"]).sparse
+        )
+
+    def test_parseArguments_whenDeduplicate(self) -> None:
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).deduplicate)
+        self.assertTrue(
+            parse_arguments(["--timestamp", "961072245", "--deduplicate"]).deduplicate
+        )
+
+    def test_parseArguments_whenCodecs(self) -> None:
+        arguments = parse_arguments(
+            [
+                "--timestamp",
+                "961072245",
+                "--codec",
+                "ac3hradaricval_MF=zstd,level=9,predictor=floating_point",
+                "--codec",
+                "ac3hradaric_MF=DEFLATE,LEVEL=6,PREDICTOR=STANDARD",
+                "--benchmark-codecs",
+            ]
+        )
+        self.assertEqual(
+            {
+                PrecipitationsParam.VALUES_3H: Codec("ZSTD", 9, "FLOATING_POINT"),
+                PrecipitationsParam.COLOR_3H: Codec("DEFLATE", 6, "STANDARD"),
+            },
+            arguments.codecs,
+        )
+        self.assertTrue(arguments.benchmark_codecs)
+        self.assertEqual({}, parse_arguments(["--timestamp", "961072245"]).codecs)
+        for codec in [
+            "ac3hradaric_MF=LERC,MAX_Z_ERROR=0.1",
+            "ac3hradaric_MF=LZW,PREDICTOR=FLOATING_POINT",
+            "ac3hradaricval_MF=LZW,LEVEL=9",
+            "unknown_MF=LZW",
+        ]:
+            with self.assertRaises(argparse.ArgumentError):
+                parse_arguments(
+                    ["--timestamp", "961072245", "--codec", codec],
+                    exit_on_error=False,
+                )
+
+    def test_parseArguments_whenOverviews(self) -> None:
+        self.assertIsNone(parse_arguments(["--timestamp", "961072245"]).overview_levels)
+        self.assertEqual(
+            [2, 4, 8, 16],
+            parse_arguments(
+                ["--timestamp", "961072245", "--overviews"]
+            ).overview_levels,
+        )
+        self.assertEqual(
+            [4, 16],
+            parse_arguments(
+                ["--timestamp", "961072245", "--overviews", "4", "16"]
+            ).overview_levels,
+        )
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--overviews", "1"],
+                exit_on_error=False,
+            )
+
+    def test_parseArguments_whenBackgroundWrites(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertIsNone(arguments.background_writers)
+        self.assertEqual(4, arguments.background_queue_size)
+        arguments = parse_arguments(
+            [
+                "--timestamp",
+                "961072245",
+                "--background-writes",
+                "--background-queue-size",
+                "8",
+            ]
+        )
+        self.assertEqual(2, arguments.background_writers)
+        self.assertEqual(8, arguments.background_queue_size)
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                [
+                    "--timestamp",
+                    "961072245",
+                    "--background-writes",
+                    "--background-queue-size",
+                    "0",
+                ],
+                exit_on_error=False,
+            )
+
+    def test_parseArguments_whenPublishAtOnce(self) -> None:
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).publish_at_once)
+        self.assertTrue(
+            parse_arguments(
+                ["--timestamp", "961072245", "--publish-at-once"]
+            ).publish_at_once
+        )
+
+    def test_parseArguments_whenQuicklooks(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertIsNone(arguments.quicklook_sizes)
+        self.assertEqual("png", arguments.quicklook_format)
+        self.assertEqual(
+            [256],
+            parse_arguments(
+                ["--timestamp", "961072245", "--quicklooks"]
+            ).quicklook_sizes,
+        )
+        arguments = parse_arguments(
+            [
+                "--timestamp",
+                "961072245",
+                "--quicklooks",
+                "128",
+                "512",
+                "--quicklooks-format",
+                "webp",
+            ]
+        )
+        self.assertEqual([128, 512], arguments.quicklook_sizes)
+        self.assertEqual("webp", arguments.quicklook_format)
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--quicklooks", "0"],
+                exit_on_error=False,
+            )
+
+    def test_parseArguments_whenXYZTiles(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertIsNone(arguments.xyz_zooms)
+        self.assertEqual(4, arguments.xyz_workers)
+        self.assertEqual(
+            [4, 5, 6, 7, 8, 9],
+            parse_arguments(["--timestamp", "961072245", "--xyz-tiles"]).xyz_zooms,
+        )
+        arguments = parse_arguments(
+            ["--timestamp", "961072245", "--xyz-tiles", "6-8", "--xyz-workers", "8"]
+        )
+        self.assertEqual([6, 7, 8], arguments.xyz_zooms)
+        self.assertEqual(8, arguments.xyz_workers)
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--xyz-tiles", "9-4"],
+                exit_on_error=False,
+            )
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--xyz-tiles", "--xyz-workers", "0"],
+                exit_on_error=False,
+            )
+
+    def test_parseArguments_whenVirtualValues(self) -> None:
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).virtual_values)
+        self.assertTrue(
+            parse_arguments(
+                ["--timestamp", "961072245", "--virtual-values"]
+            ).virtual_values
+        )
+
+    def test_manifest(self) -> None:
+        self.assertFalse(parse_arguments(["--timestamp", "961072245"]).manifest)
+        self.assertTrue(
+            parse_arguments(["--timestamp", "961072245", "--manifest"]).manifest
+        )
+
+    def test_daemon(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertFalse(arguments.daemon)
+        self.assertFalse(arguments.polling)
+        self.assertEqual(10.0, arguments.polling_interval)
+        arguments = parse_arguments(["--daemon", "--poll", "--polling-interval", "2.5"])
+        self.assertTrue(arguments.daemon)
+        self.assertTrue(arguments.polling)
+        self.assertEqual(2.5, arguments.polling_interval)
+        self.assertEqual(0, arguments.start % 300)
+        self.assertEqual(arguments.start, arguments.end)
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--daemon", "--timestamp", "961072245"], exit_on_error=False
+            )
+
+    def test_durations(self) -> None:
+        self.assertEqual([], parse_arguments(["--timestamp", "961072245"]).durations)
+        self.assertEqual(
+            [AccumulationDuration.CUMUL_1H, AccumulationDuration.CUMUL_24H],
+            parse_arguments(
+                ["--timestamp", "961072245", "--duration", "1h", "--duration", "24h"]
+            ).durations,
+        )
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--duration", "5mn"], exit_on_error=False
+            )
+
+    def test_serve(self) -> None:
+        arguments = parse_arguments(["--timestamp", "961072245"])
+        self.assertFalse(arguments.serve)
+        self.assertEqual(DEFAULT_SOCKET_PATH, arguments.socket_path)
+        arguments = parse_arguments(["--serve", "--socket", "/run/jobs.sock"])
+        self.assertTrue(arguments.serve)
+        self.assertEqual("/run/jobs.sock", arguments.socket_path)
+
+    def test_jobs(self) -> None:
+        self.assertEqual(1, parse_arguments(["--timestamp", "961072245"]).jobs)
+        self.assertEqual(
+            3, parse_arguments(["--timestamp", "961072245", "--jobs", "3"]).jobs
+        )
+        with self.assertRaises(argparse.ArgumentError):
+            parse_arguments(
+                ["--timestamp", "961072245", "--jobs", "0"], exit_on_error=False
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
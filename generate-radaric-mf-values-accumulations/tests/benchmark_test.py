@@ -0,0 +1,73 @@
+import unittest
+
+import numpy
+
+from generate_radaric_mf_values_accumulations.benchmark import (
+    BenchmarkRaster,
+    InMemoryRasterEncoder,
+    add_missing_codecs,
+    benchmark_codecs,
+    get_max_error,
+)
+from generate_radaric_mf_values_accumulations.compression import parse_codec
+from generate_radaric_mf_values_accumulations.generation import (
+    TifConfig,
+)
+
+
+class TestBenchmark(unittest.TestCase):
+    maxDiff = None
+
+    def test_benchmark_codecs(self) -> None:
+        tif_config = TifConfig(
+            cols=32,
+            rows=16,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        rasters = [
+            BenchmarkRaster(
+                "/tif/dry", tif_config, numpy.zeros((16, 32), numpy.float32)
+            ),
+            BenchmarkRaster(
+                "/tif/rain",
+                tif_config,
+                numpy.random.default_rng(0)
+                .gamma(0.5, 20, (16, 32))
+                .astype(numpy.float32),
+            ),
+        ]
+        codecs = [parse_codec("DEFLATE,LEVEL=1"), parse_codec("DEFLATE,LEVEL=9")]
+        codec_benchmarks = benchmark_codecs(
+            codecs, rasters, raster_encoder=InMemoryRasterEncoder()
+        )
+        self.assertEqual(
+            codecs, [codec_benchmark.codec for codec_benchmark in codec_benchmarks]
+        )
+        for codec_benchmark in codec_benchmarks:
+            self.assertEqual(2, codec_benchmark.rasters)
+            self.assertEqual(2 * 16 * 32 * 4, codec_benchmark.raw_size)
+            self.assertLess(0, codec_benchmark.size)
+            self.assertLess(codec_benchmark.get_ratio(), 1)
+            self.assertEqual(0, codec_benchmark.max_error)
+            self.assertIn(str(codec_benchmark.codec), str(codec_benchmark))
+
+    def test_get_max_error(self) -> None:
+        self.assertEqual(
+            0.5,
+            get_max_error(
+                numpy.array([[1.0, numpy.nan, 3.5]]), numpy.array([1.0, numpy.nan, 3.0])
+            ),
+        )
+
+    def test_add_missing_codecs(self) -> None:
+        self.assertEqual(
+            [parse_codec("LZW"), parse_codec("ZSTD,LEVEL=1")],
+            add_missing_codecs(
+                [parse_codec("LZW")], [parse_codec("lzw"), parse_codec("ZSTD,LEVEL=1")]
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import unittest
+
+from generate_radaric_mf_values_accumulations.catalog import (
+    InMemoryProductsCatalog,
+    ProductRecord,
+    SQLiteProductsCatalog,
+    crawl_tiles_into_catalog,
+    get_day_directory_at,
+    get_missing_timestamps,
+    parse_tif_path,
+)
+from generate_radaric_mf_values_accumulations.datetime_utils import (
+    FIVE_MINUTES_IN_SECONDS,
+    get_timestamp_from_iso_utc_date,
+)
+from generate_radaric_mf_values_accumulations.tiles import (
+    PrecipitationsParam,
+    Zone,
+    get_tif_path_for_param_in_zone_at,
+)
+
+MEDIA_FS = "/media/datastore"
+TILES_PATH = f"{MEDIA_FS}/tempsreel.infoclimat.net/tiles"
+
+
+class TestCatalog(unittest.TestCase):
+    maxDiff = None
+
+    def test_parse_tif_path(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:00Z")
+        for param in PrecipitationsParam:
+            for zone in Zone:
+                self.assertEqual(
+                    (param, zone, timestamp),
+                    parse_tif_path(
+                        get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+                    ),
+                )
+
+    def test_parseTifPath_whenUnknown(self) -> None:
+        self.assertIsNone(
+            parse_tif_path(f"{TILES_PATH}/2000/06/15/unknown_METROPOLE_12_v30.tif")
+        )
+        self.assertIsNone(
+            parse_tif_path(f"{TILES_PATH}/2000/06/15/radaric_MF_METROPOLE.tif")
+        )
+        self.assertIsNone(parse_tif_path("/tmp/radaric_MF_METROPOLE_12_v30.tif"))
+        self.assertIsNone(
+            parse_tif_path(f"{TILES_PATH}/2000/06/31/radaric_MF_METROPOLE_12_v30.tif")
+        )
+
+    def test_get_day_directory_at(self) -> None:
+        self.assertEqual(
+            f"{TILES_PATH}/2000/06/15",
+            get_day_directory_at(
+                get_timestamp_from_iso_utc_date("2000-06-15T12:30:00Z")
+            ),
+        )
+
+    def test_SQLiteProductsCatalog(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:00Z")
+        record = ProductRecord(
+            f"{TILES_PATH}/2000/06/15/ac60radaric_MF_METROPOLE_12_v30.tif",
+            PrecipitationsParam.VALUES_1H,
+            Zone.METROPOLE,
+            timestamp,
+            size=1234,
+            mtime=961072245.5,
+            cols=2,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+            minimum=0,
+            maximum=12.5,
+            nonzero=4,
+        )
+        other_record = ProductRecord(
+            f"{TILES_PATH}/2000/06/15/ac60radaric_MF_METROPOLE_13_v30.tif",
+            PrecipitationsParam.VALUES_1H,
+            Zone.METROPOLE,
+            timestamp + 3600,
+        )
+        catalog = SQLiteProductsCatalog(":memory:")
+        catalog.add_products([other_record, record])
+        self.assertEqual(record, catalog.get_product(record.path))
+        self.assertIsNone(catalog.get_product("/unknown.tif"))
+        self.assertEqual(
+            [record, other_record],
+            catalog.get_products(
+                PrecipitationsParam.VALUES_1H,
+                Zone.METROPOLE,
+                timestamp,
+                timestamp + 3600,
+            ),
+        )
+        self.assertEqual(
+            [],
+            catalog.get_products(
+                PrecipitationsParam.VALUES_1H, Zone.REUNION, timestamp, timestamp
+            ),
+        )
+
+    def test_get_missing_timestamps(self) -> None:
+        start = get_timestamp_from_iso_utc_date("2000-06-15T12:00:00Z")
+        catalog = InMemoryProductsCatalog(
+            [
+                ProductRecord(
+                    get_tif_path_for_param_in_zone_at(
+                        PrecipitationsParam.VALUES_5MN, Zone.METROPOLE, t
+                    ),
+                    PrecipitationsParam.VALUES_5MN,
+                    Zone.METROPOLE,
+                    t,
+                )
+                for t in [start, start + 2 * FIVE_MINUTES_IN_SECONDS]
+            ]
+        )
+        self.assertEqual(
+            [start + FIVE_MINUTES_IN_SECONDS, start + 3 * FIVE_MINUTES_IN_SECONDS],
+            get_missing_timestamps(
+                catalog,
+                PrecipitationsParam.VALUES_5MN,
+                Zone.METROPOLE,
+                start,
+                start + 3 * FIVE_MINUTES_IN_SECONDS,
+                FIVE_MINUTES_IN_SECONDS,
+            ),
+        )
+
+    def test_crawl_tiles_into_catalog(self) -> None:
+        start = get_timestamp_from_iso_utc_date("2000-06-15T12:30:00Z")
+        end = get_timestamp_from_iso_utc_date("2000-06-17T12:30:00Z")
+        with tempfile.TemporaryDirectory() as tiles_path:
+            for directory, file_name in [
+                ("2000/06/15", "radaric_MF_METROPOLE_12_v30.tif"),
+                ("2000/06/15", "unknown.tif"),
+                ("2000/06/17", "ac24hradaric_MF_REUNION_00_v00.tif"),
+                ("2000/06/18", "radaric_MF_METROPOLE_12_v30.tif"),
+            ]:
+                os.makedirs(os.path.join(tiles_path, directory), exist_ok=True)
+                with open(os.path.join(tiles_path, directory, file_name), "w") as f:
+                    f.write("tif")
+            catalog = InMemoryProductsCatalog()
+            self.assertEqual(
+                2,
+                crawl_tiles_into_catalog(
+                    catalog, start, end, tiles_path=tiles_path, jobs=2
+                ),
+            )
+            self.assertEqual(
+                [
+                    f"{tiles_path}/2000/06/15/radaric_MF_METROPOLE_12_v30.tif",
+                    f"{tiles_path}/2000/06/17/ac24hradaric_MF_REUNION_00_v00.tif",
+                ],
+                sorted(catalog.records.keys()),
+            )
+            record = catalog.records[
+                f"{tiles_path}/2000/06/17/ac24hradaric_MF_REUNION_00_v00.tif"
+            ]
+            self.assertEqual(PrecipitationsParam.COLOR_24H, record.param)
+            self.assertEqual(Zone.REUNION, record.zone)
+            self.assertEqual(
+                get_timestamp_from_iso_utc_date("2000-06-17T00:00:00Z"),
+                record.timestamp,
+            )
+            self.assertEqual(3, record.size)
+
+
+if __name__ == "__main__":
+    unittest.main()
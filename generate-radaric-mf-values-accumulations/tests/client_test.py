@@ -0,0 +1,79 @@
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+from generate_radaric_mf_values_accumulations.client import (
+    DEFAULT_SOCKET_PATH,
+    encode_message,
+    parse_client_arguments,
+    print_job_response,
+    read_message,
+)
+
+
+class TestClient(unittest.TestCase):
+    maxDiff = None
+
+    def test_messages(self) -> None:
+        stream = io.BytesIO(
+            encode_message({"timestamp": 961074000}) + encode_message({})
+        )
+        self.assertEqual({"timestamp": 961074000}, read_message(stream))
+        self.assertEqual({}, read_message(stream))
+        self.assertIsNone(read_message(stream))
+
+    def test_parse_client_arguments(self) -> None:
+        self.assertEqual(
+            {
+                "socket_path": DEFAULT_SOCKET_PATH,
+                "request": {
+                    "timestamp": 961074000,
+                    "zones": ["METROPOLE"],
+                    "replace": True,
+                    "durations": ["1h", "3h"],
+                },
+            },
+            parse_client_arguments(
+                [
+                    "--timestamp",
+                    "961074000",
+                    "--zone",
+                    "METROPOLE",
+                    "--replace",
+                    "--duration",
+                    "1h",
+                    "--duration",
+                    "3h",
+                ]
+            ),
+        )
+
+    def test_print_job_response(self) -> None:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            exit_code = print_job_response(
+                {
+                    "ok": True,
+                    "seconds": 1.5,
+                    "products": [
+                        {
+                            "zone": "METROPOLE",
+                            "timestamp": 961074000,
+                            "duration": "3h",
+                            "status": "generated",
+                            "seconds": 1.25,
+                        }
+                    ],
+                }
+            )
+        self.assertEqual(0, exit_code)
+        self.assertEqual(
+            "METROPOLE            2000-06-15 13:00   3h generated  1.250s\nTook 1.5 s.\n",
+            output.getvalue(),
+        )
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            self.assertEqual(1, print_job_response({"ok": False, "error": "failed"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+from generate_radaric_mf_values_accumulations.compression import (
+    DEFAULT_COLOR_CODEC,
+    DEFAULT_VALUES_CODEC,
+    Codec,
+    check_codec_for,
+    get_codec_for_tif_path,
+    get_param_of_tif_path,
+    parse_codec,
+)
+from generate_radaric_mf_values_accumulations.tiles import PrecipitationsParam
+
+
+class TestCompression(unittest.TestCase):
+    maxDiff = None
+
+    def test_parse_codec(self) -> None:
+        self.assertEqual(Codec("LZW"), parse_codec("lzw"))
+        self.assertEqual(
+            Codec("ZSTD", level=9, predictor="FLOATING_POINT"),
+            parse_codec("ZSTD,LEVEL=9,PREDICTOR=FLOATING_POINT"),
+        )
+        self.assertEqual(
+            Codec("LERC_DEFLATE", level=6, max_z_error=0.01),
+            parse_codec("LERC_DEFLATE,LEVEL=6,MAX_Z_ERROR=0.01"),
+        )
+        self.assertEqual(
+            "LERC_DEFLATE,LEVEL=6,MAX_Z_ERROR=0.01",
+            str(parse_codec("LERC_DEFLATE,LEVEL=6,MAX_Z_ERROR=0.01")),
+        )
+        for value in [
+            "JPEG",
+            "LZW,LEVEL=9",
+            "DEFLATE,PREDICTOR=YES",
+            "ZSTD,MAX_Z_ERROR=0.1",
+            "ZSTD,QUALITY=9",
+        ]:
+            with self.assertRaises(ValueError, msg=value):
+                parse_codec(value)
+
+    def test_get_gtiff_creation_options(self) -> None:
+        self.assertEqual(
+            ["COMPRESS=LZW"], DEFAULT_VALUES_CODEC.get_gtiff_creation_options()
+        )
+        self.assertEqual(
+            ["COMPRESS=ZSTD", "ZSTD_LEVEL=9", "PREDICTOR=3"],
+            parse_codec(
+                "ZSTD,LEVEL=9,PREDICTOR=FLOATING_POINT"
+            ).get_gtiff_creation_options(),
+        )
+        self.assertEqual(
+            ["COMPRESS=DEFLATE", "ZLEVEL=6", "PREDICTOR=2"],
+            parse_codec(
+                "DEFLATE,LEVEL=6,PREDICTOR=STANDARD"
+            ).get_gtiff_creation_options(),
+        )
+        self.assertEqual(
+            ["COMPRESS=LERC_ZSTD", "ZSTD_LEVEL=1", "MAX_Z_ERROR=0.1"],
+            parse_codec(
+                "LERC_ZSTD,LEVEL=1,MAX_Z_ERROR=0.1"
+            ).get_gtiff_creation_options(),
+        )
+
+    def test_get_cog_creation_options(self) -> None:
+        self.assertEqual(
+            ["COMPRESS=LZW", "PREDICTOR=STANDARD"],
+            DEFAULT_COLOR_CODEC.get_cog_creation_options(),
+        )
+        self.assertEqual(
+            ["COMPRESS=ZSTD", "LEVEL=9", "PREDICTOR=STANDARD"],
+            parse_codec("ZSTD,LEVEL=9,PREDICTOR=STANDARD").get_cog_creation_options(),
+        )
+
+    def test_check_codec_for(self) -> None:
+        check_codec_for(
+            PrecipitationsParam.VALUES_3H, parse_codec("LERC,MAX_Z_ERROR=0.1")
+        )
+        check_codec_for(PrecipitationsParam.COLOR_3H, parse_codec("LERC,MAX_Z_ERROR=0"))
+        with self.assertRaises(ValueError):
+            check_codec_for(
+                PrecipitationsParam.COLOR_3H, parse_codec("LERC,MAX_Z_ERROR=0.1")
+            )
+        with self.assertRaises(ValueError):
+            check_codec_for(
+                PrecipitationsParam.COLOR_3H,
+                parse_codec("LZW,PREDICTOR=FLOATING_POINT"),
+            )
+
+    def test_get_param_of_tif_path(self) -> None:
+        self.assertEqual(
+            PrecipitationsParam.VALUES_3H,
+            get_param_of_tif_path(
+                "/tiles/2000/06/15/ac3hradaricval_MF_ANTILLES_12_v00.tif"
+            ),
+        )
+        self.assertEqual(
+            PrecipitationsParam.COLOR_3H,
+            get_param_of_tif_path(
+                "/dev/shm/ac3hradaric_MF_ANTILLES_2000_06_15_12_00.tif"
+            ),
+        )
+        self.assertIsNone(get_param_of_tif_path("/tmp/out.tif"))
+
+    def test_get_codec_for_tif_path(self) -> None:
+        codecs = {PrecipitationsParam.VALUES_3H: parse_codec("ZSTD,LEVEL=1")}
+        self.assertEqual(
+            parse_codec("ZSTD,LEVEL=1"),
+            get_codec_for_tif_path(
+                "/tiles/2000/06/15/ac3hradaricval_MF_ANTILLES_12_v00.tif",
+                codecs,
+                DEFAULT_VALUES_CODEC,
+            ),
+        )
+        self.assertEqual(
+            DEFAULT_VALUES_CODEC,
+            get_codec_for_tif_path(
+                "/tiles/2000/06/15/ac6hradaricval_MF_ANTILLES_12_v00.tif",
+                codecs,
+                DEFAULT_VALUES_CODEC,
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
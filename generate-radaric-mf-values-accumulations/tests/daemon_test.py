@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from generate_radaric_mf_values_accumulations.arguments import Arguments
+from generate_radaric_mf_values_accumulations.daemon import (
+    InMemoryFilesWatcher,
+    InotifyFilesWatcher,
+    PollingFilesWatcher,
+    get_watched_directories_at,
+    get_zones_per_timestamp_of,
+    run_daemon,
+)
+from generate_radaric_mf_values_accumulations.datetime_utils import (
+    get_timestamp_from_iso_utc_date,
+)
+from generate_radaric_mf_values_accumulations.generation import (
+    InMemoryFileExistenceChecker,
+)
+from generate_radaric_mf_values_accumulations.tiles import (
+    TILES_PATH,
+    PrecipitationsParam,
+    Zone,
+    get_tif_path_for_param_in_zone_at,
+)
+
+
+def get_watched_path(zone: Zone, timestamp: int) -> str:
+    return get_tif_path_for_param_in_zone_at(
+        PrecipitationsParam.VALUES_5MN, zone, timestamp
+    )
+
+
+class TestDaemon(unittest.TestCase):
+    maxDiff = None
+
+    def test_get_watched_directories_at(self) -> None:
+        self.assertEqual(
+            [f"{TILES_PATH}/2000/06/15"],
+            get_watched_directories_at(
+                [Zone.METROPOLE, Zone.REUNION],
+                get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z"),
+            ),
+        )
+        self.assertEqual(
+            [f"{TILES_PATH}/2000/06/14", f"{TILES_PATH}/2000/06/15"],
+            get_watched_directories_at(
+                [Zone.METROPOLE],
+                get_timestamp_from_iso_utc_date("2000-06-15T00:10:00Z"),
+            ),
+        )
+
+    def test_get_zones_per_timestamp_of(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:05:00Z")
+        previous_timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        self.assertEqual(
+            {
+                previous_timestamp: [Zone.METROPOLE],
+                timestamp: [Zone.REUNION, Zone.METROPOLE],
+            },
+            get_zones_per_timestamp_of(
+                [
+                    get_watched_path(Zone.REUNION, timestamp),
+                    get_watched_path(Zone.METROPOLE, timestamp),
+                    get_watched_path(Zone.METROPOLE, timestamp),
+                    get_watched_path(Zone.ANTILLES, timestamp),
+                    get_watched_path(Zone.METROPOLE, previous_timestamp),
+                    get_tif_path_for_param_in_zone_at(
+                        PrecipitationsParam.COLOR_5MN, Zone.METROPOLE, timestamp
+                    ),
+                ],
+                [Zone.METROPOLE, Zone.REUNION],
+            ),
+        )
+
+    def test_run_daemon(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:05:00Z")
+        files_watcher = InMemoryFilesWatcher(
+            [
+                [get_watched_path(Zone.METROPOLE, timestamp)],
+                [],
+                [
+                    get_watched_path(Zone.REUNION, timestamp),
+                    get_watched_path(Zone.ANTILLES, timestamp + 300),
+                ],
+            ]
+        )
+        file_existence_checker = InMemoryFileExistenceChecker()
+        generated: list[tuple[int, int, list[Zone]]] = []
+
+        def generate(arguments: Arguments) -> None:
+            generated.append((arguments.start, arguments.end, arguments.zones))
+            if len(generated) == 1:
+                raise RuntimeError("failed")
+
+        run_daemon(
+            Arguments(start=0, end=0, replace=True),
+            files_watcher=files_watcher,
+            file_existence_checker=file_existence_checker,
+            generate=generate,
+            clock=lambda: timestamp,
+            cycles=3,
+        )
+        self.assertEqual(
+            [
+                (timestamp, timestamp, [Zone.METROPOLE]),
+                (timestamp, timestamp, [Zone.REUNION]),
+                (timestamp + 300, timestamp + 300, [Zone.ANTILLES]),
+            ],
+            generated,
+        )
+        self.assertEqual(
+            [f"{TILES_PATH}/2000/06/15"], files_watcher.watched_directories
+        )
+        self.assertTrue(
+            file_existence_checker.exists(get_watched_path(Zone.METROPOLE, timestamp))
+        )
+
+    def test_PollingFilesWatcher(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            existing_path = os.path.join(
+                directory, "mosaiques_MF_LAME_D_EAU_METROPOLE_13_v00.tif"
+            )
+            created_path = os.path.join(
+                directory, "mosaiques_MF_LAME_D_EAU_METROPOLE_13_v05.tif"
+            )
+            Path(existing_path).write_bytes(b"tif")
+            files_watcher = PollingFilesWatcher(interval=0)
+            self.assertFalse(files_watcher.watch(os.path.join(directory, "missing")))
+            self.assertTrue(files_watcher.watch(directory))
+            Path(created_path).write_bytes(b"ti")
+            Path(
+                os.path.join(directory, "radaric_MF_METROPOLE_13_v05.tif")
+            ).write_bytes(b"tif")
+            # reported once its size is stable
+            self.assertEqual([], files_watcher.wait_for_created_files(0))
+            Path(created_path).write_bytes(b"tif")
+            self.assertEqual([], files_watcher.wait_for_created_files(0))
+            self.assertEqual([created_path], files_watcher.wait_for_created_files(0))
+            self.assertEqual([], files_watcher.wait_for_created_files(0))
+
+    def test_InotifyFilesWatcher(self) -> None:
+        try:
+            files_watcher = InotifyFilesWatcher()
+        except (OSError, AttributeError):
+            self.skipTest("inotify unavailable")
+        with tempfile.TemporaryDirectory() as directory:
+            existing_path = os.path.join(
+                directory, "mosaiques_MF_LAME_D_EAU_METROPOLE_13_v00.tif"
+            )
+            created_path = os.path.join(
+                directory, "mosaiques_MF_LAME_D_EAU_METROPOLE_13_v05.tif"
+            )
+            Path(existing_path).write_bytes(b"tif")
+            self.assertTrue(files_watcher.watch(directory, include_existing=True))
+            self.assertEqual([existing_path], files_watcher.wait_for_created_files(0))
+            Path(
+                os.path.join(directory, "radaric_MF_METROPOLE_13_v05.tif")
+            ).write_bytes(b"tif")
+            Path(created_path).write_bytes(b"tif")
+            self.assertEqual([created_path], files_watcher.wait_for_created_files(1))
+            files_watcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
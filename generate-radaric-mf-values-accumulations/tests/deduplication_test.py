@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from generate_radaric_mf_values_accumulations.deduplication import (
+    ProductsDeduplicator,
+    get_content_hash_of,
+)
+from generate_radaric_mf_values_accumulations.tiles import (
+    PrecipitationsParam,
+    Zone,
+    get_param_key_for_zone,
+)
+
+
+def get_product_path(
+    directory: str, param: PrecipitationsParam, zone: Zone, hour: str
+) -> str:
+    return os.path.join(
+        directory,
+        "2000",
+        "06",
+        "15",
+        f"{get_param_key_for_zone(param, zone)}_{hour}_v00.tif",
+    )
+
+
+def write_file(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestDeduplication(unittest.TestCase):
+    maxDiff = None
+
+    def test_get_content_hash_of(self) -> None:
+        array = numpy.zeros((2, 2), numpy.float32)
+        self.assertEqual(
+            get_content_hash_of([array], ["COMPRESS=LZW"]),
+            get_content_hash_of([array.copy()], ["COMPRESS=LZW"]),
+        )
+        self.assertNotEqual(
+            get_content_hash_of([array], ["COMPRESS=LZW"]),
+            get_content_hash_of([array], ["COMPRESS=DEFLATE"]),
+        )
+        self.assertNotEqual(
+            get_content_hash_of([array]),
+            get_content_hash_of([array.astype(numpy.float64)]),
+        )
+        self.assertNotEqual(
+            get_content_hash_of([array]),
+            get_content_hash_of([array.reshape((1, 4))]),
+        )
+
+    def test_link_to_identical(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            deduplicator = ProductsDeduplicator()
+            first_path = get_product_path(
+                directory, PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "12"
+            )
+            second_path = get_product_path(
+                directory, PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "15"
+            )
+            other_zone_path = get_product_path(
+                directory, PrecipitationsParam.COLOR_3H, Zone.REUNION, "15"
+            )
+
+            self.assertFalse(deduplicator.link_to_identical(first_path, "dry"))
+            write_file(first_path, "transparent")
+            deduplicator.record_written(first_path, "dry")
+
+            self.assertFalse(deduplicator.link_to_identical(second_path, "rain"))
+            self.assertFalse(deduplicator.link_to_identical(other_zone_path, "dry"))
+            self.assertTrue(deduplicator.link_to_identical(second_path, "dry"))
+            self.assertTrue(os.path.samefile(first_path, second_path))
+            self.assertEqual(1, deduplicator.statistics.links)
+            self.assertEqual(1, deduplicator.statistics.writes)
+
+    def test_linkToIdentical_whenRemoved(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            deduplicator = ProductsDeduplicator()
+            first_path = get_product_path(
+                directory, PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "12"
+            )
+            second_path = get_product_path(
+                directory, PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "15"
+            )
+            write_file(first_path, "transparent")
+            deduplicator.record_written(first_path, "dry")
+            os.remove(first_path)
+
+            self.assertFalse(deduplicator.link_to_identical(second_path, "dry"))
+            self.assertIsNone(deduplicator.find_identical_to(second_path, "dry"))
+            self.assertFalse(os.path.exists(second_path))
+
+    def test_linkToIdentical_whenRewritten(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            deduplicator = ProductsDeduplicator()
+            first_path = get_product_path(
+                directory, PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "12"
+            )
+            second_path = get_product_path(
+                directory, PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "15"
+            )
+            write_file(first_path, "transparent")
+            deduplicator.record_written(first_path, "dry")
+            # e.g. with --replace
+            write_file(first_path, "raining")
+            deduplicator.record_written(first_path, "rain")
+
+            self.assertFalse(deduplicator.link_to_identical(second_path, "dry"))
+            self.assertFalse(os.path.exists(second_path))
+            self.assertTrue(deduplicator.link_to_identical(second_path, "rain"))
+            with open(second_path) as f:
+                self.assertEqual("raining", f.read())
+
+    def test_add_keepsLatestHashes(self) -> None:
+        deduplicator = ProductsDeduplicator(max_hashes_per_product=2)
+        for content_hash, hour in [("first", "12"), ("second", "15"), ("third", "18")]:
+            deduplicator.add(
+                get_product_path(
+                    "/tiles", PrecipitationsParam.COLOR_3H, Zone.ANTILLES, hour
+                ),
+                content_hash,
+            )
+        path = get_product_path(
+            "/tiles", PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "21"
+        )
+        self.assertIsNone(deduplicator.find_identical_to(path, "first"))
+        self.assertEqual(
+            get_product_path(
+                "/tiles", PrecipitationsParam.COLOR_3H, Zone.ANTILLES, "18"
+            ),
+            deduplicator.find_identical_to(path, "third"),
+        )
+        deduplicator.add("/not/a/product.tif", "third")
+        self.assertIsNone(deduplicator.find_identical_to("/not/a/product.tif", "third"))
+
+
+if __name__ == "__main__":
+    unittest.main()
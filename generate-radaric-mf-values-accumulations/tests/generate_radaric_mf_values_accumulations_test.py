@@ -1,41 +1,101 @@
+import os
+import tempfile
+import threading
+import types
 import unittest
 from math import nan
+from xml.etree import ElementTree
 from pathlib import Path
 
 import numpy
+from osgeo import gdal
+
+from generate_radaric_mf_values_accumulations.arguments import Arguments
+from generate_radaric_mf_values_accumulations.catalog import (
+    InMemoryProductsCatalog,
+    ProductRecord,
+)
+from generate_radaric_mf_values_accumulations.compression import Codec
 from generate_radaric_mf_values_accumulations.datetime_utils import (
     FIVE_MINUTES_IN_SECONDS,
     ONE_HOUR_IN_SECONDS,
     get_timestamp_from_iso_utc_date,
 )
-from generate_radaric_mf_values_accumulations.generate_radaric_mf_values_accumulations import (
+from generate_radaric_mf_values_accumulations.deduplication import ProductsDeduplicator
+from generate_radaric_mf_values_accumulations.generation import (
+    BackgroundProductsWriter,
+    BlockWindow,
+    CachedTifConfigGetter,
+    CatalogFileExistenceChecker,
+    CatalogTifConfigGetter,
     IdentityTransform,
+    IndexedFileExistenceChecker,
+    InMemoryAccumulationsTifStreamer,
+    InMemoryColorTifGenerator,
+    InMemoryFilesPublisher,
+    InMemoryQuicklookGenerator,
+    InMemoryVirtualValuesWriter,
+    InPlaceProductsStager,
     InMemoryFileExistenceChecker,
     InMemoryTifConfigGetter,
     InMemoryTifCreator,
+    InMemoryTifLocator,
     InMemoryTifReader,
+    LocalCacheTifReader,
     MeteoFranceTransform,
+    PublishTransaction,
+    RealFilesPublisher,
+    RealVirtualValuesWriter,
     SameInMemoryTifReader,
     TifConfig,
+    TifConfigMismatchException,
+    TransactionFileExistenceChecker,
+    TransactionGenerationManifest,
+    TransactionProductsCatalog,
     copy_from_disk_to_ram,
     copy_param_in_zone_at_from_disk_to_ram,
     create_accumulation_over_1h_from_instantanee_in_zone_at,
     create_accumulations_from,
     generate_accumulations,
+    get_average_overview,
+    clear_transparent_colors,
+    create_color_tif,
+    create_paletted_color_tif,
+    create_tif,
+    encode_image,
     generate_accumulations_over_1h_from_instantanee_if_possible,
     generate_accumulations_over_1h_from_instantanee_in_zone_at,
     generate_accumulations_over_some_hours_if_possible,
     generate_accumulations_over_some_hours_in_zone_at,
     get_accumulations_over_some_hours_in_zone_at,
     get_accumulations_per_timestamp_before_interpolation,
+    get_block_windows,
+    get_streaming_block_size,
+    get_generated_params_for,
     get_integrated_accumulations_over_1h,
+    get_quicklook_colors,
+    get_quicklook_level,
+    get_stat_path_for,
+    get_output_settings_of,
+    get_sum_vrt_content,
     get_ram_path_for_param_in_zone_at,
     integrate_accumulations_over_1h,
     interpolate_accumulations_over_1h,
+    is_empty_block,
     move_from_ram_to_disk,
     move_param_in_zone_at_from_ram_to_disk,
+    read_tif_configs_cache,
+    write_tif_configs_cache,
+    find_tif_config_in_zone_at,
     set_layer_at_timestamp_with_values_from,
+    read_blocks_from,
+    sum_blocks,
+    write_file_atomically,
+    write_product,
 )
+from generate_radaric_mf_values_accumulations.local_cache import LocalFileCache
+from generate_radaric_mf_values_accumulations.manifest import InMemoryGenerationManifest
+from generate_radaric_mf_values_accumulations.palettes import Palette
 from generate_radaric_mf_values_accumulations.radaric_mf_values_accumulations import (
     InMemoryCommandExecutor,
     get_timestamps_for_cumul_1h_at,
@@ -45,12 +105,28 @@ from generate_radaric_mf_values_accumulations.tiles import (
     InMemoryTilesDatetimesRepository,
     PrecipitationsParam,
     Zone,
+    get_param_key_for_zone,
+    get_quicklook_path_for_param_in_zone_at,
+    get_tif_path_for_param_in_zone_at,
+    get_vrt_path_for_param_in_zone_at,
 )
 
 MEDIA_FS = "/media/datastore"
 TILES_PATH = f"{MEDIA_FS}/tempsreel.infoclimat.net/tiles"
 
 
+def is_gdal_available() -> bool:
+    return isinstance(gdal, types.ModuleType)
+
+
+ROUND_TRIP_TIF_CONFIG = TifConfig(
+    cols=5,
+    rows=3,
+    geo_transform=(100, 10, 0, 200, 0, -10),
+    projection='PROJCS["WGS 84 / Pseudo-Mercator",AUTHORITY["EPSG","3857"]]',
+)
+
+
 class TestGenerateRadaricMFValuesAccumulations(unittest.TestCase):
 
     maxDiff = None
@@ -1856,6 +1932,1572 @@ class TestGenerateRadaricMFValuesAccumulations(unittest.TestCase):
             command_executor.commands,
         )
 
+    def test_CachedTifConfigGetter(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "tif_configs.json")
+            tif_locator = InMemoryTifLocator()
+            tif_config_getter = CachedTifConfigGetter(
+                InMemoryTifConfigGetter({(Zone.METROPOLE, timestamp): tif_config}),
+                tif_locator,
+                cache_path,
+            )
+            self.assertEqual(
+                tif_config, tif_config_getter.get_tif_config(timestamp, Zone.METROPOLE)
+            )
+            self.assertIsNone(tif_config_getter.get_tif_config(timestamp, Zone.REUNION))
+            self.assertEqual(
+                {Zone.METROPOLE: tif_config}, read_tif_configs_cache(cache_path)
+            )
+
+            tif_config_getter = CachedTifConfigGetter(
+                InMemoryTifConfigGetter(), tif_locator, cache_path
+            )
+            self.assertIsNone(
+                tif_config_getter.get_tif_config(
+                    timestamp + ONE_HOUR_IN_SECONDS, Zone.METROPOLE
+                )
+            )
+            radaric_tif_path = get_tif_path_for_param_in_zone_at(
+                PrecipitationsParam.VALUES_5MN,
+                Zone.METROPOLE,
+                timestamp + ONE_HOUR_IN_SECONDS,
+            )
+            tif_locator.located[radaric_tif_path] = (radaric_tif_path, 1)
+            self.assertEqual(
+                tif_config,
+                tif_config_getter.get_tif_config(
+                    timestamp + ONE_HOUR_IN_SECONDS, Zone.METROPOLE
+                ),
+            )
+
+    def test_CachedTifConfigGetter_whenCatalog(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        radaric_tif_path = get_tif_path_for_param_in_zone_at(
+            PrecipitationsParam.VALUES_5MN, Zone.METROPOLE, timestamp
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "tif_configs.json")
+            write_tif_configs_cache(cache_path, {Zone.METROPOLE: tif_config})
+            # the incoming 5 minutes tifs are never in the catalog
+            products_catalog = InMemoryProductsCatalog()
+            tif_config_getter = CachedTifConfigGetter(
+                CatalogTifConfigGetter(products_catalog, InMemoryTifConfigGetter()),
+                InMemoryTifLocator({radaric_tif_path: (radaric_tif_path, 1)}),
+                cache_path,
+            )
+            self.assertFalse(
+                CatalogFileExistenceChecker(products_catalog).exists(radaric_tif_path)
+            )
+            self.assertEqual(
+                tif_config,
+                find_tif_config_in_zone_at(
+                    timestamp, Zone.METROPOLE, tif_config_getter=tif_config_getter
+                ),
+            )
+
+    def test_CachedTifConfigGetter_whenUpdated(self) -> None:
+        tif_config = TifConfig(
+            cols=3,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "tif_configs.json")
+            in_memory_tif_config_getter = InMemoryTifConfigGetter()
+            tif_config_getter = CachedTifConfigGetter(
+                in_memory_tif_config_getter, InMemoryTifLocator(), cache_path
+            )
+            tif_config_getter.update_tif_config(Zone.ANTILLES, tif_config)
+            self.assertEqual(
+                {Zone.ANTILLES: tif_config}, read_tif_configs_cache(cache_path)
+            )
+            self.assertEqual(
+                {Zone.ANTILLES: tif_config},
+                in_memory_tif_config_getter.updated_tif_configs,
+            )
+
+    def test_CachedTifConfigGetter_whenZonesUpdatedInParallel(self) -> None:
+        tif_config = TifConfig(
+            cols=3,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "tif_configs.json")
+            # as the zone workers, each reading the cache before the others write it
+            tif_config_getters = [
+                CachedTifConfigGetter(
+                    InMemoryTifConfigGetter(), InMemoryTifLocator(), cache_path
+                )
+                for _ in range(2)
+            ]
+            tif_config_getters[0].update_tif_config(Zone.ANTILLES, tif_config)
+            tif_config_getters[1].update_tif_config(Zone.REUNION, tif_config)
+            self.assertEqual(
+                {Zone.ANTILLES: tif_config, Zone.REUNION: tif_config},
+                read_tif_configs_cache(cache_path),
+            )
+
+    def test_readTif_whenTifConfigMismatch(self) -> None:
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        other_tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 2, 0, 0, 0, 2),
+            projection="Test",
+        )
+        tif_reader = InMemoryTifReader(
+            {"/tif/path": numpy.array([[1, 2], [3, 4]])},
+            {"/tif/path": other_tif_config},
+        )
+        with self.assertRaises(TifConfigMismatchException) as cm:
+            tif_reader.read_tif("/tif/path", expected_tif_config=tif_config)
+        self.assertEqual(other_tif_config, cm.exception.actual_tif_config)
+        self.assertIsNotNone(
+            tif_reader.read_tif("/tif/path", expected_tif_config=other_tif_config)
+        )
+
+    def test_generateAccumulations_whenTifConfigMismatch(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:05:00Z")
+        zone = Zone.METROPOLE
+        cached_tif_config = TifConfig(
+            cols=3,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        actual_tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        tif_paths = [
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_{t // 100:02d}_v{t % 100:02d}.tif"
+            for t in [
+                1210,
+                1215,
+                1220,
+                1225,
+                1230,
+                1235,
+                1240,
+                1245,
+                1250,
+                1255,
+                1300,
+                1305,
+            ]
+        ]
+        tif_reader = InMemoryTifReader(
+            {tif_path: numpy.array([[1, 2], [3, 4]]) for tif_path in tif_paths},
+            {tif_path: actual_tif_config for tif_path in tif_paths},
+        )
+        tif_config_getter = InMemoryTifConfigGetter(
+            {(zone, timestamp): cached_tif_config}
+        )
+        tif_creator = InMemoryTifCreator()
+        generate_accumulations(
+            timestamp,
+            zone,
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=tif_config_getter,
+            tif_reader=tif_reader,
+            tif_creator=tif_creator,
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+        )
+        self.assertEqual(
+            {zone: actual_tif_config}, tif_config_getter.updated_tif_configs
+        )
+        self.assertEqual(
+            (2, 2),
+            tif_creator.tifs[
+                "/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_05.tif"
+            ].shape,
+        )
+
+    def test_generateAccumulations_whenTifConfigMismatchAgain(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:05:00Z")
+        zone = Zone.METROPOLE
+        cached_tif_config = TifConfig(
+            cols=3,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        actual_tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        other_tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 2, 0, 0, 0, 2),
+            projection="Test",
+        )
+        tif_paths = [
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_{t // 100:02d}_v{t % 100:02d}.tif"
+            for t in [
+                1210,
+                1215,
+                1220,
+                1225,
+                1230,
+                1235,
+                1240,
+                1245,
+                1250,
+                1255,
+                1300,
+                1305,
+            ]
+        ]
+        tif_reader = InMemoryTifReader(
+            {tif_path: numpy.array([[1, 2], [3, 4]]) for tif_path in tif_paths},
+            {
+                tif_path: other_tif_config if i == 0 else actual_tif_config
+                for i, tif_path in enumerate(tif_paths)
+            },
+        )
+        tif_creator = InMemoryTifCreator()
+        generate_accumulations(
+            timestamp,
+            zone,
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter(
+                {(zone, timestamp): cached_tif_config}
+            ),
+            tif_reader=tif_reader,
+            tif_creator=tif_creator,
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+        )
+        self.assertNotIn(
+            "/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_05.tif", tif_creator.tifs
+        )
+
+    def test_IndexedFileExistenceChecker(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            existing_path = os.path.join(directory, "existing.tif")
+            missing_path = os.path.join(directory, "missing.tif")
+            open(existing_path, "w").close()
+            os.mkdir(os.path.join(directory, "subdirectory"))
+            file_existence_checker = IndexedFileExistenceChecker()
+            self.assertTrue(file_existence_checker.exists(existing_path))
+            self.assertFalse(file_existence_checker.exists(missing_path))
+            self.assertFalse(
+                file_existence_checker.exists(os.path.join(directory, "subdirectory"))
+            )
+            self.assertFalse(
+                file_existence_checker.exists(
+                    os.path.join(directory, "missing", "file.tif")
+                )
+            )
+
+            open(missing_path, "w").close()
+            self.assertFalse(file_existence_checker.exists(missing_path))
+            file_existence_checker.add(missing_path)
+            self.assertTrue(file_existence_checker.exists(missing_path))
+
+            os.remove(existing_path)
+            self.assertTrue(file_existence_checker.exists(existing_path))
+            file_existence_checker.invalidate(directory)
+            self.assertFalse(file_existence_checker.exists(existing_path))
+
+    def test_get_generated_params_for(self) -> None:
+        self.assertEqual(
+            [PrecipitationsParam.VALUES_1H, PrecipitationsParam.COLOR_1H],
+            get_generated_params_for(AccumulationDuration.CUMUL_1H),
+        )
+        self.assertEqual(
+            [PrecipitationsParam.COLOR_3H],
+            get_generated_params_for(AccumulationDuration.CUMUL_3H),
+        )
+        self.assertEqual(
+            [PrecipitationsParam.VALUES_72H, PrecipitationsParam.COLOR_72H],
+            get_generated_params_for(AccumulationDuration.CUMUL_72H),
+        )
+
+    def test_generateAccumulationsOverSomeHoursIfPossible_addsGeneratedFiles(
+        self,
+    ) -> None:
+        zone = Zone.METROPOLE
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        file_existence_checker = InMemoryFileExistenceChecker()
+        generate_accumulations_over_some_hours_if_possible(
+            zone,
+            timestamp,
+            tif_config,
+            AccumulationDuration.CUMUL_3H,
+            file_existence_checker=file_existence_checker,
+            tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+            transform=IdentityTransform(),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+        )
+        self.assertEqual(
+            {f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_13_v00.tif"},
+            file_existence_checker.existing_files,
+        )
+
+    def test_CatalogFileExistenceChecker(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        path = f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_13_v00.tif"
+        file_existence_checker = CatalogFileExistenceChecker(
+            InMemoryProductsCatalog(
+                [
+                    ProductRecord(
+                        path, PrecipitationsParam.COLOR_3H, Zone.METROPOLE, timestamp
+                    )
+                ]
+            )
+        )
+        self.assertTrue(file_existence_checker.exists(path))
+        self.assertFalse(
+            file_existence_checker.exists(
+                f"{TILES_PATH}/2000/06/15/ac6hradaric_MF_METROPOLE_13_v00.tif"
+            )
+        )
+
+    def test_CatalogTifConfigGetter(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        fallback_tif_config = TifConfig(
+            cols=4,
+            rows=4,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        tif_config_getter = CatalogTifConfigGetter(
+            InMemoryProductsCatalog(
+                [
+                    ProductRecord(
+                        f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_13_v00.tif",
+                        PrecipitationsParam.VALUES_5MN,
+                        Zone.METROPOLE,
+                        timestamp,
+                        cols=2,
+                        rows=3,
+                        geo_transform=(0, 1, 0, 0, 0, 1),
+                        projection="Test",
+                    )
+                ]
+            ),
+            InMemoryTifConfigGetter({(Zone.REUNION, timestamp): fallback_tif_config}),
+        )
+        self.assertEqual(
+            tif_config, tif_config_getter.get_tif_config(timestamp, Zone.METROPOLE)
+        )
+        self.assertEqual(
+            fallback_tif_config,
+            tif_config_getter.get_tif_config(timestamp, Zone.REUNION),
+        )
+
+    def test_generateAccumulationsOverSomeHoursIfPossible_recordsProductsInCatalog(
+        self,
+    ) -> None:
+        zone = Zone.METROPOLE
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        products_catalog = InMemoryProductsCatalog()
+        generate_accumulations_over_some_hours_if_possible(
+            zone,
+            timestamp,
+            tif_config,
+            AccumulationDuration.CUMUL_24H,
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_reader=SameInMemoryTifReader.from_list([[0, 2], [3, 4]]),
+            transform=IdentityTransform(),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+            products_catalog=products_catalog,
+        )
+        self.assertEqual(
+            [
+                ProductRecord(
+                    f"{TILES_PATH}/2000/06/15/ac24hradaricval_MF_METROPOLE_13_v00.tif",
+                    PrecipitationsParam.VALUES_24H,
+                    zone,
+                    timestamp,
+                    cols=2,
+                    rows=2,
+                    geo_transform=(0, 1, 0, 0, 0, 1),
+                    projection="Test",
+                    minimum=0,
+                    maximum=4 * 24,
+                    nonzero=3,
+                ),
+                ProductRecord(
+                    f"{TILES_PATH}/2000/06/15/ac24hradaric_MF_METROPOLE_13_v00.tif",
+                    PrecipitationsParam.COLOR_24H,
+                    zone,
+                    timestamp,
+                    cols=2,
+                    rows=2,
+                    geo_transform=(0, 1, 0, 0, 0, 1),
+                    projection="Test",
+                ),
+            ],
+            list(products_catalog.records.values()),
+        )
+
+    def test_get_block_windows(self) -> None:
+        tif_config = TifConfig(
+            cols=5,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        self.assertEqual(
+            [
+                BlockWindow(0, 0, 2, 2),
+                BlockWindow(2, 0, 2, 2),
+                BlockWindow(4, 0, 1, 2),
+                BlockWindow(0, 2, 2, 1),
+                BlockWindow(2, 2, 2, 1),
+                BlockWindow(4, 2, 1, 1),
+            ],
+            get_block_windows(tif_config, 2, 2),
+        )
+
+    def test_sum_blocks(self) -> None:
+        self.assertTrue(
+            numpy.array_equal(
+                numpy.array([[11, 22]]),
+                sum_blocks(
+                    [numpy.array([[1, 2]]), None, numpy.array([[10, 20]])],
+                    BlockWindow(0, 0, 2, 1),
+                ),
+            )
+        )
+        self.assertTrue(
+            numpy.array_equal(
+                numpy.array([[0, 0]]), sum_blocks([], BlockWindow(0, 0, 2, 1))
+            )
+        )
+
+    def test_readBlocksFrom_whenReadWhole(self) -> None:
+        inputs = [numpy.array([[1, 2, 3], [4, 5, 6]])]
+        self.assertEqual((256, 256), get_streaming_block_size(inputs, 256))
+        blocks = read_blocks_from(inputs, BlockWindow(1, 0, 2, 2), IdentityTransform())
+        self.assertEqual([[[2, 3], [5, 6]]], [block.tolist() for block in blocks])
+        read_blocks_from(inputs, BlockWindow(0, 0, 1, 1), MeteoFranceTransform())
+        self.assertEqual([[1, 2, 3], [4, 5, 6]], inputs[0].tolist())
+
+    def test_InMemoryAccumulationsTifStreamer(self) -> None:
+        tif_config = TifConfig(
+            cols=3,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        tifs = {
+            "/tif/1": numpy.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]]),
+            "/tif/2": numpy.array([[65535, 0, 100], [0, 0, 0], [0, 0, 200]]),
+        }
+        accumulations_streamer = InMemoryAccumulationsTifStreamer(
+            {tif_path: array.copy() for tif_path, array in tifs.items()},
+            block_size=2,
+        )
+        accumulations_streamer.stream_accumulations_to_tif(
+            ["/tif/1", "/tif/2", "/tif/missing"],
+            "/tif/out",
+            tif_config,
+            tif_reader=InMemoryTifReader(),
+            transform=MeteoFranceTransform(),
+        )
+        self.assertTrue(
+            numpy.allclose(
+                create_accumulations_from(
+                    ["/tif/1", "/tif/2", "/tif/missing"],
+                    tif_config,
+                    tif_reader=InMemoryTifReader(tifs),
+                    transform=MeteoFranceTransform(),
+                ),
+                accumulations_streamer.tifs["/tif/out"],
+            )
+        )
+
+    def test_generateAccumulationsOverSomeHoursInZoneAt_whenStreaming(self) -> None:
+        zone = Zone.METROPOLE
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        accumulations_streamer = InMemoryAccumulationsTifStreamer(
+            {
+                f"{TILES_PATH}/2000/06/15/ac60radaric_MF_METROPOLE_{hour}_v00.tif": numpy.array(
+                    [[1, 2], [3, 4]]
+                )
+                for hour in ["11", "12", "13"]
+            },
+            block_size=1,
+        )
+        tif_creator = InMemoryTifCreator()
+        command_executor = InMemoryCommandExecutor()
+        accumulations = generate_accumulations_over_some_hours_in_zone_at(
+            zone,
+            timestamp,
+            tif_config,
+            AccumulationDuration.CUMUL_3H,
+            tif_reader=InMemoryTifReader(),
+            transform=IdentityTransform(),
+            tif_creator=tif_creator,
+            command_executor=command_executor,
+            accumulations_streamer=accumulations_streamer,
+        )
+        self.assertIsNone(accumulations)
+        self.assertEqual({}, tif_creator.tifs)
+        self.assertTrue(
+            numpy.array_equal(
+                numpy.array([[1 * 3, 2 * 3], [3 * 3, 4 * 3]]),
+                accumulations_streamer.tifs[
+                    "/dev/shm/ac3hradaricval_MF_METROPOLE_2000_06_15_13_00.tif"
+                ],
+            )
+        )
+        self.assertEqual(
+            [
+                f"gdaldem color-relief /dev/shm/ac3hradaricval_MF_METROPOLE_2000_06_15_13_00.tif {self.PALETTES_PATH}/radar3h.cpt /dev/shm/ac3hradaric_MF_METROPOLE_2000_06_15_13_00.tif -alpha -nearest_color_entry -of COG -co 'COMPRESS=LZW' -co 'PREDICTOR=YES'",
+                f"mv /dev/shm/ac3hradaric_MF_METROPOLE_2000_06_15_13_00.tif {TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_13_v00.tif",
+            ],
+            command_executor.commands,
+        )
+
+    def test_LocalCacheTifReader(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            tif_path = os.path.join(directory, "remote", "file.tif")
+            os.makedirs(os.path.dirname(tif_path))
+            with open(tif_path, "w") as f:
+                f.write("tif")
+            local_file_cache = LocalFileCache(os.path.join(directory, "cache"))
+            local_tif_path = local_file_cache.get_local_path(tif_path)
+            tif_reader = LocalCacheTifReader(
+                InMemoryTifReader({local_tif_path: numpy.array([[1, 2], [3, 4]])}),
+                local_file_cache,
+            )
+            self.assertTrue(
+                numpy.array_equal(
+                    numpy.array([[1, 2], [3, 4]]), tif_reader.read_tif(tif_path)
+                )
+            )
+            self.assertIsNotNone(tif_reader.read_tif(tif_path))
+            self.assertIsNone(
+                tif_reader.read_tif(os.path.join(directory, "missing.tif"))
+            )
+            self.assertEqual(1, local_file_cache.statistics.hits)
+            self.assertEqual(1, local_file_cache.statistics.misses)
+
+    def test_generateAccumulationsOverSomeHoursInZoneAt_whenColoringInProcess(
+        self,
+    ) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tif_config = TifConfig(
+            cols=2, rows=1, geo_transform=(0, 1, 0, 0, 0, 1), projection="Test"
+        )
+        tif_creator = InMemoryTifCreator()
+        command_executor = InMemoryCommandExecutor()
+        color_tif_generator = InMemoryColorTifGenerator()
+        for accumulation_duration in [
+            AccumulationDuration.CUMUL_3H,
+            AccumulationDuration.CUMUL_24H,
+        ]:
+            generate_accumulations_over_some_hours_in_zone_at(
+                zone,
+                timestamp,
+                tif_config,
+                accumulation_duration,
+                tif_reader=SameInMemoryTifReader.from_list([[0, 1]]),
+                transform=IdentityTransform(),
+                tif_creator=tif_creator,
+                command_executor=command_executor,
+                color_tif_generator=color_tif_generator,
+            )
+        self.assertEqual(
+            ["/dev/shm/ac24hradaricval_MF_METROPOLE_2000_06_15_13_00.tif"],
+            list(tif_creator.tifs.keys()),
+        )
+        # 3 is as near to 2.5 as to 3.5, the upper one wins as with gdaldem
+        self.assertEqual(
+            [
+                [[255, 0]],
+                [[255, 131]],
+                [[255, 209]],
+                [[0, 255]],
+            ],
+            color_tif_generator.tifs[
+                "/dev/shm/ac3hradaric_MF_METROPOLE_2000_06_15_13_00.tif"
+            ].tolist(),
+        )
+        self.assertIn(
+            "/dev/shm/ac24hradaric_MF_METROPOLE_2000_06_15_13_00.tif",
+            color_tif_generator.tifs,
+        )
+        self.assertEqual(
+            [
+                f"mv /dev/shm/ac3hradaric_MF_METROPOLE_2000_06_15_13_00.tif {TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_13_v00.tif",
+                f"mv /dev/shm/ac24hradaricval_MF_METROPOLE_2000_06_15_13_00.tif {TILES_PATH}/2000/06/15/ac24hradaricval_MF_METROPOLE_13_v00.tif",
+                f"mv /dev/shm/ac24hradaric_MF_METROPOLE_2000_06_15_13_00.tif {TILES_PATH}/2000/06/15/ac24hradaric_MF_METROPOLE_13_v00.tif",
+            ],
+            command_executor.commands,
+        )
+
+    def test_write_file_atomically(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.tif")
+            with open(path, "wb") as f:
+                f.write(b"previous")
+            write_file_atomically(path, b"content")
+            with open(path, "rb") as f:
+                self.assertEqual(b"content", f.read())
+            self.assertEqual(["test.tif"], os.listdir(directory))
+            with self.assertRaises(TypeError):
+                write_file_atomically(path, "not bytes")  # type: ignore
+            with open(path, "rb") as f:
+                self.assertEqual(b"content", f.read())
+            self.assertEqual(["test.tif"], os.listdir(directory))
+
+    def test_generateAccumulationsOverSomeHoursInZoneAt_whenWritingInPlace(
+        self,
+    ) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tif_config = TifConfig(
+            cols=2, rows=1, geo_transform=(0, 1, 0, 0, 0, 1), projection="Test"
+        )
+        tif_creator = InMemoryTifCreator()
+        command_executor = InMemoryCommandExecutor()
+        color_tif_generator = InMemoryColorTifGenerator()
+        for accumulation_duration in [
+            AccumulationDuration.CUMUL_3H,
+            AccumulationDuration.CUMUL_24H,
+        ]:
+            generate_accumulations_over_some_hours_in_zone_at(
+                zone,
+                timestamp,
+                tif_config,
+                accumulation_duration,
+                tif_reader=SameInMemoryTifReader.from_list([[0, 1]]),
+                transform=IdentityTransform(),
+                tif_creator=tif_creator,
+                command_executor=command_executor,
+                color_tif_generator=color_tif_generator,
+                products_stager=InPlaceProductsStager(),
+            )
+        self.assertEqual(
+            [f"{TILES_PATH}/2000/06/15/ac24hradaricval_MF_METROPOLE_13_v00.tif"],
+            list(tif_creator.tifs.keys()),
+        )
+        self.assertEqual(
+            [
+                f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_13_v00.tif",
+                f"{TILES_PATH}/2000/06/15/ac24hradaric_MF_METROPOLE_13_v00.tif",
+            ],
+            list(color_tif_generator.tifs.keys()),
+        )
+        self.assertEqual([], command_executor.commands)
+
+    def test_InMemoryColorTifGenerator_whenPaletted(self) -> None:
+        tif_config = TifConfig(
+            cols=2, rows=1, geo_transform=(0, 1, 0, 0, 0, 1), projection="Test"
+        )
+        color_tif_generator = InMemoryColorTifGenerator(
+            paletted_params=[PrecipitationsParam.COLOR_3H]
+        )
+        for accumulation_duration in [
+            AccumulationDuration.CUMUL_3H,
+            AccumulationDuration.CUMUL_6H,
+        ]:
+            color_tif_generator.generate_color_tif(
+                f"/tmp/values_{accumulation_duration.value}.tif",
+                f"/tmp/color_{accumulation_duration.value}.tif",
+                accumulation_duration,
+                tif_config,
+                numpy.array([[0, 3]], numpy.float32),
+            )
+        # 0 is transparent, so no data
+        self.assertEqual(
+            [[18, 3]], color_tif_generator.tifs["/tmp/color_3h.tif"].tolist()
+        )
+        self.assertEqual((4, 1, 2), color_tif_generator.tifs["/tmp/color_6h.tif"].shape)
+
+    def test_is_empty_block(self) -> None:
+        self.assertTrue(is_empty_block(numpy.zeros((2, 2), numpy.float32)))
+        self.assertFalse(is_empty_block(numpy.array([[0, 0.1], [0, 0]])))
+        self.assertFalse(is_empty_block(numpy.array([[0, -1], [0, 0]])))
+        self.assertTrue(is_empty_block(numpy.array([[0, -1], [0, 0]]), -1))
+
+    def test_InMemoryAccumulationsTifStreamer_whenSparse(self) -> None:
+        tif_config = TifConfig(
+            cols=3,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        accumulations_streamer = InMemoryAccumulationsTifStreamer(
+            {
+                "/tif/1": numpy.array([[0, 0, 0], [0, 0, 0], [0, 0, 1]]),
+                "/tif/2": numpy.array([[0, 0, 0], [0, 0, 0], [0, 0, 2]]),
+            },
+            block_size=2,
+            sparse=True,
+        )
+        accumulations_streamer.stream_accumulations_to_tif(
+            ["/tif/1", "/tif/2"],
+            "/tif/out",
+            tif_config,
+            tif_reader=InMemoryTifReader(),
+            transform=IdentityTransform(),
+        )
+        self.assertEqual(
+            [BlockWindow(x_offset=2, y_offset=2, cols=1, rows=1)],
+            accumulations_streamer.written_windows["/tif/out"],
+        )
+        self.assertEqual(
+            [[0, 0, 0], [0, 0, 0], [0, 0, 3]],
+            accumulations_streamer.tifs["/tif/out"].tolist(),
+        )
+
+    def test_writeProduct_whenDeduplicating(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            deduplicator = ProductsDeduplicator()
+            encoded: list[str] = []
+
+            def write(hour: str) -> str:
+                path = os.path.join(
+                    directory,
+                    "2000",
+                    "06",
+                    "15",
+                    f"ac3hradaric_MF_ANTILLES_{hour}_v00.tif",
+                )
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                def encode() -> bytes:
+                    encoded.append(path)
+                    return b"transparent"
+
+                write_product(path, encode, lambda: "dry", deduplicator)
+                return path
+
+            first_path = write("12")
+            second_path = write("15")
+            self.assertEqual([first_path], encoded)
+            self.assertTrue(os.path.samefile(first_path, second_path))
+            self.assertEqual(b"transparent", Path(second_path).read_bytes())
+
+    def test_get_average_overview(self) -> None:
+        data = numpy.array(
+            [
+                [1, 3, 5, 5, 9],
+                [1, 3, 5, -1, 9],
+                [2, 2, -1, -1, nan],
+            ],
+            numpy.float32,
+        )
+        self.assertEqual(
+            [[2, 5, 9], [2, -1, -1]],
+            get_average_overview(data, 2, no_data_value=-1).tolist(),
+        )
+        overview = get_average_overview(data[:, :2], 4)
+        self.assertEqual(numpy.float32, overview.dtype)
+        self.assertEqual([[2]], overview.tolist())
+        self.assertTrue(
+            numpy.isnan(get_average_overview(numpy.array([[nan]]), 2)).all()
+        )
+
+    def test_BackgroundProductsWriter(self) -> None:
+        products_writer = BackgroundProductsWriter(workers=2, queue_size=1)
+        written: list[str] = []
+        released = threading.Event()
+        events: list[str] = []
+
+        def write(path: str, wait: bool = False) -> None:
+            if wait:
+                released.wait(5)
+            written.append(path)
+
+        products_writer.submit(["/slow"], lambda: write("/slow", wait=True))
+        products_writer.when_written(["/slow"], lambda: events.append("/slow"))
+        products_writer.submit(["/fast"], lambda: write("/fast"))
+        products_writer.when_written(["/fast"], lambda: events.append("/fast"))
+        products_writer.wait_for(["/fast"])
+        self.assertEqual(["/fast"], written)
+        self.assertEqual([], events)
+        released.set()
+        products_writer.flush()
+        self.assertEqual(["/slow", "/fast"], events)
+
+    def test_BackgroundProductsWriter_whenFailing(self) -> None:
+        products_writer = BackgroundProductsWriter(workers=1)
+        events: list[str] = []
+        released = threading.Event()
+
+        def fail() -> None:
+            released.wait(5)
+            raise OSError("disk full")
+
+        products_writer.submit(["/failing"], fail)
+        products_writer.when_written(["/failing"], lambda: events.append("/failing"))
+        products_writer.submit(["/other"], lambda: None)
+        products_writer.when_written(["/other"], lambda: events.append("/other"))
+        released.set()
+        with self.assertRaises(OSError):
+            products_writer.flush()
+        self.assertEqual(["/other"], events)
+        products_writer.flush()
+
+    def test_generateAccumulations_whenWritingInBackground(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        results = []
+        for products_writer in [None, BackgroundProductsWriter(workers=1)]:
+            tif_creator = InMemoryTifCreator()
+            command_executor = InMemoryCommandExecutor()
+            tiles_repository = InMemoryTilesDatetimesRepository()
+            file_existence_checker = InMemoryFileExistenceChecker()
+            generate_accumulations(
+                timestamp,
+                zone,
+                file_existence_checker=file_existence_checker,
+                tif_config_getter=InMemoryTifConfigGetter(
+                    {(zone, timestamp): tif_config}
+                ),
+                tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+                tif_creator=tif_creator,
+                command_executor=command_executor,
+                tiles_repository=tiles_repository,
+                products_writer=products_writer,
+            )
+            if products_writer is not None:
+                products_writer.flush()
+            results.append(
+                (
+                    {path: tif.tolist() for path, tif in tif_creator.tifs.items()},
+                    command_executor.commands,
+                    tiles_repository.data,
+                    file_existence_checker.existing_files,
+                )
+            )
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(6, len(results[1][2]))
+
+    def test_PublishTransaction(self) -> None:
+        files_publisher = InMemoryFilesPublisher()
+        tiles_repository = InMemoryTilesDatetimesRepository()
+        publish_transaction = PublishTransaction(files_publisher, tiles_repository)
+        published_path = "/tiles/ac3hradaric_MF_METROPOLE_13_v00.tif"
+        discarded_path = "/tiles/ac6hradaric_MF_METROPOLE_13_v00.tif"
+        published_staging_path = publish_transaction.get_staging_path_for(
+            published_path
+        )
+        discarded_staging_path = publish_transaction.get_staging_path_for(
+            discarded_path
+        )
+        publish_transaction.stage(published_path)
+        publish_transaction.stage(discarded_path)
+        self.assertEqual(
+            published_path, publish_transaction.get_readable_path(published_path)
+        )
+        publish_transaction.publish(published_path)
+        publish_transaction.discard(discarded_path)
+        publish_transaction.update_tile_last_date_object(
+            "ac3hradaric_MF_METROPOLE", {"date": "x"}
+        )
+        generation_manifest = InMemoryGenerationManifest()
+        TransactionGenerationManifest(publish_transaction, generation_manifest).record(
+            published_path, "fingerprint"
+        )
+        file_existence_checker = InMemoryFileExistenceChecker()
+        TransactionFileExistenceChecker(
+            publish_transaction, file_existence_checker
+        ).add(published_path)
+        self.assertFalse(file_existence_checker.exists(published_path))
+        self.assertEqual(
+            published_staging_path,
+            publish_transaction.get_readable_path(published_path),
+        )
+        self.assertEqual([], files_publisher.published)
+        self.assertEqual({}, tiles_repository.data)
+        self.assertEqual({}, generation_manifest.fingerprints)
+
+        publish_transaction.commit()
+        self.assertEqual(
+            [[(published_staging_path, published_path)]], files_publisher.published
+        )
+        self.assertEqual([discarded_staging_path], files_publisher.discarded)
+        self.assertEqual(
+            {"ac3hradaric_MF_METROPOLE": {"date": "x"}}, tiles_repository.data
+        )
+        self.assertEqual(
+            {published_path: "fingerprint"}, generation_manifest.fingerprints
+        )
+        self.assertTrue(file_existence_checker.exists(published_path))
+        self.assertEqual(
+            published_path, publish_transaction.get_readable_path(published_path)
+        )
+
+    def test_PublishTransaction_whenRolledBack(self) -> None:
+        files_publisher = InMemoryFilesPublisher()
+        tiles_repository = InMemoryTilesDatetimesRepository()
+        publish_transaction = PublishTransaction(files_publisher, tiles_repository)
+        path = "/tiles/ac3hradaric_MF_METROPOLE_13_v00.tif"
+        publish_transaction.stage(path)
+        publish_transaction.publish(path)
+        publish_transaction.update_tile_last_date_object(
+            "ac3hradaric_MF_METROPOLE", {"date": "x"}
+        )
+        generation_manifest = InMemoryGenerationManifest()
+        TransactionGenerationManifest(publish_transaction, generation_manifest).record(
+            path, "fingerprint"
+        )
+        file_existence_checker = InMemoryFileExistenceChecker()
+        TransactionFileExistenceChecker(
+            publish_transaction, file_existence_checker
+        ).add(path)
+        products_catalog = InMemoryProductsCatalog()
+        TransactionProductsCatalog(publish_transaction, products_catalog).add_products(
+            [
+                ProductRecord(
+                    path,
+                    PrecipitationsParam.COLOR_3H,
+                    Zone.METROPOLE,
+                    get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z"),
+                )
+            ]
+        )
+        publish_transaction.rollback()
+        publish_transaction.commit()
+        self.assertEqual({}, generation_manifest.fingerprints)
+        self.assertFalse(file_existence_checker.exists(path))
+        self.assertIsNone(products_catalog.get_product(path))
+        self.assertEqual([], files_publisher.published)
+        self.assertEqual(
+            [publish_transaction.get_staging_path_for(path)], files_publisher.discarded
+        )
+        self.assertEqual({}, tiles_repository.data)
+
+    def test_RealFilesPublisher(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            staged_pathes = []
+            for name in ["first.tif", "second.tif"]:
+                path = os.path.join(directory, name)
+                Path(f"{path}.staged").write_text(name)
+                staged_pathes.append((f"{path}.staged", path))
+            Path(os.path.join(directory, "second.tif")).write_text("previous")
+            RealFilesPublisher().publish(staged_pathes)
+            RealFilesPublisher().discard(os.path.join(directory, "missing.tif"))
+            self.assertEqual(["first.tif", "second.tif"], sorted(os.listdir(directory)))
+            self.assertEqual(
+                "second.tif", Path(os.path.join(directory, "second.tif")).read_text()
+            )
+
+    def test_generateAccumulations_whenPublishedAtOnce(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        files_publisher = InMemoryFilesPublisher()
+        tiles_repository = InMemoryTilesDatetimesRepository()
+        publish_transaction = PublishTransaction(files_publisher, tiles_repository)
+        tif_creator = InMemoryTifCreator()
+        generate_accumulations(
+            timestamp,
+            zone,
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): tif_config}),
+            tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+            tif_creator=tif_creator,
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+            publish_transaction=publish_transaction,
+        )
+        self.assertEqual(1, len(files_publisher.published))
+        published_pathes = [path for _, path in files_publisher.published[0]]
+        self.assertEqual(
+            [
+                get_tif_path_for_param_in_zone_at(param, zone, timestamp)
+                for param in [
+                    PrecipitationsParam.VALUES_1H,
+                    PrecipitationsParam.COLOR_1H,
+                ]
+            ],
+            published_pathes[:2],
+        )
+        self.assertTrue(
+            all(
+                staging_path.endswith(".staged")
+                for staging_path, _ in files_publisher.published[0]
+            )
+        )
+        self.assertTrue(
+            all(path.endswith(".staged") for path in tif_creator.tifs.keys())
+        )
+        self.assertEqual(6, len(tiles_repository.data))
+
+    def test_get_quicklook_level(self) -> None:
+        tif_config = TifConfig(
+            cols=1000, rows=600, geo_transform=(0, 1, 0, 0, 0, 1), projection="Test"
+        )
+        self.assertEqual(4, get_quicklook_level(tif_config, 256))
+        self.assertEqual(1, get_quicklook_level(tif_config, 1000))
+        self.assertEqual(1, get_quicklook_level(tif_config, 2000))
+
+    def test_get_quicklook_colors(self) -> None:
+        palette = Palette(
+            [0, 1, 2],
+            [(255, 255, 255, 0), (0, 0, 255, 255), (255, 0, 0, 255)],
+        )
+        data = numpy.array([[0, 0, 2, 2, 1], [0, 0, 2, 2, nan]], numpy.float32)
+        self.assertEqual(
+            [
+                [[255, 255, 0]],
+                [[255, 0, 0]],
+                [[255, 0, 255]],
+                [[0, 255, 255]],
+            ],
+            get_quicklook_colors(data, palette, 2).tolist(),
+        )
+        self.assertEqual(
+            palette.colorize(data).tolist(),
+            get_quicklook_colors(data, palette, 1).tolist(),
+        )
+
+    def test_generateAccumulations_whenQuicklooks(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tif_config = TifConfig(
+            cols=4,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        quicklook_generator = InMemoryQuicklookGenerator([2, 4], "webp")
+        generate_accumulations(
+            timestamp,
+            zone,
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): tif_config}),
+            tif_reader=SameInMemoryTifReader.from_list([[1, 2, 3, 4], [5, 6, 7, 8]]),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+            quicklook_generator=quicklook_generator,
+        )
+        self.assertEqual(
+            [
+                f"{TILES_PATH}/2000/06/15/{get_param_key_for_zone(param, zone)}_13_v00_{size}px.webp"
+                for param in [
+                    PrecipitationsParam.COLOR_1H,
+                    PrecipitationsParam.COLOR_3H,
+                    PrecipitationsParam.COLOR_6H,
+                    PrecipitationsParam.COLOR_12H,
+                    PrecipitationsParam.COLOR_24H,
+                    PrecipitationsParam.COLOR_72H,
+                ]
+                for size in [2, 4]
+            ],
+            list(quicklook_generator.quicklooks.keys()),
+        )
+        self.assertEqual(
+            (4, 1, 2),
+            quicklook_generator.quicklooks[
+                get_quicklook_path_for_param_in_zone_at(
+                    PrecipitationsParam.COLOR_3H, zone, timestamp, 2, "webp"
+                )
+            ].shape,
+        )
+        self.assertEqual(
+            (4, 2, 4),
+            quicklook_generator.quicklooks[
+                get_quicklook_path_for_param_in_zone_at(
+                    PrecipitationsParam.COLOR_3H, zone, timestamp, 4, "webp"
+                )
+            ].shape,
+        )
+
+    def test_get_sum_vrt_content(self) -> None:
+        tif_config = TifConfig(
+            cols=2, rows=3, geo_transform=(10, 1, 0, 20, 0, -1), projection="Test"
+        )
+        vrt = ElementTree.fromstring(
+            get_sum_vrt_content(
+                "/tiles/2000/06/15/ac3hradaricval_MF_METROPOLE_01_v00.vrt",
+                [
+                    ("/tiles/2000/06/14/ac60radaric_MF_METROPOLE_23_v00.tif", 1),
+                    ("/tiles/2000/06/15/ac60radaric_MF_METROPOLE_day.tif", 2),
+                ],
+                tif_config,
+            )
+        )
+        self.assertEqual({"rasterXSize": "2", "rasterYSize": "3"}, vrt.attrib)
+        self.assertEqual("Test", vrt.findtext("SRS"))
+        self.assertEqual(
+            "10.0, 1.0, 0.0, 20.0, 0.0, -1.0", vrt.findtext("GeoTransform")
+        )
+        self.assertEqual("sum", vrt.findtext("VRTRasterBand/PixelFunctionType"))
+        self.assertEqual(
+            [
+                "../14/ac60radaric_MF_METROPOLE_23_v00.tif",
+                "ac60radaric_MF_METROPOLE_day.tif",
+            ],
+            [
+                source.text
+                for source in vrt.findall("VRTRasterBand/SimpleSource/SourceFilename")
+            ],
+        )
+        self.assertEqual(
+            ["1", "2"],
+            [
+                source.text
+                for source in vrt.findall("VRTRasterBand/SimpleSource/SourceBand")
+            ],
+        )
+
+    def test_get_stat_path_for(self) -> None:
+        tif_path = (
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_12_v35.tif"
+        )
+        archive_path = (
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_day.tif"
+        )
+        self.assertEqual(tif_path, get_stat_path_for(tif_path, products_stager=None))
+        self.assertEqual(
+            archive_path,
+            get_stat_path_for(
+                tif_path,
+                products_stager=None,
+                tif_locator=InMemoryTifLocator({tif_path: (archive_path, 152)}),
+            ),
+        )
+        self.assertEqual(
+            tif_path,
+            get_stat_path_for(
+                tif_path, products_stager=None, tif_locator=InMemoryTifLocator()
+            ),
+        )
+
+    def test_RealVirtualValuesWriter(self) -> None:
+        tif_config = TifConfig(
+            cols=2, rows=3, geo_transform=(10, 1, 0, 20, 0, -1), projection="Test"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            source_path = os.path.join(directory, "14", "source.tif")
+            vrt_path = os.path.join(directory, "15", "virtual.vrt")
+            missing_path = os.path.join(directory, "14", "missing.tif")
+            RealVirtualValuesWriter().write_virtual_values(
+                vrt_path, [missing_path], tif_config
+            )
+            self.assertFalse(os.path.exists(vrt_path))
+            os.makedirs(os.path.dirname(source_path))
+            Path(source_path).write_bytes(b"tif")
+            RealVirtualValuesWriter().write_virtual_values(
+                vrt_path, [source_path, missing_path], tif_config
+            )
+            archive_path = os.path.join(directory, "14", "archive.tif")
+            RealVirtualValuesWriter(
+                InMemoryTifLocator({missing_path: (archive_path, 3)})
+            ).write_virtual_values(
+                os.path.join(directory, "15", "archived.vrt"),
+                [missing_path],
+                tif_config,
+            )
+            self.assertEqual(
+                ["../14/archive.tif"],
+                [
+                    source.text
+                    for source in ElementTree.parse(
+                        os.path.join(directory, "15", "archived.vrt")
+                    ).findall("VRTRasterBand/SimpleSource/SourceFilename")
+                ],
+            )
+            self.assertEqual(
+                ["../14/source.tif"],
+                [
+                    source.text
+                    for source in ElementTree.parse(vrt_path).findall(
+                        "VRTRasterBand/SimpleSource/SourceFilename"
+                    )
+                ],
+            )
+
+    def test_generateAccumulations_whenVirtualValues(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        virtual_values_writer = InMemoryVirtualValuesWriter()
+        generate_accumulations(
+            timestamp,
+            zone,
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): tif_config}),
+            tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+            color_tif_generator=InMemoryColorTifGenerator(),
+            virtual_values_writer=virtual_values_writer,
+        )
+        self.assertEqual(
+            {
+                get_vrt_path_for_param_in_zone_at(param, zone, timestamp): hours
+                for param, hours in [
+                    (PrecipitationsParam.VALUES_3H, 3),
+                    (PrecipitationsParam.VALUES_6H, 6),
+                    (PrecipitationsParam.VALUES_12H, 12),
+                ]
+            },
+            {
+                vrt_path: len(sources_pathes)
+                for vrt_path, sources_pathes in virtual_values_writer.vrts.items()
+            },
+        )
+        self.assertEqual(
+            get_tif_path_for_param_in_zone_at(
+                PrecipitationsParam.VALUES_1H, zone, timestamp
+            ),
+            virtual_values_writer.vrts[
+                get_vrt_path_for_param_in_zone_at(
+                    PrecipitationsParam.VALUES_3H, zone, timestamp
+                )
+            ][-1],
+        )
+
+    def test_generateAccumulationsOver1hIfPossible_whenReplacingUnchangedInputs(
+        self,
+    ) -> None:
+        zone = Zone.METROPOLE
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        color_tif_path = (
+            f"{TILES_PATH}/2000/06/15/colorac60radaric_MF_METROPOLE_13_v00.tif"
+        )
+        file_existence_checker = InMemoryFileExistenceChecker({color_tif_path})
+        generation_manifest = InMemoryGenerationManifest()
+        tifs_created: list[list[str]] = []
+        for _ in range(2):
+            tif_creator = InMemoryTifCreator()
+            generate_accumulations_over_some_hours_if_possible(
+                zone,
+                timestamp,
+                tif_config,
+                AccumulationDuration.CUMUL_1H,
+                file_existence_checker=file_existence_checker,
+                tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+                transform=MeteoFranceTransform(),
+                tif_creator=tif_creator,
+                command_executor=InMemoryCommandExecutor(),
+                tiles_repository=InMemoryTilesDatetimesRepository(),
+                replace_existing=True,
+                generation_manifest=generation_manifest,
+            )
+            tifs_created.append(list(tif_creator.tifs.keys()))
+        self.assertEqual(
+            [["/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_00.tif"], []],
+            tifs_created,
+        )
+        self.assertEqual(
+            [color_tif_path], list(generation_manifest.fingerprints.keys())
+        )
+
+    def test_generateAccumulationsOver1hIfPossible_whenReplacingUnchangedInputsWithMissingQuicklooks(
+        self,
+    ) -> None:
+        zone = Zone.METROPOLE
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        color_tif_path = (
+            f"{TILES_PATH}/2000/06/15/colorac60radaric_MF_METROPOLE_13_v00.tif"
+        )
+        file_existence_checker = InMemoryFileExistenceChecker({color_tif_path})
+        generation_manifest = InMemoryGenerationManifest()
+        tifs_created: list[list[str]] = []
+        for quicklook_generator in [
+            None,
+            InMemoryQuicklookGenerator([1]),
+            InMemoryQuicklookGenerator([1]),
+        ]:
+            tif_creator = InMemoryTifCreator()
+            generate_accumulations_over_some_hours_if_possible(
+                zone,
+                timestamp,
+                tif_config,
+                AccumulationDuration.CUMUL_1H,
+                file_existence_checker=file_existence_checker,
+                tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+                transform=MeteoFranceTransform(),
+                tif_creator=tif_creator,
+                command_executor=InMemoryCommandExecutor(),
+                tiles_repository=InMemoryTilesDatetimesRepository(),
+                replace_existing=True,
+                quicklook_generator=quicklook_generator,
+                generation_manifest=generation_manifest,
+            )
+            tifs_created.append(list(tif_creator.tifs.keys()))
+        self.assertEqual(
+            [
+                ["/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_00.tif"],
+                ["/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_00.tif"],
+                [],
+            ],
+            tifs_created,
+        )
+
+    def test_generateAccumulationsOver1hIfPossible_whenReplacingWithOtherOutputSettings(
+        self,
+    ) -> None:
+        zone = Zone.METROPOLE
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        color_tif_path = (
+            f"{TILES_PATH}/2000/06/15/colorac60radaric_MF_METROPOLE_13_v00.tif"
+        )
+        file_existence_checker = InMemoryFileExistenceChecker({color_tif_path})
+        generation_manifest = InMemoryGenerationManifest()
+        tifs_created: list[list[str]] = []
+        for arguments in [
+            Arguments(start=0, end=0),
+            Arguments(start=0, end=0, codecs=[("ac60radaric_MF", Codec("DEFLATE"))]),
+            Arguments(start=0, end=0, codecs=[("ac60radaric_MF", Codec("DEFLATE"))]),
+        ]:
+            generation_manifest.output_settings = get_output_settings_of(arguments)
+            tif_creator = InMemoryTifCreator()
+            generate_accumulations_over_some_hours_if_possible(
+                zone,
+                timestamp,
+                tif_config,
+                AccumulationDuration.CUMUL_1H,
+                file_existence_checker=file_existence_checker,
+                tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+                transform=MeteoFranceTransform(),
+                tif_creator=tif_creator,
+                command_executor=InMemoryCommandExecutor(),
+                tiles_repository=InMemoryTilesDatetimesRepository(),
+                replace_existing=True,
+                generation_manifest=generation_manifest,
+            )
+            tifs_created.append(list(tif_creator.tifs.keys()))
+        self.assertEqual(
+            [
+                ["/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_00.tif"],
+                ["/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_00.tif"],
+                [],
+            ],
+            tifs_created,
+        )
+
+    @unittest.skipUnless(is_gdal_available(), "gdal is not installed")
+    def test_createTif_roundTrip(self) -> None:
+        data = numpy.arange(15, dtype=numpy.float32).reshape((3, 5))
+        data[0, 0] = -99
+        with tempfile.TemporaryDirectory() as directory:
+            tif_path = os.path.join(directory, "values.tif")
+            create_tif(
+                tif_path,
+                ROUND_TRIP_TIF_CONFIG,
+                data,
+                no_data_value=-99,
+                codec=Codec("DEFLATE", level=6),
+                overview_levels=[2],
+            )
+            # written through /vsimem/ then renamed, leaving no temporary file
+            self.assertEqual(["values.tif"], os.listdir(directory))
+            dataset = gdal.Open(tif_path)
+            self.assertEqual(
+                ROUND_TRIP_TIF_CONFIG.geo_transform, dataset.GetGeoTransform()
+            )
+            self.assertEqual(
+                "DEFLATE",
+                dataset.GetMetadata("IMAGE_STRUCTURE").get("COMPRESSION", None),
+            )
+            band = dataset.GetRasterBand(1)
+            self.assertEqual(gdal.GDT_Float32, band.DataType)
+            self.assertEqual(-99, band.GetNoDataValue())
+            self.assertEqual(data.tolist(), band.ReadAsArray().tolist())
+            self.assertEqual(1, band.GetOverviewCount())
+            overview_band = band.GetOverview(0)
+            self.assertEqual((3, 2), (overview_band.XSize, overview_band.YSize))
+            self.assertEqual(-99, overview_band.GetNoDataValue())
+            self.assertEqual(
+                get_average_overview(data, 2, -99).tolist(),
+                overview_band.ReadAsArray().tolist(),
+            )
+
+    @unittest.skipUnless(is_gdal_available(), "gdal is not installed")
+    def test_createTif_roundTripWhenSparse(self) -> None:
+        data = numpy.full((3, 5), -99, numpy.float32)
+        with tempfile.TemporaryDirectory() as directory:
+            tif_path = os.path.join(directory, "values.tif")
+            create_tif(tif_path, ROUND_TRIP_TIF_CONFIG, data, -99, sparse=True)
+            band = gdal.Open(tif_path).GetRasterBand(1)
+            # the block of no data is not written
+            self.assertIsNone(band.GetMetadataItem("BLOCK_OFFSET_0_0", "TIFF"))
+            self.assertEqual(data.tolist(), band.ReadAsArray().tolist())
+
+    @unittest.skipUnless(is_gdal_available(), "gdal is not installed")
+    def test_createColorTif_roundTrip(self) -> None:
+        colors = numpy.zeros((4, 3, 5), numpy.uint8)
+        colors[:, 1, 2] = [10, 20, 30, 255]
+        # transparent, cleared since sparse
+        colors[:, 2, 4] = [40, 50, 60, 0]
+        with tempfile.TemporaryDirectory() as directory:
+            tif_path = os.path.join(directory, "color.tif")
+            create_color_tif(tif_path, ROUND_TRIP_TIF_CONFIG, colors, sparse=True)
+            self.assertEqual(["color.tif"], os.listdir(directory))
+            dataset = gdal.Open(tif_path)
+            self.assertEqual(
+                "COG", dataset.GetMetadata("IMAGE_STRUCTURE").get("LAYOUT", None)
+            )
+            self.assertEqual(
+                [
+                    gdal.GCI_RedBand,
+                    gdal.GCI_GreenBand,
+                    gdal.GCI_BlueBand,
+                    gdal.GCI_AlphaBand,
+                ],
+                [
+                    dataset.GetRasterBand(band_index).GetColorInterpretation()
+                    for band_index in range(1, 5)
+                ],
+            )
+            self.assertEqual(
+                clear_transparent_colors(colors).tolist(),
+                dataset.ReadAsArray().tolist(),
+            )
+
+    @unittest.skipUnless(is_gdal_available(), "gdal is not installed")
+    def test_createPalettedColorTif_roundTrip(self) -> None:
+        palette = Palette(
+            [0, 1, 2],
+            [(255, 255, 255, 0), (0, 0, 255, 255), (255, 0, 0, 128)],
+        )
+        indexes = palette.colorize_as_color_table_indexes(
+            numpy.array(
+                [[0, 1, 2, 3, -99], [1, 1, 1, 1, 1], [2, 2, -99, 0, 0]],
+                numpy.float32,
+            ),
+            no_data_value=-99,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            tif_path = os.path.join(directory, "color.tif")
+            create_paletted_color_tif(
+                tif_path, ROUND_TRIP_TIF_CONFIG, indexes, palette, sparse=True
+            )
+            dataset = gdal.Open(tif_path)
+            self.assertEqual(
+                "COG", dataset.GetMetadata("IMAGE_STRUCTURE").get("LAYOUT", None)
+            )
+            band = dataset.GetRasterBand(1)
+            self.assertEqual(gdal.GCI_PaletteIndex, band.GetColorInterpretation())
+            self.assertEqual(palette.get_no_data_index(), band.GetNoDataValue())
+            color_table = band.GetColorTable()
+            # tiff color maps have no alpha, the transparent colors being no data
+            self.assertEqual(
+                [color[:3] for color in palette.get_color_table()],
+                [
+                    tuple(color_table.GetColorEntry(index))[:3]
+                    for index in range(len(palette.get_color_table()))
+                ],
+            )
+            self.assertEqual(indexes.tolist(), band.ReadAsArray().tolist())
+
+    @unittest.skipUnless(is_gdal_available(), "gdal is not installed")
+    def test_encodeImage_roundTrip(self) -> None:
+        colors = numpy.zeros((4, 3, 5), numpy.uint8)
+        colors[:, 0, 0] = [10, 20, 30, 255]
+        colors[:, 2, 4] = [40, 50, 60, 128]
+        with tempfile.TemporaryDirectory() as directory:
+            for image_format in ["png", "webp"]:
+                image_path = os.path.join(directory, f"quicklook.{image_format}")
+                Path(image_path).write_bytes(encode_image(colors, image_format))
+                dataset = gdal.Open(image_path)
+                self.assertEqual(
+                    {"png": "PNG", "webp": "WEBP"}[image_format],
+                    dataset.GetDriver().ShortName,
+                )
+                image_colors = dataset.ReadAsArray()
+                # both lossless, webp being free to change the colors of transparent pixels
+                visible = colors[3] > 0
+                self.assertEqual(colors[3].tolist(), image_colors[3].tolist())
+                self.assertEqual(
+                    colors[:, visible].tolist(), image_colors[:, visible].tolist()
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,219 @@
+import os
+import tempfile
+import threading
+import unittest
+from typing import Any
+
+from generate_radaric_mf_values_accumulations.arguments import Arguments
+from generate_radaric_mf_values_accumulations.client import submit_job
+from generate_radaric_mf_values_accumulations.datetime_utils import (
+    get_timestamp_from_iso_utc_date,
+)
+from generate_radaric_mf_values_accumulations.generation import (
+    GenerationReporter,
+    IndexedFileExistenceChecker,
+    InMemoryFileExistenceChecker,
+    InMemoryTifConfigGetter,
+    InMemoryTifCreator,
+    SameInMemoryTifReader,
+    TifConfig,
+    generate_accumulations,
+)
+from generate_radaric_mf_values_accumulations.jobs import (
+    JobServer,
+    execute_job,
+    get_job_arguments,
+)
+from generate_radaric_mf_values_accumulations.radaric_mf_values_accumulations import (
+    InMemoryCommandExecutor,
+)
+from generate_radaric_mf_values_accumulations.tiles import (
+    AccumulationDuration,
+    InMemoryTilesDatetimesRepository,
+    PrecipitationsParam,
+    Zone,
+    get_tif_path_for_param_in_zone_at,
+)
+
+
+class TestJobs(unittest.TestCase):
+    maxDiff = None
+
+    def test_get_job_arguments(self) -> None:
+        arguments = Arguments(
+            start=0, end=0, zones=["METROPOLE", "REUNION"], sparse=True
+        )
+        job_arguments = get_job_arguments(
+            arguments,
+            {
+                "timestamp": 961074000,
+                "zones": ["REUNION"],
+                "replace": True,
+                "durations": ["3h"],
+            },
+        )
+        self.assertEqual(961074000, job_arguments.start)
+        self.assertEqual(961074000, job_arguments.end)
+        self.assertEqual([Zone.REUNION], job_arguments.zones)
+        self.assertTrue(job_arguments.replace)
+        self.assertEqual([AccumulationDuration.CUMUL_3H], job_arguments.durations)
+        self.assertTrue(job_arguments.sparse)
+        job_arguments = get_job_arguments(arguments, {"timestamp": 961074000})
+        self.assertEqual([Zone.METROPOLE, Zone.REUNION], job_arguments.zones)
+        self.assertFalse(job_arguments.replace)
+        self.assertEqual([], job_arguments.durations)
+        self.assertEqual(0, arguments.start)
+        for request in [
+            {},
+            {"timestamp": "961074000"},
+            {"timestamp": 961074000, "zones": ["FRANCE"]},
+            {"timestamp": 961074000, "durations": ["5mn"]},
+        ]:
+            with self.assertRaises(ValueError):
+                get_job_arguments(arguments, request)
+
+    def test_execute_job(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+
+        def execute(
+            arguments: Arguments, generation_reporter: GenerationReporter
+        ) -> None:
+            generate_accumulations(
+                arguments.start,
+                zone,
+                file_existence_checker=InMemoryFileExistenceChecker(
+                    {
+                        get_tif_path_for_param_in_zone_at(
+                            PrecipitationsParam.COLOR_3H, zone, timestamp
+                        )
+                    }
+                ),
+                tif_config_getter=InMemoryTifConfigGetter(
+                    {
+                        (zone, timestamp): TifConfig(
+                            cols=2,
+                            rows=2,
+                            geo_transform=(0, 1, 0, 0, 0, 1),
+                            projection="Test",
+                        )
+                    }
+                ),
+                tif_reader=SameInMemoryTifReader.from_list([[1, 2], [3, 4]]),
+                tif_creator=InMemoryTifCreator(),
+                command_executor=InMemoryCommandExecutor(),
+                tiles_repository=InMemoryTilesDatetimesRepository(),
+                generation_reporter=generation_reporter,
+                accumulations_durations=arguments.durations,
+            )
+
+        response = execute_job(
+            Arguments(start=0, end=0),
+            {"timestamp": timestamp, "durations": ["1h", "3h"]},
+            execute=execute,
+        )
+        self.assertTrue(response["ok"])
+        self.assertEqual(
+            [
+                ("METROPOLE", timestamp, "1h", "generated"),
+                ("METROPOLE", timestamp, "3h", "skipped"),
+            ],
+            [
+                (
+                    product["zone"],
+                    product["timestamp"],
+                    product["duration"],
+                    product["status"],
+                )
+                for product in response["products"]
+            ],
+        )
+
+        def fail(arguments: Arguments, generation_reporter: GenerationReporter) -> None:
+            raise RuntimeError("failed")
+
+        response = execute_job(
+            Arguments(start=0, end=0), {"timestamp": timestamp}, execute=fail
+        )
+        self.assertFalse(response["ok"])
+        self.assertEqual("RuntimeError('failed')", response["error"])
+
+    def test_JobServer(self) -> None:
+        executed: list[tuple[int, list[Zone]]] = []
+
+        def execute(
+            arguments: Arguments, generation_reporter: GenerationReporter
+        ) -> None:
+            executed.append((arguments.start, arguments.zones))
+            generation_reporter.report(
+                arguments.zones[0],
+                arguments.start,
+                AccumulationDuration.CUMUL_1H,
+                "generated",
+                0.5,
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            socket_path = os.path.join(directory, "jobs.sock")
+            with JobServer(
+                socket_path, Arguments(start=0, end=0), execute=execute
+            ) as job_server:
+                thread = threading.Thread(target=job_server.serve_forever)
+                thread.start()
+                try:
+                    response: dict[str, Any] = submit_job(
+                        {"timestamp": 961074000, "zones": ["REUNION"]}, socket_path
+                    )
+                    invalid_response = submit_job({"timestamp": None}, socket_path)
+                finally:
+                    job_server.shutdown()
+                    thread.join()
+        self.assertEqual([(961074000, [Zone.REUNION])], executed)
+        self.assertTrue(response["ok"])
+        self.assertEqual(
+            [
+                {
+                    "zone": "REUNION",
+                    "timestamp": 961074000,
+                    "duration": "1h",
+                    "status": "generated",
+                    "seconds": 0.5,
+                }
+            ],
+            response["products"],
+        )
+        self.assertFalse(invalid_response["ok"])
+
+    def test_JobServer_whenInputArrivesBetweenJobs(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "radaric_MF_METROPOLE_13_v05.tif")
+            file_existence_checker = IndexedFileExistenceChecker()
+            existing: list[bool] = []
+
+            def execute(
+                arguments: Arguments, generation_reporter: GenerationReporter
+            ) -> None:
+                existing.append(file_existence_checker.exists(input_path))
+
+            socket_path = os.path.join(directory, "jobs.sock")
+            with JobServer(
+                socket_path,
+                Arguments(start=0, end=0),
+                execute=execute,
+                file_existence_checker=file_existence_checker,
+            ) as job_server:
+                thread = threading.Thread(target=job_server.serve_forever)
+                thread.start()
+                try:
+                    submit_job({"timestamp": 961074000}, socket_path)
+                    with open(input_path, "wb"):
+                        pass
+                    submit_job({"timestamp": 961074300}, socket_path)
+                finally:
+                    job_server.shutdown()
+                    thread.join()
+        self.assertEqual([False, True], existing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+from generate_radaric_mf_values_accumulations.local_cache import LocalFileCache
+
+
+def write_file(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def read_file(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+class LockCheckingLocalFileCache(LocalFileCache):
+    def __init__(self, cache_path: str) -> None:
+        super().__init__(cache_path)
+        self.copied_while_locked: list[bool] = []
+
+    def copy_into_cache(self, path: str, local_path: str, mtime_ns: int) -> int:
+        locked = not self.lock.acquire(blocking=False)
+        if not locked:
+            self.lock.release()
+        self.copied_while_locked.append(locked)
+        return super().copy_into_cache(path, local_path, mtime_ns)
+
+
+class TestLocalCache(unittest.TestCase):
+    maxDiff = None
+
+    def test_fetch(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "remote", "2000", "file.tif")
+            write_file(path, "first")
+            local_file_cache = LocalFileCache(os.path.join(directory, "cache"))
+
+            local_path = local_file_cache.fetch(path)
+            self.assertEqual(
+                os.path.join(directory, "cache", path.lstrip("/")), local_path
+            )
+            self.assertEqual("first", read_file(local_path))
+            self.assertEqual(local_path, local_file_cache.fetch(path))
+            self.assertEqual(1, local_file_cache.statistics.hits)
+            self.assertEqual(1, local_file_cache.statistics.misses)
+            self.assertEqual(5, local_file_cache.statistics.bytes_saved)
+
+            write_file(path, "second")
+            os.utime(path, ns=(0, 1_000_000_000))
+            self.assertEqual("second", read_file(local_file_cache.fetch(path)))
+            self.assertEqual(2, local_file_cache.statistics.misses)
+
+            self.assertIsNone(
+                local_file_cache.fetch(os.path.join(directory, "missing.tif"))
+            )
+
+    def test_fetch_copiesWithoutTheLock(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "remote", "file.tif")
+            write_file(path, "first")
+            local_file_cache = LockCheckingLocalFileCache(
+                os.path.join(directory, "cache")
+            )
+            local_file_cache.fetch(path)
+            local_file_cache.store(path)
+            self.assertEqual([False, False], local_file_cache.copied_while_locked)
+            self.assertEqual(
+                [],
+                [
+                    name
+                    for name in os.listdir(
+                        os.path.dirname(local_file_cache.fetch(path))
+                    )
+                    if name.endswith(".tmp")
+                ],
+            )
+
+    def test_evict(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            pathes = [
+                os.path.join(directory, "remote", f"{name}.tif")
+                for name in ["a", "b", "c"]
+            ]
+            for path in pathes:
+                write_file(path, "0123456789")
+            local_file_cache = LocalFileCache(
+                os.path.join(directory, "cache"), max_size=25
+            )
+            local_file_cache.fetch(pathes[0])
+            local_file_cache.fetch(pathes[1])
+            local_file_cache.fetch(pathes[0])
+            local_file_cache.fetch(pathes[2])
+            self.assertTrue(local_file_cache.contains(pathes[0]))
+            self.assertFalse(local_file_cache.contains(pathes[1]))
+            self.assertTrue(local_file_cache.contains(pathes[2]))
+            self.assertFalse(os.path.exists(local_file_cache.get_local_path(pathes[1])))
+            self.assertEqual(1, local_file_cache.statistics.evictions)
+
+            reloaded_local_file_cache = LocalFileCache(
+                os.path.join(directory, "cache"), max_size=25
+            )
+            self.assertEqual(20, reloaded_local_file_cache.get_total_size())
+
+    def test_store(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "remote", "file.tif")
+            write_file(path, "written")
+            local_file_cache = LocalFileCache(os.path.join(directory, "cache"))
+            local_file_cache.store(path)
+            self.assertEqual(7, local_file_cache.statistics.bytes_stored)
+            local_file_cache.fetch(path)
+            self.assertEqual(1, local_file_cache.statistics.hits)
+            self.assertEqual(0, local_file_cache.statistics.misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from generate_radaric_mf_values_accumulations.manifest import (
+    MISSING_FILE_FINGERPRINT,
+    InMemoryGenerationManifest,
+    SQLiteGenerationManifest,
+    get_file_fingerprint,
+    get_inputs_fingerprint,
+)
+from generate_radaric_mf_values_accumulations.tiles import AccumulationDuration
+
+
+class TestManifest(unittest.TestCase):
+    def test_get_file_fingerprint(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.tif")
+            self.assertEqual(MISSING_FILE_FINGERPRINT, get_file_fingerprint(path))
+            Path(path).write_bytes(b"tif")
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            self.assertEqual("3:1000000000", get_file_fingerprint(path))
+
+    def test_get_inputs_fingerprint(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.tif")
+            Path(path).write_bytes(b"tif")
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            inputs = [(path, path)]
+            fingerprint = get_inputs_fingerprint(inputs, AccumulationDuration.CUMUL_3H)
+            self.assertEqual(
+                fingerprint,
+                get_inputs_fingerprint(inputs, AccumulationDuration.CUMUL_3H),
+            )
+            os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+            touched_fingerprint = get_inputs_fingerprint(
+                inputs, AccumulationDuration.CUMUL_3H
+            )
+            self.assertNotEqual(fingerprint, touched_fingerprint)
+            Path(path).write_bytes(b"tiff")
+            os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+            self.assertNotEqual(
+                touched_fingerprint,
+                get_inputs_fingerprint(inputs, AccumulationDuration.CUMUL_3H),
+            )
+            os.remove(path)
+            self.assertNotEqual(
+                touched_fingerprint,
+                get_inputs_fingerprint(inputs, AccumulationDuration.CUMUL_3H),
+            )
+            self.assertNotEqual(
+                get_inputs_fingerprint(inputs, AccumulationDuration.CUMUL_3H),
+                get_inputs_fingerprint(
+                    inputs, AccumulationDuration.CUMUL_3H, "COMPRESS=DEFLATE"
+                ),
+            )
+
+    def test_SQLiteGenerationManifest(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            manifest_path = os.path.join(directory, "cache", "manifest.sqlite")
+            manifest = SQLiteGenerationManifest(manifest_path)
+            self.assertIsNone(manifest.get_fingerprint("/product.tif"))
+            manifest.record("/product.tif", "first")
+            manifest.record("/product.tif", "second")
+            manifest.close()
+            manifest = SQLiteGenerationManifest(manifest_path)
+            self.assertEqual("second", manifest.get_fingerprint("/product.tif"))
+            manifest.close()
+
+    def test_InMemoryGenerationManifest(self) -> None:
+        manifest = InMemoryGenerationManifest({"/product.tif": "first"})
+        self.assertEqual("first", manifest.get_fingerprint("/product.tif"))
+        self.assertIsNone(manifest.get_fingerprint("/other.tif"))
+        manifest.record("/other.tif", "second")
+        self.assertEqual(
+            {"/product.tif": "first", "/other.tif": "second"}, manifest.fingerprints
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import types
+import unittest
+from math import nan
+
+import numpy
+from osgeo import gdal
+
+from generate_radaric_mf_values_accumulations.palettes import (
+    NO_DATA_COLOR,
+    Palette,
+    get_radar_palette_for,
+    parse_palette,
+)
+from generate_radaric_mf_values_accumulations.radaric_mf_values_accumulations import (
+    get_generate_color_tif_from_values_command,
+    get_radar_palette_file_path_for,
+)
+from generate_radaric_mf_values_accumulations.tiles import AccumulationDuration
+
+
+def get_gdaldem_nearest_color_index(values: list[float], value: float) -> int:
+    """GDALColorReliefGetRGBA of gdaldem, with COLOR_SELECTION_NEAREST_ENTRY"""
+    lower = 0
+    upper = len(values) - 1
+    while True:
+        middle = (lower + upper) // 2
+        if upper - lower <= 1:
+            if value <= values[lower]:
+                i = lower
+            elif value <= values[upper]:
+                i = upper
+            else:
+                i = upper + 1
+            break
+        if values[middle] >= value:
+            upper = middle
+        else:
+            lower = middle
+    if i == 0:
+        return 0
+    if i == len(values):
+        return i - 1
+    if values[i - 1] == value:
+        return i - 1
+    if value - values[i - 1] < values[i] - value:
+        return i - 1
+    return i
+
+
+def is_gdal_available() -> bool:
+    return isinstance(gdal, types.ModuleType) and shutil.which("gdaldem") is not None
+
+
+class TestPalettes(unittest.TestCase):
+    maxDiff = None
+
+    def test_parse_palette(self) -> None:
+        palette = parse_palette(
+            """
+2.0 40  58  228 255
+0   255 255 255 0
+1,183,218,226
+nv 1 2 3 4
+"""
+        )
+        self.assertEqual([0, 1, 2], palette.values.tolist())
+        self.assertEqual(
+            [[255, 255, 255, 0], [183, 218, 226, 255], [40, 58, 228, 255]],
+            palette.colors.tolist(),
+        )
+        self.assertEqual([1, 2, 3, 4], palette.no_data_color.tolist())
+        with self.assertRaises(ValueError):
+            parse_palette("0 255 255")
+
+    def test_get_radar_palette_for(self) -> None:
+        palette = get_radar_palette_for(AccumulationDuration.CUMUL_1H)
+        self.assertEqual(19, len(palette.values))
+        self.assertEqual([255, 255, 255, 0], palette.colors[0].tolist())
+        self.assertEqual([142, 17, 31, 255], palette.colors[-1].tolist())
+        self.assertEqual(NO_DATA_COLOR, tuple(palette.no_data_color.tolist()))
+        self.assertIs(palette, get_radar_palette_for(AccumulationDuration.CUMUL_1H))
+
+    def test_getColorIndexes_asGdaldem(self) -> None:
+        for accumulation_duration in [
+            AccumulationDuration.CUMUL_1H,
+            AccumulationDuration.CUMUL_3H,
+            AccumulationDuration.CUMUL_6H,
+            AccumulationDuration.CUMUL_12H,
+            AccumulationDuration.CUMUL_24H,
+            AccumulationDuration.CUMUL_72H,
+        ]:
+            palette = get_radar_palette_for(accumulation_duration)
+            values = palette.values.tolist()
+            data = [values[0] - 1, values[-1] + 1, nan, 0.0]
+            for lower, upper in zip(values, values[1:]):
+                middle = (lower + upper) / 2
+                data += [
+                    lower,
+                    upper,
+                    middle,
+                    numpy.nextafter(middle, lower),
+                    numpy.nextafter(middle, upper),
+                    float(numpy.float32(middle)),
+                ]
+            data += (
+                numpy.random.default_rng(0)
+                .uniform(-10, values[-1] + 10, 1000)
+                .astype(numpy.float32)
+                .tolist()
+            )
+            self.assertEqual(
+                [get_gdaldem_nearest_color_index(values, value) for value in data],
+                palette.get_color_indexes(numpy.array(data)).tolist(),
+                accumulation_duration,
+            )
+
+    def test_colorize(self) -> None:
+        palette = Palette(
+            [0, 1, 2],
+            [(255, 255, 255, 0), (0, 0, 255, 255), (255, 0, 0, 255)],
+        )
+        self.assertEqual(
+            [
+                [[255, 0], [255, 0]],
+                [[255, 0], [0, 0]],
+                [[255, 255], [0, 0]],
+                [[0, 255], [255, 0]],
+            ],
+            palette.colorize(
+                numpy.array([[0.4, 0.5], [3, -99]], numpy.float32), no_data_value=-99
+            ).tolist(),
+        )
+        self.assertEqual(
+            [[255], [0], [0], [255]],
+            palette.colorize(numpy.array([nan])).tolist(),
+        )
+
+    @unittest.skipUnless(is_gdal_available(), "gdal and gdaldem are not installed")
+    def test_colorize_asGdaldemColorRelief(self) -> None:
+        palette = get_radar_palette_for(AccumulationDuration.CUMUL_24H)
+        data = (
+            numpy.random.default_rng(0).gamma(0.5, 20, (64, 48)).astype(numpy.float32)
+        )
+        data[0, : len(palette.values)] = palette.values
+        with tempfile.TemporaryDirectory() as directory:
+            values_tif_path = os.path.join(directory, "values.tif")
+            color_tif_path = os.path.join(directory, "color.tif")
+            dataset = gdal.GetDriverByName("GTiff").Create(
+                values_tif_path, 48, 64, 1, gdal.GDT_Float32
+            )
+            dataset.SetGeoTransform((0, 1, 0, 0, 0, -1))
+            dataset.GetRasterBand(1).WriteArray(data)
+            dataset = None
+            subprocess.run(
+                get_generate_color_tif_from_values_command(
+                    values_tif_path,
+                    color_tif_path,
+                    get_radar_palette_file_path_for(AccumulationDuration.CUMUL_24H),
+                ),
+                shell=True,
+                check=True,
+                capture_output=True,
+            )
+            self.assertTrue(
+                numpy.array_equal(
+                    gdal.Open(color_tif_path).ReadAsArray(),
+                    palette.colorize(data),
+                )
+            )
+
+    def test_colorize_as_color_table_indexes(self) -> None:
+        palette = Palette(
+            [0, 1, 2],
+            [(255, 255, 255, 0), (0, 0, 255, 255), (255, 0, 0, 128)],
+        )
+        self.assertEqual(3, palette.get_no_data_index())
+        self.assertEqual(
+            [(255, 255, 255, 0), (0, 0, 255, 255), (255, 0, 0, 128), NO_DATA_COLOR],
+            palette.get_color_table(),
+        )
+        indexes = palette.colorize_as_color_table_indexes(
+            numpy.array([[0.4, 0.5], [3, -99]], numpy.float32), no_data_value=-99
+        )
+        self.assertEqual(numpy.uint8, indexes.dtype)
+        self.assertEqual([[3, 1], [2, 3]], indexes.tolist())
+
+    def test_getColorTable_whenTooManyColors(self) -> None:
+        palette = Palette(list(range(256)), [(0, 0, 0, 255) for _ in range(256)])
+        with self.assertRaises(ValueError):
+            palette.get_color_table()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,467 @@
+import unittest
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy
+from generate_radaric_mf_values_accumulations.datetime_utils import (
+    ONE_HOUR_IN_SECONDS,
+    get_timestamp_from_iso_utc_date,
+)
+from generate_radaric_mf_values_accumulations.generation import (
+    IdentityTransform,
+    InMemoryColorTifGenerator,
+    InMemoryFileExistenceChecker,
+    InMemoryTifConfigGetter,
+    InMemoryTifCreator,
+    InPlaceProductsStager,
+    SameInMemoryTifReader,
+    TifConfig,
+    TifConfigMismatchException,
+    Transform,
+    check_tif_config,
+    generate_accumulations,
+)
+from generate_radaric_mf_values_accumulations.pipeline import (
+    PipelineConcurrency,
+    PipelineFailedException,
+    PrerequisiteFailedException,
+    get_prerequisites_per_job,
+    get_timestamps_between,
+    plan_accumulation_jobs,
+    run_accumulations_pipeline,
+)
+from generate_radaric_mf_values_accumulations.radaric_mf_values_accumulations import (
+    InMemoryCommandExecutor,
+)
+from generate_radaric_mf_values_accumulations.tiles import (
+    AccumulationDuration,
+    InMemoryTilesDatetimesRepository,
+    Zone,
+)
+
+MEDIA_FS = "/media/datastore"
+TILES_PATH = f"{MEDIA_FS}/tempsreel.infoclimat.net/tiles"
+
+TIF_CONFIG = TifConfig(
+    cols=2,
+    rows=2,
+    geo_transform=(0, 1, 0, 0, 0, 1),
+    projection="Test",
+)
+
+
+class LoggingInMemoryTifReader(SameInMemoryTifReader):
+    def __init__(
+        self,
+        array: numpy.ndarray[Any, Any],
+        log: list[str],
+        failing_path: Optional[str] = None,
+    ) -> None:
+        super().__init__(array)
+        self.log = log
+        self.failing_path = failing_path
+
+    def read_tif(
+        self,
+        tif_path: str,
+        *,
+        transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
+    ) -> Optional[numpy.ndarray[Any, Any]]:
+        if tif_path == self.failing_path:
+            raise OSError(f"Cannot read '{tif_path}'")
+        self.log.append(f"read {tif_path}")
+        return super().read_tif(
+            tif_path, transform=transform, expected_tif_config=expected_tif_config
+        )
+
+
+class MismatchingInMemoryTifReader(SameInMemoryTifReader):
+    def __init__(
+        self,
+        array: numpy.ndarray[Any, Any],
+        tif_config: TifConfig,
+        tif_configs: Optional[dict[str, TifConfig]] = None,
+    ) -> None:
+        super().__init__(array)
+        self.tif_config = tif_config
+        self.tif_configs: dict[str, TifConfig] = tif_configs or {}
+
+    def read_tif(
+        self,
+        tif_path: str,
+        *,
+        transform: Transform = IdentityTransform(),
+        expected_tif_config: Optional[TifConfig] = None,
+    ) -> Optional[numpy.ndarray[Any, Any]]:
+        check_tif_config(
+            tif_path,
+            expected_tif_config,
+            self.tif_configs.get(tif_path, self.tif_config),
+        )
+        return super().read_tif(
+            tif_path, transform=transform, expected_tif_config=expected_tif_config
+        )
+
+
+class LoggingInMemoryCommandExecutor(InMemoryCommandExecutor):
+    def __init__(self, log: list[str]) -> None:
+        super().__init__()
+        self.log = log
+
+    def execute(self, command: str) -> None:
+        super().execute(command)
+        self.log.append(command)
+
+
+class TestPipeline(unittest.TestCase):
+    maxDiff = None
+
+    PALETTES_PATH = str(Path(__file__).parent.parent.parent / "palettes")
+
+    def test_plan_accumulation_jobs(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:55:00Z")
+        jobs = plan_accumulation_jobs(
+            get_timestamps_between(timestamp, timestamp + 5 * 60),
+            [Zone.METROPOLE, Zone.REUNION],
+            file_existence_checker=InMemoryFileExistenceChecker(
+                [f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_13_v00.tif"]
+            ),
+            tif_config_getter=InMemoryTifConfigGetter(
+                {
+                    (Zone.METROPOLE, timestamp): TIF_CONFIG,
+                    (Zone.METROPOLE, timestamp + 5 * 60): TIF_CONFIG,
+                }
+            ),
+        )
+        self.assertEqual(
+            [
+                (timestamp, AccumulationDuration.CUMUL_1H),
+                (timestamp + 5 * 60, AccumulationDuration.CUMUL_1H),
+                (timestamp + 5 * 60, AccumulationDuration.CUMUL_6H),
+                (timestamp + 5 * 60, AccumulationDuration.CUMUL_12H),
+                (timestamp + 5 * 60, AccumulationDuration.CUMUL_24H),
+                (timestamp + 5 * 60, AccumulationDuration.CUMUL_72H),
+            ],
+            [(job.timestamp, job.accumulation_duration) for job in jobs],
+        )
+        self.assertTrue(all(job.zone == Zone.METROPOLE for job in jobs))
+
+    def test_get_prerequisites_per_job(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:00:00Z")
+        jobs = plan_accumulation_jobs(
+            get_timestamps_between(timestamp, timestamp + ONE_HOUR_IN_SECONDS),
+            [Zone.METROPOLE],
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter(
+                {
+                    (Zone.METROPOLE, timestamp): TIF_CONFIG,
+                    (Zone.METROPOLE, timestamp + ONE_HOUR_IN_SECONDS): TIF_CONFIG,
+                }
+            ),
+        )
+        jobs_per_product = {
+            (job.timestamp, job.accumulation_duration): job for job in jobs
+        }
+        prerequisites_per_job = get_prerequisites_per_job(jobs)
+        cumul_1h_at_12 = jobs_per_product[(timestamp, AccumulationDuration.CUMUL_1H)]
+        cumul_1h_at_13 = jobs_per_product[
+            (timestamp + ONE_HOUR_IN_SECONDS, AccumulationDuration.CUMUL_1H)
+        ]
+        self.assertEqual([], prerequisites_per_job[cumul_1h_at_13])
+        self.assertEqual(
+            [cumul_1h_at_12, cumul_1h_at_13],
+            prerequisites_per_job[
+                jobs_per_product[
+                    (timestamp + ONE_HOUR_IN_SECONDS, AccumulationDuration.CUMUL_3H)
+                ]
+            ],
+        )
+        self.assertEqual(
+            [
+                jobs_per_product[
+                    (timestamp + ONE_HOUR_IN_SECONDS, AccumulationDuration.CUMUL_24H)
+                ]
+            ],
+            prerequisites_per_job[
+                jobs_per_product[
+                    (timestamp + ONE_HOUR_IN_SECONDS, AccumulationDuration.CUMUL_72H)
+                ]
+            ],
+        )
+
+    def test_run_accumulations_pipeline(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        array = numpy.array(
+            [
+                [1, 2],
+                [3, 4],
+            ]
+        )
+        serial_tif_creator = InMemoryTifCreator()
+        serial_command_executor = InMemoryCommandExecutor()
+        serial_tiles_repository = InMemoryTilesDatetimesRepository()
+        generate_accumulations(
+            timestamp,
+            zone,
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): TIF_CONFIG}),
+            tif_reader=SameInMemoryTifReader(array),
+            tif_creator=serial_tif_creator,
+            command_executor=serial_command_executor,
+            tiles_repository=serial_tiles_repository,
+        )
+
+        log: list[str] = []
+        file_existence_checker = InMemoryFileExistenceChecker()
+        tif_creator = InMemoryTifCreator()
+        command_executor = LoggingInMemoryCommandExecutor(log)
+        tiles_repository = InMemoryTilesDatetimesRepository()
+        report = run_accumulations_pipeline(
+            get_timestamps_between(timestamp, timestamp),
+            [zone],
+            file_existence_checker=file_existence_checker,
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): TIF_CONFIG}),
+            tif_reader=LoggingInMemoryTifReader(array, log),
+            tif_creator=tif_creator,
+            command_executor=command_executor,
+            tiles_repository=tiles_repository,
+            concurrency=PipelineConcurrency(
+                readers=3, writers=2, colorizers=2, queue_size=1
+            ),
+        )
+
+        self.assertEqual(6, report.generated)
+        self.assertEqual([], report.failed)
+        self.assertEqual(serial_tif_creator.tifs.keys(), tif_creator.tifs.keys())
+        for tif_path, accumulations in serial_tif_creator.tifs.items():
+            self.assertTrue(
+                numpy.allclose(
+                    accumulations, tif_creator.tifs[tif_path], atol=1e-6, rtol=0
+                )
+            )
+        self.assertEqual(
+            sorted(serial_command_executor.commands), sorted(command_executor.commands)
+        )
+        self.assertEqual(serial_tiles_repository.data, tiles_repository.data)
+        self.assertIn(
+            f"{TILES_PATH}/2000/06/15/ac72hradaric_MF_METROPOLE_13_v00.tif",
+            file_existence_checker.existing_files,
+        )
+        cumul_1h_path = f"{TILES_PATH}/2000/06/15/ac60radaric_MF_METROPOLE_13_v00.tif"
+        cumul_24h_path = (
+            f"{TILES_PATH}/2000/06/15/ac24hradaricval_MF_METROPOLE_13_v00.tif"
+        )
+        self.assertLess(
+            log.index(
+                f"mv /dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_00.tif {cumul_1h_path}"
+            ),
+            log.index(f"read {cumul_1h_path}"),
+        )
+        self.assertLess(
+            log.index(
+                f"mv /dev/shm/ac24hradaricval_MF_METROPOLE_2000_06_15_13_00.tif {cumul_24h_path}"
+            ),
+            log.index(f"read {cumul_24h_path}"),
+        )
+
+    def test_runAccumulationsPipeline_whenReadFails(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        command_executor = InMemoryCommandExecutor()
+        tiles_repository = InMemoryTilesDatetimesRepository()
+        report = run_accumulations_pipeline(
+            get_timestamps_between(timestamp, timestamp),
+            [zone],
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): TIF_CONFIG}),
+            tif_reader=LoggingInMemoryTifReader(
+                numpy.array([[1, 2], [3, 4]]),
+                [],
+                failing_path=f"{TILES_PATH}/2000/06/13/ac24hradaricval_MF_METROPOLE_13_v00.tif",
+            ),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=command_executor,
+            tiles_repository=tiles_repository,
+        )
+        self.assertEqual(5, report.generated)
+        self.assertEqual(
+            [AccumulationDuration.CUMUL_72H],
+            [job.accumulation_duration for job, _ in report.failed],
+        )
+        self.assertTrue(
+            str(PipelineFailedException(report)).startswith("1 accumulations failed")
+        )
+        self.assertNotIn("colorac72hradaric_MF_METROPOLE", tiles_repository.data)
+        self.assertIn("ac24hradaric_MF_METROPOLE", tiles_repository.data)
+
+    def test_runAccumulationsPipeline_whenTifConfigMismatch(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        cached_tif_config = TifConfig(
+            cols=3,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        tif_config_getter = InMemoryTifConfigGetter(
+            {(zone, timestamp): cached_tif_config}
+        )
+        tif_creator = InMemoryTifCreator()
+        report = run_accumulations_pipeline(
+            get_timestamps_between(timestamp, timestamp),
+            [zone],
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=tif_config_getter,
+            tif_reader=MismatchingInMemoryTifReader(
+                numpy.array([[1, 2], [3, 4]]), TIF_CONFIG
+            ),
+            tif_creator=tif_creator,
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+            concurrency=PipelineConcurrency(queue_size=1),
+        )
+        self.assertEqual(6, report.generated)
+        self.assertEqual([], report.failed)
+        self.assertEqual({zone: TIF_CONFIG}, tif_config_getter.updated_tif_configs)
+        self.assertEqual(
+            (2, 2),
+            tif_creator.tifs[
+                "/dev/shm/ac60radaric_MF_METROPOLE_2000_06_15_13_00.tif"
+            ].shape,
+        )
+
+    def test_runAccumulationsPipeline_whenTifConfigMismatchAgain(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        cached_tif_config = TifConfig(
+            cols=3,
+            rows=3,
+            geo_transform=(0, 1, 0, 0, 0, 1),
+            projection="Test",
+        )
+        other_tif_config = TifConfig(
+            cols=2,
+            rows=2,
+            geo_transform=(0, 2, 0, 0, 0, 2),
+            projection="Test",
+        )
+        report = run_accumulations_pipeline(
+            get_timestamps_between(timestamp, timestamp),
+            [zone],
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter(
+                {(zone, timestamp): cached_tif_config}
+            ),
+            tif_reader=MismatchingInMemoryTifReader(
+                numpy.array([[1, 2], [3, 4]]),
+                TIF_CONFIG,
+                {
+                    f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_13_v00.tif": other_tif_config
+                },
+            ),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+            accumulations_durations=[AccumulationDuration.CUMUL_1H],
+        )
+        self.assertEqual(0, report.generated)
+        self.assertEqual(1, len(report.failed))
+        self.assertIsInstance(report.failed[0][1], TifConfigMismatchException)
+
+    def test_runAccumulationsPipeline_whenPrerequisiteFails(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tiles_repository = InMemoryTilesDatetimesRepository()
+        report = run_accumulations_pipeline(
+            get_timestamps_between(timestamp, timestamp),
+            [zone],
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): TIF_CONFIG}),
+            tif_reader=LoggingInMemoryTifReader(
+                numpy.array([[1, 2], [3, 4]]),
+                [],
+                failing_path=f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_13_v00.tif",
+            ),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=tiles_repository,
+        )
+        self.assertEqual(0, report.generated)
+        failed = {job.accumulation_duration: error for job, error in report.failed}
+        self.assertIsInstance(failed.pop(AccumulationDuration.CUMUL_1H), OSError)
+        self.assertEqual(5, len(failed))
+        self.assertTrue(
+            all(
+                isinstance(error, PrerequisiteFailedException)
+                for error in failed.values()
+            )
+        )
+        self.assertEqual({}, tiles_repository.data)
+
+    def test_runAccumulationsPipeline_keepsLatestTilesDatetimes(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:55:00Z")
+        zone = Zone.METROPOLE
+        tiles_repository = InMemoryTilesDatetimesRepository()
+        run_accumulations_pipeline(
+            get_timestamps_between(timestamp - 5 * 60, timestamp),
+            [zone],
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter(
+                {(zone, timestamp): TIF_CONFIG, (zone, timestamp - 5 * 60): TIF_CONFIG}
+            ),
+            tif_reader=SameInMemoryTifReader(numpy.array([[1, 2], [3, 4]])),
+            tif_creator=InMemoryTifCreator(),
+            command_executor=InMemoryCommandExecutor(),
+            tiles_repository=tiles_repository,
+            concurrency=PipelineConcurrency(readers=4),
+        )
+        self.assertEqual(
+            {
+                "colorac60radaric_MF_METROPOLE": {
+                    "year": 2000,
+                    "month": "06",
+                    "day": "15",
+                    "hour": "12",
+                    "minute": "55",
+                }
+            },
+            tiles_repository.data,
+        )
+
+    def test_runAccumulationsPipeline_whenWritingInPlace(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        zone = Zone.METROPOLE
+        tif_creator = InMemoryTifCreator()
+        command_executor = InMemoryCommandExecutor()
+        color_tif_generator = InMemoryColorTifGenerator()
+        report = run_accumulations_pipeline(
+            get_timestamps_between(timestamp, timestamp),
+            [zone],
+            file_existence_checker=InMemoryFileExistenceChecker(),
+            tif_config_getter=InMemoryTifConfigGetter({(zone, timestamp): TIF_CONFIG}),
+            tif_reader=SameInMemoryTifReader(numpy.array([[1, 2], [3, 4]])),
+            tif_creator=tif_creator,
+            command_executor=command_executor,
+            tiles_repository=InMemoryTilesDatetimesRepository(),
+            color_tif_generator=color_tif_generator,
+            products_stager=InPlaceProductsStager(),
+        )
+        self.assertEqual(6, report.generated)
+        self.assertEqual(
+            sorted(
+                [
+                    f"{TILES_PATH}/2000/06/15/ac60radaric_MF_METROPOLE_13_v00.tif",
+                    f"{TILES_PATH}/2000/06/15/ac24hradaricval_MF_METROPOLE_13_v00.tif",
+                    f"{TILES_PATH}/2000/06/15/ac72hradaricval_MF_METROPOLE_13_v00.tif",
+                ]
+            ),
+            sorted(tif_creator.tifs.keys()),
+        )
+        self.assertEqual(6, len(color_tif_generator.tifs))
+        self.assertEqual([], command_executor.commands)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from typing import Any
+
+import numpy
+from osgeo import gdal
+
+from generate_radaric_mf_values_accumulations.datetime_utils import (
+    ONE_HOUR_IN_SECONDS,
+    get_timestamp_from_iso_utc_date,
+)
+from generate_radaric_mf_values_accumulations.generation import TifConfig
+from generate_radaric_mf_values_accumulations.pyramid import (
+    WEB_MERCATOR_ORIGIN,
+    InMemoryTilePyramidGenerator,
+    XYZTile,
+    get_tile_source_indexes,
+    get_tiles_covering,
+    is_web_mercator,
+    link_tile,
+    plan_pyramid,
+    render_tile,
+    render_tiles,
+)
+from generate_radaric_mf_values_accumulations.tiles import (
+    AccumulationDuration,
+    PrecipitationsParam,
+    Zone,
+    get_pyramid_path_for_param_in_zone_at,
+)
+
+# the north east quarter of the world, as the tile 1/1/0
+NORTH_EAST_TIF_CONFIG = TifConfig(
+    cols=4,
+    rows=4,
+    geo_transform=(
+        0,
+        WEB_MERCATOR_ORIGIN / 4,
+        0,
+        WEB_MERCATOR_ORIGIN,
+        0,
+        -WEB_MERCATOR_ORIGIN / 4,
+    ),
+    projection='PROJCS["WGS 84 / Pseudo-Mercator",AUTHORITY["EPSG","3857"]]',
+)
+
+
+def is_gdal_available() -> bool:
+    return isinstance(gdal, types.ModuleType)
+
+
+def get_colors_with_opaque(pixels: list[tuple[int, int]]) -> numpy.ndarray[Any, Any]:
+    colors = numpy.zeros((4, 4, 4), numpy.uint8)
+    for row, col in pixels:
+        colors[:, row, col] = [row, col, 255, 255]
+    return colors
+
+
+class TestPyramid(unittest.TestCase):
+    maxDiff = None
+
+    def test_is_web_mercator(self) -> None:
+        self.assertTrue(is_web_mercator(NORTH_EAST_TIF_CONFIG))
+        self.assertFalse(
+            is_web_mercator(
+                TifConfig(
+                    cols=1,
+                    rows=1,
+                    geo_transform=(0, 1, 0, 0, 0, -1),
+                    projection="WGS 84",
+                )
+            )
+        )
+
+    def test_get_tiles_covering(self) -> None:
+        self.assertEqual(
+            [XYZTile(1, 1, 0), XYZTile(1, 1, 1)],
+            get_tiles_covering(NORTH_EAST_TIF_CONFIG, 1),
+        )
+        self.assertEqual(
+            [XYZTile(2, x, y) for y in [0, 1, 2] for x in [2, 3]],
+            get_tiles_covering(NORTH_EAST_TIF_CONFIG, 2),
+        )
+
+    def test_render_tile(self) -> None:
+        colors = numpy.arange(4 * 4 * 4, dtype=numpy.uint8).reshape((4, 4, 4))
+        rows, cols = get_tile_source_indexes(NORTH_EAST_TIF_CONFIG, XYZTile(1, 1, 0), 4)
+        self.assertEqual([0, 1, 2, 3], rows.tolist())
+        self.assertEqual([0, 1, 2, 3], cols.tolist())
+        self.assertEqual(colors.tolist(), render_tile(colors, rows, cols).tolist())
+        rows, cols = get_tile_source_indexes(NORTH_EAST_TIF_CONFIG, XYZTile(1, 1, 1), 4)
+        self.assertEqual([-1, -1, -1, -1], rows.tolist())
+        self.assertEqual(
+            numpy.zeros((4, 4, 4)).tolist(), render_tile(colors, rows, cols).tolist()
+        )
+
+    def test_plan_pyramid(self) -> None:
+        colors = get_colors_with_opaque([(0, 0)])
+        plan = plan_pyramid(NORTH_EAST_TIF_CONFIG, [2], colors, tile_size=2)
+        self.assertEqual([XYZTile(2, 2, 0)], plan.rendered)
+        self.assertEqual([], plan.linked)
+        self.assertEqual(5, plan.transparent)
+
+        plan = plan_pyramid(
+            NORTH_EAST_TIF_CONFIG, [2], colors, colors.copy(), tile_size=2
+        )
+        self.assertEqual([], plan.rendered)
+        self.assertEqual([XYZTile(2, 2, 0)], plan.linked)
+
+        changed_colors = get_colors_with_opaque([(0, 0), (3, 3)])
+        plan = plan_pyramid(
+            NORTH_EAST_TIF_CONFIG, [2], changed_colors, colors, tile_size=2
+        )
+        self.assertEqual([XYZTile(2, 3, 1)], plan.rendered)
+        self.assertEqual([XYZTile(2, 2, 0)], plan.linked)
+
+    def test_InMemoryTilePyramidGenerator(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+        param = PrecipitationsParam.COLOR_3H
+        zone = Zone.METROPOLE
+        generator = InMemoryTilePyramidGenerator([2], tile_size=2)
+        data = numpy.zeros((4, 4), numpy.float32)
+        data[0, 0] = 10
+        for hour in range(2):
+            generator.generate_pyramid(
+                param,
+                zone,
+                timestamp + hour * ONE_HOUR_IN_SECONDS,
+                AccumulationDuration.CUMUL_3H,
+                NORTH_EAST_TIF_CONFIG,
+                data,
+            )
+        first_pyramid_path = get_pyramid_path_for_param_in_zone_at(
+            param, zone, timestamp
+        )
+        second_pyramid_path = get_pyramid_path_for_param_in_zone_at(
+            param, zone, timestamp + ONE_HOUR_IN_SECONDS
+        )
+        self.assertEqual(
+            [f"{first_pyramid_path}/2/2/0.png", f"{second_pyramid_path}/2/2/0.png"],
+            list(generator.tiles.keys()),
+        )
+        self.assertEqual(
+            {f"{second_pyramid_path}/2/2/0.png": f"{first_pyramid_path}/2/2/0.png"},
+            generator.linked,
+        )
+
+    @unittest.skipUnless(is_gdal_available(), "gdal is not installed")
+    def test_renderTiles_roundTrip(self) -> None:
+        colors = get_colors_with_opaque([(0, 0), (3, 3)])
+        tiles = get_tiles_covering(NORTH_EAST_TIF_CONFIG, 2)
+        with tempfile.TemporaryDirectory() as directory:
+            pyramid_path = os.path.join(directory, "xyz")
+            self.assertEqual(
+                2,
+                render_tiles(
+                    colors, 0, NORTH_EAST_TIF_CONFIG, tiles, pyramid_path, tile_size=2
+                ),
+            )
+            for tile in tiles:
+                tile_path = tile.get_path_in(pyramid_path)
+                tile_colors = render_tile(
+                    colors, *get_tile_source_indexes(NORTH_EAST_TIF_CONFIG, tile, 2)
+                )
+                if not tile_colors[3].any():
+                    self.assertFalse(os.path.exists(tile_path))
+                    continue
+                dataset = gdal.Open(tile_path)
+                self.assertEqual("PNG", dataset.GetDriver().ShortName)
+                self.assertEqual(tile_colors.tolist(), dataset.ReadAsArray().tolist())
+            self.assertEqual(
+                ["0.png", "1.png"],
+                sorted(os.listdir(os.path.join(pyramid_path, "2", "2")))
+                + sorted(os.listdir(os.path.join(pyramid_path, "2", "3"))),
+            )
+
+    def test_link_tile(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            previous_tile_path = os.path.join(directory, "previous", "2", "2", "0.png")
+            tile_path = os.path.join(directory, "current", "2", "2", "0.png")
+            self.assertFalse(link_tile(previous_tile_path, tile_path))
+            os.makedirs(os.path.dirname(previous_tile_path))
+            Path(previous_tile_path).write_bytes(b"png")
+            self.assertTrue(link_tile(previous_tile_path, tile_path))
+            self.assertTrue(os.path.samefile(previous_tile_path, tile_path))
+            self.assertTrue(link_tile(tile_path, tile_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+from generate_radaric_mf_values_accumulations.datetime_utils import (
+    get_timestamp_from_iso_utc_date,
+)
+from generate_radaric_mf_values_accumulations.read_ahead import (
+    InMemoryFilePrefetcher,
+    RealFilePrefetcher,
+    get_accumulations_durations_generated_at,
+    get_next_cycle_working_set,
+    read_ahead,
+    read_ahead_next_cycle,
+)
+from generate_radaric_mf_values_accumulations.tiles import AccumulationDuration, Zone
+
+MEDIA_FS = "/media/datastore"
+TILES_PATH = f"{MEDIA_FS}/tempsreel.infoclimat.net/tiles"
+
+
+class TestReadAhead(unittest.TestCase):
+    maxDiff = None
+
+    def test_get_accumulations_durations_generated_at(self) -> None:
+        self.assertEqual(
+            [],
+            get_accumulations_durations_generated_at(
+                get_timestamp_from_iso_utc_date("2000-06-15T12:32:00Z")
+            ),
+        )
+        self.assertEqual(
+            [AccumulationDuration.CUMUL_1H],
+            get_accumulations_durations_generated_at(
+                get_timestamp_from_iso_utc_date("2000-06-15T12:35:00Z")
+            ),
+        )
+        self.assertEqual(
+            6,
+            len(
+                get_accumulations_durations_generated_at(
+                    get_timestamp_from_iso_utc_date("2000-06-15T13:00:00Z")
+                )
+            ),
+        )
+
+    def test_getNextCycleWorkingSet_whenNextIsNotOnTheHour(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:00Z")
+        self.assertEqual(
+            [
+                f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_{hour_and_minute}.tif"
+                for hour_and_minute in [
+                    "11_v40",
+                    "11_v45",
+                    "11_v50",
+                    "11_v55",
+                    "12_v00",
+                    "12_v05",
+                    "12_v10",
+                    "12_v15",
+                    "12_v20",
+                    "12_v25",
+                    "12_v30",
+                ]
+            ],
+            get_next_cycle_working_set([Zone.METROPOLE], timestamp),
+        )
+
+    def test_getNextCycleWorkingSet_whenNextIsOnTheHour(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:55:00Z")
+        working_set = get_next_cycle_working_set([Zone.REUNION], timestamp)
+        self.assertEqual(11 + 23 + 2, len(working_set))
+        self.assertIn(
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_REUNION_12_v55.tif",
+            working_set,
+        )
+        self.assertIn(
+            f"{TILES_PATH}/2000/06/14/ac60radaric_MF_REUNION_14_v00.tif",
+            working_set,
+        )
+        self.assertIn(
+            f"{TILES_PATH}/2000/06/13/ac24hradaricval_MF_REUNION_13_v00.tif",
+            working_set,
+        )
+        self.assertNotIn(
+            f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_REUNION_13_v00.tif",
+            working_set,
+        )
+        self.assertNotIn(
+            f"{TILES_PATH}/2000/06/15/ac60radaric_MF_REUNION_13_v00.tif",
+            working_set,
+        )
+
+    def test_read_ahead(self) -> None:
+        file_prefetcher = InMemoryFilePrefetcher({"/a.tif": 10, "/b.tif": 20})
+        report = read_ahead(
+            ["/a.tif", "/missing.tif", "/b.tif"], file_prefetcher=file_prefetcher
+        )
+        self.assertEqual(2, report.files)
+        self.assertEqual(1, report.missing_files)
+        self.assertEqual(30, report.bytes)
+        self.assertEqual(["/a.tif", "/b.tif"], sorted(file_prefetcher.prefetched))
+
+    def test_read_ahead_next_cycle(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:00Z")
+        path = f"{TILES_PATH}/2000/06/15/mosaiques_MF_LAME_D_EAU_METROPOLE_12_v30.tif"
+        file_prefetcher = InMemoryFilePrefetcher({path: 10})
+        report = read_ahead_next_cycle(
+            [Zone.METROPOLE], timestamp, file_prefetcher=file_prefetcher
+        )
+        self.assertEqual(1, report.files)
+        self.assertEqual(10, report.missing_files)
+        self.assertEqual([path], file_prefetcher.prefetched)
+
+    def test_RealFilePrefetcher(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "file.tif")
+            with open(path, "wb") as f:
+                f.write(b"0" * 1234)
+            for read_through in [False, True]:
+                file_prefetcher = RealFilePrefetcher(read_through=read_through)
+                self.assertEqual(1234, file_prefetcher.prefetch(path))
+                self.assertIsNone(
+                    file_prefetcher.prefetch(os.path.join(directory, "missing.tif"))
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from typing import Any
+
+PROJECT_PATH = str(Path(__file__).parent.parent)
+HEAVY_MODULES = ["numpy", "scipy", "osgeo", "sqlalchemy"]
+# seconds to parse the arguments, far above what the standard library needs
+STARTUP_BUDGET = 0.5
+
+
+def run_startup(code: str) -> dict[str, Any]:
+    """in a new interpreter, without the credentials of the database"""
+    script = f"""
+import json, sys, time
+start_time = time.perf_counter()
+{code}
+print(json.dumps({{
+    "seconds": time.perf_counter() - start_time,
+    "heavy_modules": sorted(
+        name for name in sys.modules if name.split(".")[0] in {HEAVY_MODULES!r}
+    ),
+}}))
+"""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ["DB_HOST", "DB_USER", "DB_PASSWORD", "PYTHONPATH"]
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_PATH,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+    def test_parse_arguments(self) -> None:
+        startup = run_startup(
+            """
+from generate_radaric_mf_values_accumulations.main import main
+from generate_radaric_mf_values_accumulations.arguments import parse_arguments
+parse_arguments(["--timestamp", "961072245", "--zone", "METROPOLE"])
+"""
+        )
+        self.assertEqual([], startup["heavy_modules"])
+        self.assertLess(startup["seconds"], STARTUP_BUDGET)
+
+    def test_client(self) -> None:
+        startup = run_startup(
+            """
+from generate_radaric_mf_values_accumulations.client import parse_client_arguments
+parse_client_arguments(["--timestamp", "961072245"])
+assert [
+    name for name in sys.modules if name.startswith("generate_radaric_mf_values_accumulations.")
+] == ["generate_radaric_mf_values_accumulations.client"]
+"""
+        )
+        self.assertEqual([], startup["heavy_modules"])
+        self.assertLess(startup["seconds"], STARTUP_BUDGET)
+
+    def test_generation(self) -> None:
+        """scipy for the accumulations over 1h only, sqlalchemy when connecting only"""
+        startup = run_startup(
+            """
+try:
+    import osgeo
+except ImportError:
+    print(json.dumps({"skipped": "osgeo is not installed"}))
+    sys.exit(0)
+import generate_radaric_mf_values_accumulations.generation
+"""
+        )
+        if "skipped" in startup:
+            self.skipTest(startup["skipped"])
+        self.assertNotIn("scipy", startup["heavy_modules"])
+        self.assertNotIn("sqlalchemy", startup["heavy_modules"])
+
+
+if __name__ == "__main__":
+    unittest.main()
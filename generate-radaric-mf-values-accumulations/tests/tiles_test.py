@@ -8,7 +8,10 @@ from generate_radaric_mf_values_accumulations.tiles import (
     PrecipitationsParam,
     Zone,
     get_param_key_for_zone,
+    get_pyramid_path_for_param_in_zone_at,
+    get_quicklook_path_for_param_in_zone_at,
     get_tif_path_for_param_in_zone_at,
+    get_vrt_path_for_param_in_zone_at,
     update_tile_last_timestamp,
 )
 
@@ -64,6 +67,33 @@ class TestTiles(unittest.TestCase):
             ),
         )
 
+    def test_get_quicklook_path_for_param_in_zone_at(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:45Z")
+        self.assertEqual(
+            f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_12_v30_256px.png",
+            get_quicklook_path_for_param_in_zone_at(
+                PrecipitationsParam.COLOR_3H, Zone.METROPOLE, timestamp, 256, "png"
+            ),
+        )
+
+    def test_get_pyramid_path_for_param_in_zone_at(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:30:45Z")
+        self.assertEqual(
+            f"{TILES_PATH}/2000/06/15/ac3hradaric_MF_METROPOLE_12_v30_xyz",
+            get_pyramid_path_for_param_in_zone_at(
+                PrecipitationsParam.COLOR_3H, Zone.METROPOLE, timestamp
+            ),
+        )
+
+    def test_get_vrt_path_for_param_in_zone_at(self) -> None:
+        timestamp = get_timestamp_from_iso_utc_date("2000-06-15T12:00:00Z")
+        self.assertEqual(
+            f"{TILES_PATH}/2000/06/15/ac3hradaricval_MF_METROPOLE_12_v00.vrt",
+            get_vrt_path_for_param_in_zone_at(
+                PrecipitationsParam.VALUES_3H, Zone.METROPOLE, timestamp
+            ),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,127 @@
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from generate_radaric_mf_values_accumulations.arguments import Arguments
+from generate_radaric_mf_values_accumulations.tiles import Zone
+from generate_radaric_mf_values_accumulations.zones_pool import (
+    PrefixedWriter,
+    ZoneResult,
+    ZonesFailedException,
+    execute_zones_with,
+    get_arguments_per_zone,
+    is_executed_per_zone,
+)
+
+
+class TestZonesPool(unittest.TestCase):
+    maxDiff = None
+
+    def test_PrefixedWriter(self) -> None:
+        stream = io.StringIO()
+        writer = PrefixedWriter(stream, "[METROPOLE] ")
+        writer.write("Processing ")
+        self.assertEqual("", stream.getvalue())
+        writer.write("'a.tif'...\nTook 1 s.\nlast")
+        self.assertEqual(
+            "[METROPOLE] Processing 'a.tif'...\n[METROPOLE] Took 1 s.\n",
+            stream.getvalue(),
+        )
+        writer.flush()
+        self.assertEqual(
+            "[METROPOLE] Processing 'a.tif'...\n[METROPOLE] Took 1 s.\n[METROPOLE] last\n",
+            stream.getvalue(),
+        )
+
+    def test_is_executed_per_zone(self) -> None:
+        zones = ["METROPOLE", "REUNION"]
+        self.assertTrue(
+            is_executed_per_zone(Arguments(start=0, end=0, zones=zones, jobs=2))
+        )
+        self.assertFalse(is_executed_per_zone(Arguments(start=0, end=0, zones=zones)))
+        self.assertFalse(
+            is_executed_per_zone(Arguments(start=0, end=0, zones=["METROPOLE"], jobs=2))
+        )
+        self.assertFalse(
+            is_executed_per_zone(
+                Arguments(start=0, end=0, zones=zones, jobs=2, daemon=True)
+            )
+        )
+
+    def test_get_arguments_per_zone(self) -> None:
+        arguments = Arguments(
+            start=0, end=3600, zones=["METROPOLE", "REUNION"], replace=True, jobs=2
+        )
+        arguments_per_zone = get_arguments_per_zone(arguments)
+        self.assertEqual(
+            [([Zone.METROPOLE], 0, 3600, True, 1), ([Zone.REUNION], 0, 3600, True, 1)],
+            [
+                (
+                    zone_arguments.zones,
+                    zone_arguments.start,
+                    zone_arguments.end,
+                    zone_arguments.replace,
+                    zone_arguments.jobs,
+                )
+                for zone_arguments in arguments_per_zone
+            ],
+        )
+        self.assertEqual([Zone.METROPOLE, Zone.REUNION], arguments.zones)
+
+    def test_getArgumentsPerZone_whenLocalCache(self) -> None:
+        arguments = Arguments(
+            start=0,
+            end=0,
+            zones=["METROPOLE", "REUNION"],
+            local_cache_size=2048,
+            local_cache_path="/cache/tiles",
+            jobs=2,
+        )
+        self.assertEqual(
+            [(1024, "/cache/tiles_METROPOLE"), (1024, "/cache/tiles_REUNION")],
+            [
+                (zone_arguments.local_cache_size, zone_arguments.local_cache_path)
+                for zone_arguments in get_arguments_per_zone(arguments)
+            ],
+        )
+        self.assertEqual("/cache/tiles", arguments.local_cache_path)
+
+    def test_execute_zones_with(self) -> None:
+        arguments = Arguments(
+            start=0, end=0, zones=["METROPOLE", "ANTILLES", "REUNION"], jobs=3
+        )
+
+        def execute(zone_arguments: Arguments) -> ZoneResult:
+            zone = zone_arguments.zones[0]
+            if zone == Zone.ANTILLES:
+                return ZoneResult(zone, 1, "RuntimeError('failed')")
+            if zone == Zone.REUNION:
+                raise RuntimeError("killed")
+            return ZoneResult(zone, 2)
+
+        with ThreadPoolExecutor(3) as executor, redirect_stdout(io.StringIO()):
+            with self.assertRaises(ZonesFailedException) as cm:
+                execute_zones_with(arguments, executor=executor, execute=execute)
+        self.assertEqual(
+            [
+                (Zone.ANTILLES, "RuntimeError('failed')"),
+                (Zone.REUNION, "RuntimeError('killed')"),
+            ],
+            [(result.zone, result.error) for result in cm.exception.results],
+        )
+
+        with ThreadPoolExecutor(3) as executor, redirect_stdout(io.StringIO()):
+            results = execute_zones_with(
+                arguments,
+                executor=executor,
+                execute=lambda zone_arguments: ZoneResult(zone_arguments.zones[0], 1),
+            )
+        self.assertEqual(
+            [Zone.METROPOLE, Zone.ANTILLES, Zone.REUNION],
+            [result.zone for result in results],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
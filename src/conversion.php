@@ -194,8 +194,9 @@ function compute_cumuls_from_all_zones(
     Outputer        $outputer = new FakeOutputer()
 ): void {
     $PYTHON_SCRIPT_PROJECT_PATH = dirname(__DIR__) . '/generate-radaric-mf-values-accumulations';
+    // the console script of the in-project virtualenv, without the cold start of poetry
     $command = <<<SH
-        cd {$PYTHON_SCRIPT_PROJECT_PATH} && poetry run python ./generate_radaric_mf_values_accumulations/main.py --timestamp {$timestamp} >> /var/log/infoclimat/generate-radaric-mf-values-accumulations.log 2>> /var/log/infoclimat/generate-radaric-mf-values-accumulations.error.log
+        cd {$PYTHON_SCRIPT_PROJECT_PATH} && ./.venv/bin/submit-radaric-mf-values-accumulations --timestamp {$timestamp} >> /var/log/infoclimat/generate-radaric-mf-values-accumulations.log 2>> /var/log/infoclimat/generate-radaric-mf-values-accumulations.error.log
         SH;
     $outputer->echo("Running : {$command}\n");
     $outputer->echo($command_executor->shell_exec($command) ?? '');